@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""Benchmark BMC power, boot device and credential discovery operations
+against simulated BMC fleets (see 'lib.bmc_simulator')
+"""
+
+# Copyright 2019 IBM Corp.
+#
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import multiprocessing
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from tabulate import tabulate
+
+import lib.logger as logger
+from lib.bmc import Bmc
+from lib.bmc_discovery import CredentialDiscovery
+from lib.bmc_simulator import (BmcFleet, DEFAULT_LATENCY,
+                               MAX_NODES_PER_PROCESS)
+
+NODE_COUNTS = '1,10,100,1000'
+OPERATIONS = ('login', 'power', 'bootdev', 'inventory', 'status', 'snapshot',
+              'discover')
+# Read with OpenBMC REST requests only
+OPENBMC_OPERATIONS = ('status', 'snapshot')
+USERID = 'ADMIN'
+PASSWORD = 'admin'
+
+
+def _login(address, bmc_type):
+    bmc = Bmc(address, USERID, PASSWORD, bmc_type)
+    if not bmc.is_connected():
+        return None
+    return bmc
+
+
+def _run_login(address, bmc_type):
+    bmc = _login(address, bmc_type)
+    return bmc is not None and bool(bmc.logout())
+
+
+def _run_power(address, bmc_type):
+    bmc = _login(address, bmc_type)
+    if bmc is None:
+        return False
+    result = (bmc.chassis_power('on') is not None and
+              bmc.chassis_power('status') == 'on')
+    bmc.logout()
+    return result
+
+
+def _run_bootdev(address, bmc_type):
+    bmc = _login(address, bmc_type)
+    if bmc is None:
+        return False
+    result = (bmc.host_boot_source('network') == 'network' and
+              bmc.host_boot_source() == 'network')
+    bmc.logout()
+    return result
+
+
+def _run_inventory(address, bmc_type):
+    bmc = _login(address, bmc_type)
+    if bmc is None:
+        return False
+    result = bmc.get_system_sn_pn() is not None
+    bmc.logout()
+    return result
+
+
+def _run_status(address, bmc_type):
+    """Read power, boot and inventory state with one request per fact"""
+    bmc = _login(address, bmc_type)
+    if bmc is None:
+        return False
+    result = (bmc.chassis_power('status') is not None and
+              bmc.host_boot_source() is not None and
+              bmc.host_boot_mode() is not None and
+              bmc.get_system_sn_pn() is not None)
+    bmc.logout()
+    return result
+
+
+def _run_snapshot(address, bmc_type):
+    """Read the same state as _run_status with one snapshot"""
+    bmc = _login(address, bmc_type)
+    if bmc is None:
+        return False
+    snapshot = bmc.get_snapshot()
+    result = snapshot is not None and None not in snapshot
+    bmc.logout()
+    return result
+
+
+NODE_OPERATIONS = {'login': _run_login, 'power': _run_power,
+                   'bootdev': _run_bootdev, 'inventory': _run_inventory,
+                   'status': _run_status, 'snapshot': _run_snapshot}
+
+
+def _get_executor(args):
+    """Get the executor that runs per-node operations
+
+    pyghmi IPMI sessions share one client per process and it can deadlock
+    retrying requests (e.g. power state polling) for concurrent threads, so
+    concurrent IPMI nodes are handled by worker processes instead. Workers are
+    started before the benchmark is timed.
+
+    Returns:
+        Executor: Thread or process pool with args.workers workers
+    """
+    if args.bmc_type != 'ipmi' or args.workers == 1:
+        return ThreadPoolExecutor(max_workers=args.workers)
+    executor = ProcessPoolExecutor(
+        max_workers=args.workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=logger.create,
+        initargs=(args.log_lvl_file, args.log_lvl_print))
+    for future in [executor.submit(time.sleep, 0.1)
+                   for _ in range(args.workers)]:
+        future.result()
+    return executor
+
+
+def _run_discover(fleet, workers):
+    """Discover credentials when half of the candidate sets are wrong"""
+    count = len(fleet.endpoints)
+    cred_list = [[USERID, 'wrong', fleet.bmc_type, count // 2],
+                 [USERID, PASSWORD, fleet.bmc_type, count - count // 2]]
+    discovery = CredentialDiscovery(cred_list, max_workers=workers)
+    bmc_ai = discovery.discover(fleet.get_addresses(), max_rounds=3, delay=1)
+    return count - len(bmc_ai)
+
+
+def run_benchmark(operation, count, args):
+    """Run one operation against a new simulated fleet
+
+    Returns:
+        list: Result table row
+    """
+    log = logger.getlogger()
+    with BmcFleet(count, args.bmc_type, addresses=args.addresses,
+                  nodes_per_process=args.nodes_per_process, userid=USERID,
+                  password=PASSWORD, latency=args.latency,
+                  auth_fail_rate=args.auth_fail_rate, seed=args.seed) as fleet:
+        executor = None if operation == 'discover' else _get_executor(args)
+        start = time.time()
+        try:
+            if operation == 'discover':
+                failed = _run_discover(fleet, args.workers)
+            else:
+                results = list(executor.map(
+                    NODE_OPERATIONS[operation], fleet.get_addresses(),
+                    [args.bmc_type] * count))
+                failed = results.count(False)
+            error = None
+        except Exception as exc:
+            log.debug(f'{operation} on {count} BMCs failed', exc_info=True)
+            failed = count
+            error = f'{type(exc).__name__}: {exc}'
+        elapsed = time.time() - start
+        if executor is not None:
+            executor.shutdown()
+        stats = fleet.get_stats()
+    operations = stats.logins + stats.requests
+    return [operation, args.bmc_type, count, args.workers, f'{elapsed:.2f}',
+            f'{count / elapsed:.1f}', operations,
+            f'{operations / elapsed:.1f}', stats.auth_failures, failed,
+            error or 'ok']
+
+
+def main(args):
+    log = logger.getlogger()
+    operations = args.operations.split(',')
+    for operation in operations:
+        if operation not in OPERATIONS:
+            sys.exit(f'Unknown operation {operation}. Use one of '
+                     f'{", ".join(OPERATIONS)}')
+    skipped = [operation for operation in operations
+               if operation in OPENBMC_OPERATIONS and args.bmc_type != 'openbmc']
+    if skipped:
+        log.warning(f'Skipping {", ".join(skipped)}. Only OpenBMC supports '
+                    'them.')
+        operations = [operation for operation in operations
+                      if operation not in skipped]
+    counts = [int(count) for count in args.nodes.split(',')]
+    rows = []
+    for operation in operations:
+        for count in counts:
+            rows.append(run_benchmark(operation, count, args))
+            log.info(f'{operation} on {count} BMCs: {rows[-1][4]} s')
+    print()
+    print(tabulate(rows, headers=('Operation', 'BMC type', 'Nodes', 'Workers',
+                                  'Secs', 'Nodes/sec', 'BMC ops', 'Ops/sec',
+                                  'Auth failures', 'Failed nodes',
+                                  'Result')))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--nodes', default=NODE_COUNTS,
+                        help='Comma separated fleet sizes '
+                        f'(default {NODE_COUNTS})')
+    parser.add_argument('--operations', default=','.join(OPERATIONS),
+                        help='Comma separated operations: '
+                        f'{", ".join(OPERATIONS)}')
+    parser.add_argument('--bmc-type', default='ipmi',
+                        choices=('ipmi', 'openbmc'), help='BMC type')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Nodes handled concurrently (1 is serial like '
+                        'set_power_clients)')
+    parser.add_argument('--addresses', type=int, default=1,
+                        help='Loopback addresses to spread the BMCs over')
+    parser.add_argument('--nodes-per-process', type=int,
+                        default=MAX_NODES_PER_PROCESS,
+                        help='BMCs served by each simulator process')
+    parser.add_argument('--latency', type=float, default=DEFAULT_LATENCY,
+                        help='Seconds added to each BMC response')
+    parser.add_argument('--auth-fail-rate', type=float, default=0.0,
+                        help='Probability of rejecting a valid login')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='Auth failure random seed')
+    parser.add_argument('--print', '-p', dest='log_lvl_print',
+                        help='print log level', default='info')
+    parser.add_argument('--file', '-f', dest='log_lvl_file',
+                        help='file log level', default='nolog')
+
+    args = parser.parse_args()
+    logger.create(args.log_lvl_file, args.log_lvl_print)
+    main(args)
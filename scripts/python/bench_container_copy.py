@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""Benchmark copying files into the POWER-Up container ('Container.copy'):
+the former temporary tar file, read into memory, against the archive streamed
+by 'utilities.tar_stream'. Without --container the archive is consumed locally,
+as the docker daemon would receive it. Each copy runs in a fresh process to
+measure its peak memory.
+"""
+
+# Copyright 2019 IBM Corp.
+#
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import multiprocessing
+import os
+import resource
+import shutil
+import tarfile
+import tempfile
+import time
+
+from tabulate import tabulate
+
+import lib.logger as logger
+from lib.utilities import tar_stream
+
+SIZES = '1024'
+METHODS = ('file', 'stream')
+BLOCK_SIZE = 1 << 20
+
+
+def legacy_archive(source_path):
+    """Archive source_path as 'Container.copy' did before streaming: in a
+    tar file next to the source, read whole into memory
+
+    Returns:
+        tuple: Archive data (bytes), temporary tar file size
+    """
+    orig_cwd = os.getcwd()
+    os.chdir(os.path.dirname(source_path))
+    try:
+        tar_file = tarfile.open(source_path + '.tar', mode='w')
+        tar_file.add(os.path.basename(source_path))
+        tar_file.close()
+        tar_data = open(source_path + '.tar', 'rb').read()
+        size = os.path.getsize(source_path + '.tar')
+        os.remove(source_path + '.tar')
+    finally:
+        os.chdir(orig_cwd)
+    return tar_data, size
+
+
+def make_input(path, size_mb, files):
+    """Create directory path with files totalling size_mb MB"""
+    os.makedirs(path)
+    block = os.urandom(BLOCK_SIZE)
+    for index in range(files):
+        with open(os.path.join(path, f'file{index}'), 'wb') as f:
+            for _ in range(size_mb // files):
+                f.write(block)
+
+
+def _copy(method, source_path, container, dest, results):
+    """Copy source_path in a child process and report time, peak memory,
+    archive bytes and temporary file size
+    """
+    start = time.time()
+    temp_size = 0
+    if method == 'file':
+        data, temp_size = legacy_archive(source_path)
+        size = len(data)
+    else:
+        data = tar_stream([source_path])
+        size = 0
+    if container:
+        import docker
+        cont = docker.from_env().containers.get(container)
+        if not cont.put_archive(dest, data):
+            raise RuntimeError("Container 'put_archive' error!")
+    elif method == 'stream':
+        for chunk in data:
+            size += len(chunk)
+    elapsed = time.time() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results.put((elapsed, peak, size, temp_size))
+
+
+def run_benchmark(size_mb, method, args):
+    """Copy a size_mb MB directory with one method
+
+    Returns:
+        list: Result table row
+    """
+    tmp = tempfile.mkdtemp(dir=args.dir)
+    try:
+        source_path = os.path.join(tmp, 'payload')
+        make_input(source_path, size_mb, args.files)
+        ctx = multiprocessing.get_context('spawn')
+        results = ctx.Queue()
+        proc = ctx.Process(target=_copy, args=(method, source_path,
+                                               args.container, args.dest,
+                                               results))
+        proc.start()
+        elapsed, peak, size, temp_size = results.get()
+        proc.join()
+    finally:
+        shutil.rmtree(tmp)
+    return [size_mb, args.files, method, f'{elapsed:.2f}',
+            f'{size / (1 << 20) / elapsed:.0f}', f'{peak / 1024:.0f}',
+            f'{temp_size / (1 << 20):.0f}']
+
+
+def main(args):
+    log = logger.getlogger()
+    rows = []
+    for size_mb in [int(size) for size in args.sizes.split(',')]:
+        for method in args.methods.split(','):
+            rows.append(run_benchmark(size_mb, method, args))
+            log.info(f'{size_mb} MB {method}: {rows[-1][3]} s')
+    print()
+    print(tabulate(rows, headers=('Input MB', 'Files', 'Method', 'Seconds',
+                                  'MB/s', 'Peak RSS MB', 'Temp file MB')))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', default=SIZES,
+                        help=f'Comma separated input sizes in MB '
+                        f'(default {SIZES})')
+    parser.add_argument('--files', type=int, default=1,
+                        help='Files the input is split into')
+    parser.add_argument('--methods', default=','.join(METHODS),
+                        help=f'Comma separated copy methods {METHODS}')
+    parser.add_argument('--container',
+                        help='Copy into this running container')
+    parser.add_argument('--dest', default='/tmp',
+                        help='Container destination directory')
+    parser.add_argument('--dir', help='Directory for the input files')
+    parser.add_argument('--print', '-p', dest='log_lvl_print',
+                        help='print log level', default='info')
+    parser.add_argument('--file', '-f', dest='log_lvl_file',
+                        help='file log level', default='nolog')
+
+    args = parser.parse_args()
+    logger.create(args.log_lvl_file, args.log_lvl_print)
+    main(args)
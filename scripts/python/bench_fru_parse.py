@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""Benchmark parsing 'ipmitool fru' output per node: the former YAML round
+trip against the single pass 'lib.ipmi.ipmi_fru2dict', and the system serial
+and part number extraction ('extract_system_sn_pn') built on it
+"""
+
+# Copyright 2019 IBM Corp.
+#
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import glob
+import os
+import re
+import time
+
+import yaml
+from tabulate import tabulate
+
+import lib.genesis as gen
+import lib.logger as logger
+from lib.ipmi import extract_system_sn_pn, ipmi_fru2dict
+
+FRU_DIR = os.path.join(gen.GEN_PATH, 'tests', 'unit', 'fixtures', 'fru')
+NODES = 1000
+METHODS = ('yaml', 'direct', 'sn_pn')
+
+
+def legacy_fru2dict(fru_str):
+    """Convert the ipmitool fru output to a dictionary as 'ipmi_fru2dict'
+    did before: rewrite it as YAML, then load it
+    """
+    yaml_data = []
+    lines = fru_str.splitlines()
+    for i, _line in enumerate(lines):
+        line = re.sub(r'\s*:\s*', ': ', _line)
+        if re.search(r'^\s*$', line):
+            yaml_data.append(line)
+            continue
+        if i < len(lines) - 1:
+            indent = re.search(r'[ \t]*', line).span()[1]
+            next_indent = re.search(r'[ \t]*', lines[i + 1]).span()[1]
+            if next_indent > indent:
+                line = re.sub(r'\s*:\s*', ':', line)
+                if line.split(':')[1]:
+                    line = line.split(':')[1]
+                else:
+                    line = line.split(':')[0]
+                yaml_data.append(line + ':')
+            else:
+                if ':' not in line:
+                    line += ':'
+                split = line.split(':', 1)
+                line = split[0] + ': "' + split[1] + '"'
+                yaml_data.append(line)
+    yaml_data = '\n'.join(yaml_data)
+    return yaml.full_load(yaml_data)
+
+
+PARSERS = {'yaml': legacy_fru2dict, 'direct': ipmi_fru2dict,
+           'sn_pn': extract_system_sn_pn}
+
+
+def run_benchmark(path, method, nodes):
+    """Parse the FRU output of path once per node
+
+    Returns:
+        list: Result table row
+    """
+    with open(path) as f:
+        fru_str = f.read()
+    parser = PARSERS[method]
+    start = time.time()
+    try:
+        for _ in range(nodes):
+            parser(fru_str)
+        error = None
+    except Exception as exc:
+        error = f'{type(exc).__name__}'
+    elapsed = time.time() - start
+    return [os.path.basename(path), len(fru_str.splitlines()), method,
+            f'{elapsed:.3f}', f'{elapsed / nodes * 1e6:.0f}', error or 'ok']
+
+
+def main(args):
+    log = logger.getlogger()
+    paths = sorted(glob.glob(os.path.join(args.fru_dir, '*.txt')))
+    if not paths:
+        log.error(f'No FRU outputs (*.txt) in {args.fru_dir}')
+        return
+    rows = []
+    for path in paths:
+        for method in args.methods.split(','):
+            rows.append(run_benchmark(path, method, args.nodes))
+            log.info(f'{rows[-1][0]} {method}: {rows[-1][3]} s')
+    print()
+    print(tabulate(rows, headers=('FRU output', 'Lines', 'Method', 'Secs',
+                                  'usec/node', 'Result')))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--nodes', type=int, default=NODES,
+                        help=f'Nodes parsed per FRU output (default {NODES})')
+    parser.add_argument('--methods', default=','.join(METHODS),
+                        help=f'Comma separated parse methods {METHODS}')
+    parser.add_argument('--fru-dir', default=FRU_DIR,
+                        help='Directory of ipmitool fru outputs (*.txt)')
+    parser.add_argument('--print', '-p', dest='log_lvl_print',
+                        help='print log level', default='info')
+    parser.add_argument('--file', '-f', dest='log_lvl_file',
+                        help='file log level', default='nolog')
+
+    args = parser.parse_args()
+    logger.create(args.log_lvl_file, args.log_lvl_print)
+    main(args)
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""Benchmark building and updating the deployer interfaces dictionary
+('lib.interfaces') in a network namespace populated with test links.
+Must be run as root.
+"""
+
+# Copyright 2019 IBM Corp.
+#
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import os
+import sys
+import time
+
+from pyroute2 import netns
+from pyroute2.netlink.exceptions import NetlinkError
+from tabulate import tabulate
+
+import lib.logger as logger
+from lib.interfaces import Interfaces
+
+LINK_COUNTS = '10,100,500'
+NAMESPACE = 'pup-bench-ifcs'
+
+
+def legacy_interfaces_dict(ipr):
+    """Build the interfaces dictionary with per link queries, as
+    'Interfaces.get_interfaces_dict' did before using single dumps
+    (addresses are dumped once per label query)
+    """
+    link_indcs = [link['index'] for link in ipr.get_links()]
+    ifcs = {}
+    for link in ipr.get_links():
+        name = link.get_attr('IFLA_IFNAME')
+        ifcs[name] = {'addrs': []}
+        link_idx = link.get_attr('IFLA_LINK')
+        if link_idx in link_indcs:
+            ifcs[name]['slave'] = (ipr.get_links(link_idx)[0]
+                                   .get_attr('IFLA_IFNAME'))
+        else:
+            ifcs[name]['slave'] = link_idx
+        if ipr.get_addr(label=name):
+            for idx, _ in enumerate(ipr.get_addr(label=name)):
+                ifcs[name]['addrs'].append(
+                    ipr.get_addr(label=name)[idx].get_attr('IFA_ADDRESS'))
+    return ifcs
+
+
+def populate(ifcs, count, kind):
+    """Add links with one address each ('veth' links are added in pairs)
+    """
+    for index in range(count):
+        name = f'pup{index}'
+        if kind == 'veth':
+            if index % 2:
+                continue
+            ifcs.link('add', ifname=name, kind='veth',
+                      peer=f'pup{index + 1}')
+        else:
+            ifcs.link('add', ifname=name, kind=kind)
+    for link in ifcs.get_links():
+        name = link.get_attr('IFLA_IFNAME')
+        if name.startswith('pup'):
+            index = int(name[3:])
+            ifcs.addr('add', index=link['index'],
+                      address=f'10.{index // 250}.{index % 250}.1', mask=24)
+
+
+def _time(func, repeat):
+    start = time.time()
+    for _ in range(repeat):
+        func()
+    return (time.time() - start) / repeat
+
+
+def run_benchmark(count, args):
+    """Time full builds and a single interface update with 'count' links
+
+    Returns:
+        list: Result table row
+    """
+    netns.create(NAMESPACE)
+    try:
+        ifcs = Interfaces(netns=NAMESPACE)
+        try:
+            populate(ifcs, count, args.kind)
+            legacy = _time(lambda: legacy_interfaces_dict(ifcs), args.repeat)
+            dump = _time(ifcs.get_interfaces_dict, args.repeat)
+            ifcs.ifcs = ifcs.get_interfaces_dict()
+            index = ifcs.link_lookup(ifname='pup0')[0]
+            ifcs.addr('add', index=index, address='10.255.0.1', mask=24)
+            update = _time(lambda: ifcs.update_interface('pup0'), args.repeat)
+            if '10.255.0.1' not in ifcs.ifcs['pup0']['addrs']:
+                raise AssertionError('Interface update not applied')
+            links = len(ifcs.ifcs)
+        finally:
+            ifcs.close()
+    finally:
+        netns.remove(NAMESPACE)
+    return [links, f'{legacy * 1000:.1f}', f'{dump * 1000:.1f}',
+            f'{legacy / dump:.1f}', f'{update * 1000:.2f}']
+
+
+def main(args):
+    log = logger.getlogger()
+    if os.geteuid() != 0:
+        sys.exit('Network namespaces require root')
+    if NAMESPACE in netns.listnetns():
+        netns.remove(NAMESPACE)
+    rows = []
+    for count in [int(count) for count in args.links.split(',')]:
+        try:
+            rows.append(run_benchmark(count, args))
+        except NetlinkError as exc:
+            sys.exit(f"Unable to create '{args.kind}' links: {exc}. Try "
+                     "'--kind veth'")
+        log.info(f'{count} links: {rows[-1][2]} ms')
+    print()
+    print(tabulate(rows, headers=('Links', 'Per link ms', 'Dump ms',
+                                  'Speedup', 'Update ms')))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--links', default=LINK_COUNTS,
+                        help='Comma separated link counts '
+                        f'(default {LINK_COUNTS})')
+    parser.add_argument('--kind', default='dummy',
+                        choices=('dummy', 'veth', 'bridge'),
+                        help='Test link kind')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Timed repetitions')
+    parser.add_argument('--print', '-p', dest='log_lvl_print',
+                        help='print log level', default='info')
+    parser.add_argument('--file', '-f', dest='log_lvl_file',
+                        help='file log level', default='nolog')
+
+    args = parser.parse_args()
+    logger.create(args.log_lvl_file, args.log_lvl_print)
+    main(args)
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""Benchmark switch configuration and MAC address table discovery
+against simulated switch fabrics (see 'lib.switch_simulator')
+"""
+
+# Copyright 2019 IBM Corp.
+#
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import yaml
+from tabulate import tabulate
+
+import lib.logger as logger
+from lib.switch_common import SwitchCommon
+from lib.switch_simulator import SimulatedFabric
+
+SWITCH_COUNTS = '1,2,4,8,16,32,64'
+OPERATIONS = ('data', 'mgmt', 'mac')
+USERID = 'admin'
+PASSWORD = 'passw0rd'
+VLAN_IPMI = 30
+VLAN_PXE = 40
+VLAN_DATA = 100
+
+
+def _get_port(switch_class, port):
+    return f'1/{port}' if switch_class == 'cisco' else port
+
+
+def make_mgmt_config(addresses, switch_class, ports):
+    """Create a config with management switches at the given addresses
+
+    Half of the ports below the deployer uplink (the last port) are
+    cabled to node BMCs and the other half to node PXE interfaces.
+
+    Returns:
+        dict: Config
+    """
+    half = (ports - 1) // 2
+    switches = []
+    ipmi = []
+    pxe = []
+    for index, ipaddr in enumerate(addresses):
+        label = f'mgmt{index + 1}'
+        switches.append({
+            'label': label, 'class': switch_class, 'userid': USERID,
+            'password': PASSWORD,
+            'interfaces': [{'type': 'outband', 'ipaddr': ipaddr, 'port': 1}],
+            'links': [{'target': 'deployer',
+                       'ports': _get_port(switch_class, ports)}]})
+        ipmi.append({'switch': label, 'ports': [
+            _get_port(switch_class, port) for port in range(1, half + 1)]})
+        pxe.append({'switch': label, 'interface': 'pxe-ifc', 'ports': [
+            _get_port(switch_class, port)
+            for port in range(half + 1, 2 * half + 1)]})
+    return {
+        'version': 'v2.0',
+        'globals': {'switch_mode_mgmt': 'active'},
+        'deployer': {'networks': {
+            'mgmt': [{'device': 'eth0', 'interface_ipaddr': '192.168.16.3',
+                      'netmask': '255.255.255.0'}],
+            'client': [
+                {'device': 'eth0', 'type': 'ipmi', 'vlan': VLAN_IPMI,
+                 'container_ipaddr': '192.168.30.2',
+                 'bridge_ipaddr': '192.168.30.3',
+                 'netmask': '255.255.255.0'},
+                {'device': 'eth0', 'type': 'pxe', 'vlan': VLAN_PXE,
+                 'container_ipaddr': '192.168.40.2',
+                 'bridge_ipaddr': '192.168.40.3',
+                 'netmask': '255.255.255.0'}]}},
+        'switches': {'mgmt': switches},
+        'interfaces': [{'label': 'pxe-ifc', 'iface': 'eth0',
+                        'method': 'dhcp'}],
+        'node_templates': [{'label': 'node', 'physical_interfaces': {
+            'ipmi': ipmi, 'pxe': pxe}}]}
+
+
+def make_data_config(addresses, switch_class, ports):
+    """Create a config with data switches at the given addresses
+
+    Nodes have a two port LACP bond carrying a tagged VLAN. The bond
+    slaves of each node are cabled to port n and port n + half of a data
+    switch, which are put in port channel n.
+
+    Returns:
+        dict: Config
+    """
+    half = (ports - 1) // 2
+    switches = []
+    data = []
+    for index, ipaddr in enumerate(addresses):
+        label = f'data{index + 1}'
+        switches.append({
+            'label': label, 'class': switch_class, 'userid': USERID,
+            'password': PASSWORD,
+            'interfaces': [{'type': 'outband', 'ipaddr': ipaddr}],
+            'links': [{'target': 'deployer',
+                       'ports': _get_port(switch_class, ports)}]})
+        data.append({'switch': label, 'interface': 'bond0-slave0',
+                     'ports': [_get_port(switch_class, port)
+                               for port in range(1, half + 1)]})
+        data.append({'switch': label, 'interface': 'bond0-slave1',
+                     'ports': [_get_port(switch_class, port)
+                               for port in range(half + 1, 2 * half + 1)]})
+    return {
+        'version': 'v2.0',
+        'globals': {'switch_mode_data': 'active'},
+        'deployer': {'networks': {'mgmt': [
+            {'device': 'eth0', 'interface_ipaddr': '192.168.16.3',
+             'netmask': '255.255.255.0'}]}},
+        'switches': {'data': switches},
+        'interfaces': [
+            {'label': 'bond0-slave0', 'iface': 'eth10', 'method': 'manual',
+             'bond_master': 'bond0'},
+            {'label': 'bond0-slave1', 'iface': 'eth11', 'method': 'manual',
+             'bond_master': 'bond0'},
+            {'label': 'bond0', 'iface': 'bond0', 'method': 'manual',
+             'bond_mode': '802.3ad', 'bond_slaves': 'none'},
+            {'label': f'bond0.{VLAN_DATA}', 'iface': f'bond0.{VLAN_DATA}',
+             'method': 'manual', 'vlan_raw_device': 'bond0'}],
+        'networks': [{'label': 'data-net', 'interfaces': [
+            'bond0', f'bond0.{VLAN_DATA}']}],
+        'node_templates': [{'label': 'node', 'networks': ['data-net'],
+                            'physical_interfaces': {'data': data}}]}
+
+
+def _run_config_op(make_config, operation, fabric, switch_class, ports,
+                   work_dir):
+    cfg = make_config(fabric.get_addresses(), switch_class, ports)
+    config_path = os.path.join(work_dir, f'{operation}.config.yml')
+    with open(config_path, 'w') as config_file:
+        yaml.safe_dump(cfg, config_file, default_flow_style=False)
+    if operation == 'data':
+        from configure_data_switches import configure_data_switch
+        configure_data_switch(config_path)
+    else:
+        from configure_mgmt_switches import configure_mgmt_switches
+        configure_mgmt_switches(config_path)
+    return None
+
+
+def _run_mac_op(fabric, switch_class, macs_per_port, ports):
+    from lib.switch import SwitchFactory
+    macs = 0
+    for address in fabric.get_addresses():
+        switch = SwitchFactory.factory(switch_class, address, USERID,
+                                       PASSWORD)
+        port_macs = switch.show_mac_address_table(format='std')
+        macs += sum(len(_macs) for _macs in port_macs.values())
+    expected = len(fabric.switches) * ports * macs_per_port
+    if macs != expected:
+        return f'found {macs} of {expected} MACs'
+    return None
+
+
+def run_benchmark(operation, count, args, work_dir):
+    """Run one operation against a new simulated fabric
+
+    Returns:
+        list: Result table row
+    """
+    log = logger.getlogger()
+    switch_class = args.mgmt_class if operation == 'mgmt' else args.data_class
+    with SimulatedFabric(
+            count, switch_class, ports=args.ports,
+            macs_per_port=args.macs_per_port, userid=USERID,
+            password=PASSWORD, latency=args.latency,
+            cmd_latency=args.cmd_latency, fail_rate=args.fail_rate,
+            seed=args.seed) as fabric:
+        ssh_port = SwitchCommon.SSH_PORT
+        SwitchCommon.SSH_PORT = fabric.port
+        start = time.time()
+        try:
+            if operation == 'mac':
+                error = _run_mac_op(fabric, switch_class, args.macs_per_port,
+                                    args.ports)
+            elif operation == 'data':
+                error = _run_config_op(make_data_config, operation, fabric,
+                                       switch_class, args.ports, work_dir)
+            else:
+                error = _run_config_op(make_mgmt_config, operation, fabric,
+                                       switch_class, args.ports, work_dir)
+        except Exception as exc:
+            log.debug(f'{operation} on {count} switches failed',
+                      exc_info=True)
+            error = f'{type(exc).__name__}: {exc}'
+        finally:
+            SwitchCommon.SSH_PORT = ssh_port
+        elapsed = time.time() - start
+        stats = fabric.get_stats()
+    return [operation, switch_class, count, f'{elapsed:.2f}',
+            f'{elapsed / count:.2f}', stats.sessions, stats.commands,
+            stats.failures, error or 'ok']
+
+
+def main(args):
+    log = logger.getlogger()
+    operations = args.operations.split(',')
+    for operation in operations:
+        if operation not in OPERATIONS:
+            sys.exit(f'Unknown operation {operation}. Use one of '
+                     f'{", ".join(OPERATIONS)}')
+    if 'mgmt' in operations and shutil.which('ping') is None:
+        log.warning('ping is not available. Management switches will not '
+                    'be reachable and configure_mgmt_switches will fail.')
+    counts = [int(count) for count in args.switches.split(',')]
+    rows = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for operation in operations:
+            for count in counts:
+                rows.append(run_benchmark(operation, count, args, work_dir))
+                log.info(f'{operation} on {count} switches: {rows[-1][3]} s')
+    print()
+    print(tabulate(rows, headers=('Operation', 'Class', 'Switches', 'Secs',
+                                  'Secs/switch', 'SSH sessions',
+                                  'CLI commands', 'Injected failures',
+                                  'Result')))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--switches', default=SWITCH_COUNTS,
+                        help='Comma separated fabric sizes '
+                        f'(default {SWITCH_COUNTS})')
+    parser.add_argument('--operations', default=','.join(OPERATIONS),
+                        help="Comma separated operations: 'data' "
+                        "(configure_data_switch), 'mgmt' "
+                        "(configure_mgmt_switches) and 'mac' (MAC address "
+                        "table discovery)")
+    parser.add_argument('--data-class', default='mellanox',
+                        choices=('mellanox', 'lenovo', 'cisco'),
+                        help='Data switch class')
+    parser.add_argument('--mgmt-class', default='lenovo',
+                        choices=('mellanox', 'lenovo', 'cisco'),
+                        help='Management switch class')
+    parser.add_argument('--ports', type=int, default=48,
+                        help='Ports per switch')
+    parser.add_argument('--macs-per-port', type=int, default=1,
+                        help='MACs learned on each port')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='Seconds added to each SSH command')
+    parser.add_argument('--cmd-latency', type=float, default=0.0,
+                        help='Seconds added to each CLI command')
+    parser.add_argument('--fail-rate', type=float, default=0.0,
+                        help='Probability of rejecting an SSH command')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='Failure injection random seed')
+    parser.add_argument('--print', '-p', dest='log_lvl_print',
+                        help='print log level', default='info')
+    parser.add_argument('--file', '-f', dest='log_lvl_file',
+                        help='file log level', default='nolog')
+
+    args = parser.parse_args()
+    logger.create(args.log_lvl_file, args.log_lvl_print)
+    main(args)
@@ -56,14 +56,15 @@ def extract_iso_images(path, html_dir):
         file_list = [os.path.basename(path)]
         path = os.path.dirname(path) + '/'
 
-    # Extract ISO into web directory for access over http
-    for _file in file_list:
-        if _file.endswith('.iso'):
-            kernel, initrd = util.extract_iso_image(path + _file, html_dir)
-            name = _file[:-4]
-            return_list.append((name,
-                                os.path.join(html_dir, kernel),
-                                os.path.join(html_dir, initrd)))
+    # Extract ISOs concurrently into web directory for access over http
+    iso_files = [_file for _file in file_list if _file.endswith('.iso')]
+    boot_files = util.extract_iso_images(
+        [path + _file for _file in iso_files], html_dir)
+    for _file, (kernel, initrd) in zip(iso_files, boot_files):
+        name = _file[:-4]
+        return_list.append((name,
+                            os.path.join(html_dir, kernel),
+                            os.path.join(html_dir, initrd)))
 
     return return_list
 
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+# Copyright 2019 IBM Corp.
+#
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""dnsmasq '--dhcp-script' hook forwarding lease events to a unix socket
+
+Run by dnsmasq (through the wrapper written by 'lib.lease_watcher') as:
+    dhcp_lease_event.py <socket path> <add|old|del> <mac> <ip> [hostname]
+
+Only the standard library is used so the hook starts quickly, and
+errors are ignored so lease handling in dnsmasq is never affected.
+"""
+
+import socket
+import sys
+
+
+def send_event(socket_path, args):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    try:
+        sock.sendto(' '.join(args).encode('utf-8'), socket_path)
+    except OSError:
+        pass
+    finally:
+        sock.close()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) >= 5:
+        send_event(sys.argv[1], sys.argv[2:6])
@@ -19,20 +19,17 @@ import argparse
 import os
 import re
 import sys
-import subprocess
-import platform
-import time
 from netaddr import IPNetwork
-from pyroute2 import IPRoute
 
 import lib.logger as logger
 from lib.config import Config
 from lib.exception import UserCriticalException
-from lib.genesis import Color, GEN_PATH
-from lib.utilities import line_in_file, sub_proc_exec
+from lib.firewall import update_firewall
+from lib.genesis import Color, GEN_PATH, get_opsys
+from lib.network_plan import NetworkPlan, get_bridge_label, get_bridge_port
+from lib.utilities import line_in_file
 
-IPR = IPRoute()
-OPSYS = platform.dist()[0]
+OPSYS = get_opsys()
 IFCFG_PATH = '/etc/sysconfig/network-scripts/'
 
 
@@ -45,6 +42,9 @@ def enable_deployer_network(config_path=None):
     specify a bridge with a tagged vlan. PXE and IPMI networks always include a
     bridge. The IPMI bridge can be tagged or untagged. The PXE bridge must be
     tagged.  Networks can share a physical port or specify unique ports.
+    The link and address changes for all networks are planned from one read
+    of the current state and applied together. If any change fails, the
+    applied changes are reverted and no config files are written.
     This function is idempotent.
     """
     global LOG
@@ -56,7 +56,8 @@ def enable_deployer_network(config_path=None):
     #     self.LOG.info('Passive Management Switch(es) specified')
     # return
 
-    LOG.debug('=== Configuring deployer management networks ===')
+    networks = []
+    LOG.debug('=== Planning deployer management networks ===')
     dev_label = cfg.get_depl_netw_mgmt_device()
     interface_ipaddr = cfg.get_depl_netw_mgmt_intf_ip()
     container_ipaddr = cfg.get_depl_netw_mgmt_cont_ip()
@@ -65,14 +66,14 @@ def enable_deployer_network(config_path=None):
     netprefix = cfg.get_depl_netw_mgmt_prefix()
 
     for i, dev in enumerate(dev_label):
-        _create_network(dev_label[i],
-                        interface_ipaddr[i],
-                        netprefix[i],
-                        container_ipaddr=container_ipaddr[i],
-                        bridge_ipaddr=bridge_ipaddr[i],
-                        vlan=vlan[i])
-
-    LOG.debug('=== Configuring deployer client networks ===')
+        networks.append({'dev_label': dev_label[i],
+                         'interface_ipaddr': interface_ipaddr[i],
+                         'netprefix': netprefix[i],
+                         'container_ipaddr': container_ipaddr[i],
+                         'bridge_ipaddr': bridge_ipaddr[i],
+                         'vlan': vlan[i]})
+
+    LOG.debug('=== Planning deployer client networks ===')
     # type; ie pxe or ipmi
     _type = cfg.get_depl_netw_client_type()
     dev_label = cfg.get_depl_netw_client_device()
@@ -83,16 +84,29 @@ def enable_deployer_network(config_path=None):
     netprefix = cfg.get_depl_netw_client_prefix()
 
     for i, dev in enumerate(dev_label):
-        _create_network(dev_label[i],
-                        interface_ipaddr[i],
-                        netprefix[i],
-                        container_ipaddr=container_ipaddr[i],
-                        bridge_ipaddr=bridge_ipaddr[i],
-                        vlan=vlan[i],
-                        _type=_type[i])
-
-
-def _create_network(
+        networks.append({'dev_label': dev_label[i],
+                         'interface_ipaddr': interface_ipaddr[i],
+                         'netprefix': netprefix[i],
+                         'container_ipaddr': container_ipaddr[i],
+                         'bridge_ipaddr': bridge_ipaddr[i],
+                         'vlan': vlan[i],
+                         '_type': _type[i]})
+
+    plan = NetworkPlan()
+    for network in networks:
+        _plan_network(plan, **network)
+    LOG.debug('=== Configuring deployer networks ===')
+    plan.apply()
+    for network in networks:
+        _write_network_cfg(**network)
+    # Forward packets coming into all the bridges in one firewall update
+    update_firewall(add_bridges=[
+        get_bridge_label(network.get('_type', 'mgmt'), network['vlan'])
+        for network in networks if network['bridge_ipaddr']])
+
+
+def _plan_network(
+        plan,
         dev_label,
         interface_ipaddr,
         netprefix,
@@ -100,10 +114,11 @@ def _create_network(
         bridge_ipaddr=None,
         vlan=None,
         _type='mgmt'):
-    """ Creates a network between the container interface and a physical interface.
+    """ Plans a network between the container interface and a physical interface.
     If no bridge ip address is specified, the connection is via the default lxc
     bridge. If a bridge ip address and vlan are specified, a bridge is created.
     Inputs:
+        plan (NetworkPlan): Plan the network changes are added to.
         dev_label (str): Name of the physical device providing external connectivity
             for the network.
         interface_ipaddr (str): ipv4 address of the phsical device specified by
@@ -118,26 +133,39 @@ def _create_network(
         type (str): Type of interface being served by the network (mgmt, pxe, ipmi)
         to be created.
     """
+    if bridge_ipaddr:
+        br_label = get_bridge_label(_type, vlan)
+        link = get_bridge_port(dev_label, vlan)
+        # if the vlan link already exists on another bridge then display warning
+        if plan.is_attached_elsewhere(link, br_label):
+            LOG.warning('Link {} already in use on another bridge.'.format(link))
+            print('Warning: Link {} already in use on another bridge.'.format(link))
 
-    ifc_addresses = _get_ifc_addresses()
+        if br_label in plan.state.links:
+            LOG.info('{}NOTE: bridge {} is already configured.{}'.format(Color.bold,
+                     br_label, Color.endc))
+            print("Enter to continue, or 'T' to terminate deployment")
+            resp = input("\nEnter or 'T': ")
+            if resp == 'T':
+                sys.exit('POWER-Up stopped at user request')
 
-    if not IPR.link_lookup(ifname=dev_label):
-        LOG.error('External interface {} not found'.format(dev_label))
-        raise UserCriticalException('External interface {} not found.'
-                                    .format(dev_label))
+    plan.add_network(dev_label, interface_ipaddr, netprefix,
+                     bridge_ipaddr=bridge_ipaddr, vlan=vlan, _type=_type)
 
-    # if no bridge_ipaddr is specied (ie None), then a bridge will not be created.
-    if not bridge_ipaddr:
-        # if address not already on device, then add it.
-        if not interface_ipaddr + '/' + str(netprefix) in ifc_addresses[dev_label]:
-            LOG.debug('Adding address {} to link {}'.
-                      format(interface_ipaddr, dev_label))
-            index = IPR.link_lookup(ifname=dev_label)
-            IPR.addr('add', index=index, address=interface_ipaddr, mask=netprefix)
-        else:
-            LOG.debug('Address {} already exists on link {}'.
-                      format(interface_ipaddr, dev_label))
 
+def _write_network_cfg(
+        dev_label,
+        interface_ipaddr,
+        netprefix,
+        container_ipaddr=None,
+        bridge_ipaddr=None,
+        vlan=None,
+        _type='mgmt'):
+    """ Writes the interface or bridge config files of a network set up by
+    the applied plan. Inputs are as for _plan_network.
+    """
+    # if no bridge_ipaddr is specied (ie None), then a bridge is not used.
+    if not bridge_ipaddr:
         # Check to see if the device and address is configured in any interface
         # definition file. If not, then write a definition file.
         ifc_file_list = _get_ifcs_file_list()
@@ -158,99 +186,17 @@ def _create_network(
                 ifc_cfgd=ifc_cfgd)
     # bridge
     else:
-        # Check for existing addresses on the external interface and
-        # remove any that lie within the mgmt subnet. You only need to remove
-        # the first address found in the subnet since any additional ones are
-        # secondary and removed when the first (primary) is removed. Note that
-        # this does not remove addresses from network config files.
-        cidr = IPNetwork(bridge_ipaddr + '/' + str(netprefix))
-        network = IPNetwork(cidr)
-        network_addr = str(network.network)
-
-        for addr in IPR.get_addr(label=dev_label):
-            pfx = int(addr['prefixlen'])
-            adr = addr.get_attr('IFA_ADDRESS')
-            existing_network = IPNetwork(
-                addr.get_attr('IFA_ADDRESS') + '/' + str(addr['prefixlen']))
-            existing_network_addr = str(existing_network.network)
-            if existing_network_addr == network_addr:
-                LOG.debug(
-                    'Removing address {}/{} from interface {}'
-                    .format(adr, pfx, dev_label))
-                IPR.addr(
-                    'delete',
-                    index=IPR.link_lookup(ifname=dev_label),
-                    address=adr,
-                    mask=pfx)
-
-        # Prepare to setup the bridge
-        br_label = 'br-' + _type
-        if vlan and vlan != 4095:
-            br_label = br_label + '-' + str(vlan)
-        link = dev_label
-        # if a vlan other than 1 or 4095 is specified, create the vlan link
-        if vlan and vlan != 4095:
-            link = dev_label + '.{}'.format(vlan)
-        # if the vlan link already exists on another bridge then display warning
-        if _is_ifc_attached_elsewhere(link, br_label):
-            LOG.warning('Link {} already in use on another bridge.'.format(link))
-            print('Warning: Link {} already in use on another bridge.'.format(link))
-
-        if not IPR.link_lookup(ifname=link):
-            LOG.debug('creating vlan interface: {}'.format(link))
-            IPR.link(
-                "add",
-                ifname=link,
-                kind="vlan",
-                link=IPR.link_lookup(ifname=dev_label)[0],
-                vlan_id=vlan)
-        IPR.link("set", index=IPR.link_lookup(ifname=link)[0], state="up")
-        if not _wait_for_ifc_up(link):
-            raise UserCriticalException('Failed to bring up interface {} '.
-                                        format(link))
-
+        br_label = get_bridge_label(_type, vlan)
+        link = get_bridge_port(dev_label, vlan)
         # set bridge file write mode to 'w' (write) or 'a' (append)
         mode = 'a' if _type == 'mgmt' else 'w'
 
-        if IPR.link_lookup(ifname=br_label):
-            LOG.info('{}NOTE: bridge {} is already configured.{}'.format(Color.bold,
-                     br_label, Color.endc))
-            print("Enter to continue, or 'T' to terminate deployment")
-            resp = input("\nEnter or 'T': ")
-            if resp == 'T':
-                sys.exit('POWER-Up stopped at user request')
-
         _write_br_cfg_file(
             br_label,
             ip=bridge_ipaddr,
             prefix=netprefix,
             ifc=link,
             mode=mode)
-        _setup_bridge(br_label, bridge_ipaddr, netprefix, link)
-        _update_firewall(br_label)
-
-
-def _is_firewall_running():
-    res, err, rc = sub_proc_exec('systemctl status firewalld')
-    if not rc:
-        if 'Active: active' in res or 'active (running)' in res:
-            return True
-
-
-def _update_firewall(br_label):
-    """Update iptables FORWARD table to forward all traffic coming into
-    the specified bridge.
-    """
-    if _is_firewall_running():
-        fwd_tbl, err, rc = sub_proc_exec('iptables -vL FORWARD')
-        if br_label not in fwd_tbl:
-            LOG.debug(f'Updating firewall. Forward {br_label} packets.')
-            cmd = (f'iptables -I FORWARD -p all -i {br_label} '
-                   f'-s 0.0.0.0/0 -d 0.0.0.0/0 -j ACCEPT')
-            res, err, rc = sub_proc_exec(cmd)
-            if rc:
-                LOG.warning('An error occured while updating the firewall. '
-                            f'Error {err}. RC: {rc}')
 
 
 def _is_ifc_configured(ifc_cfg_file, dev_label, interface_ipaddr):
@@ -480,20 +426,6 @@ def _write_br_cfg_file(bridge, ip=None, prefix=None, ifc=None, mode='w'):
                 f.write('DELAY=0')
 
 
-def _get_ifc_addresses():
-    """ Create a dictionary of links.  For each link, create list of cidr
-    addresses
-    """
-    ifc_addresses = {}
-    for link in IPR.get_links():
-        link_name = link.get_attr('IFLA_IFNAME')
-        ifc_addresses[link_name] = []
-        for addr in IPR.get_addr(index=link['index']):
-            ifc_addresses[link_name].append(
-                addr.get_attr('IFA_ADDRESS') + '/' + str(addr['prefixlen']))
-    return ifc_addresses
-
-
 def _get_ifcs_file_list():
     """ Returns the absolute path for all interface definition files
     """
@@ -514,128 +446,6 @@ def _get_ifcs_file_list():
     return file_list
 
 
-def _setup_bridge(bridge, ip=None, prefix=None, ifc=None):
-    """ Sets up a bridge. If the bridge does not exist, it is created.
-    If an ip address and prefix are given it will be added to the bridge.
-    If an interface name is specified it will be attached to the bridge
-    Args:
-        bridge (str) bridge name
-        ip (str) ipv4 address (ie '1.2.3.4')
-        prefix (int or str) Network mask length (ie 24)
-        ifc (str) An interface name
-    """
-    LOG.debug('Setting up bridge {} with ifc {} and address {}'
-              .format(bridge, ifc, ip))
-    if not IPR.link_lookup(ifname=bridge):
-        IPR.link("add", ifname=bridge, kind="bridge")
-    IPR.link("set", ifname=bridge, state="up")
-    if ip and prefix:
-        if not _is_addr_on_link(ip, bridge):
-            IPR.addr(
-                'add', index=IPR.link_lookup(ifname=bridge)[0],
-                address=ip,
-                mask=int(prefix))
-    if ifc:
-        IPR.link(
-            'set',
-            index=IPR.link_lookup(ifname=ifc)[0],
-            master=IPR.link_lookup(ifname=bridge)[0])
-    if not _wait_for_ifc_up(ifc):
-        LOG.error('Failed to bring up interface {}'.format(ifc))
-        raise UserCriticalException('Failed to bring up interface {}'.format(ifc))
-    if not _wait_for_ifc_up(bridge):
-        LOG.error('Failed to bring up bridge {}'.format(bridge))
-        raise UserCriticalException('Failed to bring up bridge {}'.format(bridge))
-
-
-def _is_addr_on_link(ip, link):
-    """ Checks to see if address ip is already added to link
-    Args:
-        ip (str) ipv4 address
-        link (str) link name
-    Returns: True/False
-    """
-    addr_list = IPR.get_addr(label=link)
-    for addr in addr_list:
-        if ip == addr.get_attr('IFA_ADDRESS'):
-            LOG.debug(
-                'Address {} found on link {}'.format(ip, link))
-            return True
-    LOG.debug('Address {} not found on link {}'.format(ip, link))
-    return False
-
-
-def _is_ifc_attached_elsewhere(ifc, bridge):
-    """ Checks to see if ifc is in use on a bridge other than that specified
-    Args:
-        ifc (str) interface name
-        bridge (str) name of bridge the interface is intended for
-    Returns:
-        True if the interface is already being used (is unavailable)
-    """
-    br_list, err, rc = sub_proc_exec('brctl show')
-    br_list = br_list.splitlines()
-    output = []
-    for line in br_list[1:]:
-        if line.startswith('\t'):
-            output[len(output) - 1] = output[len(output) - 1] + line
-        else:
-            output.append(line)
-        if ifc in output[len(output) - 1] \
-                and bridge not in output[len(output) - 1]:
-            return True
-    return False
-
-
-def _is_ifc_attached(ifc, bridge):
-    """ Checks to see if ifc is in use on a bridge other than that specified
-    Args:
-        ifc (str) interface name
-        bridge (str) name of bridge the interface is intended for
-    Returns:
-        True if the interface is already being used (is unavailable)
-    """
-
-    br_list = subprocess.check_output(['bash', '-c', 'brctl show']
-                                      ).decode("utf-8").splitlines()
-    output = []
-    for line in br_list[1:]:
-        if line.startswith('\t'):
-            output[len(output) - 1] = output[len(output) - 1] + line
-        else:
-            output.append(line)
-        if ifc in output[len(output) - 1] and bridge in output[len(output) - 1]:
-            return True
-    return False
-
-
-def _is_ifc_up(ifname):
-    if 'UP' == IPR.get_links(
-            IPR.link_lookup(ifname=ifname))[0].get_attr('IFLA_OPERSTATE'):
-        return True
-    return False
-
-
-def _wait_for_ifc_up(ifname, timespan=10):
-    """ Waits up to timespan seconds for the specified interface to be up.
-    Prints a message if the interface is not up in 2 seconds.
-    Args:
-        ifname (str) : Name of the interface
-        timespan (int) : length of time to wait in seconds
-    Returns:
-        True if interface is up, False if not.
-    """
-    for _ in range(2 * timespan):
-        if _ == 4:
-            print('Waiting for interface {} to come up. '.format(ifname))
-        if _is_ifc_up(ifname):
-            LOG.debug('Interface {} is up'.format(ifname))
-            return True
-        time.sleep(0.5)
-    LOG.info('Timeout waiting for interface {} to come up'.format(ifname))
-    return False
-
-
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     parser.add_argument('config_path', default='config.yml',
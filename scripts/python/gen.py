@@ -24,24 +24,15 @@ import getpass
 from subprocess import Popen, PIPE
 from platform import machine
 
-import enable_deployer_networks
-import enable_deployer_gateway
-import download_install_deps
-import validate_cluster_hardware
-import configure_mgmt_switches
-import osinstall
-import remove_client_host_keys
-from lib.utilities import scan_ping_network, sub_proc_exec, get_and_create_dir
-import download_os_images
 import lib.argparse_gen as argparse_gen
 import lib.logger as logger
 import lib.genesis as gen
-from lib.db import DatabaseConfig
+import lib.trace as trace
 from lib.exception import UserException, UserCriticalException
-from lib.switch_exception import SwitchException
-from set_power_clients import set_power_clients
-from set_bootdev_clients import set_bootdev_clients
-from archive import bundle
+
+# Subcommand modules and their third party dependencies (docker,
+# pyroute2, pyghmi, paramiko, npyscreen, jsonschema...) are imported by
+# the handlers which use them, keeping 'pup' startup fast.
 
 
 class Gen(object):
@@ -52,6 +43,19 @@ class Gen(object):
     """
 
     ROOTUSER = 'root'
+
+    # Subcommand registry in argument precedence order:
+    # (command, parsed argument attribute, handler method name)
+    COMMANDS = (
+        (argparse_gen.Cmd.SETUP, 'setup', '_cmd_setup'),
+        (argparse_gen.Cmd.CONFIG, 'config', '_cmd_config'),
+        (argparse_gen.Cmd.VALIDATE, 'validate', '_cmd_validate'),
+        (argparse_gen.Cmd.DEPLOY, 'deploy', '_cmd_deploy'),
+        (argparse_gen.Cmd.POST_DEPLOY, 'post_deploy', '_cmd_post_deploy'),
+        (argparse_gen.Cmd.OSINSTALL, 'osinstall', '_cmd_osinstall'),
+        (argparse_gen.Cmd.SOFTWARE, 'software', '_cmd_software'),
+        (argparse_gen.Cmd.UTIL, 'utils', '_cmd_util'),
+    )
     global COL
     COL = gen.Color
 
@@ -64,6 +68,7 @@ class Gen(object):
         if not os.path.isfile(ssh_log):
             os.mknod(ssh_log)
         if not os.access(ssh_log, os.W_OK):
+            from lib.utilities import sub_proc_exec
             cmd = f'sudo chmod 666 {ssh_log}'
             res, err, rc = sub_proc_exec(cmd)
 
@@ -83,7 +88,10 @@ class Gen(object):
                 file=sys.stderr)
             sys.exit(1)
 
+    @trace.traced(trace.PHASE)
     def _config_mgmt_switches(self):
+        import configure_mgmt_switches
+
         print(COL.scroll_ten, COL.up_ten)
         print('{}Configuring management switches{}\n'.
               format(COL.header1, COL.endc))
@@ -99,7 +107,10 @@ class Gen(object):
         else:
             print('\nSuccessfully completed management switch configuration\n')
 
+    @trace.traced(trace.PHASE)
     def _create_deployer_networks(self):
+        import enable_deployer_networks
+
         print(COL.scroll_ten, COL.up_ten)
         print('{}Setting up deployer interfaces and networks{}\n'.
               format(COL.header1, COL.endc))
@@ -116,7 +127,10 @@ class Gen(object):
         else:
             print('Successfully completed deployer network setup\n')
 
+    @trace.traced(trace.PHASE)
     def _enable_deployer_gateway(self):
+        import enable_deployer_gateway
+
         print(COL.scroll_ten, COL.up_ten)
         print('{}Setting up PXE network gateway and NAT record{}\n'.
               format(COL.header1, COL.endc))
@@ -135,7 +149,11 @@ class Gen(object):
         else:
             print('Successfully completed PXE network gateway setup\n')
 
+    @trace.traced(trace.PHASE)
     def _download_install_deps(self):
+        import download_install_deps
+        from lib.utilities import get_and_create_dir
+
         print(COL.scroll_ten, COL.up_ten)
         print('{}Downloading installation dependencies{}\n'.
               format(COL.header1, COL.endc))
@@ -145,6 +163,7 @@ class Gen(object):
         download_install_deps.create_yum_install_repo(repo_base_dir, arch=arch)
         download_install_deps.create_pup_repo_mirror(repo_base_dir)
 
+    @trace.traced(trace.PHASE)
     def _create_container(self):
         print(COL.scroll_ten, COL.up_ten)
         print('{}Creating container for running the POWER-Up '
@@ -158,7 +177,9 @@ class Gen(object):
             sys.exit(1)
         print('Success: Created container')
 
+    @trace.traced(trace.PHASE)
     def _config_file(self):
+        from lib.db import DatabaseConfig
         from lib.inv_items import InventoryNodes
         print(COL.scroll_ten, COL.up_ten)
         print('{}Validating cluster configuration file{}\n'.
@@ -186,7 +207,10 @@ class Gen(object):
         else:
             print('Successfully completed config file validation.\n')
 
+    @trace.traced(trace.PHASE)
     def _cluster_hardware(self):
+        import validate_cluster_hardware
+
         print(COL.scroll_ten, COL.up_ten)
         print('{}Discovering and validating cluster hardware{}\n'.
               format(COL.header1, COL.endc))
@@ -233,6 +257,7 @@ class Gen(object):
         else:
             print('Successfully validated cluster hardware.\n')
 
+    @trace.traced(trace.PHASE)
     def _create_inventory(self):
         # from lib.inventory import Inventory
         # log = logger.getlogger()
@@ -288,6 +313,7 @@ class Gen(object):
         except FileNotFoundError as exc:
             log.debug(f'Unable to create copy of config file. {exc}')
 
+    @trace.traced(trace.PHASE)
     def _install_cobbler(self):
         from lib.container import Container
 
@@ -304,7 +330,9 @@ class Gen(object):
             sys.exit(1)
         print('Success: Cobbler installed')
 
+    @trace.traced(trace.PHASE)
     def _download_os_images(self):
+        import download_os_images
         from lib.container import Container
 
         try:
@@ -325,6 +353,7 @@ class Gen(object):
                 sys.exit(1)
         print('Success: OS images downloaded and copied into container')
 
+    @trace.traced(trace.PHASE)
     def _inv_add_ports_ipmi(self):
         log = logger.getlogger()
         from lib.inventory import Inventory
@@ -352,6 +381,7 @@ class Gen(object):
             sys.exit(1)
         print('IPMI ports added to inventory')
 
+    @trace.traced(trace.PHASE)
     def _add_cobbler_distros(self):
         from lib.container import Container
 
@@ -368,9 +398,12 @@ class Gen(object):
             sys.exit(1)
         print('Success: Cobbler distros and profiles added')
 
+    @trace.traced(trace.PHASE)
     def _inv_add_ports_pxe(self):
         log = logger.getlogger()
         from lib.inventory import Inventory
+        from set_power_clients import set_power_clients
+        from set_bootdev_clients import set_bootdev_clients
         inv = Inventory(cfg_file=self.config_file_path)
         if (inv.check_all_nodes_pxe_macs() and
                 inv.check_all_nodes_pxe_ipaddrs()):
@@ -402,6 +435,7 @@ class Gen(object):
             sys.exit(1)
         print('PXE ports added to inventory')
 
+    @trace.traced(trace.PHASE)
     def _reserve_ipmi_pxe_ips(self):
         from lib.container import Container
 
@@ -418,6 +452,7 @@ class Gen(object):
             sys.exit(1)
         print('Success: IPMI and PXE IP Addresses Reserved')
 
+    @trace.traced(trace.PHASE)
     def _add_cobbler_systems(self):
         from lib.container import Container
 
@@ -434,7 +469,9 @@ class Gen(object):
             sys.exit(1)
         print('Success: Cobbler systems added')
 
+    @trace.traced(trace.PHASE)
     def _install_client_os(self):
+        import remove_client_host_keys
         from lib.container import Container
 
         remove_client_host_keys.remove_client_host_keys(self.config_file_path)
@@ -454,12 +491,15 @@ class Gen(object):
 
         print('Success: Client OS installaion complete')
 
+    @trace.traced(trace.PHASE)
     def _ssh_keyscan(self):
         _run_playbook("ssh_keyscan.yml", self.config_file_path)
         print('Success: SSH host key scan complete')
 
+    @trace.traced(trace.PHASE)
     def _config_data_switches(self):
         import configure_data_switches
+        from lib.switch_exception import SwitchException
 
         print(COL.scroll_ten, COL.up_ten)
         print('{}Configuring data switches{}\n'.
@@ -478,6 +518,7 @@ class Gen(object):
         else:
             print('\nSuccesfully configured data switches')
 
+    @trace.traced(trace.PHASE)
     def _gather_mac_addr(self):
         from lib.container import Container
         from lib.inventory import Inventory
@@ -529,16 +570,24 @@ class Gen(object):
 
         print('Success: Gathered Client MAC addresses')
 
+    @trace.traced(trace.PHASE)
     def _lookup_interface_names(self):
+        from inv_set_interface_names import inv_set_interface_names_from_facts
         try:
             _run_playbook("lookup_interface_names.yml --extra-vars config_path=" +
                           self.cont_config_file_path, self.config_file_path)
+            missing = inv_set_interface_names_from_facts(self.config_file_path)
         except UserException as exc:
             print('Fail:', str(exc), file=sys.stderr)
             sys.exit(1)
+        if missing:
+            print('Fail: No cached facts found for: ' + ', '.join(missing),
+                  file=sys.stderr)
+            sys.exit(1)
 
         print('Success: Interface names collected')
 
+    @trace.traced(trace.PHASE)
     def _validate_bootstrap_vars(self):
         rc, stdout = _run_playbook("validate_bootstrap_vars.yml",
                                    self.config_file_path,
@@ -549,21 +598,28 @@ class Gen(object):
             print(f'Failed to validate bootstrap vars:\n{stdout}')
             sys.exit(1)
 
+    @trace.traced(trace.PHASE)
     def _config_client_os(self):
         self._validate_bootstrap_vars()
         _run_playbook("configure_operating_systems.yml", self.config_file_path,
                       extra_vars=self.args.extra_vars)
         print('Success: Client operating systems are configured')
 
+    @trace.traced(trace.PHASE)
     def _scan_pxe_network(self):
+        from lib.utilities import scan_ping_network
         print('Scanning cluster PXE network')
         scan_ping_network('pxe', self.config_file_path)
 
+    @trace.traced(trace.PHASE)
     def _scan_ipmi_network(self):
+        from lib.utilities import scan_ping_network
         print('Scanning cluster IPMI network')
         scan_ping_network('ipmi', self.config_file_path)
 
+    @trace.traced(trace.PHASE)
     def _bundle(self, root_dir):
+        from archive import bundle
         log = logger.getlogger()
         print('Bundling {0} directory'.format(root_dir))
         try:
@@ -572,7 +628,9 @@ class Gen(object):
         except KeyboardInterrupt as e:
             log.error("User exit ... {0}".format(e))
 
+    @trace.traced(trace.PHASE)
     def _extract_bundle(self, root_dir):
+        from archive import bundle
         log = logger.getlogger()
         print('Exctracting to {0} directory ... '.format(root_dir))
         try:
@@ -583,7 +641,9 @@ class Gen(object):
         except PermissionError as e:
             log.error("{0}".format(e))
 
+    @trace.traced(trace.PHASE)
     def _osinstall(self):
+        import osinstall
         # profile_path = osinstall.Profile()
         osinstall.osinstall(self.config_file_path)
         # print(self.config_file_path)
@@ -591,7 +651,6 @@ class Gen(object):
     def launch(self):
         """Launch actions"""
 
-        cmd = None
         if not hasattr(self.args, 'software'):
             self.cont_config_file_path += (
                 os.path.basename(self.args.config_file_name))
@@ -612,330 +671,298 @@ class Gen(object):
 
             self.config_file_path = os.path.abspath(self.config_file_path)
 
-        # Determine which subcommand was specified
-        try:
-            if self.args.setup:
-                cmd = argparse_gen.Cmd.SETUP.value
-        except AttributeError:
-            pass
-        try:
-            if self.args.config:
-                cmd = argparse_gen.Cmd.CONFIG.value
-        except AttributeError:
-            pass
-        try:
-            if self.args.validate:
-                cmd = argparse_gen.Cmd.VALIDATE.value
-                print('\nUsing {}'.format(self.config_file_path))
-                resp = input('Enter to continue. "T" to terminate ')
-                if resp == 'T':
-                    sys.exit('POWER-Up stopped at user request')
-        except AttributeError:
-            pass
-        try:
-            if self.args.deploy:
-                cmd = argparse_gen.Cmd.DEPLOY.value
-        except AttributeError:
-            pass
-        try:
-            if self.args.post_deploy:
-                cmd = argparse_gen.Cmd.POST_DEPLOY.value
-        except AttributeError:
-            pass
-        try:
-            if self.args.osinstall:
-                cmd = argparse_gen.Cmd.OSINSTALL.value
-        except AttributeError:
-            pass
-        try:
-            if self.args.software:
-                cmd = argparse_gen.Cmd.SOFTWARE.value
-        except AttributeError:
-            pass
-        try:
-            if self.args.utils:
-                cmd = argparse_gen.Cmd.UTIL.value
-        except AttributeError:
-            pass
-
-        # Invoke subcommand method
-        if cmd == argparse_gen.Cmd.SETUP.value:
-            if gen.is_container():
-                print(
-                    'Fail: Invalid subcommand in container', file=sys.stderr)
-                sys.exit(1)
+        # Determine which subcommand was specified and invoke its handler
+        cmd = None
+        handler = None
+        for command, arg, method in self.COMMANDS:
+            if getattr(self.args, arg, False):
+                cmd, handler = command.value, method
+        if handler is None:
+            print('Unrecognized POWER-Up command')
+            return
+        with trace.span(trace.COMMAND, cmd):
+            getattr(self, handler)(cmd)
 
-            self._check_root_user(cmd)
+    def _cmd_setup(self, cmd):
+        if gen.is_container():
+            print(
+                'Fail: Invalid subcommand in container', file=sys.stderr)
+            sys.exit(1)
 
-            if self.args.all:
-                self.args.networks = True
-                self.args.gateway = True
+        self._check_root_user(cmd)
 
-            if self.args.networks:
-                self._create_deployer_networks()
-            if self.args.gateway:
-                self._enable_deployer_gateway()
+        if self.args.all:
+            self.args.networks = True
+            self.args.gateway = True
 
-        if cmd == argparse_gen.Cmd.CONFIG.value:
-            if gen.is_container():
-                print(
-                    'Fail: Invalid subcommand in container', file=sys.stderr)
-                sys.exit(1)
-            if argparse_gen.is_arg_present(self.args.create_container):
-                self._check_non_root_user(cmd)
-                self._create_container()
-            if self.args.mgmt_switches:
-                self._config_mgmt_switches()
-            if argparse_gen.is_arg_present(self.args.data_switches):
-                self._config_data_switches()
-
-        if cmd == argparse_gen.Cmd.VALIDATE.value:
-            if argparse_gen.is_arg_present(self.args.config_file):
-                self._check_non_root_user(cmd)
-                self._config_file()
-            if argparse_gen.is_arg_present(self.args.cluster_hardware):
-                self._check_root_user(cmd)
-                self._cluster_hardware()
-
-        if cmd == argparse_gen.Cmd.DEPLOY.value:
-            if gen.is_container():
-                print(
-                    'Fail: Invalid subcommand in container', file=sys.stderr)
-                sys.exit(1)
+        if self.args.networks:
+            self._create_deployer_networks()
+        if self.args.gateway:
+            self._enable_deployer_gateway()
 
-            if argparse_gen.is_arg_present(self.args.all):
-                self.args.create_inventory = self.args.all
-                self.args.install_cobbler = self.args.all
-                self.args.download_os_images = self.args.all
-                self.args.inv_add_ports_ipmi = self.args.all
-                self.args.inv_add_ports_pxe = self.args.all
-                self.args.reserve_ipmi_pxe_ips = self.args.all
-                self.args.add_cobbler_distros = self.args.all
-                self.args.add_cobbler_systems = self.args.all
-                self.args.install_client_os = self.args.all
-
-            if argparse_gen.is_arg_present(self.args.create_inventory):
-                self._create_inventory()
-            if argparse_gen.is_arg_present(self.args.install_cobbler):
-                self._install_cobbler()
-            if argparse_gen.is_arg_present(self.args.download_os_images):
-                self._download_os_images()
-            if argparse_gen.is_arg_present(self.args.inv_add_ports_ipmi):
-                self._inv_add_ports_ipmi()
-            if argparse_gen.is_arg_present(self.args.inv_add_ports_pxe):
-                self._inv_add_ports_pxe()
-            if argparse_gen.is_arg_present(self.args.reserve_ipmi_pxe_ips):
-                self._reserve_ipmi_pxe_ips()
-            if argparse_gen.is_arg_present(self.args.add_cobbler_distros):
-                self._add_cobbler_distros()
-            if argparse_gen.is_arg_present(self.args.add_cobbler_systems):
-                self._add_cobbler_systems()
-            if argparse_gen.is_arg_present(self.args.install_client_os):
-                self._install_client_os()
-            if argparse_gen.is_arg_present(self.args.all):
-                print("\n\nPress enter to continue with node configuration ")
-                print("and data switch setup, or 'T' to terminate ")
-                print("POWER-Up. (To restart, type: 'pup post-deploy)")
-                resp = input("\nEnter or 'T': ")
-                if resp == 'T':
-                    sys.exit('POWER-Up stopped at user request')
-                cmd = argparse_gen.Cmd.POST_DEPLOY.value
+    def _cmd_config(self, cmd):
+        if gen.is_container():
+            print(
+                'Fail: Invalid subcommand in container', file=sys.stderr)
+            sys.exit(1)
+        if argparse_gen.is_arg_present(self.args.create_container):
+            self._check_non_root_user(cmd)
+            self._create_container()
+        if self.args.mgmt_switches:
+            self._config_mgmt_switches()
+        if argparse_gen.is_arg_present(self.args.data_switches):
+            self._config_data_switches()
+
+    def _cmd_validate(self, cmd):
+        print('\nUsing {}'.format(self.config_file_path))
+        resp = input('Enter to continue. "T" to terminate ')
+        if resp == 'T':
+            sys.exit('POWER-Up stopped at user request')
+
+        if argparse_gen.is_arg_present(self.args.config_file):
+            self._check_non_root_user(cmd)
+            self._config_file()
+        if argparse_gen.is_arg_present(self.args.cluster_hardware):
+            self._check_root_user(cmd)
+            self._cluster_hardware()
 
-        if cmd == argparse_gen.Cmd.POST_DEPLOY.value:
-            if gen.is_container():
-                print('Fail: Invalid subcommand in container', file=sys.stderr)
-                sys.exit(1)
-            if argparse_gen.is_arg_present(self.args.all):
-                self.args.ssh_keyscan = self.args.all
-                self.args.gather_mac_addr = self.args.all
-                self.args.data_switches = self.args.all
-                self.args.lookup_interface_names = self.args.all
-                self.args.config_client_os = self.args.all
-
-            self._validate_bootstrap_vars()
-            if argparse_gen.is_arg_present(self.args.ssh_keyscan):
-                self._ssh_keyscan()
-            if argparse_gen.is_arg_present(self.args.gather_mac_addr):
-                self._gather_mac_addr()
-            if argparse_gen.is_arg_present(self.args.lookup_interface_names):
-                self._lookup_interface_names()
-            if argparse_gen.is_arg_present(self.args.config_client_os):
-                self._config_client_os()
-            if argparse_gen.is_arg_present(self.args.all):
-                self._config_data_switches()
-
-        if cmd == argparse_gen.Cmd.OSINSTALL.value:
-            self._osinstall()
-
-        if cmd == argparse_gen.Cmd.SOFTWARE.value:
-            if not argparse_gen.is_arg_present(self.args.prep) and not \
-                    argparse_gen.is_arg_present(self.args.init_clients) and not \
-                    argparse_gen.is_arg_present(self.args.install) and not \
-                    argparse_gen.is_arg_present(self.args.README) and not \
-                    argparse_gen.is_arg_present(self.args.status) and not \
-                    argparse_gen.is_arg_present(self.args.bundle_to) and not \
-                    argparse_gen.is_arg_present(self.args.extract_from) and not \
-                    argparse_gen.is_arg_present(self.args.extract_from) and not \
-                    argparse_gen.is_arg_present(self.args.download_install_deps):
-                self.args.all = True
-            if self.args.bundle_to or self.args.extract_from:
-                self.args.all = False
-            if gen.GEN_SOFTWARE_PATH not in sys.path:
-                sys.path.append(gen.GEN_SOFTWARE_PATH)
-            try:
-                self.args.name = self.args.name.split('.')[0]
-                software_module = importlib.import_module(self.args.name)
-            except ImportError as exc:
-                print(exc)
-                sys.exit(1)
-            if 'software' not in dir(software_module):
-                self.log.error('Software installation modules need to implement a '
-                               'class named "software"')
-                sys.exit(1)
-            else:
-                soft = software_module.software(self.args.eval, self.args.non_interactive, self.args.arch,
-                                                self.args.proc_family, self.args.engr_mode, self.args.base_dir,
-                                                self.args.public)
+    def _cmd_deploy(self, cmd):
+        if gen.is_container():
+            print(
+                'Fail: Invalid subcommand in container', file=sys.stderr)
+            sys.exit(1)
 
-            if self.args.bundle_to:
-                try:
-                    self._bundle(soft.root_dir)
-                except:
-                    sys.exit(1)
-            if self.args.extract_from:
-                log = logger.getlogger()
-                try:
-                    in_dir = bundle.validate_directories(soft.root_dir, self.args.extract_from[0])
-                    if in_dir is not None:
-                        msg = 'Directories exist in {0} directory and will be overwritten\nDirectories: \n\t{1}'.format(soft.root_dir, "\n\t".join(in_dir))
-                        log.warning(msg)
-                        while True:
-                            try:
-                                resp = input("Enter C to continue extracting or 'T' to terminate \n")
-                                if resp == 'T':
-                                    log.info("'{}' entered. Terminating POWER-Up at user request".format(resp))
-                                    sys.exit(1)
-                                elif resp == 'C':
-                                    log.info("'{0}' entered. Continuing archiving of {1}".format(resp, soft.root_dir))
-                                    break
-                                else:
-                                    continue
-                            except KeyboardInterrupt:
-                                log.info("\nExiting at user request ... ")
-                                sys.exit(1)
-                            except Exception as e:
-                                log.error("Uncaught exception:\n{0}".format(e))
-                                sys.exit(1)
+        if argparse_gen.is_arg_present(self.args.all):
+            self.args.create_inventory = self.args.all
+            self.args.install_cobbler = self.args.all
+            self.args.download_os_images = self.args.all
+            self.args.inv_add_ports_ipmi = self.args.all
+            self.args.inv_add_ports_pxe = self.args.all
+            self.args.reserve_ipmi_pxe_ips = self.args.all
+            self.args.add_cobbler_distros = self.args.all
+            self.args.add_cobbler_systems = self.args.all
+            self.args.install_client_os = self.args.all
+
+        if argparse_gen.is_arg_present(self.args.create_inventory):
+            self._create_inventory()
+        if argparse_gen.is_arg_present(self.args.install_cobbler):
+            self._install_cobbler()
+        if argparse_gen.is_arg_present(self.args.download_os_images):
+            self._download_os_images()
+        if argparse_gen.is_arg_present(self.args.inv_add_ports_ipmi):
+            self._inv_add_ports_ipmi()
+        if argparse_gen.is_arg_present(self.args.inv_add_ports_pxe):
+            self._inv_add_ports_pxe()
+        if argparse_gen.is_arg_present(self.args.reserve_ipmi_pxe_ips):
+            self._reserve_ipmi_pxe_ips()
+        if argparse_gen.is_arg_present(self.args.add_cobbler_distros):
+            self._add_cobbler_distros()
+        if argparse_gen.is_arg_present(self.args.add_cobbler_systems):
+            self._add_cobbler_systems()
+        if argparse_gen.is_arg_present(self.args.install_client_os):
+            self._install_client_os()
+        if argparse_gen.is_arg_present(self.args.all):
+            print("\n\nPress enter to continue with node configuration ")
+            print("and data switch setup, or 'T' to terminate ")
+            print("POWER-Up. (To restart, type: 'pup post-deploy)")
+            resp = input("\nEnter or 'T': ")
+            if resp == 'T':
+                sys.exit('POWER-Up stopped at user request')
+            self._cmd_post_deploy(argparse_gen.Cmd.POST_DEPLOY.value)
+
+    def _cmd_post_deploy(self, cmd):
+        if gen.is_container():
+            print('Fail: Invalid subcommand in container', file=sys.stderr)
+            sys.exit(1)
+        if argparse_gen.is_arg_present(self.args.all):
+            self.args.ssh_keyscan = self.args.all
+            self.args.gather_mac_addr = self.args.all
+            self.args.data_switches = self.args.all
+            self.args.lookup_interface_names = self.args.all
+            self.args.config_client_os = self.args.all
 
-                        self._extract_bundle(soft.root_dir)
-                    else:
-                        self._extract_bundle(soft.root_dir)
-                except Exception as e:
-                    print(e)
-                    sys.exit(1)
+        self._validate_bootstrap_vars()
+        if argparse_gen.is_arg_present(self.args.ssh_keyscan):
+            self._ssh_keyscan()
+        if argparse_gen.is_arg_present(self.args.gather_mac_addr):
+            self._gather_mac_addr()
+        if argparse_gen.is_arg_present(self.args.lookup_interface_names):
+            self._lookup_interface_names()
+        if argparse_gen.is_arg_present(self.args.config_client_os):
+            self._config_client_os()
+        if argparse_gen.is_arg_present(self.args.all):
+            self._config_data_switches()
+
+    def _cmd_osinstall(self, cmd):
+        self._osinstall()
+
+    def _cmd_software(self, cmd):
+        if not argparse_gen.is_arg_present(self.args.prep) and not \
+                argparse_gen.is_arg_present(self.args.init_clients) and not \
+                argparse_gen.is_arg_present(self.args.install) and not \
+                argparse_gen.is_arg_present(self.args.README) and not \
+                argparse_gen.is_arg_present(self.args.status) and not \
+                argparse_gen.is_arg_present(self.args.bundle_to) and not \
+                argparse_gen.is_arg_present(self.args.extract_from) and not \
+                argparse_gen.is_arg_present(self.args.extract_from) and not \
+                argparse_gen.is_arg_present(self.args.download_install_deps):
+            self.args.all = True
+        if self.args.bundle_to or self.args.extract_from:
+            self.args.all = False
+        if gen.GEN_SOFTWARE_PATH not in sys.path:
+            sys.path.append(gen.GEN_SOFTWARE_PATH)
+        try:
+            self.args.name = self.args.name.split('.')[0]
+            software_module = importlib.import_module(self.args.name)
+        except ImportError as exc:
+            print(exc)
+            sys.exit(1)
+        if 'software' not in dir(software_module):
+            self.log.error('Software installation modules need to implement a '
+                           'class named "software"')
+            sys.exit(1)
+        else:
+            soft = software_module.software(self.args.eval, self.args.non_interactive, self.args.arch,
+                                            self.args.proc_family, self.args.engr_mode, self.args.base_dir,
+                                            self.args.public, self.args.single_run)
+
+        if self.args.bundle_to:
             try:
-                if (self.args.prep is True or self.args.all is True) and self.args.step is not None:
-                    try:
-                        soft.prep_init()
-                        for step in self.args.step:
-                            run_this = "create_" + step
-                            if hasattr(soft, run_this):
-                                func = getattr(soft, run_this)
-                                func()
+                self._bundle(soft.root_dir)
+            except:
+                sys.exit(1)
+        if self.args.extract_from:
+            from archive import bundle
+            log = logger.getlogger()
+            try:
+                in_dir = bundle.validate_directories(soft.root_dir, self.args.extract_from[0])
+                if in_dir is not None:
+                    msg = 'Directories exist in {0} directory and will be overwritten\nDirectories: \n\t{1}'.format(soft.root_dir, "\n\t".join(in_dir))
+                    log.warning(msg)
+                    while True:
+                        try:
+                            resp = input("Enter C to continue extracting or 'T' to terminate \n")
+                            if resp == 'T':
+                                log.info("'{}' entered. Terminating POWER-Up at user request".format(resp))
+                                sys.exit(1)
+                            elif resp == 'C':
+                                log.info("'{0}' entered. Continuing archiving of {1}".format(resp, soft.root_dir))
+                                break
                             else:
-                                print('\nUnable to find: ' + step + " in :" + self.args.name)
-                        soft.prep_post()
-                    except AttributeError as exc:
-                        print(exc)
-                elif (self.args.prep is True or self.args.all is True) and self.args.step is None:
-                    try:
-                        soft.prep()
-                    except AttributeError as exc:
-                        print(exc.message)
-                        print('The software class needs to implement a '
-                              'method named "setup"')
-            except KeyboardInterrupt as e:
-                soft.prep_post()
-                print('User exited ...\n' + str(e))
+                                continue
+                        except KeyboardInterrupt:
+                            log.info("\nExiting at user request ... ")
+                            sys.exit(1)
+                        except Exception as e:
+                            log.error("Uncaught exception:\n{0}".format(e))
+                            sys.exit(1)
+
+                    self._extract_bundle(soft.root_dir)
+                else:
+                    self._extract_bundle(soft.root_dir)
             except Exception as e:
-                raise e
-            if self.args.init_clients is True or self.args.all is True:
+                print(e)
+                sys.exit(1)
+        try:
+            if (self.args.prep is True or self.args.all is True) and self.args.step is not None:
                 try:
-                    soft.init_clients()
+                    soft.prep_init()
+                    for step in self.args.step:
+                        run_this = "create_" + step
+                        if hasattr(soft, run_this):
+                            func = getattr(soft, run_this)
+                            func()
+                        else:
+                            print('\nUnable to find: ' + step + " in :" + self.args.name)
+                    soft.prep_post()
                 except AttributeError as exc:
                     print(exc)
+            elif (self.args.prep is True or self.args.all is True) and self.args.step is None:
+                try:
+                    soft.prep()
+                except AttributeError as exc:
+                    print(exc.message)
                     print('The software class needs to implement a '
-                          'method named "init_clients"')
-
+                          'method named "setup"')
+        except KeyboardInterrupt as e:
+            soft.prep_post()
+            print('User exited ...\n' + str(e))
+        except Exception as e:
+            raise e
+        if self.args.init_clients is True or self.args.all is True:
             try:
-                if (self.args.install is True or self.args.all is True) and self.args.run_ansible_task is not None:
-                    try:
-                        run_this = "run_ansible_task"
-                        import tempfile
-                        run_it_file = ""
-                        for task in self.args.run_ansible_task:
-                            task_file = soft.get_software_path(os.path.basename(task))
-                            if not os.path.isfile(task_file):
-                                print('\nUnable to find: ' + task_file)
-                            else:
-                                run_it_file = run_it_file + '''\n- description: Running file {0}\n  tasks: {1}\n'''.format(
-                                                            soft.get_software_path(os.path.basename(task_file)), os.path.basename(task_file))
-                        if hasattr(soft, run_this) and run_it_file != "":
-                            func = getattr(soft, run_this)
-                            fileobj = tempfile.NamedTemporaryFile()
-                            with open(fileobj.name, 'w') as f:
-                                f.write(run_it_file)
-                                f.seek(0)
-                                func(fileobj.name)
-                        else:
-                            if run_it_file == "":
-                                print('\nUnable to find files to run')
-                            else:
-                                print('\nUnable to find: ' + run_this + " in :" + self.args.name)
-                    except AttributeError as exc:
-                        print(exc)
-
-                elif (self.args.install is True or self.args.all is True) and self.args.run_ansible_task is None:
-                    try:
-                        soft.install()
-                    except AttributeError as exc:
-                        print(exc.message)
-                        print('The software class needs to implement a '
-                              'method named "setup"')
-            except KeyboardInterrupt as e:
-                print('User exited ...\n' + str(e))
-            except Exception as e:
-                raise e
+                soft.init_clients()
+            except AttributeError as exc:
+                print(exc)
+                print('The software class needs to implement a '
+                      'method named "init_clients"')
 
-            if self.args.README is True:
+        try:
+            if (self.args.install is True or self.args.all is True) and self.args.run_ansible_task is not None:
                 try:
-                    soft.README()
+                    run_this = "run_ansible_task"
+                    import tempfile
+                    run_it_file = ""
+                    for task in self.args.run_ansible_task:
+                        task_file = soft.get_software_path(os.path.basename(task))
+                        if not os.path.isfile(task_file):
+                            print('\nUnable to find: ' + task_file)
+                        else:
+                            run_it_file = run_it_file + '''\n- description: Running file {0}\n  tasks: {1}\n'''.format(
+                                                        soft.get_software_path(os.path.basename(task_file)), os.path.basename(task_file))
+                    if hasattr(soft, run_this) and run_it_file != "":
+                        func = getattr(soft, run_this)
+                        fileobj = tempfile.NamedTemporaryFile()
+                        with open(fileobj.name, 'w') as f:
+                            f.write(run_it_file)
+                            f.seek(0)
+                            func(fileobj.name)
+                    else:
+                        if run_it_file == "":
+                            print('\nUnable to find files to run')
+                        else:
+                            print('\nUnable to find: ' + run_this + " in :" + self.args.name)
                 except AttributeError as exc:
                     print(exc)
-                    print('No "about" information available')
 
-            if self.args.status is True:
+            elif (self.args.install is True or self.args.all is True) and self.args.run_ansible_task is None:
                 try:
-                    soft.status()
+                    soft.install()
                 except AttributeError as exc:
-                    print(exc)
-                    print('No "status" information available')
-
-            if self.args.download_install_deps:
-                soft.download_install_deps()
-
-        if cmd == argparse_gen.Cmd.UTIL.value:
-            if self.args.scan_pxe_network:
-                self._scan_pxe_network()
-            if self.args.scan_ipmi_network:
-                self._scan_ipmi_network()
-            if self.args.download_install_deps:
-                self._download_install_deps()
-            if self.args.bundle_to or self.args.bundle_from:
-                self._bundle(self.args.bundle_from[0])
-
-        if not cmd:
-            print('Unrecognized POWER-Up command')
+                    print(exc.message)
+                    print('The software class needs to implement a '
+                          'method named "setup"')
+        except KeyboardInterrupt as e:
+            print('User exited ...\n' + str(e))
+        except Exception as e:
+            raise e
+
+        if self.args.README is True:
+            try:
+                soft.README()
+            except AttributeError as exc:
+                print(exc)
+                print('No "about" information available')
+
+        if self.args.status is True:
+            try:
+                soft.status()
+            except AttributeError as exc:
+                print(exc)
+                print('No "status" information available')
+
+        if self.args.download_install_deps:
+            soft.download_install_deps()
+
+    def _cmd_util(self, cmd):
+        if self.args.scan_pxe_network:
+            self._scan_pxe_network()
+        if self.args.scan_ipmi_network:
+            self._scan_ipmi_network()
+        if self.args.download_install_deps:
+            self._download_install_deps()
+        if self.args.bundle_to or self.args.bundle_from:
+            self._bundle(self.args.bundle_from[0])
 
 
 def _run_playbook(playbook, config_path, extra_vars=None, display=True,
@@ -954,18 +981,20 @@ def _run_playbook(playbook, config_path, extra_vars=None, display=True,
         cmd += f" --extra-vars '{' '.join(extra_vars)}'"
     command = ['bash', '-c', cmd]
     log.debug('Run subprocess: %s' % ' '.join(command))
-    if display:
-        process = Popen(command, cwd=gen.get_playbooks_path())
-        process.wait()
-        stdout = ''
-    else:
-        process = Popen(command, stdout=PIPE, stderr=PIPE,
-                        cwd=gen.get_playbooks_path())
-        stdout, stderr = process.communicate()
-        try:
-            stdout = stdout.decode('utf-8')
-        except AttributeError:
-            pass
+    with trace.span(trace.ANSIBLE, playbook.strip()) as span:
+        if display:
+            process = Popen(command, cwd=gen.get_playbooks_path())
+            process.wait()
+            stdout = ''
+        else:
+            process = Popen(command, stdout=PIPE, stderr=PIPE,
+                            cwd=gen.get_playbooks_path())
+            stdout, stderr = process.communicate()
+            try:
+                stdout = stdout.decode('utf-8')
+            except AttributeError:
+                pass
+        span.set(rc=process.returncode)
     return (process.returncode, stdout)
 
 
@@ -978,5 +1007,12 @@ if __name__ == '__main__':
 
     if args.log_level_print[0] == 'debug':
         print('DEBUG - {}'.format(args))
+    if args.trace:
+        trace.enable()
     GEN = Gen(args)
-    GEN.launch()
+    try:
+        GEN.launch()
+    finally:
+        path = trace.get_path()
+        if path is not None:
+            print(f'\n{trace.finish()}\n\nTrace written to {path}')
@@ -16,10 +16,9 @@
 # limitations under the License.
 
 import os.path
-import re
-from orderedattrdict import AttrDict
 
 import lib.logger as logger
+from lib.lease_watcher import read_leases
 from lib.exception import UserException
 
 
@@ -32,20 +31,12 @@ class GetDhcpLeases(object):
         log = logger.getlogger()
 
         try:
-            fds = open(dhcp_leases_file, 'r')
-        except:
+            self.mac_ip = read_leases(dhcp_leases_file)
+        except IOError:
             msg = 'DHCP leases file not found: %s'
             log.error(msg % (dhcp_leases_file))
             raise UserException(msg % dhcp_leases_file)
-        self.mac_ip = AttrDict()
-        for line in fds:
-            match = re.search(
-                r'^\S+\s+(\S+)\s+(\S+)',
-                line)
-            mac = match.group(1)
-            ipaddr = match.group(2)
-            self.mac_ip[mac] = ipaddr
-            log.debug('Lease found - MAC: %s - IP: %s' % (mac, ipaddr))
+        log.debug('Leases found - %s' % self.mac_ip)
 
     def get_mac_ip(self):
         return self.mac_ip
@@ -25,7 +25,8 @@ import lib.logger as logger
 from lib.config import Config
 from lib.inventory import Inventory
 from lib.switch import SwitchFactory
-from lib.switch_common import SwitchCommon
+from lib.mac_table import parse_mac_address_table
+from lib.node_correlator import NodeCorrelator
 from get_dhcp_lease_info import GetDhcpLeases
 from lib.genesis import GEN_PASSIVE_PATH
 
@@ -48,6 +49,8 @@ class InventoryAddPorts(object):
         for sw_ai in self.cfg.yield_sw_mgmt_access_info():
             label = sw_ai[0]
             self.sw_dict[label] = SwitchFactory.factory(*sw_ai[1:])
+        self.correlator = NodeCorrelator()
+        self.correlator.add_config_slots(self.cfg, self.port_type)
 
     def get_ports(self):
         dhcp_leases = GetDhcpLeases(self.dhcp_leases_file)
@@ -71,7 +74,7 @@ class InventoryAddPorts(object):
                         .format(error))
                     raise
                 mgmt_sw_cfg_mac_lists[switch_label] = \
-                    SwitchCommon.get_port_to_mac(mac_info, self.log)
+                    parse_mac_address_table(mac_info).port_to_macs
         else:
             for switch in self.sw_dict:
                 self.log.debug('Switch: {}'.format(switch))
@@ -81,20 +84,13 @@ class InventoryAddPorts(object):
         self.log.debug('Management switches MAC address tables: {}'.format(
             mgmt_sw_cfg_mac_lists))
 
-        # Remove all the mac address table entries which do not have a matching
-        # MAC address in the DHCP leases table, then remove any MAC addresses
-        # which do not have a  DHCP table entry.
-        for switch in mgmt_sw_cfg_mac_lists.keys():
-            for port in list(mgmt_sw_cfg_mac_lists[switch].keys()):
-                port_macs = mgmt_sw_cfg_mac_lists[switch][port]
-                found_mac = False
-                for mac in dhcp_mac_ip.keys():
-                    if mac in port_macs:
-                        found_mac = True
-                        # keep only the mac which has a dhcp address
-                        mgmt_sw_cfg_mac_lists[switch][port] = [mac]
-                if not found_mac:
-                    del mgmt_sw_cfg_mac_lists[switch][port]
+        self.correlator.update_leases(dhcp_mac_ip)
+        for switch, port_to_macs in mgmt_sw_cfg_mac_lists.items():
+            self.correlator.update_mac_table(switch, port_to_macs)
+
+        # Keep only switch ports with a MAC address which has a DHCP lease
+        mgmt_sw_cfg_mac_lists = self.correlator.get_leased_port_macs(
+            mgmt_sw_cfg_mac_lists.keys())
         self.log.debug('Management switches MAC address table of ports with'
                        'dhcp leases: {}'.format(mgmt_sw_cfg_mac_lists))
 
@@ -105,133 +101,12 @@ class InventoryAddPorts(object):
             self.inv.add_macs_pxe(mgmt_sw_cfg_mac_lists)
             self.inv.add_ipaddrs_pxe(dhcp_mac_ip)
 
-        if self.port_type == 'ipmi':
-            self.node_table, self.ports_found, self.ports_total = \
-                self._build_node_table_ipmi(self.cfg, dhcp_mac_ip, mgmt_sw_cfg_mac_lists)
-
-        if self.port_type == 'pxe':
-            self.node_table, self.ports_found, self.ports_total = \
-                self._build_node_table_pxe(self.cfg, dhcp_mac_ip, mgmt_sw_cfg_mac_lists)
-
-    def _build_node_table_ipmi(self, cfg, dhcp_list, mac_lists):
-        # Tabulate results by Node type (template)
-        node_table = {}
-        ports_total = 0
-        ports_found = 0
-        for idx_ntmplt in self.cfg.yield_ntmpl_ind():
-            node_label = self.cfg.get_ntmpl_label(idx_ntmplt)
-            self.log.debug('node label: {}'.format(node_label))
-            ports_list = []
-
-            for idx_ipmi in self.cfg.yield_ntmpl_phyintf_ipmi_ind(idx_ntmplt):
-                switch_label = self.cfg.get_ntmpl_phyintf_ipmi_switch(
-                    idx_ntmplt, idx_ipmi)
-                ports_total += self.cfg.get_ntmpl_phyintf_ipmi_pt_cnt(
-                    idx_ntmplt, idx_ipmi)
-
-                for idx_port in self.cfg.yield_ntmpl_phyintf_ipmi_pt_ind(
-                        idx_ntmplt, idx_ipmi):
-                    port = self.cfg.get_ntmpl_phyintf_ipmi_ports(
-                        idx_ntmplt, idx_ipmi, idx_port)
-                    result = self.inv.get_port_mac_ip(switch_label, port)
-                    if None not in result:
-                        ports_found += 1
-                        ports_list.append(
-                            [True, switch_label, port, result[0], result[1], 'ipmi'])
-                        self.log.debug(
-                            'Node Port Defined in Inventory - Template: {}'
-                            'Switch: {} Port: {} MAC: {} IP: {}'.format(
-                                node_label, switch_label, port, result[0],
-                                result[1], 'ipmi'))
-                    elif str(port) in mac_lists[switch_label]:
-                        for mac in mac_lists[switch_label][str(port)]:
-                            if mac in dhcp_list:
-                                ipaddr = dhcp_list[mac]
-                                ports_list.append(
-                                    [False, switch_label, port, mac,
-                                     ipaddr, 'ipmi'])
-                                self.log.debug(
-                                    'Node Port MAC/IP NOT Defined in Inventory - '
-                                    'Template: {} Switch: {} Port: {} '
-                                    'MAC: {} IP: {}'.format(
-                                        node_label, switch_label, port, mac, ipaddr))
-                            else:
-                                ports_list.append(
-                                    [False, switch_label, port, mac, '-', 'ipmi'])
-                                self.log.debug(
-                                    'No DHCP Lease Found for Port MAC Address - '
-                                    'Template: {} Switch: {} Port: {} '
-                                    'MAC: {}'.format(
-                                        node_label, switch_label, port, mac))
-                    else:
-                        ports_list.append(
-                            [False, switch_label, port, '-', '-', 'ipmi'])
-                        self.log.debug(
-                            'No Entries Found in MGMT Switch MAC Address Table - '
-                            'Template: {} Switch: {} Port: {}'.format(
-                                node_label, switch_label, port))
-            node_table[node_label] = ports_list
-        self.log.debug('node table: {}'.format(node_table))
-        return node_table, ports_found, ports_total
-
-    def _build_node_table_pxe(self, cfg, dhcp_list, mac_lists):
-        # Tabulate results by Node type (template)
-        node_table = {}
-        ports_total = 0
-        ports_found = 0
-        for idx_ntmplt in cfg.yield_ntmpl_ind():
-            node_label = cfg.get_ntmpl_label(idx_ntmplt)
-            self.log.debug('node label: {}'.format(node_label))
-            ports_list = []
-
-            for idx_pxe in cfg.yield_ntmpl_phyintf_pxe_ind(idx_ntmplt):
-                switch_label = cfg.get_ntmpl_phyintf_pxe_switch(idx_ntmplt, idx_pxe)
-                ports_total += cfg.get_ntmpl_phyintf_pxe_pt_cnt(idx_ntmplt, idx_pxe)
-
-                for idx_port in cfg.yield_ntmpl_phyintf_pxe_pt_ind(
-                        idx_ntmplt, idx_pxe):
-                    port = cfg.get_ntmpl_phyintf_pxe_ports(
-                        idx_ntmplt, idx_pxe, idx_port)
-                    result = self.inv.get_port_mac_ip(switch_label, port)
-                    if None not in result:
-                        ports_found += 1
-                        ports_list.append(
-                            [True, switch_label, port, result[0], result[1], 'pxe'])
-                        self.log.debug(
-                            'Node Port Defined in Inventory - Template: {}'
-                            'Switch: {} Port: {} MAC: {} IP: {}'.format(
-                                node_label, switch_label, port, result[0],
-                                result[1], 'pxe'))
-                    elif str(port) in mac_lists[switch_label]:
-                        for mac in mac_lists[switch_label][str(port)]:
-                            if mac in dhcp_list:
-                                ipaddr = dhcp_list[mac]
-                                ports_list.append(
-                                    [False, switch_label, port, mac,
-                                     ipaddr, 'pxe'])
-                                self.log.debug(
-                                    'Node Port MAC/IP NOT Defined in Inventory - '
-                                    'Template: {} Switch: {} Port: {} '
-                                    'MAC: {} IP: {}'.format(
-                                        node_label, switch_label, port, mac, ipaddr))
-                            else:
-                                ports_list.append(
-                                    [False, switch_label, port, mac, '-', 'pxe'])
-                                self.log.debug(
-                                    'No DHCP Lease Found for Port MAC Address - '
-                                    'Template: {} Switch: {} Port: {} '
-                                    'MAC: {}'.format(
-                                        node_label, switch_label, port, mac))
-                    else:
-                        ports_list.append(
-                            [False, switch_label, port, '-', '-', 'pxe'])
-                        self.log.debug(
-                            'No Entries Found in MGMT Switch MAC Address Table - '
-                            'Template: {} Switch: {} Port: {}'.format(
-                                node_label, switch_label, port))
-            node_table[node_label] = ports_list
-        self.log.debug('node table: {}'.format(node_table))
-        return node_table, ports_found, ports_total
+        self.correlator.update_inventory(self.inv.get_ports_mac_ip())
+        node_table, self.ports_found, self.ports_total = \
+            self.correlator.get_node_table(self.port_type)
+        self.node_table = {template: [list(row) for row in rows]
+                           for template, rows in node_table.items()}
+        self.log.debug('node table: {}'.format(self.node_table))
 
     def get_table(self):
         return self.node_table
@@ -17,15 +17,15 @@
 
 import argparse
 import os.path
+import re
 import sys
 import xmlrpc.client
-from netaddr import IPNetwork
 from time import time, sleep
 
 from lib.config import Config
 from lib.inventory import Inventory
 import lib.genesis as gen
-import lib.utilities as util
+from lib.ip_plan import AddressPlanner, PlanEntry, int_to_ip
 from set_power_clients import set_power_clients
 from lib.exception import UserException
 import lib.logger as logger
@@ -39,47 +39,146 @@ POWER_WAIT = gen.get_power_wait()
 SLEEP_TIME = gen.get_power_sleep_time()
 
 
-class IPManager(object):
-    """Manage IP address assignments from a given network
+def _get_reserved_ips(cfg):
+    """Get deployer and switch addresses that must not be assigned"""
+    reserved = []
+    reserved += cfg.get_depl_netw_client_cont_ip()
+    reserved += cfg.get_depl_netw_client_brg_ip()
+    for switch_index in range(cfg.get_sw_mgmt_cnt()):
+        reserved += list(cfg.yield_sw_mgmt_interfaces_ip(switch_index))
+    for switch_index in range(cfg.get_sw_data_cnt()):
+        reserved += list(cfg.yield_sw_data_interfaces_ip(switch_index))
+    return [ipaddr for ipaddr in reserved if ipaddr]
 
-    Args:
-        network (IPNetwork): netaddr IPNetwork object
-        start_offset (int): Starting IP address offset
+
+def _get_dnsmasq_leases():
+    """Get existing IPMI reservations from the dnsmasq template
+
+    Returns:
+        dict: IP addresses keyed by lower case MAC address
     """
+    leases = {}
+    if not os.path.isfile(DNSMASQ_TEMPLATE):
+        return leases
+    with open(DNSMASQ_TEMPLATE) as template:
+        for line in template:
+            if not line.startswith('dhcp-host='):
+                continue
+            fields = line[len('dhcp-host='):].strip().split(',')
+            if len(fields) >= 3:
+                leases[fields[0].lower()] = fields[2]
+    return leases
 
-    def __init__(self, network, start_offset):
-        self.log = logger.getlogger()
-        self.network = network
-        self.next_offset = start_offset
-        self.next_ip = network.network + self.next_offset
 
-    def get_next_ip(self, reserve=True):
-        """Get next available sequential IP address
+def plan_ipmi_pxe_ips(cfg, inv, leases=None):
+    """Plan IPMI and PXE addresses for all nodes
 
-        Args:
-            reserve (bool): If true the IP will be considered reserved
+    IP addresses are assigned sequentially within the appropriate
+    client networks starting with the DHCP pool start offset defined
+    in 'lib.genesis'. Deployer and switch addresses are skipped and
+    existing reservations are kept when still valid.
 
-        Returns:
-            ip_address (str): Next IP address
+    Args:
+        cfg (Config): Config object
+        inv (Inventory): Inventory object
+        leases (dict, optional): Existing addresses keyed by MAC
 
-        Raises:
-            UserException: No more IP addresses available
-        """
-        if self.next_ip == self.network.network + self.network.size:
-            raise UserException('Not enough IP addresses in network \'%s\'' %
-                                str(self.network.cidr))
-        ip_address = str(self.next_ip)
-        if reserve:
-            self.next_ip += 1
-        return ip_address
+    Returns:
+        tuple: (list of PlanEntry, dict of AddressPlanner keyed by
+               network type)
+
+    Raises:
+        UserException: - No IPMI or PXE client networks defined within
+                         the 'config.yml'
+                       - Not enough addresses in a client network
+    """
+    planners = {}
+    start_offset = gen.get_dhcp_pool_start()
+    for index, netw_type in enumerate(cfg.yield_depl_netw_client_type()):
+        if netw_type in ('ipmi', 'pxe'):
+            ip = cfg.get_depl_netw_client_cont_ip(index)
+            netmask = cfg.get_depl_netw_client_netmask(index)
+            planners[netw_type] = AddressPlanner(ip + '/' + netmask,
+                                                 start_offset)
+
+    # If only one network is defined use the same planner for both
+    if not planners:
+        raise UserException('No IPMI or PXE client network found')
+    planners.setdefault('ipmi', planners.get('pxe'))
+    planners.setdefault('pxe', planners.get('ipmi'))
+
+    reserved = _get_reserved_ips(cfg)
+    for planner in set(planners.values()):
+        for ipaddr in reserved:
+            planner.reserve(ipaddr)
+        for mac, ipaddr in (leases or {}).items():
+            planner.add_lease(mac, ipaddr)
+
+    nodes = []
+    requests = {planner: [] for planner in planners.values()}
+    for index, hostname in enumerate(inv.yield_nodes_hostname()):
+        rack_id = inv.get_nodes_rack_id(index)
+        for net_type in ('ipmi', 'pxe'):
+            if net_type == 'ipmi':
+                mac = inv.get_nodes_ipmi_mac(0, index)
+                prev_ipaddr = inv.get_nodes_ipmi_ipaddr(0, index)
+            else:
+                mac = inv.get_nodes_pxe_mac(0, index)
+                prev_ipaddr = inv.get_nodes_pxe_ipaddr(0, index)
+            nodes.append((index, hostname, rack_id, net_type, mac,
+                          prev_ipaddr))
+            requests[planners[net_type]].append(
+                ((index, net_type), mac, rack_id))
+
+    ipaddrs = {}
+    for planner, _requests in requests.items():
+        ipaddrs.update(planner.plan(_requests))
+
+    plan = [PlanEntry(index, hostname, rack_id, net_type, mac,
+                      ipaddrs[(index, net_type)], prev_ipaddr)
+            for index, hostname, rack_id, net_type, mac, prev_ipaddr
+            in nodes]
+    return plan, planners
+
+
+def _write_dnsmasq_template(plan, planners, dhcp_lease_time):
+    """Write IPMI reservations and DHCP pools to the dnsmasq template"""
+    ipmi_entries = [entry for entry in plan if entry.net_type == 'ipmi']
+    ipmi_macs = set(entry.mac.lower() for entry in ipmi_entries)
+    dhcp_ranges = {}
+    for planner in set(planners.values()):
+        dhcp_ranges[planner.cidr] = _get_dhcp_range(planner, dhcp_lease_time)
+
+    with open(DNSMASQ_TEMPLATE) as template:
+        lines = template.readlines()
+    new_lines = []
+    for line in lines:
+        if line.startswith('dhcp-host='):
+            mac = line[len('dhcp-host='):].split(',')[0].lower()
+            if mac in ipmi_macs:
+                continue
+        elif line.startswith('dhcp-range='):
+            for cidr, dhcp_range in dhcp_ranges.items():
+                if re.search(' # ' + re.escape(cidr) + r'\s*$', line):
+                    line = dhcp_range + '\n'
+                    break
+        new_lines.append(line)
+    if new_lines and not new_lines[-1].endswith('\n'):
+        new_lines[-1] += '\n'
+    for entry in ipmi_entries:
+        new_lines.append('dhcp-host=%s,%s-bmc,%s,%s\n' %
+                         (entry.mac, entry.hostname, entry.ipaddr,
+                          dhcp_lease_time))
+    with open(DNSMASQ_TEMPLATE, 'w') as template:
+        template.writelines(new_lines)
 
 
 def inv_set_ipmi_pxe_ip(config_path):
     """Configure DHCP IP reservations for IPMI and PXE interfaces
 
-    IP addresses are assigned sequentially within the appropriate
-    client networks starting with the DHCP pool start offset defined
-    in 'lib.genesis'.
+    IP addresses for all nodes are planned up front (see
+    'plan_ipmi_pxe_ips'). The dnsmasq template, inventory and Cobbler
+    are then each updated once.
 
     Raises:
         UserException: - No IPMI or PXE client networks defined within
@@ -90,78 +189,48 @@ def inv_set_ipmi_pxe_ip(config_path):
     cfg = Config(config_path)
     inv = Inventory(cfg_file=config_path)
 
-    ipmiNetwork = None
-    pxeNetwork = None
-    nodes_list = []
-
     # All nodes should be powered off before starting
     set_power_clients('off', config_path, wait=POWER_WAIT)
 
-    # Create IPManager object for IPMI and/or PXE networks
-    start_offset = gen.get_dhcp_pool_start()
-    for index, netw_type in enumerate(cfg.yield_depl_netw_client_type()):
-        ip = cfg.get_depl_netw_client_cont_ip(index)
-        netmask = cfg.get_depl_netw_client_netmask(index)
-        if netw_type == 'ipmi':
-            ipmiNetwork = IPManager(IPNetwork(ip + '/' + netmask), start_offset)
-        elif netw_type == 'pxe':
-            pxeNetwork = IPManager(IPNetwork(ip + '/' + netmask), start_offset)
-
-    # If only one network is defined use the same IPManager for both
-    if ipmiNetwork is None and pxeNetwork is not None:
-        ipmiNetwork = pxeNetwork
-    elif ipmiNetwork is not None and pxeNetwork is None:
-        pxeNetwork = ipmiNetwork
-    elif ipmiNetwork is None and pxeNetwork is None:
-        raise UserException('No IPMI or PXE client network found')
+    plan, planners = plan_ipmi_pxe_ips(cfg, inv, _get_dnsmasq_leases())
 
-    # Modify IP addresses for each node
+    # IPMI reservations are written directly to the dnsmasq template
     dhcp_lease_time = cfg.get_globals_dhcp_lease_time()
-    for index, hostname in enumerate(inv.yield_nodes_hostname()):
-        # IPMI reservations are written directly to the dnsmasq template
-        ipmi_ipaddr = inv.get_nodes_ipmi_ipaddr(0, index)
-        ipmi_mac = inv.get_nodes_ipmi_mac(0, index)
-        ipmi_new_ipaddr = ipmiNetwork.get_next_ip()
-        util.remove_line(DNSMASQ_TEMPLATE, "^dhcp-host=" + ipmi_mac + ".*")
-        util.append_line(DNSMASQ_TEMPLATE, 'dhcp-host=%s,%s-bmc,%s,%s\n' %
-                         (ipmi_mac, hostname, ipmi_new_ipaddr,
-                          dhcp_lease_time))
-        _adjust_dhcp_pool(ipmiNetwork.network,
-                          ipmiNetwork.get_next_ip(reserve=False),
-                          dhcp_lease_time)
-
-        # PXE reservations are handled by Cobbler
-        pxe_ipaddr = inv.get_nodes_pxe_ipaddr(0, index)
-        pxe_mac = inv.get_nodes_pxe_mac(0, index)
-        pxe_new_ipaddr = pxeNetwork.get_next_ip()
-        log.info('Modifying Inventory PXE IP - Node: %s MAC: %s '
-                 'Original IP: %s New IP: %s' %
-                 (hostname, pxe_mac, pxe_ipaddr, pxe_new_ipaddr))
-        inv.set_nodes_pxe_ipaddr(0, index, pxe_new_ipaddr)
-        _adjust_dhcp_pool(pxeNetwork.network,
-                          pxeNetwork.get_next_ip(reserve=False),
-                          dhcp_lease_time)
-
-        # Run Cobbler sync to process DNSMASQ template
-        cobbler_server = xmlrpc.client.Server("http://127.0.0.1/cobbler_api")
-        token = cobbler_server.login(COBBLER_USER, COBBLER_PASS)
-        cobbler_server.sync(token)
-        log.debug("Running Cobbler sync")
-
-        # Save info to verify connection come back up
-        ipmi_userid = inv.get_nodes_ipmi_userid(index)
-        ipmi_password = inv.get_nodes_ipmi_password(index)
-        bmc_type = inv.get_nodes_bmc_type(index)
+    _write_dnsmasq_template(plan, planners, dhcp_lease_time)
+
+    # PXE reservations are handled by Cobbler
+    pxe_ipaddrs = {}
+    for entry in plan:
+        if entry.net_type == 'pxe':
+            log.info('Modifying Inventory PXE IP - Node: %s MAC: %s '
+                     'Original IP: %s New IP: %s' %
+                     (entry.hostname, entry.mac, entry.prev_ipaddr,
+                      entry.ipaddr))
+            pxe_ipaddrs[entry.index] = entry.ipaddr
+    inv.set_nodes_pxe_ipaddrs(0, pxe_ipaddrs)
+
+    # Run Cobbler sync to process DNSMASQ template
+    cobbler_server = xmlrpc.client.Server("http://127.0.0.1/cobbler_api")
+    token = cobbler_server.login(COBBLER_USER, COBBLER_PASS)
+    cobbler_server.sync(token)
+    log.debug("Running Cobbler sync")
+
+    # Save info to verify connection come back up
+    nodes_list = []
+    for entry in plan:
         # No need to reset and check if the IP does not change
-        if ipmi_new_ipaddr != ipmi_ipaddr:
-            nodes_list.append({'hostname': hostname,
-                               'index': index,
-                               'ipmi_userid': ipmi_userid,
-                               'ipmi_password': ipmi_password,
-                               'ipmi_new_ipaddr': ipmi_new_ipaddr,
-                               'ipmi_ipaddr': ipmi_ipaddr,
-                               'ipmi_mac': ipmi_mac,
-                               'bmc_type': bmc_type})
+        if entry.net_type != 'ipmi' or entry.ipaddr == entry.prev_ipaddr:
+            continue
+        nodes_list.append({'hostname': entry.hostname,
+                           'index': entry.index,
+                           'ipmi_userid': inv.get_nodes_ipmi_userid(
+                               entry.index),
+                           'ipmi_password': inv.get_nodes_ipmi_password(
+                               entry.index),
+                           'ipmi_new_ipaddr': entry.ipaddr,
+                           'ipmi_ipaddr': entry.prev_ipaddr,
+                           'ipmi_mac': entry.mac,
+                           'bmc_type': inv.get_nodes_bmc_type(entry.index)})
 
     # Issue MC cold reset to force refresh of IPMI interfaces
     for node in nodes_list:
@@ -186,6 +255,7 @@ def inv_set_ipmi_pxe_ip(config_path):
         print(f'\rTimeout count down: {int(end_time - time())}    ', end='')
         sys.stdout.flush()
         success_list = []
+        ipmi_ipaddrs = {}
         sleep(2)
         for list_index, node in enumerate(nodes_list):
             hostname = node['hostname']
@@ -210,13 +280,16 @@ def inv_set_ipmi_pxe_ip(config_path):
                 log.info(f'Modifying Inventory IPMI IP - Node: {hostname} MAC: '
                          f'{ipmi_mac} Original IP: {ipmi_ipaddr} New IP: '
                          f'{ipmi_new_ipaddr}')
-                inv.set_nodes_ipmi_ipaddr(0, index, ipmi_new_ipaddr)
+                ipmi_ipaddrs[index] = ipmi_new_ipaddr
                 success_list.append(list_index)
             else:
                 log.debug(f'BMC connection failed - Node: {hostname} '
                           f'IP: {ipmi_ipaddr}')
                 continue
 
+        if ipmi_ipaddrs:
+            inv.set_nodes_ipmi_ipaddrs(0, ipmi_ipaddrs)
+
         # Remove nodes that connected successfully
         for remove_index in sorted(success_list, reverse=True):
             del nodes_list[remove_index]
@@ -224,21 +297,19 @@ def inv_set_ipmi_pxe_ip(config_path):
     for node in nodes_list:
         log.error('Unable to connect to BMC at new IPMI IP address- Node: %s '
                   'MAC: %s Original IP: %s New IP: %s' %
-                  (hostname, ipmi_mac, ipmi_ipaddr, ipmi_new_ipaddr))
+                  (node['hostname'], node['ipmi_mac'], node['ipmi_ipaddr'],
+                   node['ipmi_new_ipaddr']))
     if len(nodes_list) > 0:
         raise UserException('%d BMC(s) not responding after IP modification' %
                             len(nodes_list))
 
 
-def _adjust_dhcp_pool(network, dhcp_pool_start, dhcp_lease_time):
+def _get_dhcp_range(planner, dhcp_lease_time):
     dhcp_range = 'dhcp-range=%s,%s,%s  # %s'
-    new_entry = dhcp_range % (dhcp_pool_start,
-                              str(network.network + network.size - 1),
-                              str(dhcp_lease_time),
-                              str(network.cidr))
-
-    entry = "^dhcp-range=.* # " + str(network.cidr)
-    util.replace_regex(DNSMASQ_TEMPLATE, entry, new_entry)
+    return dhcp_range % (planner.get_next_ip(),
+                         int_to_ip(planner.broadcast),
+                         str(dhcp_lease_time),
+                         planner.cidr)
 
 
 if __name__ == '__main__':
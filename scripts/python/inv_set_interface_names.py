@@ -17,6 +17,8 @@
 
 import sys
 
+import lib.logger as logger
+from lib.fact_cache import FactCache
 from lib.inventory import Inventory
 
 
@@ -31,6 +33,43 @@ def inv_set_interface_name(set_mac, set_name, config_path=None):
     inv.set_interface_name(set_mac, set_name)
 
 
+def inv_set_interface_names_from_facts(config_path=None):
+    """Set physical interface names with 'rename=false' using the
+    device names found in the Ansible fact cache
+
+    Args:
+        config_path (str, optional): Config file path
+
+    Returns:
+        list: Hostnames with interfaces to set but no cached facts
+    """
+    log = logger.getlogger()
+    fact_cache = FactCache()
+    inv = Inventory(config_path)
+    missing = []
+
+    for index, hostname in enumerate(inv.yield_nodes_hostname()):
+        node = inv.get_node_dict(index)
+        set_macs = [mac for if_type in ('pxe', 'data')
+                    for mac, rename in zip(node[if_type]['macs'],
+                                           node[if_type]['rename'])
+                    if mac is not None and not rename]
+        if not set_macs:
+            continue
+        mac_to_device = fact_cache.get_mac_to_device(hostname)
+        if not mac_to_device:
+            missing.append(hostname)
+            continue
+        for mac in set_macs:
+            if mac.lower() not in mac_to_device:
+                log.warning(f"Interface MAC '{mac}' not found in "
+                            f"'{hostname}' facts")
+                continue
+            inv.set_interface_name(mac, mac_to_device[mac.lower()])
+
+    return missing
+
+
 if __name__ == '__main__':
     """
     Arg1: Interface MAC address
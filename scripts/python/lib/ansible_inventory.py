@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""Native Ansible inventory parser"""
+
+# Copyright 2019 IBM Corp.
+#
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import ast
+import copy
+import os
+import re
+import shlex
+import yaml
+
+from lib.exception import UserException
+
+PATTERN_SECTION = re.compile(r'^\[([^\]:]+)(?::(\w+))?\]\s*$')
+PATTERN_RANGE = re.compile(r'^(.*)\[([0-9]+):([0-9]+)\](.*)$')
+PATTERN_HOST_PORT = re.compile(r'^(.+?)(?::([0-9]+))?$')
+
+# Parsed inventories keyed by path, invalidated on mtime or size change
+_CACHE = {}
+
+
+class AnsibleInventory(object):
+    """Ansible inventory parsed without invoking Ansible
+
+    Supports the INI and YAML formats used for the 'software_hosts'
+    file, including groups, ':children' and ':vars' sections. Variable
+    precedence follows Ansible: 'all' vars, then group vars ordered by
+    group depth and name, then host vars.
+
+    Args:
+        path (str): Path to inventory file
+    """
+
+    def __init__(self, path):
+        self.path = path
+        # group name -> {'hosts': [...], 'children': [...], 'vars': {...}}
+        self.groups = {}
+        # host name -> host vars defined on the host itself
+        self.hosts = {}
+        self._hostvars = None
+
+        with open(path) as inventory_file:
+            content = inventory_file.read()
+
+        data = self._load_yaml(content)
+        if data is not None:
+            self._parse_yaml(data)
+        else:
+            self._parse_ini(content)
+        self._add_implicit_groups()
+
+    def _group(self, name):
+        if name not in self.groups:
+            self.groups[name] = {'hosts': [], 'children': [], 'vars': {}}
+        return self.groups[name]
+
+    def _add_host(self, group, host, host_vars=None):
+        if host not in self.hosts:
+            self.hosts[host] = {}
+        if host_vars:
+            self.hosts[host].update(host_vars)
+        if host not in self._group(group)['hosts']:
+            self._group(group)['hosts'].append(host)
+
+    @staticmethod
+    def _load_yaml(content):
+        """Return YAML data if content is a YAML format inventory"""
+        try:
+            data = yaml.safe_load(content)
+        except yaml.YAMLError:
+            return None
+        if (not isinstance(data, dict) or
+                not all(isinstance(value, dict) or value is None
+                        for value in data.values())):
+            return None
+        return data
+
+    def _parse_yaml(self, data, parent=None):
+        for group, group_data in data.items():
+            self._group(group)
+            if parent is not None:
+                self._add_child(parent, group)
+            if group_data is None:
+                continue
+            for host, host_vars in (group_data.get('hosts') or {}).items():
+                for _host in _expand_hostname_range(host):
+                    self._add_host(group, _host, host_vars)
+            self.groups[group]['vars'].update(group_data.get('vars') or {})
+            self._parse_yaml(group_data.get('children') or {}, group)
+
+    def _parse_ini(self, content):
+        group = 'ungrouped'
+        section = 'hosts'
+        for lineno, line in enumerate(content.splitlines(), 1):
+            line = line.strip()
+            if not line or line[0] in '#;':
+                continue
+            match = PATTERN_SECTION.match(line)
+            if match:
+                group = match.group(1)
+                section = match.group(2) or 'hosts'
+                if section not in ('hosts', 'vars', 'children'):
+                    raise UserException(
+                        "Invalid section '{}' in inventory '{}' line {}"
+                        .format(line, self.path, lineno))
+                self._group(group)
+                continue
+            elif line.startswith('['):
+                raise UserException("Invalid section entry '{}' in inventory "
+                                    "'{}' line {}".format(line, self.path,
+                                                          lineno))
+            elif section == 'vars':
+                # Ansible keeps ':vars' section values as strings
+                key, value = self._parse_var(line, lineno, literal=False)
+                self._group(group)['vars'][key] = value
+                continue
+            try:
+                tokens = shlex.split(line, comments=True)
+            except ValueError as exc:
+                raise UserException("Error parsing inventory '{}' line {}: {}"
+                                    .format(self.path, lineno, exc))
+            if not tokens:
+                continue
+            if section == 'hosts':
+                host, host_vars = self._parse_host_line(tokens, lineno)
+                for _host in _expand_hostname_range(host):
+                    self._add_host(group, _host, host_vars)
+            else:
+                self._add_child(group, tokens[0])
+
+    def _parse_host_line(self, tokens, lineno):
+        host, port = PATTERN_HOST_PORT.match(tokens[0]).groups()
+        host_vars = {}
+        if port is not None:
+            host_vars['ansible_port'] = int(port)
+        for token in tokens[1:]:
+            key, value = self._parse_var(token, lineno)
+            host_vars[key] = value
+        return host, host_vars
+
+    def _parse_var(self, definition, lineno, literal=True):
+        if '=' not in definition:
+            raise UserException("Expected key=value in inventory '{}' line {}"
+                                ", got: {}".format(self.path, lineno,
+                                                   definition))
+        key, value = definition.split('=', 1)
+        value = value.strip()
+        if literal:
+            value = _parse_value(value)
+        return key.strip(), value
+
+    def _add_child(self, parent, child):
+        self._group(child)
+        if child not in self._group(parent)['children']:
+            self._group(parent)['children'].append(child)
+
+    def _add_implicit_groups(self):
+        all_group = self._group('all')
+        ungrouped = self._group('ungrouped')
+        for host in all_group['hosts']:
+            if host not in ungrouped['hosts']:
+                ungrouped['hosts'].append(host)
+        all_group['hosts'] = []
+        children = set()
+        for group in self.groups.values():
+            children.update(group['children'])
+        for group in self.groups:
+            if group != 'all' and group not in children:
+                self._add_child('all', group)
+        grouped = set()
+        for name, group in self.groups.items():
+            if name not in ('all', 'ungrouped'):
+                grouped.update(group['hosts'])
+        ungrouped['hosts'] = [host for host in ungrouped['hosts']
+                              if host not in grouped]
+
+    def _group_depths(self, name='all', depth=0, depths=None):
+        if depths is None:
+            depths = {}
+        if depths.get(name, -1) >= depth:
+            return depths
+        depths[name] = depth
+        for child in self.groups[name]['children']:
+            self._group_depths(child, depth + 1, depths)
+        return depths
+
+    def get_hosts(self, group='all'):
+        """Get hosts belonging to a group, including its children
+
+        Args:
+            group (str, optional): Group name (defaults to 'all')
+
+        Returns:
+            list: Host names in inventory order. An unknown group
+                  returns an empty list (like 'ansible --list-hosts').
+        """
+        hosts = []
+        seen = set()
+        stack = [group]
+        visited = set()
+        while stack:
+            name = stack.pop(0)
+            if name not in self.groups or name in visited:
+                continue
+            visited.add(name)
+            for host in self.groups[name]['hosts']:
+                if host not in seen:
+                    seen.add(host)
+                    hosts.append(host)
+            stack.extend(self.groups[name]['children'])
+        if group == 'all':
+            hosts += [host for host in self.hosts if host not in seen]
+        return hosts
+
+    def get_groups(self, host):
+        """Get all groups a host belongs to, directly or through children
+
+        Args:
+            host (str): Host name
+
+        Returns:
+            list: Sorted group names (includes 'all')
+        """
+        return sorted(group for group in self.groups
+                      if host in self.get_hosts(group))
+
+    def get_hostvars(self):
+        """Get the combined variables for every host
+
+        Returns:
+            dict: Same shape as 'ansible-inventory --list' '_meta.hostvars'
+        """
+        if self._hostvars is None:
+            depths = self._group_depths()
+            members = {group: set(self.get_hosts(group))
+                       for group in self.groups}
+            ordered = sorted(self.groups,
+                             key=lambda group: (depths.get(group, 0), group))
+            hostvars = {}
+            for host in self.get_hosts():
+                host_vars = {}
+                for group in ordered:
+                    if host in members[group]:
+                        host_vars.update(self.groups[group]['vars'])
+                host_vars.update(self.hosts[host])
+                hostvars[host] = host_vars
+            self._hostvars = hostvars
+        return copy.deepcopy(self._hostvars)
+
+
+def _parse_value(value):
+    """Interpret an INI host line value as a Python literal, falling back
+    to str
+    """
+    try:
+        return ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return value
+
+
+def _expand_hostname_range(host):
+    """Expand a numeric 'host[01:10]' pattern into a list of hosts"""
+    match = PATTERN_RANGE.match(host)
+    if not match:
+        return [host]
+    head, start, end, tail = match.groups()
+    width = len(start) if start.startswith('0') else 0
+    return ['{}{}{}'.format(head, str(index).zfill(width), tail)
+            for index in range(int(start), int(end) + 1)]
+
+
+def load_inventory(path):
+    """Load an Ansible inventory file, reusing the last parse if the
+    file is unchanged
+
+    Args:
+        path (str): Path to inventory file
+
+    Returns:
+        AnsibleInventory: Parsed inventory
+
+    Raises:
+        UserException: If the file is missing or cannot be parsed
+    """
+    try:
+        stat = os.stat(path)
+    except OSError as exc:
+        raise UserException("Unable to read inventory '{}': {}"
+                            .format(path, exc))
+    key = os.path.realpath(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    cached = _CACHE.get(key)
+    if cached is None or cached[0] != signature:
+        cached = (signature, AnsibleInventory(path))
+        _CACHE[key] = cached
+    return cached[1]
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""Single-run Ansible execution of software install procedures"""
+
+# Copyright 2019 IBM Corp.
+#
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import sys
+import yaml
+
+import lib.logger as logger
+import lib.trace as trace
+from lib.fact_cache import FactCache
+from lib.utilities import sub_proc_exec, sub_proc_display, get_selection, \
+    heading1, bold, ansible_pprint
+
+# Settings applied to every compiled procedure run. ControlPersist keeps
+# client SSH connections open across plays and gates and pipelining
+# avoids the per-task temp file round trip.
+ANSIBLE_ENV_DEFAULTS = {
+    'ANSIBLE_SSH_ARGS': '-C -o ControlMaster=auto -o ControlPersist=30m',
+    'ANSIBLE_PIPELINING': 'True',
+}
+
+
+def get_ansible_env(env=None):
+    """Get the process environment for a compiled procedure run. The
+    shared POWER-Up fact cache is configured in playbooks/ansible.cfg.
+
+    Args:
+        env (dict, optional): Module specific environment variables,
+                              these take precedence over the defaults
+
+    Returns:
+        dict: Environment for ansible-playbook
+    """
+    _env = dict(os.environ)
+    _env.update(ANSIBLE_ENV_DEFAULTS)
+    if env is not None:
+        _env.update(env)
+    return _env
+
+
+class InstallProcedure(object):
+    """Install procedure compiled into one playbook of tagged plays
+
+    Each entry of an '*_install_procedure.yml' file becomes one play
+    tagged 'step_<n>'. The last task of every play records the tag in
+    a state file so a failed or interrupted run can be resumed from the
+    first incomplete step.
+
+    Gates are Python callbacks keyed by step description. A gate runs
+    before its step and splits the playbook into separately executed
+    segments. A gate returning False stops the procedure before its
+    step (e.g. manual reboots are required).
+
+    Args:
+        procedure_file (str): Path to install procedure yaml file
+        tasks_dir (str): Directory containing the task files
+        playbook_path (str): Path of the generated playbook
+        state_file (str): Path of the completed steps state file
+        eng_mode (bool, optional): Include 'engr_mode' steps
+    """
+
+    def __init__(self, procedure_file, tasks_dir, playbook_path, state_file,
+                 eng_mode=False):
+        self.log = logger.getlogger()
+        self.tasks_dir = tasks_dir
+        self.playbook_path = playbook_path
+        self.state_file = state_file
+        self.steps = []
+
+        with open(procedure_file) as f:
+            procedure = yaml.safe_load(f)
+
+        for index, step in enumerate(procedure):
+            if 'engr_mode' in step['tasks'] and not eng_mode:
+                continue
+            step = dict(step)
+            step['tag'] = 'step_{:02}'.format(index)
+            self.steps.append(step)
+
+    def _get_play(self, step):
+        hosts = 'all'
+        if 'hosts' in step:
+            hosts = f"{step['hosts']}:localhost"
+        play = {
+            'name': step['description'],
+            'hosts': hosts,
+            'gather_facts': False,
+            'any_errors_fatal': True,
+            'tags': [step['tag']],
+            'tasks': [
+                {'import_tasks': os.path.join(self.tasks_dir,
+                                              step['tasks'])},
+                {'meta': 'flush_handlers'},
+                {'name': 'Record install step completion',
+                 'lineinfile': {'path': self.state_file,
+                                'line': step['tag'],
+                                'create': True},
+                 'delegate_to': 'localhost',
+                 'run_once': True,
+                 'become': False}]}
+        reboot_handler = os.path.join(self.tasks_dir, 'reboot.yml')
+        if os.path.isfile(reboot_handler):
+            play['handlers'] = [{'import_tasks': reboot_handler}]
+        return play
+
+    def compile(self):
+        """Write the generated playbook
+
+        Returns:
+            str: Path to generated playbook
+        """
+        playbook = [{'name': 'Gather localhost facts',
+                     'hosts': 'localhost',
+                     'gather_facts': True,
+                     'gather_timeout': 10,
+                     'tags': ['always'],
+                     'tasks': []}]
+        for step in self.steps:
+            playbook.append(self._get_play(step))
+        with open(self.playbook_path, 'w') as f:
+            f.write('---\n# Generated by POWER-Up - do not edit\n')
+            yaml.safe_dump(playbook, f, default_flow_style=False,
+                           sort_keys=False)
+        self.log.debug(f"Compiled install procedure '{self.playbook_path}' "
+                       f"({len(self.steps)} steps)")
+        return self.playbook_path
+
+    def get_completed(self):
+        """Get tags of completed steps
+
+        Returns:
+            set: Completed step tags
+        """
+        if not os.path.isfile(self.state_file):
+            return set()
+        with open(self.state_file) as f:
+            return set(line.strip() for line in f if line.strip())
+
+    def set_completed(self, step):
+        """Mark a step completed without running it"""
+        with open(self.state_file, 'a') as f:
+            f.write(step['tag'] + '\n')
+
+    def reset(self):
+        """Forget completed steps so the next run starts from the top"""
+        if os.path.isfile(self.state_file):
+            os.remove(self.state_file)
+
+    def get_segments(self, gates=None):
+        """Split steps into segments which start at gated steps
+
+        Args:
+            gates (dict, optional): Gate callbacks keyed by description
+
+        Returns:
+            list: List of step lists
+        """
+        gates = gates or {}
+        segments = [[]]
+        for step in self.steps:
+            if step['description'] in gates and segments[-1]:
+                segments.append([])
+            segments[-1].append(step)
+        return [segment for segment in segments if segment]
+
+    def uses_become(self):
+        """Check if any step task file requests privilege escalation"""
+        for step in self.steps:
+            with open(os.path.join(self.tasks_dir, step['tasks'])) as f:
+                if 'become:' in f.read():
+                    return True
+        return False
+
+    def requires_reboot(self, steps):
+        """Check if any of the steps may reboot clients"""
+        for step in steps:
+            with open(os.path.join(self.tasks_dir, step['tasks'])) as f:
+                if 'notify: Reboot' in f.read():
+                    return True
+        return False
+
+    def check_reboots(self, ansible_inventory, resume_cmd):
+        """Gate stopping the procedure until all clients are rebooted
+
+        Clients with 'pup_reboot=False' are not rebooted automatically.
+        Cached facts are cleared so the resumed run gathers them again.
+
+        Args:
+            ansible_inventory (str): Path to software inventory file
+            resume_cmd (str): Command resuming the installation
+
+        Returns:
+            bool: True if no manual reboots are required
+        """
+        from software_hosts import get_host_list_no_reboot
+        no_reboot_hosts = get_host_list_no_reboot(ansible_inventory)
+        if not no_reboot_hosts:
+            return True
+        FactCache().clear()
+        print(bold("\nInstallation cannot complete until all "
+                   "clients have been rebooted."))
+        print(bold("\nThe following client nodes have not been "
+                   "automatically rebooted: "))
+        for host in no_reboot_hosts:
+            print(f"    {host}")
+        print(bold(f"\nPlease manually reboot these hosts and then "
+                   f"re-run '{resume_cmd}' to resume the installation"))
+        return False
+
+    def run(self, base_cmd, gates=None, env=None, display=False,
+            before_run=None, non_int=False):
+        """Run the procedure with one ansible-playbook process per segment
+
+        Args:
+            base_cmd (str): ansible-playbook command (inventory, extra
+                            vars, become options) without a playbook
+            gates (dict, optional): Gate callbacks keyed by description
+            env (dict, optional): Process environment
+            display (bool, optional): Stream Ansible output to the screen
+            before_run (callable, optional): Called before each
+                                             ansible-playbook process
+                                             (e.g. to unlock the vault)
+            non_int (bool, optional): Resume without prompting
+
+        Returns:
+            bool: True if all steps completed
+        """
+        gates = gates or {}
+        self.compile()
+        completed = self.get_completed()
+        if completed:
+            pending = [step for step in self.steps
+                       if step['tag'] not in completed]
+            if not pending:
+                self.reset()
+                completed = set()
+            else:
+                print(bold('\nA previous install run did not complete. '
+                           'Next step: ' + pending[0]['description']))
+                if not non_int:
+                    choice, item = get_selection(['Resume', 'Restart'])
+                    if choice == "2":
+                        self.reset()
+                        completed = set()
+
+        for segment in self.get_segments(gates):
+            pending = [step for step in segment
+                       if step['tag'] not in completed]
+            if not pending:
+                continue
+            gate = gates.get(segment[0]['description'])
+            if gate is not None and pending[0] is segment[0]:
+                if gate() is False:
+                    return False
+            if not self._run_segment(segment, base_cmd, env, display,
+                                     before_run):
+                return False
+            completed = self.get_completed()
+
+        self.reset()
+        return True
+
+    def _run_segment(self, segment, base_cmd, env, display, before_run):
+        log = self.log
+        while True:
+            completed = self.get_completed()
+            pending = [step for step in segment
+                       if step['tag'] not in completed]
+            if not pending:
+                return True
+            for step in pending:
+                heading1(f"Client Node Action: {step['description']}")
+            reboot = self.requires_reboot(pending)
+            if reboot:
+                print(bold('\nThis step requires changed systems to reboot! '
+                           '(16 minute timeout)'))
+            tags = ','.join(step['tag'] for step in pending)
+            cmd = f'{base_cmd} {self.playbook_path} --tags "{tags}"'
+            if before_run is not None:
+                before_run()
+            log.info(f"Running Ansible install procedure steps '{tags}' ...")
+            with trace.span(trace.ANSIBLE, os.path.basename(self.playbook_path),
+                            tags=tags) as span:
+                if display:
+                    rc = sub_proc_display(cmd, shell=True, env=env)
+                    resp = ''
+                    err = ''
+                else:
+                    resp, err, rc = sub_proc_exec(cmd, shell=True, env=env)
+                span.set(rc=rc)
+            log.debug(f"cmd: {cmd}\nresp: {resp}\nerr: {err}\nrc: {rc}")
+            print("")  # line break
+            if reboot:
+                # Rebooted clients may have new kernel and device facts
+                FactCache().clear()
+
+            if rc == 0:
+                log.info("Ansible tasks ran successfully")
+                for step in pending:
+                    if step['tag'] not in self.get_completed():
+                        self.set_completed(step)
+                return True
+            if '.vault was not found' in err:
+                log.warning("Vault file missing, retrying...")
+                continue
+
+            failed = [step for step in pending
+                      if step['tag'] not in self.get_completed()][0]
+            log.warning(f"Ansible tasks failed in step "
+                        f"'{failed['description']}'!")
+            if resp != '':
+                print(f"stdout:\n{ansible_pprint(resp)}\n")
+            if err != '':
+                print(f"stderr:\n{err}\n")
+            choice, item = get_selection(['Retry', 'Continue', 'Exit'])
+            if choice == "2":
+                self.set_completed(failed)
+            elif choice == "3":
+                log.debug('User chooses to exit.')
+                sys.exit('Exiting')
@@ -85,6 +85,13 @@ def get_args(parser_args=False):
         help='Add log to stdout/stderr\nChoices: {}\nDefault: {}'.format(
             ','.join(LOG_LEVEL_CHOICES), LOG_LEVEL_PRINT[0]))
 
+    common_parser.add_argument(
+        '--trace',
+        action='store_true',
+        help='Time deploy phases, BMC, switch, subprocess and Ansible\n'
+             'operations. Writes a JSON lines trace to the logs\n'
+             'directory and prints a summary.')
+
     common_parser.add_argument(
         '--extra-vars',
         nargs=1,
@@ -460,6 +467,13 @@ def get_args(parser_args=False):
         action='store_true',
         help='Use public access, default is to use --prep to install private repos')
 
+    parser_software.add_argument(
+        '--single-run',
+        default=False,
+        action='store_true',
+        help='Run the install procedure as one compiled Ansible playbook.\n'
+             'A failed or interrupted install can be resumed.')
+
     parser_software.add_argument(
         '--run_ansible_task',
         default=None,
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""Find unused IPv4 addresses by ARP probing many candidates at once"""
+
+# Copyright 2019 IBM Corp.
+#
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import itertools
+import select
+import socket
+import struct
+import time
+
+import lib.logger as logger
+from lib.utilities import netns_socket
+
+ETH_P_ARP = 0x0806
+ARP_REQUEST = 1
+ARP_REPLY = 2
+BROADCAST_MAC = b'\xff' * 6
+# Ethernet header, then ARP for Ethernet/IPv4
+ARP_FRAME = struct.Struct('!6s6sH HHBBH 6s4s6s4s')
+# Addresses probed together and seconds to wait for their replies
+ARP_WINDOW = 64
+ARP_TIMEOUT = 0.5
+# Additional requests sent to addresses which did not answer
+ARP_RETRIES = 1
+
+
+def make_arp_request(src_mac, addr, src_addr='0.0.0.0'):
+    """Build a broadcast ARP request frame. The default unspecified sender
+    address makes it an RFC 5227 probe, which needs no address on the
+    sending interface.
+
+    Args:
+        src_mac (bytes): Sender MAC address
+        addr (str): Target IPv4 address
+        src_addr (str, optional): Sender IPv4 address
+
+    Returns:
+        bytes: Ethernet frame
+    """
+    return ARP_FRAME.pack(BROADCAST_MAC, src_mac, ETH_P_ARP,
+                          1, 0x0800, 6, 4, ARP_REQUEST,
+                          src_mac, socket.inet_aton(src_addr),
+                          b'\x00' * 6, socket.inet_aton(addr))
+
+
+def parse_arp_frame(frame):
+    """Parse an Ethernet ARP frame
+
+    Returns:
+        tuple: operation (int), sender MAC (bytes), sender address (str),
+               target address (str), or None if the frame is not IPv4 ARP
+    """
+    if len(frame) < ARP_FRAME.size:
+        return None
+    (_, _, ethertype, _, ptype, hlen, plen, op, sha, spa, _,
+     tpa) = ARP_FRAME.unpack_from(frame)
+    if ethertype != ETH_P_ARP or ptype != 0x0800 or (hlen, plen) != (6, 4):
+        return None
+    return op, sha, socket.inet_ntoa(spa), socket.inet_ntoa(tpa)
+
+
+class ArpProbe(object):
+    """Probe for addresses in use on the link of an interface from one raw
+    socket. Requires root (CAP_NET_RAW).
+
+    Args:
+        ifc (str): Interface name
+        timeout (float, optional): Seconds to wait for the replies to each
+                                   round of requests
+        retries (int, optional): Additional rounds of requests for
+                                 addresses which did not answer
+        netns (str, optional): Network namespace of the interface
+    """
+
+    def __init__(self, ifc, timeout=ARP_TIMEOUT, retries=ARP_RETRIES,
+                 netns=None):
+        self.log = logger.getlogger()
+        self.ifc = ifc
+        self.timeout = timeout
+        self.retries = retries
+        self.sock = netns_socket(socket.AF_PACKET, socket.SOCK_RAW,
+                                 socket.htons(ETH_P_ARP), netns)
+        try:
+            self.sock.bind((ifc, ETH_P_ARP))
+        except OSError:
+            self.sock.close()
+            raise
+        self.sock.setblocking(False)
+        self.mac = self.sock.getsockname()[4]
+
+    def close(self):
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def probe(self, addrs):
+        """Find which addresses answer ARP requests
+
+        Args:
+            addrs (iter of str): IPv4 addresses
+
+        Returns:
+            set of str: Addresses in use
+        """
+        pending = set(addrs)
+        used = set()
+        for _ in range(self.retries + 1):
+            if not pending:
+                break
+            self._drain()
+            for addr in sorted(pending):
+                self.sock.send(make_arp_request(self.mac, addr))
+            deadline = time.time() + self.timeout
+            while pending:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                if not select.select([self.sock], [], [], remaining)[0]:
+                    break
+                self._receive(pending, used)
+        self.log.debug(f'ARP probe on {self.ifc}: {len(used)} in use')
+        return used
+
+    def find_unused(self, candidates, window=ARP_WINDOW):
+        """Find the first candidate address which does not answer ARP.
+        Candidates are probed a window at a time.
+
+        Args:
+            candidates (iter of str): IPv4 addresses in order of preference
+            window (int, optional): Addresses probed together
+
+        Returns:
+            str: Unused address or None if all candidates are in use
+        """
+        candidates = iter(candidates)
+        while True:
+            batch = list(itertools.islice(candidates, window))
+            if not batch:
+                return None
+            used = self.probe(batch)
+            for addr in batch:
+                if addr not in used:
+                    return addr
+
+    def _drain(self):
+        """Discard frames received before the current requests"""
+        while select.select([self.sock], [], [], 0)[0]:
+            self.sock.recv(65535)
+
+    def _receive(self, pending, used):
+        while True:
+            try:
+                frame = self.sock.recv(65535)
+            except BlockingIOError:
+                return
+            arp = parse_arp_frame(frame)
+            if arp is None:
+                continue
+            op, sha, spa, tpa = arp
+            if sha == self.mac:
+                continue
+            # Any frame claiming a candidate address marks it in use, as
+            # does an RFC 5227 probe (sender address 0.0.0.0) from another
+            # host configuring that same address.
+            if spa in pending:
+                addr = spa
+            elif op == ARP_REQUEST and spa == '0.0.0.0' and tpa in pending:
+                addr = tpa
+            else:
+                continue
+            pending.discard(addr)
+            used.add(addr)
+
+
+def find_unused_addr(ifc, candidates, window=ARP_WINDOW, timeout=ARP_TIMEOUT,
+                     retries=ARP_RETRIES, netns=None):
+    """Find the first candidate address not in use on the link of ifc
+
+    Args:
+        ifc (str): Interface name
+        candidates (iter of str): IPv4 addresses in order of preference
+        window (int, optional): Addresses probed together
+        timeout (float, optional): Seconds to wait for each round of replies
+        retries (int, optional): Additional requests to silent addresses
+        netns (str, optional): Network namespace of the interface
+
+    Returns:
+        str: Unused address or None if all candidates are in use
+    """
+    with ArpProbe(ifc, timeout, retries, netns) as probe:
+        return probe.find_unused(candidates, window)
@@ -17,11 +17,16 @@
 
 import argparse
 import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError, as_completed
 import requests.exceptions
 
 import lib.logger as logger
 import lib.open_bmc as open_bmc
 import lib.ipmi as ipmi
+import lib.trace as trace
+
+# Upper bound on concurrent requests of 'call_all'
+MAX_WORKERS = 32
 
 
 class Bmc(object):
@@ -34,6 +39,7 @@ class Bmc(object):
         bmc_type (str): Indicates the type of BMC ('ipmi' or 'openbmc')
     """
 
+    @trace.traced(trace.BMC, name='login', host_attr='host')
     def __init__(self, host, user, pw, bmc_type='ipmi', timeout=10):
         self.log = logger.getlogger()
         self.host = host
@@ -53,6 +59,8 @@ class Bmc(object):
                 self.connected = True
         else:
             self.log.error(f'Unsupported BMC type: {bmc_type}')
+        if not self.connected:
+            trace.count('bmc.login_failures')
 
     def is_connected(self):
         return self.connected
@@ -60,73 +68,70 @@ class Bmc(object):
     def get_host(self):
         return self.host
 
+    @trace.traced(trace.BMC, host_attr='host')
     def get_system_sn_pn(self, timeout=5):
         if self.bmc_type == 'openbmc':
             return open_bmc.get_system_sn_pn(self.host, self.bmc)
         if self.bmc_type == 'ipmi':
-            return ipmi.get_system_sn_pn(self.host, self.user, self.pw)
+            return ipmi.get_system_sn_pn(self.host, self.bmc, timeout)
 
-    def get_system_info(self, timeout=5):
-        if self.bmc_type == 'openbmc':
-            return open_bmc.get_system_info(self.host, self.bmc)
-        if self.bmc_type == 'ipmi':
-            return ipmi.get_system_info(self.host, self.user, self.pw)
+    @trace.traced(trace.BMC, host_attr='host')
+    def get_snapshot(self, timeout=10):
+        """Get the power, boot, inventory and firmware state with one
+        concurrent request per object subtree. Only OpenBMC supports
+        snapshots.
 
-    def get_system_inventory_in_background(self):
+        Returns:
+            open_bmc.BmcSnapshot: BMC state or None
+        """
         if self.bmc_type == 'openbmc':
-            self.error('Not implemented')
-            return
-            # return open_bmc.get_system_info(self.host, self.bmc)
-        if self.bmc_type == 'ipmi':
-            return ipmi.get_system_inventory_in_background(self.host,
-                                                           self.user, self.pw)
-
-    def extract_system_info(self, inventory):
-        if self.bmc_type == 'openbmc':
-            self.error('Not implemented')
-            return
-            # return open_bmc.extract_system_info(inventory)
-        if self.bmc_type == 'ipmi':
-            return ipmi.extract_system_info(inventory)
+            return open_bmc.get_snapshot(self.host, self.bmc, timeout)
+        self.log.debug(f'State snapshots are not supported for '
+                       f'{self.bmc_type} BMCs')
 
-    def extract_system_sn_pn(self, inventory):
+    @trace.traced(trace.BMC, host_attr='host')
+    def get_system_info(self, timeout=5):
         if self.bmc_type == 'openbmc':
-            self.error('Not implemented')
-            return
-            # return open_bmc.extract_system_info(inventory)
+            return open_bmc.get_system_info(self.host, self.bmc)
         if self.bmc_type == 'ipmi':
-            return ipmi.extract_system_sn_pn(inventory)
+            return ipmi.get_system_info(self.host, self.bmc)
 
+    @trace.traced(trace.BMC, host_attr='host')
     def logout(self):
         if self.bmc_type == 'openbmc':
             return open_bmc.logout(self.host, self.user, self.pw, self.bmc)
         elif self.bmc_type == 'ipmi':
             return ipmi.logout(self.host, self.user, self.pw, self.bmc)
 
+    @trace.traced(trace.BMC, host_attr='host')
     def chassis_power(self, op, timeout=10):
         if self.bmc_type == 'openbmc':
             return open_bmc.chassisPower(self.host, op, self.bmc)
         if self.bmc_type == 'ipmi':
             return ipmi.chassisPower(self.host, op, self.bmc)
 
+    @trace.traced(trace.BMC, host_attr='host')
     def host_boot_source(self, source='', timeout=10):
         if self.bmc_type == 'openbmc':
             return open_bmc.hostBootSource(self.host, source, self.bmc)
         elif self.bmc_type == 'ipmi':
             return ipmi.hostBootSource(self.host, source, self.bmc)
 
+    @trace.traced(trace.BMC, host_attr='host')
     def host_boot_mode(self, mode='', timeout=10):
         if self.bmc_type == 'openbmc':
             return open_bmc.hostBootMode(self.host, mode, self.bmc)
         elif self.bmc_type == 'ipmi':
             return ipmi.hostBootMode(self.host, mode, self.bmc)
 
+    @trace.traced(trace.BMC, host_attr='host')
     def bmc_reset(self, op):
         if self.bmc_type == 'openbmc':
             return open_bmc.bmcReset(self.host, op, self.bmc)
         elif self.bmc_type == 'ipmi':
             return ipmi.bmcReset(self.host, op, self.bmc)
 
+    @trace.traced(trace.BMC, host_attr='host')
     def bmc_status(self, timeout=5):
         if self.bmc_type == 'openbmc':
             return open_bmc.bmcPowerState(self.host, self.bmc, timeout)
@@ -134,6 +139,52 @@ class Bmc(object):
             return 'Ready'
 
 
+def call_all(bmcs, func, timeout, max_workers=MAX_WORKERS):
+    """Call a function for each BMC concurrently, within an overall
+    deadline. Calls still running at the deadline are not waited for, but
+    they keep running in the background, so func must bound its own run
+    time (e.g. with request timeouts). Only use this for OpenBMC sessions;
+    pyghmi IPMI sessions share one client per process and are not safe to
+    use from concurrent threads.
+
+    Args:
+        bmcs (dict): Logged in Bmc instances keyed by address
+        func (callable): Called with a Bmc instance
+        timeout (int): Overall deadline in seconds
+        max_workers (int, optional): Maximum concurrent calls
+
+    Returns:
+        tuple: Results keyed by address (dict) and the addresses of the
+               BMCs whose call was still running at the deadline (list).
+               BMCs whose call raised or did not return in time are left
+               out of the results. Do not log out the pending BMCs.
+    """
+    log = logger.getlogger()
+    results = {}
+    if not bmcs:
+        return results, []
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(bmcs)))
+    futures = {executor.submit(func, bmc): address
+               for address, bmc in bmcs.items()}
+    try:
+        for future in as_completed(futures, timeout=timeout):
+            address = futures[future]
+            try:
+                results[address] = future.result()
+            except Exception as exc:
+                log.debug(f'BMC {address} - request failed: {exc}')
+    except TimeoutError:
+        pass
+    for future in futures:
+        future.cancel()
+    pending = [address for future, address in futures.items()
+               if not future.done()]
+    if pending:
+        log.debug(f'No response within {timeout} s from BMCs: {pending}')
+    executor.shutdown(wait=False)
+    return results, pending
+
+
 if __name__ == '__main__':
     """Show status of the POWER-Up environment
     Args:
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""Concurrent BMC credential discovery"""
+
+# Copyright 2019 IBM Corp.
+#
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import lib.logger as logger
+import lib.bmc as _bmc
+
+# Upper bound on BMC logins in flight at once
+MAX_WORKERS = 64
+
+
+def get_oui(mac):
+    """Get the vendor OUI ('cc:cc:cc') of a MAC address or None"""
+    if not mac:
+        return None
+    return mac.lower().replace('-', ':')[:8]
+
+
+class CredentialDiscovery(object):
+    """Discover which credentials give access to each BMC
+
+    Nodes are probed concurrently, each trying its candidate credentials
+    one at a time so a node stops as soon as one set works. Candidates
+    are ordered by affinity: the credentials of the node template cabled
+    to the node's switch port first, then credentials that worked for
+    BMCs with the same MAC OUI, then overall success count and finally
+    the number of nodes still expected per credential set. Affinity is
+    learned while the discovery runs.
+
+    Args:
+        cred_list (list of lists): Each item holds the userid, password,
+                                   bmc_type and number of nodes for a
+                                   node template
+        max_workers (int, optional): Maximum concurrent BMC probes
+    """
+
+    def __init__(self, cred_list, max_workers=MAX_WORKERS):
+        self.log = logger.getlogger()
+        self.cred_list = cred_list
+        self.max_workers = max_workers
+        self.lock = threading.Lock()
+        self.remaining = [creds[3] for creds in cred_list]
+        self.successes = [0] * len(cred_list)
+        self.oui_successes = {}
+
+    def get_order(self, template=None, oui=None):
+        """Get credential indices in the order they should be tried
+
+        Args:
+            template (int, optional): Index of the node's expected
+                                      credentials
+            oui (str, optional): BMC MAC OUI
+
+        Returns:
+            list of int: Indices into cred_list
+        """
+        with self.lock:
+            oui_successes = self.oui_successes.get(oui, {})
+            return sorted(range(len(self.cred_list)),
+                          key=lambda index: (index != template,
+                                             -oui_successes.get(index, 0),
+                                             -self.successes[index],
+                                             -self.remaining[index],
+                                             index))
+
+    def _record(self, index, oui):
+        with self.lock:
+            self.successes[index] += 1
+            self.remaining[index] -= 1
+            if oui is not None:
+                counts = self.oui_successes.setdefault(oui, {})
+                counts[index] = counts.get(index, 0) + 1
+
+    def probe(self, node, creds, timeout):
+        """Check if credentials give access to a BMC
+
+        Args:
+            node (str): BMC address
+            creds (list): userid, password and bmc_type
+            timeout (int): Connection timeout
+
+        Returns:
+            bool: True if the BMC answered a power status request
+        """
+        self.log.debug(f'BMC {node} - Trying userid: {creds[0]} | '
+                       f'password: {creds[1]} | bmc type: {creds[2]}')
+        bmc = _bmc.Bmc(node, *creds[:3], timeout=timeout)
+        if not bmc.is_connected():
+            return False
+        status = bmc.chassis_power('status')
+        if status:
+            self.log.debug(f'Node {node} is powered {status}')
+        else:
+            self.log.debug(f'No power status response from node {node}')
+        bmc.logout()
+        return bool(status)
+
+    def _discover_node(self, node, template, oui, timeout):
+        for index in self.get_order(template, oui):
+            if self.probe(node, self.cred_list[index], timeout):
+                self._record(index, oui)
+                return index
+        return None
+
+    def discover(self, nodes, templates=None, macs=None, max_rounds=20,
+                 delay=5, timeout=5, callback=None):
+        """Discover credentials for all nodes
+
+        Nodes without working credentials are retried in later rounds
+        with a longer timeout.
+
+        Args:
+            nodes (list of str): BMC addresses
+            templates (dict, optional): Expected cred_list index keyed by
+                                        node (e.g. from switch port)
+            macs (dict, optional): BMC MAC address keyed by node
+            max_rounds (int, optional): Maximum discovery rounds
+            delay (int, optional): Seconds between rounds
+            timeout (int, optional): Initial connection timeout
+            callback (callable, optional): Called with (node, creds) from
+                                           the calling thread for each
+                                           discovered node
+
+        Returns:
+            dict: (userid, password, bmc_type) tuples keyed by node
+        """
+        templates = templates or {}
+        macs = macs or {}
+        bmc_ai = {}
+        pending = list(nodes)
+        for attempt in range(max_rounds):
+            if attempt > 0:
+                time.sleep(delay)
+                timeout += 1
+            workers = min(self.max_workers, len(pending))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {executor.submit(self._discover_node, node,
+                                           templates.get(node),
+                                           get_oui(macs.get(node)),
+                                           timeout): node
+                           for node in pending}
+                for future in as_completed(futures):
+                    node = futures[future]
+                    try:
+                        index = future.result()
+                    except Exception as exc:
+                        # Retried in the next round like a failed login
+                        self.log.warning(f'BMC {node} - credential probe '
+                                         f'failed: {exc}')
+                        continue
+                    if index is None:
+                        continue
+                    bmc_ai[node] = tuple(self.cred_list[index][:3])
+                    if callback is not None:
+                        callback(node, bmc_ai[node])
+            pending = [node for node in pending if node not in bmc_ai]
+            if not pending:
+                break
+            self.log.debug(f'Round {attempt + 1}: {len(pending)} BMCs without '
+                           'working credentials')
+        return bmc_ai
@@ -0,0 +1,847 @@
+#!/usr/bin/env python3
+"""Simulated IPMI and OpenBMC endpoints for BMC fleet benchmarks"""
+
+# Copyright 2019 IBM Corp.
+#
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import datetime
+import json
+import multiprocessing
+import os
+import random
+import selectors
+import ssl
+import tempfile
+import threading
+import time
+import traceback
+import uuid
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from ipaddress import IPv4Address
+from socketserver import ThreadingMixIn
+
+from orderedattrdict import AttrDict
+from pyghmi.ipmi import bmc as ipmi_bmc
+from pyghmi.ipmi.private import constants
+from pyghmi.ipmi.private import serversession
+from pyghmi.ipmi.private import session as ipmi_session
+
+# pyghmi watches its sockets with select(), so each worker process must
+# stay well below FD_SETSIZE (1024) sockets
+MAX_NODES_PER_PROCESS = 500
+POLL_INTERVAL = 0.2
+# RMCP+ authentication algorithm and status codes
+AUTH_HMAC_SHA1 = 1
+RMCP_UNAUTHORIZED_NAME = 0xd
+RMCP_NO_CIPHER_SUITE = 0x11
+START_TIMEOUT = 60
+# Seconds added to each response. pyghmi clients can miss a response that
+# arrives before they wait for it and then only pick it up on retry
+# (0.5 s or more), which real BMCs are too slow to trigger.
+DEFAULT_LATENCY = 0.001
+
+STATS = ('logins', 'auth_failures', 'requests', 'resets', 'dropped')
+
+# IPMI boot device names (see 'pyghmi.ipmi.command.boot_devices') and
+# the OpenBMC boot sources they correspond to
+BOOT_SOURCES = {'default': 'Default', 'network': 'Network', 'hd': 'Disk'}
+BOOT_MODES = ('Regular', 'Safe', 'Setup')
+
+# IPMI storage requests for FRU 0 and the FRU areas served for it
+NETFN_STORAGE = 0xa
+GET_FRU_INVENTORY_AREA_INFO = 0x10
+READ_FRU_DATA = 0x11
+IPMI_NOT_PRESENT = 0xcb
+FRU_RACK_MOUNT_CHASSIS = 0x17
+FRU_END_OF_FIELDS = 0xc1
+
+OBMC = 'xyz.openbmc_project'
+OBMC_PATH = f'/{OBMC.replace(".", "/")}'
+BOOT_OBJECT = f'{OBMC_PATH}/control/host0/boot/one_time'
+BOOT_PATH = f'{BOOT_OBJECT}/attr/'
+STATE_PATH = f'{OBMC_PATH}/state/'
+SOFTWARE_PATH = f'{OBMC_PATH}/software/'
+INVENTORY_PATH = f'{OBMC_PATH}/inventory/system'
+SENSOR_PATH = f'{OBMC_PATH}/sensors/temperature/ambient'
+
+
+def generate_certificate(common_name='bmc-simulator'):
+    """Create a self signed certificate for the OpenBMC endpoints
+
+    Returns:
+        tuple: PEM encoded certificate and private key (bytes)
+    """
+    from cryptography import x509
+    from cryptography.hazmat.backends import default_backend
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+
+    key = ec.generate_private_key(ec.SECP256R1(), default_backend())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, common_name)])
+    now = datetime.datetime.utcnow()
+    cert = (x509.CertificateBuilder()
+            .subject_name(name)
+            .issuer_name(name)
+            .public_key(key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now - datetime.timedelta(days=1))
+            .not_valid_after(now + datetime.timedelta(days=365))
+            .sign(key, hashes.SHA256(), default_backend()))
+    return (cert.public_bytes(serialization.Encoding.PEM),
+            key.private_bytes(serialization.Encoding.PEM,
+                              serialization.PrivateFormat.PKCS8,
+                              serialization.NoEncryption()))
+
+
+def _fru_field(value):
+    """Encode an 8-bit ASCII FRU type/length field"""
+    data = value.encode('ascii')
+    return bytes([0xc0 | len(data)]) + data
+
+
+def _fru_area(data):
+    """Terminate, pad and checksum a FRU info area
+
+    Args:
+        data (bytes): Area bytes following the version and length bytes
+
+    Returns:
+        bytes: Area, a multiple of 8 bytes long
+    """
+    data += bytes([FRU_END_OF_FIELDS])
+    data += bytes(-(len(data) + 3) % 8)
+    area = bytes([1, (len(data) + 3) // 8]) + data
+    return area + bytes([-sum(area) & 0xff])
+
+
+def make_fru(serial, model, manufacturer='SIM'):
+    """Build FRU 0 data with chassis, board and product info areas
+
+    Returns:
+        bytes: FRU data, as read by 'pyghmi.ipmi.fru.FRU'
+    """
+    chassis = _fru_area(bytes([FRU_RACK_MOUNT_CHASSIS]) + _fru_field(model) +
+                        _fru_field(serial))
+    # Manufactured 2019-01-01, in minutes since 1996
+    board = _fru_area(bytes([0]) + (12097440).to_bytes(3, 'little') +
+                      _fru_field(manufacturer) + _fru_field('Planar') +
+                      _fru_field(f'Y{serial}') + _fru_field('01AB234') +
+                      _fru_field(''))
+    product = _fru_area(bytes([0]) + _fru_field(manufacturer) +
+                        _fru_field('Simulated node') + _fru_field(model) +
+                        _fru_field('1.0') + _fru_field(serial) +
+                        _fru_field('') + _fru_field(''))
+    offset = 1
+    header = bytes([1, 0])
+    for area in (chassis, board, product):
+        header += bytes([offset])
+        offset += len(area) // 8
+    header += bytes(2)
+    header += bytes([-sum(header) & 0xff])
+    return header + chassis + board + product
+
+
+class SimulatedNode(object):
+    """Power, boot and BMC state of one simulated node
+
+    State is shared by the IPMI and OpenBMC front ends. All times are in
+    seconds.
+
+    Args:
+        index (int): Node index in the fleet. Makes the serial number
+                     unique.
+        userid (str): BMC user
+        password (str): BMC password
+        latency (float): Delay added to each response
+        auth_fail_rate (float): Probability of rejecting a login with
+                                correct credentials
+        reset_time (float): Time the BMC is unreachable after a cold reset.
+                            Sessions do not survive a reset.
+        power_delay (float): Time a power on or off takes to complete
+        seed (int): Auth failure random seed
+    """
+
+    def __init__(self, index, userid='ADMIN', password='admin',
+                 latency=DEFAULT_LATENCY,
+                 auth_fail_rate=0.0, reset_time=0.0, power_delay=0.0,
+                 seed=None):
+        self.index = index
+        self.userid = userid
+        self.password = password
+        self.latency = latency
+        self.auth_fail_rate = auth_fail_rate
+        self.reset_time = reset_time
+        self.power_delay = power_delay
+        self.random = random.Random(seed)
+        self.serial = f'SIM{index:07d}'
+        self.model = '8335-GTB'
+        self.bootdev = 'default'
+        self.boot_mode = 'Regular'
+        self.fw_activation = 'Active'
+        self.fru = make_fru(self.serial, self.model)
+        self.stats = AttrDict((key, 0) for key in STATS)
+        self.lock = threading.Lock()
+        self._power = 'off'
+        self._power_target = 'off'
+        self._power_at = 0
+        self._reset_until = 0
+        self._epoch = 0
+
+    def count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+    def check_login(self, userid, password):
+        """Check login credentials
+
+        Returns:
+            bool: True if the login is accepted
+        """
+        with self.lock:
+            self.stats.logins += 1
+            if (userid != self.userid or password != self.password or
+                    self.random.random() < self.auth_fail_rate):
+                self.stats.auth_failures += 1
+                return False
+            return True
+
+    def get_password(self, userid):
+        """Get the password of a user for IPMI RAKP authentication
+
+        A failed login returns a wrong password, which the client detects
+        as an incorrect password.
+
+        Returns:
+            str: Password
+        """
+        with self.lock:
+            self.stats.logins += 1
+            if self.random.random() < self.auth_fail_rate:
+                self.stats.auth_failures += 1
+                return self.password + '-rejected'
+            return self.password
+
+    def is_resetting(self):
+        return time.time() < self._reset_until
+
+    def get_epoch(self):
+        """Get the number of resets. Sessions of older epochs are invalid."""
+        return self._epoch
+
+    def reset(self):
+        """Start a BMC cold reset. Host power is not affected."""
+        with self.lock:
+            self.stats.resets += 1
+            self._epoch += 1
+            self._reset_until = time.time() + self.reset_time
+            self.bootdev = 'default'
+
+    @property
+    def power(self):
+        with self.lock:
+            if self._power != self._power_target and \
+                    time.time() >= self._power_at:
+                self._power = self._power_target
+            return self._power
+
+    def set_power(self, state):
+        """Request power 'on' or 'off'"""
+        with self.lock:
+            self._power_target = state
+            self._power_at = time.time() + self.power_delay
+
+    def get_state(self):
+        return AttrDict([('index', self.index), ('power', self.power),
+                         ('bootdev', self.bootdev),
+                         ('boot_mode', self.boot_mode),
+                         ('resetting', self.is_resetting())])
+
+
+class _AuthData(object):
+    """pyghmi server password lookup of a node"""
+
+    def __init__(self, node):
+        self.node = node
+
+    def get(self, userid):
+        return self.node.get_password(userid)
+
+
+class _DelayedSocket(object):
+    """Server socket proxy sending packets after the node latency"""
+
+    def __init__(self, sock, node):
+        self._sock = sock
+        self._node = node
+
+    def __getattr__(self, name):
+        return getattr(self._sock, name)
+
+    def _sendto(self, data, address):
+        try:
+            self._sock.sendto(data, address)
+        except OSError:
+            pass
+
+    def sendto(self, data, address):
+        timer = threading.Timer(self._node.latency, self._sendto,
+                                (bytes(data), address))
+        timer.daemon = True
+        timer.start()
+        return len(data)
+
+
+class _ServerSession(serversession.ServerSession):
+    """RMCP+ session limited to cipher suite 3 (SHA-1)
+
+    Like BMCs without SHA-256 support, other proposals are rejected so
+    the client falls back to SHA-1. Unknown users are rejected instead of
+    ignored.
+    """
+
+    def create_open_session_response(self, request):
+        if request[12] != AUTH_HMAC_SHA1:
+            self.clientsessionid = request[4:8]
+            return (bytearray([request[0], RMCP_NO_CIPHER_SUITE, 0, 0]) +
+                    self.clientsessionid)
+        return super().create_open_session_response(request)
+
+    def _got_rakp1(self, data):
+        node = self.bmc.node
+        if data[27] and bytes(data[28:]).decode('utf-8') != node.userid:
+            node.count('logins')
+            node.count('auth_failures')
+            self.send_payload(
+                bytearray([data[0], RMCP_UNAUTHORIZED_NAME, 0, 0]) +
+                self.clientsessionid, constants.payload_types['rakp2'],
+                retry=False)
+            return
+        super()._got_rakp1(data)
+
+    def sessionless_data(self, data, sockaddr):
+        # Packets of a client whose session was dropped
+        self.bmc.sessionless_data(data, sockaddr)
+
+
+class IpmiEndpoint(ipmi_bmc.Bmc):
+    """IPMI over LAN responder for power, boot device, cold reset and FRU 0
+    reads
+
+    Requests are served by the pyghmi event loop of the process (see
+    'IpmiEndpoint.serve'). Session packets are delayed by the node latency
+    with timers so one slow node does not hold up the others.
+    """
+
+    def __init__(self, node, address='127.0.0.1', port=0):
+        self.node = node
+        super().__init__(_AuthData(node), port=port,
+                         bmcuuid=uuid.UUID(int=node.index), address=address)
+        # pyghmi routes session packets by the listening port
+        self.port = self.serversocket.getsockname()[1]
+        self.address = address
+        self.session_socket = (_DelayedSocket(self.serversocket, node)
+                               if node.latency else self.serversocket)
+
+    @staticmethod
+    def serve(stop):
+        """Run the pyghmi event loop until 'stop' is set"""
+        while not stop.is_set():
+            try:
+                ipmi_session.Session.wait_for_rsp(POLL_INTERVAL)
+            except Exception:
+                # A malformed or stale packet must not stop the other BMCs
+                traceback.print_exc()
+
+    def _drop_sessions(self):
+        for handlers in list(ipmi_session.Session.bmc_handlers.values()):
+            session = handlers.get(self.port)
+            if getattr(session, 'bmc', None) is self:
+                del handlers[self.port]
+
+    def sessionless_data(self, data, sockaddr):
+        data = bytearray(data)
+        if (len(data) >= 22 and data[0] == 6 and data[2:4] == b'\xff\x07' and
+                data[4] == 6 and data[5] ==
+                constants.payload_types['rmcpplusopenreq']):
+            _ServerSession(self.authdata, self.kg, sockaddr,
+                           self.session_socket, data[16:], self.uuid,
+                           bmc=self)
+            return
+        super().sessionless_data(data, sockaddr)
+
+    def process_pktqueue(self):
+        if self.node.is_resetting():
+            with self.node.lock:
+                self.node.stats.dropped += len(self.pktqueue)
+            self.pktqueue.clear()
+            return
+        super().process_pktqueue()
+
+    def handle_raw_request(self, request, session):
+        if self.node.is_resetting():
+            self.node.count('dropped')
+            return
+        self.node.count('requests')
+        epoch = self.node.get_epoch()
+        if request['netfn'] == NETFN_STORAGE:
+            self._handle_fru_request(request, session)
+            return
+        super().handle_raw_request(request, session)
+        if self.node.get_epoch() != epoch:
+            self._drop_sessions()
+
+    def _handle_fru_request(self, request, session):
+        """Serve reads of FRU 0, the only FRU of the node"""
+        data = request['data']
+        fru = self.node.fru
+        if not data or data[0] != 0:
+            session.send_ipmi_response(code=IPMI_NOT_PRESENT)
+        elif request['command'] == GET_FRU_INVENTORY_AREA_INFO:
+            session.send_ipmi_response(
+                data=list(len(fru).to_bytes(2, 'little')) + [0])
+        elif request['command'] == READ_FRU_DATA and len(data) == 4:
+            offset = data[1] | data[2] << 8
+            chunk = fru[offset:offset + data[3]]
+            session.send_ipmi_response(data=[len(chunk)] + list(chunk))
+        else:
+            session.send_ipmi_response(code=0xc1)
+
+    def get_power_state(self):
+        return self.node.power
+
+    def power_on(self):
+        self.node.set_power('on')
+
+    def power_off(self):
+        self.node.set_power('off')
+
+    def power_shutdown(self):
+        self.node.set_power('off')
+
+    def power_cycle(self):
+        self.node.set_power('on')
+
+    def power_reset(self):
+        self.node.set_power('on')
+
+    def cold_reset(self):
+        self.node.reset()
+        return 0
+
+    def get_boot_device(self):
+        return self.node.bootdev
+
+    def set_boot_device(self, bootdevice):
+        self.node.bootdev = bootdevice
+
+
+class _OpenBmcHandler(BaseHTTPRequestHandler):
+    """OpenBMC REST API requests used by 'lib.open_bmc'"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_PUT(self):
+        self._handle('PUT')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def _send(self, data, code=200, cookie=None):
+        if code == 200:
+            body = {'data': data, 'message': '200 OK', 'status': 'ok'}
+        else:
+            body = {'data': {'description': data},
+                    'message': f'{code} {self.responses[code][0]}',
+                    'status': 'error'}
+        body = json.dumps(body).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if cookie is not None:
+            self.send_header('Set-Cookie', cookie)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _get_token(self):
+        for cookie in self.headers.get_all('Cookie') or []:
+            for item in cookie.split(';'):
+                name, _, value = item.strip().partition('=')
+                if name == 'SESSION':
+                    return value
+        return None
+
+    def _handle(self, method):
+        node = self.server.node
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        if node.is_resetting():
+            # Unreachable while rebooting
+            node.count('dropped')
+            self.close_connection = True
+            return
+        try:
+            data = json.loads(body.decode('utf-8'))['data'] if body else None
+        except (ValueError, KeyError, TypeError):
+            self._send('Malformed request', 400)
+            return
+        if method == 'POST' and self.path == '/login':
+            if not isinstance(data, list) or len(data) != 2 or \
+                    not node.check_login(*data):
+                self._send('Invalid username or password', 401)
+                return
+            token = uuid.uuid4().hex
+            self.server.tokens[token] = node.get_epoch()
+            self._send(f"User '{data[0]}' logged in",
+                       cookie=f'SESSION={token}; Secure; HttpOnly')
+            return
+        token = self._get_token()
+        if self.server.tokens.get(token) != node.get_epoch():
+            self._send('Login required', 401)
+            return
+        node.count('requests')
+        if node.latency:
+            time.sleep(node.latency)
+        if method == 'POST' and self.path == '/logout':
+            self.server.tokens.pop(token, None)
+            self._send(f"User '{node.userid}' logged out")
+        elif method == 'GET':
+            self._get(node)
+        elif method == 'PUT':
+            self._put(node, data)
+        else:
+            self._send('Not found', 404)
+
+    def _get_objects(self, node):
+        """Get the D-Bus objects of a node, as returned by 'enumerate'
+
+        Returns:
+            dict: Object properties by path
+        """
+        host_state = 'Running' if node.power == 'on' else 'Off'
+        return {
+            BOOT_OBJECT: {
+                'BootSource': f'{OBMC}.Control.Boot.Source.Sources.'
+                              f'{BOOT_SOURCES.get(node.bootdev, "Default")}',
+                'BootMode': f'{OBMC}.Control.Boot.Mode.Modes.'
+                            f'{node.boot_mode}',
+                'Enabled': 1},
+            STATE_PATH + 'chassis0': {
+                'CurrentPowerState': f'{OBMC}.State.Chassis.PowerState.'
+                                     f'{node.power.title()}'},
+            STATE_PATH + 'host0': {
+                'CurrentHostState': f'{OBMC}.State.Host.HostState.'
+                                    f'{host_state}'},
+            STATE_PATH + 'bmc0': {
+                'CurrentBMCState': f'{OBMC}.State.BMC.BMCState.Ready'},
+            f'{SOFTWARE_PATH}{node.index:08x}': {
+                'Activation': f'{OBMC}.Software.Activation.Activations.'
+                              f'{node.fw_activation}',
+                'RequestedActivation':
+                    f'{OBMC}.Software.Activation.RequestedActivations.None',
+                'Purpose': f'{OBMC}.Software.Version.VersionPurpose.BMC',
+                'Version': 'v2.0-sim'},
+            INVENTORY_PATH: {
+                'Manufacturer': 'SIM', 'Model': node.model,
+                'PartNumber': node.model, 'SerialNumber': node.serial,
+                'Present': 1},
+            SENSOR_PATH: {
+                'Scale': -3, 'Unit': f'{OBMC}.Sensor.Value.Unit.DegreesC',
+                'Value': 25000}}
+
+    def _get(self, node):
+        objects = self._get_objects(node)
+        path, _, prop = self.path.partition('/attr/')
+        if path.endswith('/enumerate'):
+            # The object at the path and all objects below it
+            root = path[:-len('/enumerate')]
+            self._send({obj_path: props for obj_path, props in objects.items()
+                        if obj_path == root or
+                        obj_path.startswith(root.rstrip('/') + '/')})
+        elif prop and prop in objects.get(path, {}):
+            self._send(objects[path][prop])
+        elif not prop and path in objects:
+            self._send(objects[path])
+        else:
+            self._send('Not found', 404)
+
+    def _put(self, node, data):
+        value = str(data).split('.')[-1]
+        if self.path == BOOT_PATH + 'BootSource':
+            bootdevs = {source: bootdev
+                        for bootdev, source in BOOT_SOURCES.items()}
+            if value not in bootdevs:
+                self._send('Invalid boot source', 400)
+                return
+            node.bootdev = bootdevs[value]
+        elif self.path == BOOT_PATH + 'BootMode':
+            if value not in BOOT_MODES:
+                self._send('Invalid boot mode', 400)
+                return
+            node.boot_mode = value
+        elif self.path == STATE_PATH + 'host0/attr/RequestedHostTransition':
+            if value not in ('On', 'Off', 'Reboot'):
+                self._send('Invalid host transition', 400)
+                return
+            node.set_power('off' if value == 'Off' else 'on')
+        elif self.path == STATE_PATH + 'bmc0/attr/RequestedBMCTransition':
+            if value != 'Reboot':
+                self._send('Invalid BMC transition', 400)
+                return
+            self._send(None)
+            self.close_connection = True
+            node.reset()
+            return
+        else:
+            self._send('Not found', 404)
+            return
+        self._send(None)
+
+
+class OpenBmcEndpoint(ThreadingMixIn, HTTPServer):
+    """HTTPS OpenBMC REST API emulator
+
+    Connections are accepted by 'OpenBmcEndpoint.serve', which watches
+    the listening sockets of all endpoints of a process, and are then
+    served by one thread each. The TLS handshake runs in the connection
+    thread.
+    """
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, node, context, address='127.0.0.1', port=0):
+        self.node = node
+        self.tokens = {}
+        super().__init__((address, port), _OpenBmcHandler)
+        self.socket = context.wrap_socket(self.socket, server_side=True,
+                                          do_handshake_on_connect=False)
+        self.address, self.port = self.socket.getsockname()[:2]
+
+    def finish_request(self, request, client_address):
+        try:
+            request.do_handshake()
+        except (ssl.SSLError, OSError):
+            return
+        super().finish_request(request, client_address)
+
+    def handle_error(self, request, client_address):
+        pass
+
+    @staticmethod
+    def serve(endpoints, stop):
+        """Accept connections on all endpoints until 'stop' is set"""
+        with selectors.DefaultSelector() as selector:
+            for endpoint in endpoints:
+                selector.register(endpoint, selectors.EVENT_READ)
+            while not stop.is_set():
+                for key, _ in selector.select(POLL_INTERVAL):
+                    key.fileobj._handle_request_noblock()
+
+
+def _load_context(cert):
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    with tempfile.TemporaryDirectory() as cert_dir:
+        cert_file = os.path.join(cert_dir, 'cert.pem')
+        key_file = os.path.join(cert_dir, 'key.pem')
+        with open(cert_file, 'wb') as f:
+            f.write(cert[0])
+        with open(key_file, 'wb') as f:
+            f.write(cert[1])
+        context.load_cert_chain(cert_file, key_file)
+    return context
+
+
+def _run_worker(conn, bmc_type, specs, node_args, cert):
+    """Serve simulated BMC endpoints in a worker process
+
+    Args:
+        conn (Connection): Command pipe
+        bmc_type (str): 'ipmi' or 'openbmc'
+        specs (list): (index, address, port) of each endpoint
+        node_args (dict): SimulatedNode arguments
+        cert (tuple): PEM certificate and key of OpenBMC endpoints
+    """
+    seed = node_args.pop('seed', None)
+    nodes = [SimulatedNode(index, seed=None if seed is None else seed + index,
+                           **node_args)
+             for index, _, _ in specs]
+    stop = threading.Event()
+    if bmc_type == 'openbmc':
+        context = _load_context(cert)
+        endpoints = [OpenBmcEndpoint(node, context, address, port)
+                     for node, (_, address, port) in zip(nodes, specs)]
+        thread = threading.Thread(target=OpenBmcEndpoint.serve,
+                                  args=(endpoints, stop), daemon=True)
+    else:
+        endpoints = [IpmiEndpoint(node, address, port)
+                     for node, (_, address, port) in zip(nodes, specs)]
+        thread = threading.Thread(target=IpmiEndpoint.serve, args=(stop,),
+                                  daemon=True)
+    thread.start()
+    conn.send([(endpoint.address, endpoint.port) for endpoint in endpoints])
+    while True:
+        command = conn.recv()
+        if command == 'stats':
+            conn.send([dict(node.stats) for node in nodes])
+        elif command == 'reset_stats':
+            for node in nodes:
+                with node.lock:
+                    for key in node.stats:
+                        node.stats[key] = 0
+            conn.send(None)
+        elif command == 'nodes':
+            conn.send([dict(node.get_state()) for node in nodes])
+        else:
+            break
+    stop.set()
+    thread.join()
+    if bmc_type == 'openbmc':
+        for endpoint in endpoints:
+            endpoint.server_close()
+    conn.send(None)
+
+
+class BmcFleet(object):
+    """A set of simulated BMCs of the same type
+
+    Endpoints are spread over worker processes and listen on consecutive
+    loopback addresses and on their own ports. Addresses are returned
+    in 'host:port' form, which 'lib.bmc.Bmc' accepts for both BMC types.
+
+    Args:
+        count (int): Number of BMCs
+        bmc_type (str): 'ipmi' or 'openbmc'
+        base_address (str, optional): Loopback address of the first BMC
+        addresses (int, optional): Number of consecutive loopback
+                                   addresses the BMCs are spread over
+        base_port (int, optional): Port of the first BMC. Following BMCs
+                                   use the next ports. By default free
+                                   ports are picked.
+        nodes_per_process (int, optional): BMCs served by each worker
+                                           process
+        kwargs: Passed to each SimulatedNode ('userid', 'password',
+                'latency', 'auth_fail_rate', 'reset_time', 'power_delay'
+                and 'seed')
+
+    Attributes:
+        endpoints (list of tuple): (address, port) of each BMC
+    """
+
+    def __init__(self, count, bmc_type='ipmi', base_address='127.0.0.1',
+                 addresses=1, base_port=0,
+                 nodes_per_process=MAX_NODES_PER_PROCESS, **kwargs):
+        if bmc_type not in ('ipmi', 'openbmc'):
+            raise ValueError(f'Unsupported BMC type: {bmc_type}')
+        self.count = count
+        self.bmc_type = bmc_type
+        self.userid = kwargs.setdefault('userid', 'ADMIN')
+        self.password = kwargs.setdefault('password', 'admin')
+        self.node_args = kwargs
+        base = IPv4Address(base_address)
+        self.specs = [(index, str(base + index % addresses),
+                       base_port + index if base_port else 0)
+                      for index in range(count)]
+        self.nodes_per_process = min(nodes_per_process,
+                                     MAX_NODES_PER_PROCESS)
+        self.endpoints = []
+        self._workers = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        context = multiprocessing.get_context('spawn')
+        cert = generate_certificate() if self.bmc_type == 'openbmc' else None
+        for start in range(0, self.count, self.nodes_per_process):
+            conn, child_conn = context.Pipe()
+            process = context.Process(
+                target=_run_worker, daemon=True,
+                args=(child_conn, self.bmc_type,
+                      self.specs[start:start + self.nodes_per_process],
+                      dict(self.node_args), cert))
+            process.start()
+            self._workers.append((process, conn))
+        for process, conn in self._workers:
+            if not conn.poll(START_TIMEOUT):
+                raise OSError('BMC simulator worker failed to start '
+                              f'(exit code {process.exitcode})')
+            self.endpoints += conn.recv()
+
+    def stop(self):
+        for process, conn in self._workers:
+            try:
+                conn.send('stop')
+                conn.poll(START_TIMEOUT)
+            except (OSError, EOFError):
+                pass
+        for process, conn in self._workers:
+            process.join(START_TIMEOUT)
+            if process.is_alive():
+                process.terminate()
+            conn.close()
+        self._workers = []
+
+    def __enter__(self):
+        try:
+            self.start()
+        except (OSError, EOFError):
+            self.stop()
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def get_addresses(self):
+        """Get the 'host:port' address of each BMC"""
+        return [f'{address}:{port}' for address, port in self.endpoints]
+
+    def get_credentials(self):
+        """Get BMC credentials in the form taken by 'set_power_clients'
+
+        Returns:
+            dict: (userid, password, bmc_type) keyed by BMC address
+        """
+        return {address: (self.userid, self.password, self.bmc_type)
+                for address in self.get_addresses()}
+
+    def _request(self, command):
+        with self._lock:
+            for _, conn in self._workers:
+                conn.send(command)
+            return [conn.recv() for _, conn in self._workers]
+
+    def get_nodes(self):
+        """Get the power, boot and reset state of each node"""
+        return [AttrDict(state) for states in self._request('nodes')
+                for state in states]
+
+    def get_stats(self):
+        """Get login, auth failure, request, reset and dropped totals"""
+        stats = AttrDict((key, 0) for key in STATS)
+        for worker_stats in self._request('stats'):
+            for node_stats in worker_stats:
+                for key in stats:
+                    stats[key] += node_stats[key]
+        return stats
+
+    def reset_stats(self):
+        self._request('reset_stats')
@@ -23,6 +23,7 @@ from itertools import chain
 
 import lib.logger as logger
 from lib.db import DatabaseConfig
+from lib.config_model import ConfigModel
 from lib.exception import UserException
 from lib.genesis import CFG_FILE
 
@@ -88,6 +89,14 @@ class Config(object):
             self.config_path = CFG_FILE
             dbase = DatabaseConfig(CFG_FILE)
             self.cfg = dbase.load_config()
+        self._model = None
+
+    @property
+    def model(self):
+        """ConfigModel: Views compiled from the config on first use"""
+        if self._model is None:
+            self._model = ConfigModel(self.cfg)
+        return self._model
 
     @staticmethod
     def _netmask_to_prefix(netmask):
@@ -126,6 +135,22 @@ class Config(object):
             self.log.error("Neither 'netmask' nor 'prefix' is specified")
             sys.exit(1)
 
+    def _get_masks_member(self, masks, field, index):
+        """Get compiled netmask or prefix values
+        Args:
+            masks (tuple of NetworkMask): Compiled network masks
+            field (str): 'netmask' or 'prefix'
+            index (int): Index
+
+        Returns:
+            list or obj: Members or member
+        """
+        members = masks if index is None else masks[index:index + 1]
+        values = [getattr(member, field) for member in members]
+        if None in values:
+            self._netmask_prefix_not_found()
+        return values if index is None else values[0]
+
     @staticmethod
     def _get_members(obj_list, key, index):
         """Get dictionary value under a list
@@ -429,25 +454,7 @@ class Config(object):
             str or iter of str: Netmask
         """
 
-        if index is None:
-            list_ = []
-            for member in self.cfg.deployer.networks.mgmt:
-                if self.CfgKey.NETMASK in member:
-                    list_.append(member[self.CfgKey.NETMASK])
-                elif self.CfgKey.PREFIX in member:
-                    list_.append(self._prefix_to_netmask(
-                        member[self.CfgKey.PREFIX]))
-                else:
-                    self._netmask_prefix_not_found()
-            return list_
-        else:
-            member = self.cfg.deployer.networks.mgmt[index]
-            if self.CfgKey.NETMASK in member:
-                return member[self.CfgKey.NETMASK]
-            elif self.CfgKey.PREFIX in member:
-                return self._prefix_to_netmask(member[self.CfgKey.PREFIX])
-            else:
-                self._netmask_prefix_not_found()
+        return self._get_masks_member(self.model.mgmt_masks, 'netmask', index)
 
     def yield_depl_netw_mgmt_netmask(self):
         """Yield deployer networks mgmt netmask
@@ -464,25 +471,7 @@ class Config(object):
             str or iter of str: Prefix
         """
 
-        if index is None:
-            list_ = []
-            for member in self.cfg.deployer.networks.mgmt:
-                if self.CfgKey.PREFIX in member:
-                    list_.append(member[self.CfgKey.PREFIX])
-                elif self.CfgKey.NETMASK in member:
-                    list_.append(self._netmask_to_prefix(
-                        member[self.CfgKey.NETMASK]))
-                else:
-                    self._netmask_prefix_not_found()
-            return list_
-        else:
-            member = self.cfg.deployer.networks.mgmt[index]
-            if self.CfgKey.PREFIX in member:
-                return member[self.CfgKey.PREFIX]
-            elif self.CfgKey.NETMASK in member:
-                return self._netmask_to_prefix(member[self.CfgKey.NETMASK])
-            else:
-                self._netmask_prefix_not_found()
+        return self._get_masks_member(self.model.mgmt_masks, 'prefix', index)
 
     def yield_depl_netw_mgmt_prefix(self):
         """Yield deployer networks mgmt prefix
@@ -657,25 +646,7 @@ class Config(object):
             str or iter of str: Netmask
         """
 
-        if index is None:
-            list_ = []
-            for member in self.cfg.deployer.networks.client:
-                if self.CfgKey.NETMASK in member:
-                    list_.append(member[self.CfgKey.NETMASK])
-                elif self.CfgKey.PREFIX in member:
-                    list_.append(self._prefix_to_netmask(
-                        member[self.CfgKey.PREFIX]))
-                else:
-                    self._netmask_prefix_not_found()
-            return list_
-        else:
-            member = self.cfg.deployer.networks.client[index]
-            if self.CfgKey.NETMASK in member:
-                return member[self.CfgKey.NETMASK]
-            elif self.CfgKey.PREFIX in member:
-                return self._prefix_to_netmask(member[self.CfgKey.PREFIX])
-            else:
-                self._netmask_prefix_not_found()
+        return self._get_masks_member(self.model.client_masks, 'netmask', index)
 
     def yield_depl_netw_client_netmask(self):
         """Yield deployer networks client netmask
@@ -692,25 +663,7 @@ class Config(object):
             str or iter of str: Prefix
         """
 
-        if index is None:
-            list_ = []
-            for member in self.cfg.deployer.networks.client:
-                if self.CfgKey.PREFIX in member:
-                    list_.append(member[self.CfgKey.PREFIX])
-                elif self.CfgKey.NETMASK in member:
-                    list_.append(self._netmask_to_prefix(
-                        member[self.CfgKey.NETMASK]))
-                else:
-                    self._netmask_prefix_not_found()
-            return list_
-        else:
-            member = self.cfg.deployer.networks.client[index]
-            if self.CfgKey.PREFIX in member:
-                return member[self.CfgKey.PREFIX]
-            elif self.CfgKey.NETMASK in member:
-                return self._netmask_to_prefix(member[self.CfgKey.NETMASK])
-            else:
-                self._netmask_prefix_not_found()
+        return self._get_masks_member(self.model.client_masks, 'prefix', index)
 
     def yield_depl_netw_client_prefix(self):
         """Yield deployer networks client prefix
@@ -1824,54 +1777,25 @@ class Config(object):
             UserException: If referenced interface is not defined
         """
 
-        node_template = self.cfg.node_templates[node_template_index]
-        interface_defs = self.get_interfaces()
-        network_defs = self.get_networks()
-        if_labels = []
-
-        for interface in self.yield_ntmpl_phyintf_pxe_interface(
-                node_template_index):
-            if_labels.append(interface)
+        if_labels = self.model.template_if_labels[node_template_index]
+        interface_defs = self.model.interfaces
+        replace_keys = [self.CfgKey.ADDRESS_LIST,
+                        self.CfgKey.ADDRESS_START,
+                        self.CfgKey.IPADDR_LIST,
+                        self.CfgKey.IPADDR_START]
 
-        for interface in self.yield_ntmpl_phyintf_data_interface(
-                node_template_index):
-            if_labels.append(interface)
-
-        if (self.CfgKey.INTERFACES in node_template and
-                node_template[self.CfgKey.INTERFACES] is not None):
-            for interface in node_template[self.CfgKey.INTERFACES]:
-                if interface not in if_labels:
-                    if_labels.append(interface)
-
-        if (self.CfgKey.NETWORKS in node_template and
-                node_template[self.CfgKey.NETWORKS] is not None):
-            for network in node_template[self.CfgKey.NETWORKS]:
-                for network_def in network_defs:
-                    if network == network_def[self.CfgKey.LABEL]:
-                        for interface in network_def[self.CfgKey.INTERFACES]:
-                            if interface not in if_labels:
-                                if_labels.append(interface)
-
-        interfaces = [None] * len(if_labels)
-        for interface in interface_defs:
-            if interface[self.CfgKey.LABEL] in if_labels:
-                index = if_labels.index(interface[self.CfgKey.LABEL])
-                _interface = interface.copy()
-                replace_keys = [self.CfgKey.ADDRESS_LIST,
-                                self.CfgKey.ADDRESS_START,
-                                self.CfgKey.IPADDR_LIST,
-                                self.CfgKey.IPADDR_START]
-                for key in replace_keys:
-                    if key in _interface.keys():
-                        del _interface[key]
-                        new_key = key.split('_')[0]
-                        _interface[new_key] = None
-                interfaces[index] = _interface
-
-        for index, interface in enumerate(interfaces):
-            if interface is None:
+        interfaces = []
+        for label in if_labels:
+            if label not in interface_defs:
                 raise UserException('No interface defined with label=%s' %
-                                    if_labels[index])
+                                    label)
+            _interface = interface_defs[label].copy()
+            for key in replace_keys:
+                if key in _interface.keys():
+                    del _interface[key]
+                    new_key = key.split('_')[0]
+                    _interface[new_key] = None
+            interfaces.append(_interface)
 
         return interfaces
 
@@ -2522,16 +2446,10 @@ class Config(object):
             list of str: Ports
         """
 
-        port_list = []
-
-        for template in self.cfg.node_templates:
-            for temp_if_type, items in template.physical_interfaces.items():
-                if if_type is None or if_type == temp_if_type:
-                    for item in items:
-                        if item.switch == switch_label:
-                            for port in item.ports:
-                                port_list.append(port)
-        return port_list
+        if if_type is not None:
+            return list(self.model.get_switch_ports(switch_label, if_type))
+        return [tmpl_port.port for tmpl_port in self.model.template_ports
+                if tmpl_port.switch == switch_label]
 
     def yield_client_switch_ports(self, switch_label, if_type=None):
         """Yield physical interface ports associated with switch_label
@@ -2547,6 +2465,19 @@ class Config(object):
         for member in self.get_client_switch_ports(switch_label, if_type):
             yield member
 
+    def get_client_switch_port_ntmpl(self, switch_label, port, if_type):
+        """Get the node template index cabled to a switch port
+        Args:
+            switch_label (str): Switch Label
+            port (str or int): Port
+            if_type (str): Interface type ('ipmi', 'pxe', or 'data')
+
+        Returns:
+            int: Node template index or None
+        """
+
+        return self.model.get_port_template(switch_label, port, if_type)
+
     def get_interfaces(self):
         """Get top level 'interfaces' dictionary
 
@@ -2563,10 +2494,7 @@ class Config(object):
             dict: Interface definition or empty dict
         """
 
-        for ifc in self.get_interfaces():
-            if ifc['label'] == label:
-                return ifc
-        return {}
+        return self.model.interfaces.get(label, {})
 
     def get_networks(self):
         """Get top level 'networks' dictionary
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""Compiled config views"""
+
+# Copyright 2019 IBM Corp.
+#
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from collections import namedtuple
+from types import MappingProxyType
+
+from lib.exception import UserException
+from lib.ip_plan import ip_to_int, int_to_ip, prefix_to_mask, mask_to_prefix
+
+# Physical interface port of a node template
+TemplatePort = namedtuple('TemplatePort', ['template_index', 'template',
+                                           'if_type', 'intf_index', 'switch',
+                                           'port'])
+
+# Netmask and prefix of a deployer network. Both are None if neither is
+# specified in the config.
+NetworkMask = namedtuple('NetworkMask', ['netmask', 'prefix'])
+
+
+def get_network_mask(member, field='network'):
+    """Get the netmask and prefix of a config network member
+
+    Args:
+        member (dict): Config element with a 'netmask' or 'prefix'
+        field (str, optional): Config path of member, for errors
+
+    Returns:
+        NetworkMask: Netmask and prefix. If both are given in the config
+                     they are returned as is.
+
+    Raises:
+        UserException: Invalid netmask or prefix
+    """
+    if not isinstance(member, dict):
+        return NetworkMask(None, None)
+    netmask = member.get('netmask')
+    prefix = member.get('prefix')
+    try:
+        if netmask is not None and prefix is None:
+            prefix = mask_to_prefix(ip_to_int(netmask))
+        elif prefix is not None and netmask is None:
+            netmask = int_to_ip(prefix_to_mask(prefix))
+    except (ValueError, TypeError) as exc:
+        key = 'netmask' if netmask is not None else 'prefix'
+        raise UserException(f"Invalid '{field}.{key}': {exc}")
+    return NetworkMask(netmask, prefix)
+
+
+class ConfigModel(object):
+    """Immutable views of a config, derived once
+
+    All lists are tuples and all maps are read only. Ports are keyed as
+    strings.
+
+    Attributes:
+        templates (tuple): Node template labels
+        template_ports (tuple): TemplatePort of all node template
+                                physical interface ports in config order
+        switch_ports (mapping): (if_type, switch) -> tuple of config ports
+        port_templates (mapping): (if_type, switch, port) -> node template
+                                  index
+        interfaces (mapping): Interface label -> interface definition
+        template_if_labels (tuple): Per node template tuple of interface
+                                    labels (physical interfaces, then
+                                    'interfaces', then network interfaces)
+        mgmt_masks (tuple): NetworkMask of each deployer mgmt network
+        client_masks (tuple): NetworkMask of each deployer client network
+
+    The masks are converted on first access, so an invalid netmask or
+    prefix only fails the accessors that use it.
+    """
+
+    __slots__ = ('templates', 'template_ports', 'switch_ports',
+                 'port_templates', 'interfaces', 'template_if_labels',
+                 '_networks', '_masks')
+
+    def __init__(self, cfg):
+        templates = []
+        template_ports = []
+        switch_ports = {}
+        port_templates = {}
+        template_if_labels = []
+
+        network_ifcs = {}
+        for network in cfg.get('networks') or []:
+            network_ifcs.setdefault(network.label, []).extend(
+                network.get('interfaces') or [])
+
+        for tmpl_idx, template in enumerate(cfg.node_templates):
+            templates.append(template.label)
+            phy_intfs = template.get('physical_interfaces') or {}
+            for if_type, intfs in phy_intfs.items():
+                for intf_idx, intf in enumerate(intfs or []):
+                    for port in intf.get('ports') or []:
+                        template_ports.append(TemplatePort(
+                            tmpl_idx, template.label, if_type, intf_idx,
+                            intf.get('switch'), port))
+                        switch_ports.setdefault(
+                            (if_type, intf.get('switch')), []).append(port)
+                        port_templates.setdefault(
+                            (if_type, intf.get('switch'), str(port)),
+                            tmpl_idx)
+
+            if_labels = [intf.get('interface')
+                         for intf in phy_intfs.get('pxe') or []]
+            if_labels += [intf.get('interface')
+                          for intf in phy_intfs.get('data') or []]
+            for label in template.get('interfaces') or []:
+                if label not in if_labels:
+                    if_labels.append(label)
+            for network in template.get('networks') or []:
+                for label in network_ifcs.get(network, []):
+                    if label not in if_labels:
+                        if_labels.append(label)
+            template_if_labels.append(tuple(if_labels))
+
+        networks = cfg.get('deployer', {}).get('networks', {})
+        self.templates = tuple(templates)
+        self.template_ports = tuple(template_ports)
+        self.switch_ports = MappingProxyType(
+            {key: tuple(ports) for key, ports in switch_ports.items()})
+        self.port_templates = MappingProxyType(port_templates)
+        self.interfaces = MappingProxyType(
+            {ifc.label: ifc for ifc in cfg.get('interfaces') or []})
+        self.template_if_labels = tuple(template_if_labels)
+        self._networks = networks
+        self._masks = {}
+
+    @property
+    def mgmt_masks(self):
+        return self._get_masks('mgmt')
+
+    @property
+    def client_masks(self):
+        return self._get_masks('client')
+
+    def _get_masks(self, net_type):
+        """Get the NetworkMask of each deployer network of a type
+
+        Raises:
+            UserException: Invalid netmask or prefix
+        """
+        if net_type not in self._masks:
+            self._masks[net_type] = tuple(
+                get_network_mask(member,
+                                 f'deployer.networks.{net_type}[{index}]')
+                for index, member in
+                enumerate(self._networks.get(net_type) or []))
+        return self._masks[net_type]
+
+    def get_switch_ports(self, switch, if_type):
+        """Get node template ports cabled to a switch
+
+        Args:
+            switch (str): Switch label
+            if_type (str): 'ipmi', 'pxe' or 'data'
+
+        Returns:
+            tuple: Ports in config order
+        """
+        return self.switch_ports.get((if_type, switch), ())
+
+    def get_port_template(self, switch, port, if_type):
+        """Get the node template index cabled to a switch port or None"""
+        return self.port_templates.get((if_type, switch, str(port)))
@@ -19,16 +19,18 @@
 
 import os
 import sys
+import tempfile
 from Crypto.PublicKey import RSA
 import docker
-import tarfile
 from netaddr import IPNetwork
 
 import lib.logger as logger
 from lib.config import Config
+from lib.docker_context import (get_context_digest, get_context_files,
+                                write_context)
 from lib.exception import UserException
 import lib.genesis as gen
-from lib.utilities import sub_proc_display, sha1sum
+from lib.utilities import sub_proc_display, tar_stream
 
 
 class Container(object):
@@ -240,19 +242,35 @@ class Container(object):
         self.connect_networks()
 
     def build_image(self):
+        """Build the image unless it exists. The image is tagged with a
+        digest of the files the Dockerfile consumes, and only those files are
+        sent as the build context.
+
+        Returns:
+            str: Image tag
+        """
         repo_name = self.DEFAULT_CONTAINER_NAME
-        dockerfile_tag = sha1sum(self.depl_dockerfile_path)
-        tag = f"{repo_name}:{dockerfile_tag}"
+        context_path = gen.get_package_path()
+        context_files = get_context_files(context_path,
+                                          self.depl_dockerfile_path)
+        tag = f"{repo_name}:{get_context_digest(context_path, context_files)}"
         try:
             self.client.images.get(tag)
             self.log.info(f"Using existing Docker image '{tag}'")
         except docker.errors.ImageNotFound:
-            self.log.info(f"Building Docker image '{repo_name}'")
+            self.log.info(f"Building Docker image '{repo_name}' from "
+                          f"{len(context_files)} context files")
             try:
-                self.image, build_logs = self.client.images.build(
-                    path=gen.get_package_path(),
-                    tag=tag,
-                    rm=True)
+                with tempfile.TemporaryFile() as context:
+                    write_context(context_path, context_files, context)
+                    context.seek(0)
+                    self.image, build_logs = self.client.images.build(
+                        fileobj=context,
+                        custom_context=True,
+                        dockerfile=os.path.relpath(self.depl_dockerfile_path,
+                                                   context_path),
+                        tag=tag,
+                        rm=True)
             except docker.errors.APIError as exc:
                 msg = ("Failed to create image "
                        f"'{self.DEFAULT_CONTAINER_NAME}': {exc}")
@@ -368,18 +386,22 @@ class Container(object):
         return network
 
     def copy(self, source_path, cont_dest_path):
-        self.log.debug(f"Copy '{source_path}' into "
+        """Copy files or directories into the container directory of
+        cont_dest_path. The archive is streamed to the docker daemon, without
+        temporary files or changing the working directory.
+
+        Args:
+            source_path (str or list of str): Files or directories, each
+                                              copied under its base name
+            cont_dest_path (str): Path in the destination directory
+        """
+        source_paths = ([source_path] if isinstance(source_path, str) else
+                        list(source_path))
+        self.log.debug(f"Copy '{', '.join(source_paths)}' into "
                        f"'{self.cont.name}:{cont_dest_path}'")
-        orig_cwd = os.getcwd()
-        os.chdir(os.path.dirname(source_path))
-        source_base = os.path.basename(source_path)
-
-        tar_file = tarfile.open(source_path + '.tar', mode='w')
-        tar_file.add(source_base)
-        tar_file.close()
-        tar_data = open(source_path + '.tar', 'rb').read()
-        if self.cont.put_archive(os.path.dirname(cont_dest_path), tar_data):
-            os.remove(source_path + '.tar')
-        else:
+        for path in source_paths:
+            if not os.path.exists(path):
+                raise UserException(f"Copy source '{path}' not found")
+        if not self.cont.put_archive(os.path.dirname(cont_dest_path),
+                                     tar_stream(source_paths)):
             self.log.error("Container 'put_archive' error!")
-        os.chdir(orig_cwd)
@@ -17,14 +17,16 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import hashlib
+import json
 import os
 import yaml
 from orderedattrdict.yamlutils import AttrDictYAMLLoader
 
 import lib.logger as logger
-from lib.validate_config_schema import ValidateConfigSchema
-from lib.validate_config_logic import ValidateConfigLogic
-from lib.exception import UserException
+from lib.validate_config_schema import ValidateConfigSchema, SCHEMA_VERSION
+from lib.validate_config_logic import ValidateConfigLogic, LOGIC_VERSION
+from lib.exception import UserException, UserCriticalException
 import lib.genesis as gen
 
 
@@ -32,6 +34,8 @@ class DatabaseConfig(object):
     """Database """
 
     FILE_MODE = 0o666
+    VALIDATION_CACHE_FILE = 'config-validation.json'
+    VALIDATION_CACHE_SIZE = 32
 
     def __init__(self, cfg_file):
         self.log = logger.getlogger()
@@ -102,16 +106,101 @@ class DatabaseConfig(object):
         self.cfg = self._load_yaml_file(self.cfg_file)
         return self.cfg
 
-    def validate_config(self):
-        """Validate config"""
+    def _get_validation_key(self):
+        """Get the validation result cache key
 
-        self._is_config_file(self.cfg_file)
+        The key covers the config file content, the schema and logic
+        versions and the OS image files the OS profiles are validated
+        against.
+
+        Returns:
+            str: Hex digest
+        """
+        digest = hashlib.sha256(SCHEMA_VERSION.encode('utf-8'))
+        digest.update(LOGIC_VERSION.encode('utf-8'))
+        with open(self.cfg_file, 'rb') as cfg_file:
+            digest.update(cfg_file.read())
+        os_images_path = gen.get_os_images_path()
+        try:
+            for name in sorted(os.listdir(os_images_path)):
+                stat = os.stat(os.path.join(os_images_path, name))
+                digest.update('{}:{}:{}'.format(
+                    name, stat.st_size, stat.st_mtime_ns).encode('utf-8'))
+        except OSError:
+            pass
+        return digest.hexdigest()
+
+    def _load_validation_cache(self):
+        path = os.path.join(gen.get_cache_path(), self.VALIDATION_CACHE_FILE)
+        try:
+            with open(path, 'r') as cache_file:
+                return json.load(cache_file)
+        except (IOError, ValueError):
+            return {}
+
+    def _save_validation_cache(self, cache):
+        path = os.path.join(gen.get_cache_path(), self.VALIDATION_CACHE_FILE)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path + '.tmp', 'w') as cache_file:
+                json.dump(cache, cache_file)
+            os.rename(path + '.tmp', path)
+        except (IOError, OSError) as exc:
+            self.log.debug('Unable to save config validation cache - {}'
+                           .format(exc))
+
+    def _validate_config(self):
+        """Run schema and logic validation, collecting all errors
+
+        Returns:
+            str: Warnings, or None
+
+        Exception:
+            UserCriticalException listing all errors
+        """
         self.cfg = self._load_yaml_file(self.cfg_file)
 
-        schema = ValidateConfigSchema(self.cfg)
-        schema.validate_config_schema()
-        logic = ValidateConfigLogic(self.cfg)
-        logic.validate_config_logic()
+        errors, warnings = ValidateConfigSchema(self.cfg).get_errors()
+        warnings = ['\n'.join(warnings)] if warnings else []
+        if errors:
+            # Logic validation requires a schema valid config
+            raise UserCriticalException('\n'.join(errors + warnings))
+        try:
+            ValidateConfigLogic(self.cfg).validate_config_logic()
+        except UserCriticalException as exc:
+            raise UserCriticalException('\n'.join(warnings + [str(exc)]))
+        except UserException as exc:
+            warnings.append(str(exc))
+        return '\n'.join(warnings) or None
+
+    def validate_config(self):
+        """Validate config
+
+        Successful results (including warnings) are cached by the config
+        content hash and the validation rule versions, so unchanged configs
+        are not validated again.
+
+        Exception:
+            UserCriticalException listing all errors, UserException if
+            only warnings are found
+        """
+
+        self._is_config_file(self.cfg_file)
+        key = self._get_validation_key()
+        cache = self._load_validation_cache()
+        if key in cache:
+            self.log.debug('Config validation result cached for {}'.format(
+                self.cfg_file))
+            warnings = cache[key]
+        else:
+            warnings = self._validate_config()
+            cache.pop(key, None)
+            cache[key] = warnings
+            while len(cache) > self.VALIDATION_CACHE_SIZE:
+                del cache[next(iter(cache))]
+            self._save_validation_cache(cache)
+        if warnings:
+            raise UserException(warnings)
 
 
 class DatabaseInventory(object):
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""Docker build context limited to the files a Dockerfile consumes, and a
+content digest of those files for tagging the image
+"""
+
+# Copyright 2019 IBM Corp.
+#
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import fnmatch
+import hashlib
+import json
+import os
+import stat
+import tarfile
+
+DOCKERIGNORE = '.dockerignore'
+COPY_INSTRUCTIONS = ('COPY', 'ADD')
+# Copied into the image but not part of its tag. The deployer logs change on
+# every run and would otherwise force a rebuild each time.
+UNTAGGED_SOURCES = ('logs/*',)
+BLOCK_SIZE = 1 << 20
+
+
+def get_copy_sources(dockerfile_path):
+    """Get the build context sources of the COPY and ADD instructions.
+    Sources copied from other build stages (--from) and URLs are skipped.
+
+    Args:
+        dockerfile_path (str): Dockerfile path
+
+    Returns:
+        list of str: Source paths or patterns, relative to the context
+    """
+    with open(dockerfile_path) as f:
+        lines = f.read().splitlines()
+    instructions = []
+    instruction = ''
+    for line in lines:
+        if not instruction and line.lstrip().startswith('#'):
+            continue
+        if line.rstrip().endswith('\\'):
+            instruction += line.rstrip()[:-1] + ' '
+            continue
+        instructions.append(instruction + line)
+        instruction = ''
+    instructions.append(instruction)
+
+    sources = []
+    for instruction in instructions:
+        words = instruction.split(None, 1)
+        if len(words) < 2 or words[0].upper() not in COPY_INSTRUCTIONS:
+            continue
+        args = words[1].strip()
+        if args.startswith('['):
+            args = json.loads(args)
+        else:
+            args = args.split()
+        flags = [arg for arg in args if arg.startswith('--')]
+        if any(flag.startswith('--from') for flag in flags):
+            continue
+        args = [arg for arg in args if not arg.startswith('--')]
+        sources.extend(source for source in args[:-1]
+                       if '://' not in source)
+    return sources
+
+
+def get_ignore_patterns(context_path):
+    """Read the .dockerignore patterns of a build context
+
+    Returns:
+        list of str: Patterns, in file order
+    """
+    path = os.path.join(context_path, DOCKERIGNORE)
+    if not os.path.isfile(path):
+        return []
+    with open(path) as f:
+        lines = [line.strip() for line in f.read().splitlines()]
+    return [line for line in lines if line and not line.startswith('#')]
+
+
+def is_ignored(rel_path, patterns):
+    """Check rel_path against .dockerignore patterns. The last matching
+    pattern wins, '!' patterns re-include, a leading '**/' matches any
+    directory, and a pattern matching a directory also matches its contents.
+    """
+    ignored = False
+    parts = rel_path.split('/')
+    parents = ['/'.join(parts[:i]) for i in range(1, len(parts) + 1)]
+    for pattern in patterns:
+        negate = pattern.startswith('!')
+        pattern = os.path.normpath(pattern.lstrip('!').lstrip('/'))
+        if pattern.startswith('**/'):
+            candidates = ['/'.join(parts[i:j]) for j in range(1, len(parts) + 1)
+                          for i in range(j)]
+            pattern = pattern[3:]
+        else:
+            candidates = parents
+        if any(fnmatch.fnmatchcase(path, pattern) for path in candidates):
+            ignored = not negate
+    return ignored
+
+
+def _glob(context_path, pattern):
+    """Match a source pattern one path component at a time, where '*' does
+    not match '/' and does match hidden files, as docker does
+
+    Returns:
+        list of str: Matching paths, relative to the context
+    """
+    matches = ['']
+    for part in os.path.normpath(pattern.lstrip('/')).split('/'):
+        if part == '.':
+            continue
+        found = []
+        for match in matches:
+            path = os.path.join(context_path, match)
+            if not os.path.isdir(path):
+                continue
+            if not any(char in part for char in '*?['):
+                names = [part] if os.path.lexists(os.path.join(path, part)) \
+                    else []
+            else:
+                names = fnmatch.filter(sorted(os.listdir(path)), part)
+            found.extend(os.path.join(match, name) for name in names)
+        matches = found
+    return matches
+
+
+def get_context_files(context_path, dockerfile_path):
+    """Get the files a Dockerfile consumes from its build context. Matching
+    directories contribute all the files below them.
+
+    Args:
+        context_path (str): Build context directory
+        dockerfile_path (str): Dockerfile path, within the context
+
+    Returns:
+        list of str: Sorted file paths relative to the context, including
+                     the Dockerfile
+    """
+    patterns = get_ignore_patterns(context_path)
+    files = {os.path.relpath(dockerfile_path, context_path)}
+    for source in get_copy_sources(dockerfile_path):
+        for match in _glob(context_path, source):
+            path = os.path.join(context_path, match)
+            if os.path.isdir(path) and not os.path.islink(path):
+                for root, dirs, names in os.walk(path):
+                    dirs.sort()
+                    for name in names:
+                        files.add(os.path.relpath(os.path.join(root, name),
+                                                  context_path))
+            else:
+                files.add(match)
+    return sorted(path for path in files if not is_ignored(path, patterns))
+
+
+def get_context_digest(context_path, files, exclude=UNTAGGED_SOURCES):
+    """Digest of the names, executable bits and contents of the build
+    context files. File times and other metadata do not change it.
+
+    Args:
+        context_path (str): Build context directory
+        files (list of str): Paths relative to the context
+        exclude (iter of str, optional): Patterns of files left out
+
+    Returns:
+        str: sha1 hex digest
+    """
+    digest = hashlib.sha1()
+    for rel_path in sorted(files):
+        if any(fnmatch.fnmatchcase(rel_path, pattern) for pattern in exclude):
+            continue
+        path = os.path.join(context_path, rel_path)
+        mode = os.lstat(path).st_mode
+        digest.update(rel_path.encode('utf-8') + b'\0')
+        if stat.S_ISLNK(mode):
+            digest.update(b'l' + os.readlink(path).encode('utf-8'))
+        else:
+            digest.update(b'x' if mode & stat.S_IXUSR else b'-')
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(BLOCK_SIZE), b''):
+                    digest.update(block)
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def write_context(context_path, files, fileobj):
+    """Write a build context tar archive holding only files
+
+    Args:
+        context_path (str): Build context directory
+        files (list of str): Paths relative to the context
+        fileobj (file): Binary file the archive is written to
+    """
+    with tarfile.open(fileobj=fileobj, mode='w') as tar_file:
+        for rel_path in sorted(files):
+            tar_file.add(os.path.join(context_path, rel_path),
+                         arcname=rel_path, recursive=False)
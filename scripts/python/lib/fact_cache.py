@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""Ansible fact cache shared across POWER-Up playbooks"""
+
+# Copyright 2019 IBM Corp.
+#
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import time
+
+import lib.logger as logger
+import lib.genesis as gen
+
+
+class FactCache(object):
+    """Ansible 'jsonfile' fact cache
+
+    POWER-Up playbooks run with playbooks/ansible.cfg, which enables the
+    cache with smart gathering, so facts collected by one playbook are
+    reused by the next until they expire. Cached facts can also be read
+    directly from Python without launching Ansible.
+
+    Args:
+        path (str, optional): Cache directory (defaults to the ansible.cfg
+                              'fact_caching_connection')
+        timeout (int, optional): Cache TTL in seconds, 0 never expires
+                                 (defaults to the ansible.cfg
+                                 'fact_caching_timeout')
+    """
+
+    def __init__(self, path=None, timeout=None):
+        self.log = logger.getlogger()
+        self.path = path if path is not None else gen.get_fact_cache_path()
+        self.timeout = (timeout if timeout is not None
+                        else gen.get_fact_cache_timeout())
+
+    def _get_host_file(self, host):
+        return os.path.join(self.path, host)
+
+    def is_fresh(self, host):
+        """Check if unexpired facts are cached for a host
+
+        Args:
+            host (str): Ansible inventory hostname
+
+        Returns:
+            bool: True if cached facts exist and have not expired
+        """
+        try:
+            mtime = os.path.getmtime(self._get_host_file(host))
+        except OSError:
+            return False
+        return self.timeout == 0 or time.time() - mtime < self.timeout
+
+    def get_facts(self, host):
+        """Get cached facts for a host
+
+        Keys are returned without the 'ansible_' prefix (the same form
+        as the 'ansible_facts' dictionary).
+
+        Args:
+            host (str): Ansible inventory hostname
+
+        Returns:
+            dict: Cached facts or None if missing or expired
+        """
+        if not self.is_fresh(host):
+            return None
+        try:
+            with open(self._get_host_file(host)) as f:
+                facts = json.load(f)
+        except (IOError, ValueError) as exc:
+            self.log.debug(f"Unable to read cached facts for '{host}': {exc}")
+            return None
+        return {(key[8:] if key.startswith('ansible_') else key): value
+                for key, value in facts.items()}
+
+    def get_mac_to_device(self, host):
+        """Get a MAC address to interface device name map for a host
+
+        Args:
+            host (str): Ansible inventory hostname
+
+        Returns:
+            dict: Lower case MAC addresses mapped to device names (empty
+                  if facts are not cached)
+        """
+        facts = self.get_facts(host)
+        if facts is None:
+            return {}
+        mac_to_device = {}
+        for device in facts.get('interfaces', []):
+            interface = facts.get(device.replace('-', '_'), {})
+            if 'macaddress' in interface:
+                mac_to_device[interface['macaddress'].lower()] = device
+        return mac_to_device
+
+    def clear(self, host=None):
+        """Remove cached facts
+
+        Args:
+            host (str, optional): Only remove facts for this host
+        """
+        if not os.path.isdir(self.path):
+            return
+        hosts = [host] if host is not None else os.listdir(self.path)
+        for _host in hosts:
+            try:
+                os.remove(self._get_host_file(_host))
+            except OSError:
+                pass
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""Compute the firewall rules for the deployer bridges and services and
+apply only the missing changes, in one iptables-restore and one firewalld
+call each.
+"""
+
+# Copyright 2019 IBM Corp.
+#
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import lib.logger as logger
+from lib.utilities import sub_proc_exec
+
+FIREWALL_SERVICE = 'firewalld'
+FIREWALL_TIMEOUT = 60
+# FORWARD rule accepting all traffic coming into a bridge, in iptables-save
+# form ('-p all -s 0.0.0.0/0 -d 0.0.0.0/0' are implied)
+BRIDGE_RULE = '-i {} -j ACCEPT'
+
+
+def is_firewall_running(service=FIREWALL_SERVICE):
+    _, _, rc = sub_proc_exec(f'systemctl is-active --quiet {service}')
+    return rc == 0
+
+
+def get_forward_rules(save_output):
+    """Get the rules of the filter table FORWARD chain
+
+    Args:
+        save_output (str): iptables-save output
+
+    Returns:
+        list of str: Rule specifications, without '-A FORWARD'
+    """
+    table = None
+    rules = []
+    for line in save_output.splitlines():
+        if line.startswith('*'):
+            table = line[1:]
+        elif table == 'filter' and line.startswith('-A FORWARD '):
+            rules.append(line[len('-A FORWARD '):])
+    return rules
+
+
+def get_bridge_rule_changes(rules, add_bridges=(), remove_bridges=()):
+    """Compute the iptables-restore commands which make all traffic coming
+    into add_bridges forwarded and remove every FORWARD rule of
+    remove_bridges. Rules already in the wanted state need no command.
+
+    Args:
+        rules (list of str): Current FORWARD rules (see get_forward_rules)
+        add_bridges (iter of str): Bridges to forward packets from
+        remove_bridges (iter of str): Bridges to remove rules of
+
+    Returns:
+        list of str: iptables-restore commands for the filter table
+    """
+    changes = []
+    for bridge in dict.fromkeys(add_bridges):
+        rule = BRIDGE_RULE.format(bridge)
+        if rule not in rules:
+            # Insert, ahead of any reject rule at the end of the chain
+            changes.append(f'-I FORWARD {rule}')
+    remove_bridges = set(remove_bridges)
+    for rule in rules:
+        words = rule.split()
+        if any(opt in ('-i', '-o') and ifc in remove_bridges
+               for opt, ifc in zip(words, words[1:])):
+            changes.append(f'-D FORWARD {rule}')
+    return changes
+
+
+def update_bridge_rules(add_bridges=(), remove_bridges=()):
+    """Forward all packets coming into add_bridges and remove the FORWARD
+    rules of remove_bridges with one atomic 'iptables-restore --noflush'.
+    Nothing is run beyond one iptables-save if the rules are up to date.
+
+    Args:
+        add_bridges (iter of str): Bridges to forward packets from
+        remove_bridges (iter of str): Bridges to remove rules of
+
+    Returns:
+        int: Return code of iptables-restore, 0 if no changes were needed
+    """
+    log = logger.getlogger()
+    save, err, rc = sub_proc_exec('iptables-save -t filter',
+                                  timeout=FIREWALL_TIMEOUT)
+    if rc:
+        log.warning(f'Unable to read the firewall rules. Error {err}. '
+                    f'RC: {rc}')
+        return rc
+    changes = get_bridge_rule_changes(get_forward_rules(save), add_bridges,
+                                      remove_bridges)
+    if not changes:
+        log.debug('Firewall FORWARD rules are up to date')
+        return 0
+    log.debug('Updating firewall FORWARD rules:\n' + '\n'.join(changes))
+    restore = '\n'.join(['*filter'] + changes + ['COMMIT', ''])
+    _, err, rc = sub_proc_exec('iptables-restore --noflush', input=restore,
+                               timeout=FIREWALL_TIMEOUT)
+    if rc:
+        log.warning('An error occured while updating the firewall. '
+                    f'Error {err}. RC: {rc}')
+    return rc
+
+
+def add_firewalld_services(services):
+    """Allow services in the runtime and permanent firewalld configuration.
+    Services already allowed permanently are skipped, and no reload is
+    needed since the runtime configuration is changed directly.
+
+    Args:
+        services (iter of str): Service names
+
+    Returns:
+        int: Binary error code, as 'utilities.firewall_add_services'
+    """
+    log = logger.getlogger()
+    resp, err, rc = sub_proc_exec('firewall-cmd --permanent --list-services',
+                                  timeout=FIREWALL_TIMEOUT)
+    if rc:
+        log.error(f'Failed to list firewall services. Error {err}')
+        return 100
+    missing = [service for service in services
+               if service not in resp.split()]
+    if not missing:
+        log.debug('Firewall services already allowed')
+        return 0
+    add = ' '.join(f'--add-service={service}' for service in missing)
+    fw_err = 0
+    for cmd in (f'firewall-cmd --permanent {add}', f'firewall-cmd {add}'):
+        resp, err, rc = sub_proc_exec(cmd, timeout=FIREWALL_TIMEOUT)
+        if rc != 0:
+            fw_err = 100
+            log.error(f'Failed to enable {", ".join(missing)} service(s) '
+                      f'on firewall. Error {err}')
+    return fw_err
+
+
+def update_firewall(add_bridges=(), remove_bridges=(), services=()):
+    """Apply the firewall rules for all deployer bridges and services. The
+    bridge FORWARD rules are only applied while the firewall is running.
+
+    Args:
+        add_bridges (iter of str): Bridges to forward packets from
+        remove_bridges (iter of str): Bridges to remove rules of
+        services (iter of str): firewalld services to allow
+
+    Returns:
+        int: Binary error code, as 'utilities.firewall_add_services'
+    """
+    log = logger.getlogger()
+    fw_err = 0
+    running = is_firewall_running()
+    if services and not running:
+        _, _, rc = sub_proc_exec(f'systemctl enable {FIREWALL_SERVICE}')
+        if rc != 0:
+            fw_err += 1
+            log.error('Failed to enable firewall service')
+        _, _, rc = sub_proc_exec(f'systemctl start {FIREWALL_SERVICE}')
+        if rc != 0:
+            fw_err += 10
+            log.error('Failed to start firewall')
+        running = not rc
+    if services and running:
+        fw_err += add_firewalld_services(services)
+    if (add_bridges or remove_bridges) and running:
+        if update_bridge_rules(add_bridges, remove_bridges):
+            fw_err += 1000
+    return fw_err
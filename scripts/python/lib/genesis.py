@@ -19,6 +19,7 @@ import platform
 import os.path
 import re
 import yaml
+from configparser import ConfigParser
 
 
 PROJECT_NAME = "power-up"
@@ -33,7 +34,9 @@ GEN_LOGS_PATH = os.path.join(GEN_PATH, 'logs', '')
 GEN_SOFTWARE_PATH = os.path.join(GEN_PATH, 'software', '')
 GEN_SAMPLE_CONFIGS_PATH = os.path.join(GEN_PATH, 'sample-configs', '')
 NGINX_ROOT_DIR = '/srv/pup'
-OPSYS = platform.dist()[0]
+# 'distro' ids mapped to the names used by 'platform.dist'
+DISTRO_NAMES = {'ubuntu': 'Ubuntu', 'rhel': 'redhat'}
+_OPSYS = None
 DEFAULT_CONTAINER_NAME = PROJECT_NAME
 CONTAINER_PACKAGE_PATH = '/opt/' + PROJECT_NAME
 CONTAINER_ID_FILE = 'container'
@@ -45,6 +48,11 @@ PYTHON_DIR = 'python'
 OS_IMAGES_DIR = 'os-images'
 PLAYBOOKS_DIR = 'playbooks'
 HOSTS_FILE = 'hosts'
+ANSIBLE_CFG = 'ansible.cfg'
+# Ansible defaults for fact cache settings missing from ansible.cfg
+FACT_CACHE_DIR = '.facts'
+FACT_CACHE_TIMEOUT = 86400
+CACHE_DIR = '.cache'
 DYNAMIC_INVENTORY = 'inventory.py'
 CONFIG_FILE = 'config.yml'
 SSH_PRIVATE_KEY_FILE = os.path.expanduser('~/.ssh/gen')
@@ -96,6 +104,21 @@ class Color:
     endc = '\033[0m'
 
 
+def get_opsys():
+    """Get the deployer OS distribution name, as formerly returned by
+    'platform.dist()[0]' (e.g. 'Ubuntu', 'redhat' or 'centos'). The lookup
+    is deferred to first use and cached.
+    """
+    global _OPSYS
+    if _OPSYS is None:
+        if hasattr(platform, 'dist'):
+            _OPSYS = platform.dist()[0]
+        else:
+            from distro import id as distro_id
+            _OPSYS = DISTRO_NAMES.get(distro_id(), distro_id())
+    return _OPSYS
+
+
 def get_switch_lock_path():
     if is_container():
         match = re.search(r'(/\w+)/', CONTAINER_PACKAGE_PATH).group(1)
@@ -247,6 +270,41 @@ def get_hosts_file_path():
     return os.path.join(get_playbooks_path(), HOSTS_FILE)
 
 
+def get_ansible_cfg_path():
+    return os.path.join(get_playbooks_path(), ANSIBLE_CFG)
+
+
+def _get_ansible_cfg_default(option, default):
+    """Read an option of the [defaults] section of the POWER-Up
+    ansible.cfg
+    """
+    parser = ConfigParser(interpolation=None)
+    parser.read(get_ansible_cfg_path())
+    return parser.get('defaults', option, fallback=default)
+
+
+def get_fact_cache_path():
+    """Ansible fact cache directory ('fact_caching_connection' in the
+    POWER-Up ansible.cfg). Ansible resolves a relative path from the
+    directory of ansible.cfg.
+    """
+    path = _get_ansible_cfg_default('fact_caching_connection', FACT_CACHE_DIR)
+    return os.path.join(
+        os.path.normpath(os.path.join(get_playbooks_path(), path)), '')
+
+
+def get_fact_cache_timeout():
+    """Ansible fact cache TTL in seconds ('fact_caching_timeout' in the
+    POWER-Up ansible.cfg, 0 disables expiry)
+    """
+    return int(_get_ansible_cfg_default('fact_caching_timeout',
+                                        FACT_CACHE_TIMEOUT))
+
+
+def get_cache_path():
+    return os.path.join(GEN_PATH, CACHE_DIR, '')
+
+
 def get_dynamic_inventory_path():
     return os.path.join(get_python_path(), DYNAMIC_INVENTORY)
 
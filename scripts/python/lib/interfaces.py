@@ -18,11 +18,15 @@
 import argparse
 import time
 from pyroute2 import IPRoute
-import re
+from pyroute2.netlink.exceptions import NetlinkError
 
 import lib.logger as logger
+from lib.arp import find_unused_addr
 from lib.utilities import is_overlapping_addr, add_offset_to_address,\
-    get_network_size, sub_proc_exec
+    get_network_size
+
+# netlink error code of a missing interface
+ENODEV = 19
 
 
 class Interfaces(IPRoute):
@@ -32,13 +36,14 @@ class Interfaces(IPRoute):
         IPRoutes methods are overwritten.
         """
         self.log = logger.getlogger()
+        self.netns = kwargs.get('netns')
+        # Interface names keyed by link index
+        self.link_names = {}
         self.link_indcs = ()
-        for link in self.get_links():
-            self.link_indcs += (link['index'],)
         # NOTE self.ifcs is static. Active methods in this Interfaces class
         # update the self.ifcs dict.  If you make interface changes using parent
         # IPRoute methods, self.ifcs will not reflect the changes unless you
-        # refresh it as below.
+        # refresh it as below (or with update_interface for one interface).
         self.ifcs = self.get_interfaces_dict()
 
     def get_interfaces_dict(self):
@@ -46,50 +51,104 @@ class Interfaces(IPRoute):
         Top level ifcs keys are interface names. Second level key contain; state (UP/DOWN),
         type (type of interface (phys/vlan/bridge/veth/tun)), vlan (number or None),
         and addrs (tuple of addresses).
+        The dictionary is built from one dump of the links and one dump of the
+        addresses, regardless of the number of interfaces.
         """
+        links = self.get_links()
+        self.link_names = {link['index']: link.get_attr('IFLA_IFNAME')
+                           for link in links}
+        self.link_indcs = tuple(self.link_names)
+        addrs = self._get_addrs_by_label()
         ifcs = {}
-        for link in self.get_links():
-            link_name = link.get_attr('IFLA_IFNAME')
-            ifcs[link_name] = {}
-            ifcs[link_name]['addrs'] = []
-            # If this link has a slave (eg a tagged vlan ifc)
-            # thats in the host namespace then the value of the 'slave' key
-            # is the ifc name.  If the slave is not in the host namespace (ie
-            # a container, then set 'slave' to the index number.
-            if link.get_attr('IFLA_LINK'):
-                link_idx = link.get_attr('IFLA_LINK')
-                if link_idx in self.link_indcs:
-                    ifcs[link_name]['slave'] = (self.get_links(link_idx)[0].
-                                                get_attr('IFLA_IFNAME'))
-                else:
-                    ifcs[link_name]['slave'] = link_idx
-            else:
-                ifcs[link_name]['slave'] = None
+        for link in links:
+            ifcs[link.get_attr('IFLA_IFNAME')] = self._get_ifc_dict(link, addrs)
+        return ifcs
+
+    def update_interface(self, ifc):
+        """Update self.ifcs with the current state of one interface, without
+        dumping all interfaces. The interface is removed from self.ifcs if it
+        no longer exists.
+        Args:
+            ifc (str): Interface name
+        """
+        try:
+            link = self.link('get', ifname=ifc)[0]
+        except NetlinkError as exc:
+            if exc.code != ENODEV:
+                raise
+            self.ifcs.pop(ifc, None)
+            self.link_names = {idx: name for idx, name in
+                               self.link_names.items() if name != ifc}
+            self.link_indcs = tuple(self.link_names)
+            return
+        self.link_names[link['index']] = ifc
+        self.link_indcs = tuple(self.link_names)
+        addrs = self._get_addrs_by_label(index=link['index'])
+        self.ifcs[ifc] = self._get_ifc_dict(link, addrs)
+
+    def _get_link_name(self, index):
+        """Get an interface name from its link index, querying only links
+        created since the last dump
+        """
+        if index not in self.link_names:
+            self.link_names[index] = self.get_links(index)[0]\
+                .get_attr('IFLA_IFNAME')
+            self.link_indcs = tuple(self.link_names)
+        return self.link_names[index]
+
+    def _get_addrs_by_label(self, **kwarg):
+        """Get addresses from one address dump
+        Args:
+            kwarg: get_addr filters (eg index)
+        Returns:
+            dict: Lists of addresses keyed by label (interface name)
+        """
+        addrs = {}
+        for addr in self.get_addr(**kwarg):
+            label = addr.get_attr('IFA_LABEL')
+            if label is not None:
+                addrs.setdefault(label, []).append(addr.get_attr('IFA_ADDRESS'))
+        return addrs
 
-            # Get list of ipv4  addresses
-            if self.get_addr(label=link_name):
-                for idx, item in enumerate(self.get_addr(label=link_name)):
-                    ifcs[link_name]['addrs'].append(self.get_addr(label=link_name)
-                                                    [idx].get_attr('IFA_ADDRESS'))
-            ifcs[link_name]['state'] = link.get_attr('IFLA_OPERSTATE')
-            ifcs[link_name]['mac'] = link.get_attr('IFLA_ADDRESS')
-            if not link.get_attr('IFLA_LINKINFO'):
-                ifcs[link_name]['type'] = 'phys'
-                ifcs[link_name]['vlan'] = None
+    def _get_ifc_dict(self, link, addrs):
+        """Get the self.ifcs entry of one link
+        Args:
+            link (ifinfmsg): Link message
+            addrs (dict): Lists of addresses keyed by label
+        """
+        link_name = link.get_attr('IFLA_IFNAME')
+        ifc = {}
+        # Get list of ipv4  addresses
+        ifc['addrs'] = list(addrs.get(link_name, []))
+        # If this link has a slave (eg a tagged vlan ifc)
+        # thats in the host namespace then the value of the 'slave' key
+        # is the ifc name.  If the slave is not in the host namespace (ie
+        # a container, then set 'slave' to the index number.
+        link_idx = link.get_attr('IFLA_LINK')
+        if link_idx:
+            ifc['slave'] = self.link_names.get(link_idx, link_idx)
+        else:
+            ifc['slave'] = None
+        ifc['state'] = link.get_attr('IFLA_OPERSTATE')
+        ifc['mac'] = link.get_attr('IFLA_ADDRESS')
+        linkinfo = link.get_attr('IFLA_LINKINFO')
+        if not linkinfo:
+            ifc['type'] = 'phys'
+            ifc['vlan'] = None
+        else:
+            ifc['type'] = linkinfo.get_attr('IFLA_INFO_KIND')
+            if ifc['type'] == 'vlan':
+                ifc['vlan'] = linkinfo.get_attr('IFLA_INFO_DATA')\
+                    .get_attr('IFLA_VLAN_ID')
             else:
-                ifcs[link_name]['type'] = link.get_attr('IFLA_LINKINFO')\
-                    .get_attr('IFLA_INFO_KIND')
-                if link.get_attr('IFLA_LINKINFO').get_attr('IFLA_INFO_KIND') == 'vlan':
-                    ifcs[link_name]['vlan'] = link.get_attr('IFLA_LINKINFO')\
-                        .get_attr('IFLA_INFO_DATA').get_attr('IFLA_VLAN_ID')
-                else:
-                    ifcs[link_name]['vlan'] = None
-        return ifcs
+                ifc['vlan'] = None
+        return ifc
 
     def find_unused_addr_and_add_to_ifc(self, ifc, cidr, offset=4, loc='top'):
-        """ Finds an available address in the given subnet. nmap -PR is used to
-        scan the subnet on the specified interface. Searching starts at either the
-        top or the bottom of the subnet at an offset specified by offset.
+        """ Finds an available address in the given subnet. Candidate addresses
+        are ARP probed on the specified interface a window at a time (see
+        lib.arp). Searching starts at either the top or the bottom of the subnet
+        at an offset specified by offset.
         """
         status = False
         mult = 1 if loc == 'bot' else -1
@@ -101,36 +160,27 @@ class Interfaces(IPRoute):
 
         if not status:
             # Find an available address on the subnet.
-            # if no route exists, add one temporarily so the subnet can be scanned
-            routes = self.get_interfaces_routes()
-            if ifc not in routes or cidr not in routes[ifc]:
-                self.route('add', dst=cidr,
-                           oif=self.link_lookup(ifname=ifc)[0])
             # Get an address near the top of the subnet
             if loc == 'top':
                 st_addr = add_offset_to_address(cidr, get_network_size(cidr) - offset)
             else:
                 st_addr = add_offset_to_address(cidr, offset)
-            for i in range(get_network_size(cidr) - offset):
-                addr = add_offset_to_address(st_addr, mult * i)
-                cmd = f'nmap -PR {addr}'
-                res, err, rc = sub_proc_exec(cmd)
-                if not re.search(r'\d+\.\d+\.\d+\.\d+', res, re.DOTALL):
-                    # Found an unused address
-                    # First remove the temp route
-                    res = self.route('del', dst=cidr,
-                                     oif=self.link_lookup(ifname=ifc)[0])
-                    if res[0]['header']['error']:
-                        self.log.error(f'Error occurred removing route from {ifc}')
-                    # Add the address to the BMC interface
-                    self.log.info(f'Adding address {addr} to ifc {ifc}')
-                    idx = self.link_lookup(ifname=ifc)[0]
-                    self.addr('add', index=idx, address=addr,
-                              mask=int(cidr.rsplit('/')[1]))
-                    status = True
-                    break
+            candidates = (add_offset_to_address(st_addr, mult * i)
+                          for i in range(get_network_size(cidr) - offset))
+            try:
+                addr = find_unused_addr(ifc, candidates, netns=self.netns)
+            except OSError as exc:
+                self.log.error(f'Unable to ARP probe on {ifc}: {exc}')
+                addr = None
+            if addr:
+                # Add the address to the BMC interface
+                self.log.info(f'Adding address {addr} to ifc {ifc}')
+                idx = self.link_lookup(ifname=ifc)[0]
+                self.addr('add', index=idx, address=addr,
+                          mask=int(cidr.rsplit('/')[1]))
+                status = True
         # Update self.ifcs
-        self.ifcs = self.get_interfaces_dict()
+        self.update_interface(ifc)
         return status
 
     def get_interface_addresses(self, ifc):
@@ -156,8 +206,7 @@ class Interfaces(IPRoute):
         routes = self.get_routes(family=2)  # get ipv4 routes
         for route in routes:
             if not route.get_attr('RTA_GATEWAY'):  # ipv4
-                ifc_name = self.get_links(route.get_attr('RTA_OIF'))[0]\
-                    .get_attr('IFLA_IFNAME')
+                ifc_name = self._get_link_name(route.get_attr('RTA_OIF'))
                 if ifc_name not in rts:
                     rts[ifc_name] = ()
                 if route['dst_len'] != 32:
@@ -268,7 +317,7 @@ class Interfaces(IPRoute):
                 self.log.error('Failed to bring up interface {ifc} ')
                 passed = False
         # Update the interfaces dict
-        self.ifcs = self.get_interfaces_dict()
+        self.update_interface(tagged_ifc_name)
         return passed
 
     def _is_ifc_up(self, ifname):
@@ -360,6 +360,26 @@ class Inventory(object):
                     return mac, ipaddr
         return mac, ipaddr
 
+    def get_ports_mac_ip(self):
+        """Get the mac address and ip address of all inventory ports in a
+        single pass over the nodes.
+        Returns:
+            dict: (mac, ipaddr) tuples keyed by (switch, str(port)). The
+                  first ipmi or pxe entry of a port is used, matching
+                  'get_port_mac_ip'.
+        """
+        ports_mac_ip = {}
+        for node in self.inv.nodes:
+            for intf in (node.ipmi, node.pxe):
+                macs = intf.get('macs') or []
+                ipaddrs = intf.get('ipaddrs') or []
+                for idx, port in enumerate(intf.ports):
+                    mac = macs[idx] if idx < len(macs) else None
+                    ipaddr = ipaddrs[idx] if idx < len(ipaddrs) else None
+                    ports_mac_ip.setdefault((intf.switches[idx], str(port)),
+                                            (mac, ipaddr))
+        return ports_mac_ip
+
     def get_nodes_ipmi_userid(self, index=None):
         """Get nodes BMC userid
         Args:
@@ -412,6 +432,17 @@ class Inventory(object):
         self.inv.nodes[index].ipmi.ipaddrs[if_index] = ipaddr
         self.dbase.dump_inventory(self.inv)
 
+    def set_nodes_ipmi_ipaddrs(self, if_index, ipaddrs):
+        """Set IPMI interface ipaddr of multiple nodes
+        Args:
+            if_index (int): Interface index
+            ipaddrs (dict): ipaddrs keyed by list index
+        """
+
+        for index, ipaddr in ipaddrs.items():
+            self.inv.nodes[index].ipmi.ipaddrs[if_index] = ipaddr
+        self.dbase.dump_inventory(self.inv)
+
     def get_nodes_ipmi_mac(self, if_index, index=None):
         """Get nodes IPMI interface MAC address
         Args:
@@ -463,6 +494,17 @@ class Inventory(object):
         self.inv.nodes[index].pxe.ipaddrs[if_index] = ipaddr
         self.dbase.dump_inventory(self.inv)
 
+    def set_nodes_pxe_ipaddrs(self, if_index, ipaddrs):
+        """Set PXE interface ipaddr of multiple nodes
+        Args:
+            if_index (int): Interface index
+            ipaddrs (dict): ipaddrs keyed by list index
+        """
+
+        for index, ipaddr in ipaddrs.items():
+            self.inv.nodes[index].pxe.ipaddrs[if_index] = ipaddr
+        self.dbase.dump_inventory(self.inv)
+
     def get_nodes_pxe_mac(self, if_index, index=None):
         """Get nodes PXE interface MAC address
         Args:
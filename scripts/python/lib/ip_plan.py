@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""IPv4 address planning with integer arithmetic"""
+
+# Copyright 2019 IBM Corp.
+#
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import socket
+import struct
+from bisect import bisect_right
+from collections import namedtuple
+
+import lib.logger as logger
+from lib.exception import UserException
+
+MAX_IPV4 = 0xFFFFFFFF
+
+# One row of an address plan
+PlanEntry = namedtuple('PlanEntry', ['index', 'hostname', 'rack_id',
+                                     'net_type', 'mac', 'ipaddr',
+                                     'prev_ipaddr'])
+
+
+def ip_to_int(ipaddr):
+    """Convert a dotted quad IPv4 address to an integer
+
+    Raises:
+        ValueError: Invalid address
+    """
+    try:
+        return struct.unpack('!I', socket.inet_pton(socket.AF_INET,
+                                                    ipaddr.strip()))[0]
+    except (OSError, AttributeError):
+        raise ValueError(f"Invalid IPv4 address '{ipaddr}'")
+
+
+def int_to_ip(value):
+    """Convert an integer to a dotted quad IPv4 address
+
+    Raises:
+        ValueError: Value outside of the IPv4 address space
+    """
+    if not 0 <= value <= MAX_IPV4:
+        raise ValueError(f'Address value {value} outside of IPv4 space')
+    return socket.inet_ntoa(struct.pack('!I', value))
+
+
+def prefix_to_mask(prefix):
+    """Convert a prefix length to an integer netmask"""
+    prefix = int(prefix)
+    if not 0 <= prefix <= 32:
+        raise ValueError(f'Invalid IPv4 prefix length {prefix}')
+    return (MAX_IPV4 << (32 - prefix)) & MAX_IPV4
+
+
+def mask_to_prefix(mask):
+    """Convert an integer netmask to a prefix length. Non-contiguous
+    masks return 32 (the same as netaddr 'netmask_bits')."""
+    prefix = 32 - (~mask & MAX_IPV4).bit_length()
+    if prefix_to_mask(prefix) != mask:
+        return 32
+    return prefix
+
+
+def parse_network(cidr):
+    """Parse an address with an optional prefix length or netmask
+
+    Args:
+        cidr (str): 'a.b.c.d', 'a.b.c.d/nn' or 'a.b.c.d/w.x.y.z'
+
+    Returns:
+        tuple: (address int, prefix length int)
+    """
+    addr, _, prefix = str(cidr).partition('/')
+    if not prefix:
+        prefix = 32
+    elif '.' in prefix:
+        prefix = mask_to_prefix(ip_to_int(prefix))
+    else:
+        prefix = int(prefix)
+    return ip_to_int(addr), int(prefix)
+
+
+def network_range(cidr):
+    """Get the first and last address integers of a network
+
+    Args:
+        cidr (str): Address with prefix length or netmask
+
+    Returns:
+        tuple: (network address int, broadcast address int)
+    """
+    addr, prefix = parse_network(cidr)
+    mask = prefix_to_mask(prefix)
+    return addr & mask, addr | (~mask & MAX_IPV4)
+
+
+class AddressPlanner(object):
+    """Plan address assignments within one network
+
+    All requests are assigned in a single call. Addresses are handed
+    out sequentially from the start offset, skipping reserved ranges
+    (e.g. switch and deployer addresses). Existing leases are kept when
+    they are still valid so repeated runs produce the same plan. With a
+    block size every rack gets its own contiguous block of addresses,
+    in order of first appearance.
+
+    Args:
+        cidr (str): Network address with prefix length or netmask
+        start_offset (int, optional): Offset of first assignable address
+        block_size (int, optional): Addresses per rack block
+    """
+
+    def __init__(self, cidr, start_offset=0, block_size=None):
+        self.log = logger.getlogger()
+        self.network, self.broadcast = network_range(cidr)
+        self.prefix = parse_network(cidr)[1]
+        self.cidr = f'{int_to_ip(self.network)}/{self.prefix}'
+        self.first = self.network + start_offset
+        # Network and broadcast addresses are never assigned
+        self.last = (self.broadcast - 1 if self.prefix < 31
+                     else self.broadcast)
+        self.block_size = block_size
+        self._reserved = []
+        self._leases = {}
+        self.assigned = {}
+
+    def reserve(self, start, end=None):
+        """Exclude an address or an inclusive address range from planning.
+        Addresses outside of the network are ignored.
+
+        Args:
+            start (str): First address
+            end (str, optional): Last address (defaults to start)
+        """
+        _start = ip_to_int(start)
+        _end = ip_to_int(end) if end is not None else _start
+        _start = max(_start, self.network)
+        _end = min(_end, self.broadcast)
+        if _start <= _end:
+            self._reserved.append((_start, _end))
+
+    def add_lease(self, mac, ipaddr):
+        """Record an existing assignment to keep if still valid
+
+        Args:
+            mac (str): MAC address
+            ipaddr (str): Leased address
+        """
+        self._leases[mac.lower()] = ip_to_int(ipaddr)
+
+    def _merged_reserved(self):
+        merged = []
+        for start, end in sorted(self._reserved):
+            if merged and start <= merged[-1][1] + 1:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        return merged
+
+    def _get_blocks(self, requests):
+        racks = []
+        for request in requests:
+            if request[2] not in racks:
+                racks.append(request[2])
+        if not self.block_size:
+            return {rack: (self.first, self.last) for rack in racks}
+        blocks = {}
+        for index, rack in enumerate(racks):
+            start = self.first + index * self.block_size
+            end = start + self.block_size - 1
+            if end > self.last:
+                raise UserException(
+                    f"Not enough IP addresses in network '{self.cidr}' for "
+                    f"{len(racks)} rack blocks of {self.block_size}")
+            blocks[rack] = (start, end)
+        return blocks
+
+    def plan(self, requests):
+        """Assign an address to every request
+
+        Args:
+            requests (list): (key, mac, rack_id) tuples. Keys must be
+                             unique, mac and rack_id may be None.
+
+        Returns:
+            dict: Address strings keyed by request key
+
+        Raises:
+            UserException: Not enough addresses in the network or block
+        """
+        reserved = self._merged_reserved()
+        starts = [interval[0] for interval in reserved]
+
+        def reserved_end(value):
+            """Return end of reserved interval containing value or None"""
+            pos = bisect_right(starts, value) - 1
+            if pos >= 0 and value <= reserved[pos][1]:
+                return reserved[pos][1]
+            return None
+
+        blocks = self._get_blocks(requests)
+        assigned = {}
+        taken = set()
+
+        # Keep valid existing leases first so they are never reassigned
+        for key, mac, rack_id in requests:
+            value = self._leases.get(mac.lower()) if mac else None
+            if value is None:
+                continue
+            start, end = blocks[rack_id]
+            if (start <= value <= end and value not in taken and
+                    reserved_end(value) is None):
+                assigned[key] = value
+                taken.add(value)
+            else:
+                self.log.debug(f'Existing lease {int_to_ip(value)} for {mac} '
+                               f'collides or is outside of the plan range')
+
+        cursors = {rack: start for rack, (start, end) in blocks.items()}
+        for key, mac, rack_id in requests:
+            if key in assigned:
+                continue
+            value = cursors[rack_id]
+            end = blocks[rack_id][1]
+            while value <= end:
+                _end = reserved_end(value)
+                if _end is not None:
+                    value = _end + 1
+                elif value in taken:
+                    value += 1
+                else:
+                    break
+            if value > end:
+                raise UserException(
+                    f"Not enough IP addresses in network '{self.cidr}'" +
+                    (f" block for rack '{rack_id}'" if self.block_size
+                     else ''))
+            assigned[key] = value
+            taken.add(value)
+            cursors[rack_id] = value + 1
+
+        self.assigned = assigned
+        return {key: int_to_ip(value) for key, value in assigned.items()}
+
+    def get_next_ip(self):
+        """Get the address following the highest planned address
+
+        Returns:
+            str: Next IP address (e.g. the start of a DHCP pool)
+
+        Raises:
+            UserException: No more IP addresses available
+        """
+        value = max(self.assigned.values(), default=self.first - 1) + 1
+        if value > self.broadcast:
+            raise UserException(
+                f"Not enough IP addresses in network '{self.cidr}'")
+        return int_to_ip(value)
@@ -17,20 +17,63 @@
 
 from pyghmi import exceptions as pyghmi_exception
 from pyghmi.ipmi import command
+from pyghmi.ipmi import fru
 from pyghmi.ipmi.private import session
 import re
+import time
 from enum import Enum
-import yaml
 
 import lib.logger as logger
-import lib.utilities as u
+
+IPMI_PORT = 623
+# Names of the FRU holding the system serial and part number
+SYSTEM_FRU_RE = re.compile('NODE|SYS|Backplane|MP|Mainboard')
+# pyghmi FRU fields and the item names 'ipmitool fru' prints for them
+FRU_FIELDS = {
+    'Chassis type': 'Chassis Type',
+    'Chassis part number': 'Chassis Part Number',
+    'Chassis serial number': 'Chassis Serial',
+    'Board manufacture date': 'Board Mfg Date',
+    'Board manufacturer': 'Board Mfg',
+    'Board product name': 'Board Product',
+    'Board serial number': 'Board Serial',
+    'Board model': 'Board Part Number',
+    'Board FRU Id': 'Board FRU ID',
+    'Manufacturer': 'Product Manufacturer',
+    'Product name': 'Product Name',
+    'Model': 'Product Part Number',
+    'Hardware Version': 'Product Version',
+    'Serial Number': 'Product Serial',
+    'Asset Number': 'Product Asset Tag',
+    'FRU ID': 'Product FRU ID',
+}
+FRU_EXTRA_FIELDS = {'chassis_extra': 'Chassis Extra',
+                    'board_extra': 'Board Extra',
+                    'product_extra': 'Product Extra'}
+
+
+def split_host(host):
+    """Split an optional port from a BMC address
+
+    Args:
+        host (str): BMC address or 'address:port' (e.g. a simulated BMC, see
+                    'lib.bmc_simulator')
+
+    Returns:
+        tuple: address (str), UDP port (int)
+    """
+    address, _, port = host.rpartition(':')
+    if address and ':' not in address and port.isdigit():
+        return address, int(port)
+    return host, IPMI_PORT
 
 
 def login(host, username, pw, timeout=None):
     """
          Logs into the BMC and creates a session
     Args:
-         host: (str), the hostname or IP address of the bmc to log into
+         host: (str), the hostname or IP address of the bmc to log into,
+               optionally followed by ':port'
          username: (str) The user name for the bmc to log into
          pw: (str) The password for the BMC to log into
          timeout (None) : Does nothing. Provides compatibility with open_bmc
@@ -44,11 +87,21 @@ def login(host, username, pw, timeout=None):
 
     session.Session.initting_sessions = {}
     try:
-        mysess = command.Command(host, username, pw)
+        address, port = split_host(host)
+        mysess = command.Command(address, username, pw, port=port)
     except pyghmi_exception.IpmiException as exc:
         log.error(f'Failed IPMI login to BMC {host}')
         log.error(exc)
         mysess = None
+    except AttributeError as exc:
+        # pyghmi marks a rejected session broken before it records the
+        # error message. When another thread services the session (e.g.
+        # concurrent credential discovery probes) the constructor can see
+        # the broken session first and fails reading 'errormsg'.
+        if "'errormsg'" not in str(exc):
+            raise
+        log.error(f'Failed IPMI login to BMC {host}')
+        mysess = None
     return mysess
 
 
@@ -70,46 +123,40 @@ def logout(host, user, pw, bmc):
     return res
 
 
+def _get_indent(line):
+    return len(line) - len(line.lstrip(' \t'))
+
+
 def ipmi_fru2dict(fru_str):
-    """Convert the ipmitool fru output to a dictionary. The function first
-        converts the input string to yaml, then yaml load is used to create a
-        dictionary.
+    """Convert the ipmitool fru output to a dictionary in one pass. A line
+    followed by a more indented line starts a nested dictionary, named by
+    the text after its ':' (e.g. the 'FRU Device Description'), and the
+    other lines are 'name : value' items of the enclosing dictionary.
+    Values are stripped and may contain ':'. Lines without ':' (e.g.
+    'Device not present') have an empty value.
     Args:
         fru_str (str): Result of running 'ipmitool fru'
     returns: A dictionary who's keys are the FRUs
     """
-    yaml_data = []
+    fru_dict = {}
+    # Enclosing dictionaries and their indentation, innermost last
+    stack = [(-1, fru_dict)]
     lines = fru_str.splitlines()
-    for i, _line in enumerate(lines):
-        # Strip out any excess white space (including tabs) around the ':'
-        line = re.sub(r'\s*:\s*', ': ', _line)
-        # Check for blank lines
-        if re.search(r'^\s*$', line):
-            yaml_data.append(line)
+    for i, line in enumerate(lines):
+        if not line.strip():
             continue
-        if i < len(lines) - 1:
-            # If indentation is increasing on the following line, then convert
-            # the current line to a dictionary key.
-            indent = re.search(r'[ \t]*', line).span()[1]
-            next_indent = re.search(r'[ \t]*', lines[i + 1]).span()[1]
-            if next_indent > indent:
-                line = re.sub(r'\s*:\s*', ':', line)
-                # if ':' in middle of line take the second half, else
-                # take the beginning
-                if line.split(':')[1]:
-                    line = line.split(':')[1]
-                else:
-                    line = line.split(':')[0]
-                yaml_data.append(line + ':')
-            else:
-                if ':' not in line:
-                    line += ':'
-                split = line.split(':', 1)
-                # Add quotes around the value to handle non alphanumerics
-                line = split[0] + ': "' + split[1] + '"'
-                yaml_data.append(line)
-    yaml_data = '\n'.join(yaml_data)
-    return yaml.full_load(yaml_data)
+        indent = _get_indent(line)
+        while stack[-1][0] >= indent:
+            stack.pop()
+        name, _, value = line.partition(':')
+        name, value = name.strip(), value.strip()
+        if i < len(lines) - 1 and _get_indent(lines[i + 1]) > indent:
+            nested = {}
+            stack[-1][1][value or name] = nested
+            stack.append((indent, nested))
+        else:
+            stack[-1][1][name] = value
+    return fru_dict
 
 
 def extract_system_sn_pn(ipmi_fru_str):
@@ -128,82 +175,105 @@ def extract_system_info(ipmi_fru_str):
     returns:
         dictionary with system fru info
     """
-    yaml_dict = ipmi_fru2dict(ipmi_fru_str)
-    fru_item = ''
-    for item in yaml_dict:
-        for srch_item in ['NODE', 'SYS', 'Backplane', 'MP', 'Mainboard']:
-            if srch_item in item:
-                fru_item = yaml_dict[item]
-                break
-        if fru_item:
-            fru_item = {item: fru_item}
-            break
-    if not fru_item:
-        fru_item = yaml_dict
-
-    return fru_item
+    fru_dict = ipmi_fru2dict(ipmi_fru_str)
+    for item in fru_dict:
+        if SYSTEM_FRU_RE.search(item) and fru_dict[item]:
+            return {item: fru_dict[item]}
+    return fru_dict
 
 
-def get_system_inventory(host, user, pw):
-    log = logger.getlogger()
-    cmd = f'ipmitool -I lanplus -H {host} -U {user} -P {pw} fru'
-    res, err, rc = u.sub_proc_exec(cmd)
-    if rc == 0:
-        return res
-    else:
-        log.debug(f'Unable to read system information from {host}, rc: {rc}')
+def fru_info2dict(info):
+    """Convert pyghmi FRU information to the 'ipmitool fru' item names (see
+    ipmi_fru2dict). Empty fields are left out and, as with repeated ipmitool
+    items, only the last extra field of each area is kept.
+    Args:
+        info (dict): 'pyghmi.ipmi.fru.FRU' info
+    returns: A dictionary of FRU items
+    """
+    fru_dict = {}
+    for key, value in info.items():
+        if key in FRU_EXTRA_FIELDS:
+            key = FRU_EXTRA_FIELDS[key]
+            value = [item for item in value if item]
+            value = value[-1] if value else None
+        else:
+            key = FRU_FIELDS.get(key, key)
+        if isinstance(value, (bytes, bytearray)):
+            value = value.hex()
+        if value:
+            fru_dict[key] = str(value).strip()
+    return fru_dict
 
 
-def get_system_info(host, user, pw):
+def read_fru(host, bmc, fruid=0):
+    """Read a FRU on an IPMI session. The FRU data is read in a few
+    requests on the session instead of running ipmitool.
+    Args:
+        host (str): BMC address, for logging
+        bmc (pyghmi.ipmi.command object): Logged in session
+        fruid (int): FRU device id. FRU 0 describes the system.
+    returns: A dictionary of FRU items (see fru_info2dict) or None if the
+             FRU is not present or could not be read
+    """
     log = logger.getlogger()
+    try:
+        info = fru.FRU(ipmicmd=bmc, fruid=fruid).info
+    except pyghmi_exception.IpmiException as exc:
+        log.debug(f'Unable to read FRU {fruid} from {host}: {exc}')
+        return None
+    if info is None:
+        return None
+    return fru_info2dict(info)
 
-    inv = get_system_inventory(host, user, pw)
 
-    if inv:
-        sys_info = extract_system_info(inv)
-        return sys_info
-    else:
-        log.debug(f'Unable to read system information from {host}')
+def get_system_info(host, bmc, timeout=None):
+    """Read the system FRU information on an IPMI session. FRU 0 is read
+    first. If it has no chassis serial number, the FRU names (read from the
+    SDR repository) are searched as in extract_system_info.
+    Args:
+        host (str): BMC address, for logging
+        bmc (pyghmi.ipmi.command object): Logged in session
+        timeout (float, optional): Seconds after which no further FRUs are
+            read. Each request is bounded by the pyghmi session retries.
+    returns: A dictionary with one item, the system FRU, as returned by
+             extract_system_info, or None
+    """
+    log = logger.getlogger()
+    deadline = None if timeout is None else time.time() + timeout
+    info = read_fru(host, bmc)
+    if info and info.get('Chassis Serial'):
+        return {'Builtin FRU Device (ID 0)': info}
+    try:
+        for name in bmc.get_inventory_descriptions():
+            if deadline is not None and time.time() > deadline:
+                log.debug(f'Timeout reading FRU inventory from {host}')
+                break
+            if name != 'System' and SYSTEM_FRU_RE.search(name):
+                sys_info = bmc.get_inventory_of_component(name)
+                if sys_info:
+                    return {name: fru_info2dict(sys_info)}
+    except pyghmi_exception.IpmiException as exc:
+        log.debug(f'Unable to read FRU inventory from {host}: {exc}')
+    if info:
+        return {'Builtin FRU Device (ID 0)': info}
+    log.debug(f'Unable to read system information from {host}')
 
 
-def get_system_sn_pn(host, user, pw):
-    sys_info = get_system_info(host, user, pw)
+def get_system_sn_pn(host, bmc, timeout=None):
+    """Get the system serial and part number on an IPMI session
+    Args:
+        host (str): BMC address, for logging
+        bmc (pyghmi.ipmi.command object): Logged in session
+        timeout (float, optional): See get_system_info
+    returns: tuple with sn and pn, or None
+    """
+    sys_info = get_system_info(host, bmc, timeout)
     if not sys_info:
         return
     else:
         key = list(sys_info.keys())[0]
-        return (sys_info[key]['Chassis Serial'],
-                sys_info[key]['Chassis Part Number'])
-
-
-def get_system_inventory_in_background(host, user, pw):
-    """ Launches a background subprocess (using Popen) to gather fru
-    information from a target node. The reference to the subprocess class is
-    returned. The background subprocess can be polled for completion using
-    process.poll Fru information can be read using process.communicate
-
-    example:
-    p = get_system_inventory_in_background('192.168.36.21', 'ADMIN', 'admin')
-    ready = False
-    while not ready:
-        if p.poll():
-            ready = True
-    sys_inv = p.communicate()
-    sys_info = extract_system_info_from_inventory(sys_inv)  # returns dict
-    sn, pn = extract_system_sn_pn_from_inventory(sys_inv)
-    """
-    log = logger.getlogger()
-    cmd = f'ipmitool -I lanplus -H {host} -U {user} -P {pw} fru'
-    try:
-        process = u.sub_proc_launch(cmd)
-    except OSError:
-        log.error('An OS error occurred while attempting to run ipmitool fru '
-                  'cmd')
-    except ValueError:
-        log.error('An incorrect argument was passed to the subprocess running '
-                  'ipmitool')
-
-    return process
+        return (sys_info[key].get('Chassis Serial'),
+                sys_info[key].get('Chassis Part Number'))
 
 
 def chassisPower(host, op, bmc, timeout=6):
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""Read the directory tree of an ISO9660 image in place, with Rock Ridge or
+Joliet names, without extracting or mounting it
+"""
+
+# Copyright 2019 IBM Corp.
+#
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import struct
+from collections import namedtuple
+
+from lib.exception import UserException
+
+SECTOR_SIZE = 2048
+# Volume descriptors start after the 32 KB system area
+VD_START = 16
+VD_PRIMARY = 1
+VD_SUPPLEMENTARY = 2
+VD_TERMINATOR = 255
+VD_MAX = 64
+ROOT_RECORD_OFFSET = 156
+JOLIET_ESCAPES = (b'%/@', b'%/C', b'%/E')
+DIR_FLAG = 0x02
+# Rock Ridge alternate name flags
+NM_CONTINUE = 0x01
+NM_CURRENT = 0x02
+NM_PARENT = 0x04
+
+IsoEntry = namedtuple('IsoEntry', ['name', 'is_dir', 'extent', 'size'])
+
+
+def _uint32(data, offset):
+    """Read the little endian half of a both-endian 32 bit field"""
+    return struct.unpack_from('<I', data, offset)[0]
+
+
+class IsoImage(object):
+    """Directory tree of an ISO9660 image. Names are the Rock Ridge names
+    when the image has them, as 'xorriso -osirrox on' extracts them, else
+    the Joliet names, else the ISO9660 names without their version.
+
+    Args:
+        path (str): ISO file path
+
+    Raises:
+        UserException: path is not an ISO9660 image
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        try:
+            self._read_descriptors()
+        except Exception:
+            self.file.close()
+            raise
+        self._dirs = {}
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def get_digest(self):
+        """Digest identifying the image: its size and volume descriptors,
+        which hold the volume id, creation and modification times and
+        the location of the directory tree. Reads no file contents.
+
+        Returns:
+            str: sha1 hex digest
+        """
+        digest = hashlib.sha1(str(self.size).encode('utf-8'))
+        digest.update(self.descriptors)
+        return digest.hexdigest()
+
+    def listdir(self, path='/'):
+        """List the names in the directory path
+
+        Returns:
+            list of str: Sorted names
+
+        Raises:
+            UserException: path is not a directory of the image
+        """
+        entry = self._lookup(path)
+        if entry is None or not entry.is_dir:
+            raise UserException(f"Not a directory in '{self.path}': {path}")
+        return sorted(self._read_dir(entry))
+
+    def isfile(self, path):
+        entry = self._lookup(path)
+        return entry is not None and not entry.is_dir
+
+    def isdir(self, path):
+        entry = self._lookup(path)
+        return entry is not None and entry.is_dir
+
+    def walk(self, path='/'):
+        """Walk the directory tree below path, top down, like 'os.walk'
+
+        Yields:
+            tuple: Directory path (str), directory names (list of str),
+                   file names (list of str), names sorted
+        """
+        entry = self._lookup(path)
+        if entry is None or not entry.is_dir:
+            return
+        pending = [(path.rstrip('/') or '/', entry)]
+        while pending:
+            dirpath, entry = pending.pop(0)
+            entries = self._read_dir(entry)
+            dirnames = sorted(name for name, item in entries.items()
+                              if item.is_dir)
+            filenames = sorted(name for name, item in entries.items()
+                               if not item.is_dir)
+            yield dirpath, dirnames, filenames
+            pending[0:0] = [(f'{dirpath.rstrip("/")}/{name}', entries[name])
+                            for name in dirnames]
+
+    def _read(self, offset, length):
+        self.file.seek(offset)
+        return self.file.read(length)
+
+    def _read_descriptors(self):
+        """Find the primary and Joliet root directories and whether the
+        primary tree has Rock Ridge entries
+        """
+        self.file.seek(0, 2)
+        self.size = self.file.tell()
+        descriptors = []
+        primary = joliet = None
+        for sector in range(VD_START, VD_START + VD_MAX):
+            data = self._read(sector * SECTOR_SIZE, SECTOR_SIZE)
+            if len(data) < SECTOR_SIZE or data[1:6] != b'CD001':
+                break
+            descriptors.append(data)
+            if data[0] == VD_PRIMARY and primary is None:
+                primary = data
+            elif data[0] == VD_SUPPLEMENTARY and joliet is None and \
+                    any(escape in data[88:120] for escape in JOLIET_ESCAPES):
+                joliet = data
+            elif data[0] == VD_TERMINATOR:
+                break
+        if primary is None:
+            raise UserException(f"Not an ISO9660 image: '{self.path}'")
+        self.descriptors = b''.join(descriptors)
+        self.joliet = False
+        self.susp_skip = None
+        root = self._parse_record(primary[ROOT_RECORD_OFFSET:])
+        self._detect_rock_ridge(root)
+        if self.susp_skip is None and joliet is not None:
+            self.joliet = True
+            root = self._parse_record(joliet[ROOT_RECORD_OFFSET:])
+        self.root = root
+
+    def _detect_rock_ridge(self, root):
+        """Rock Ridge images start the system use area of the root '.'
+        record with a SUSP 'SP' entry
+        """
+        data = self._read(root.extent * SECTOR_SIZE, SECTOR_SIZE)
+        name_len = data[32]
+        sua = data[33 + name_len + (name_len + 1) % 2:data[0]]
+        if sua[:2] == b'SP' and sua[4:6] == b'\xbe\xef':
+            self.susp_skip = sua[6]
+
+    def _parse_record(self, record):
+        name_len = record[32]
+        return IsoEntry(record[33:33 + name_len],
+                        bool(record[25] & DIR_FLAG), _uint32(record, 2),
+                        _uint32(record, 10))
+
+    def _get_susp_entries(self, sua):
+        """Get the SUSP entries of a system use area, following
+        continuation areas
+
+        Returns:
+            list of tuple: Signature (bytes), entry data (bytes)
+        """
+        entries = []
+        areas = [sua]
+        while areas:
+            area = areas.pop(0)
+            pos = 0
+            while pos + 4 <= len(area):
+                sig, length = area[pos:pos + 2], area[pos + 2]
+                if length < 4:
+                    break
+                body = area[pos + 4:pos + length]
+                if sig == b'CE':
+                    areas.append(self._read(
+                        _uint32(body, 0) * SECTOR_SIZE + _uint32(body, 8),
+                        _uint32(body, 16)))
+                elif sig == b'ST':
+                    break
+                else:
+                    entries.append((sig, body))
+                pos += length
+        return entries
+
+    def _read_dir(self, entry):
+        """Read the entries of a directory
+
+        Returns:
+            dict: IsoEntry by name
+        """
+        if entry.extent in self._dirs:
+            return self._dirs[entry.extent]
+        data = self._read(entry.extent * SECTOR_SIZE, entry.size)
+        entries = {}
+        pos = 0
+        while pos < len(data):
+            length = data[pos]
+            if length == 0:
+                # Records do not cross sector boundaries
+                pos = (pos // SECTOR_SIZE + 1) * SECTOR_SIZE
+                continue
+            record = data[pos:pos + length]
+            pos += length
+            item = self._parse_record(record)
+            if item.name in (b'\x00', b'\x01'):
+                continue
+            name = None
+            if self.susp_skip is not None:
+                name_len = len(item.name)
+                sua = record[33 + name_len + (name_len + 1) % 2 +
+                             self.susp_skip:]
+                name, item = self._apply_rock_ridge(sua, item)
+                if item is None:
+                    continue
+            if name is None:
+                name = self._decode_name(item.name, item.is_dir)
+            entries[name] = item._replace(name=name)
+        self._dirs[entry.extent] = entries
+        return entries
+
+    def _apply_rock_ridge(self, sua, item):
+        """Get the Rock Ridge name of an entry and resolve relocated
+        directories
+
+        Returns:
+            tuple: Name (str) or None, entry or None if it is hidden
+        """
+        parts = []
+        for sig, body in self._get_susp_entries(sua):
+            if sig == b'NM' and body and \
+                    not body[0] & (NM_CURRENT | NM_PARENT):
+                parts.append(body[1:])
+            elif sig == b'RE':
+                # Relocated directory, listed at its child link
+                return None, None
+            elif sig == b'CL':
+                extent = _uint32(body, 0)
+                dot = self._read(extent * SECTOR_SIZE, SECTOR_SIZE)
+                item = item._replace(is_dir=True, extent=extent,
+                                     size=_uint32(dot, 10))
+        name = b''.join(parts).decode('utf-8', 'replace') if parts else None
+        return name, item
+
+    def _decode_name(self, raw_name, is_dir):
+        if self.joliet:
+            name = raw_name.decode('utf-16-be', 'replace')
+        else:
+            name = raw_name.decode('ascii', 'replace')
+        if not is_dir:
+            name = name.split(';')[0]
+            if name.endswith('.'):
+                name = name[:-1]
+        return name
+
+    def _lookup(self, path):
+        """Find the entry at path
+
+        Returns:
+            IsoEntry: Entry or None if path does not exist
+        """
+        entry = self.root
+        for part in path.strip('/').split('/'):
+            if not part or part == '.':
+                continue
+            if not entry.is_dir:
+                return None
+            entry = self._read_dir(entry).get(part)
+            if entry is None:
+                return None
+        return entry
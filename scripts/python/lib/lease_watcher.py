@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""Event driven dnsmasq DHCP lease tracking"""
+
+# Copyright 2019 IBM Corp.
+#
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import select
+import socket
+import stat
+import sys
+import time
+from orderedattrdict import AttrDict
+
+import lib.logger as logger
+
+FILE_PATH = os.path.dirname(os.path.abspath(__file__))
+LEASE_EVENT_SCRIPT = os.path.join(FILE_PATH, '..', 'dhcp_lease_event.py')
+POLL_INTERVAL = 1
+
+# Parsed lease files keyed by path, invalidated on inode, mtime or size
+# change
+_CACHE = {}
+
+
+def _get_signature(path):
+    try:
+        stat_ = os.stat(path)
+    except OSError:
+        return None
+    return (stat_.st_ino, stat_.st_mtime_ns, stat_.st_size)
+
+
+def parse_leases(content):
+    """Parse dnsmasq lease file content
+
+    Args:
+        content (str): Lease file content. Each line holds the expiry
+                       time, MAC, IP address, hostname and client id.
+
+    Returns:
+        AttrDict: IP addresses keyed by MAC in file order
+    """
+    mac_ip = AttrDict()
+    for line in content.splitlines():
+        fields = line.split(None, 3)
+        if len(fields) >= 3:
+            mac_ip[fields[1]] = fields[2]
+    return mac_ip
+
+
+def read_leases(path):
+    """Read a dnsmasq lease file, reusing the last parse if unchanged
+
+    Args:
+        path (str): Lease file path
+
+    Returns:
+        AttrDict: IP addresses keyed by MAC (a copy, safe to modify)
+
+    Raises:
+        IOError: Lease file can not be read
+    """
+    key = os.path.realpath(path)
+    signature = _get_signature(path)
+    cached = _CACHE.get(key)
+    if signature is None or cached is None or cached[0] != signature:
+        with open(path, 'r') as leases_file:
+            content = leases_file.read()
+        cached = (signature, parse_leases(content))
+        _CACHE[key] = cached
+    return AttrDict(cached[1])
+
+
+class LeaseWatcher(object):
+    """Live MAC to IP table of a dnsmasq lease file
+
+    Events are received on a unix datagram socket from the
+    'dhcp_lease_event.py' hook which dnsmasq runs through its
+    '--dhcp-script' option (see 'get_dnsmasq_args'). Without events
+    (e.g. a dnsmasq instance started without the hook) the lease file
+    is checked for changes every POLL_INTERVAL seconds and only
+    re-parsed when it changed.
+
+    Args:
+        leases_file (str): dnsmasq lease file path
+        socket_path (str, optional): Event socket path (defaults to the
+                                     lease file path with '.sock' added)
+    """
+
+    def __init__(self, leases_file, socket_path=None):
+        self.log = logger.getlogger()
+        self.leases_file = leases_file
+        self.socket_path = (socket_path if socket_path is not None
+                            else leases_file + '.sock')
+        self.hook_path = leases_file + '.hook'
+        self.mac_ip = AttrDict()
+        self.sock = None
+        self._signature = None
+
+    def start(self):
+        """Open the event socket and write the dnsmasq hook wrapper"""
+        if self.sock is not None:
+            return
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.bind(self.socket_path)
+        os.chmod(self.socket_path, 0o666)
+        with open(self.hook_path, 'w') as hook:
+            hook.write('#!/bin/sh\n'
+                       f'exec {sys.executable} '
+                       f'{os.path.abspath(LEASE_EVENT_SCRIPT)} '
+                       f'{self.socket_path} "$@"\n')
+        os.chmod(self.hook_path, os.stat(self.hook_path).st_mode |
+                 stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+        self.refresh()
+
+    def stop(self):
+        """Close the event socket"""
+        if self.sock is None:
+            return
+        self.sock.close()
+        self.sock = None
+        for path in (self.socket_path, self.hook_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def get_dnsmasq_args(self):
+        """Get dnsmasq options which send lease events to this watcher
+
+        Returns:
+            str: dnsmasq command line options
+        """
+        return (f'--dhcp-leasefile={self.leases_file} '
+                f'--dhcp-script={self.hook_path} --dhcp-scriptuser=root')
+
+    def refresh(self):
+        """Re-read the lease file if it changed. Leases no longer in the
+        file (expired or released) are dropped.
+
+        Returns:
+            list: MACs added or with a changed address
+        """
+        signature = _get_signature(self.leases_file)
+        if signature is None or signature == self._signature:
+            return []
+        self._signature = signature
+        try:
+            mac_ip = read_leases(self.leases_file)
+        except IOError as exc:
+            self.log.debug(f'Unable to read lease file: {exc}')
+            return []
+        new = [mac for mac, ipaddr in mac_ip.items()
+               if self.mac_ip.get(mac) != ipaddr]
+        self.mac_ip = mac_ip
+        return new
+
+    def _handle_event(self, data):
+        fields = data.decode('utf-8', 'replace').split()
+        if len(fields) < 3:
+            return []
+        action, mac, ipaddr = fields[:3]
+        self.log.debug(f'DHCP lease event: {action} {mac} {ipaddr}')
+        if action == 'del':
+            self.mac_ip.pop(mac, None)
+            return []
+        self.mac_ip[mac] = ipaddr
+        return [mac]
+
+    def wait(self, timeout):
+        """Wait until leases are granted or the timeout expires
+
+        Args:
+            timeout (float): Maximum seconds to wait
+
+        Returns:
+            list: MACs with new, changed or (with events) renewed leases.
+                  Empty on timeout.
+        """
+        end_time = time.time() + timeout
+        while True:
+            new = self.refresh()
+            remaining = end_time - time.time()
+            if new or remaining <= 0:
+                return new
+            if self.sock is None:
+                time.sleep(min(POLL_INTERVAL, remaining))
+                continue
+            ready, _, _ = select.select([self.sock], [], [],
+                                        min(POLL_INTERVAL, remaining))
+            while ready:
+                new += self._handle_event(self.sock.recv(4096))
+                ready, _, _ = select.select([self.sock], [], [], 0)
+            if new:
+                return new
+
+    def wait_for(self, count, timeout, callback=None):
+        """Wait until the table holds a number of leases
+
+        Args:
+            count (int): Number of leases to wait for
+            timeout (float): Maximum seconds to wait
+            callback (callable, optional): Called with the list of MACs
+                                           returned by each 'wait'
+
+        Returns:
+            bool: True if 'count' leases are present
+        """
+        end_time = time.time() + timeout
+        self.refresh()
+        while len(self.mac_ip) < count:
+            remaining = end_time - time.time()
+            if remaining <= 0:
+                break
+            new = self.wait(remaining)
+            if new and callback is not None:
+                callback(new)
+        return len(self.mac_ip) >= count
+
+    def get_mac_ip(self):
+        return self.mac_ip
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""Switch MAC address table parser"""
+
+# Copyright 2019 IBM Corp.
+#
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import re
+from orderedattrdict import AttrDict
+
+import lib.logger as logger
+
+# 'cc:cc:cc:cc:cc:cc' (any of '.:-' separators) or 'cccc.cccc.cccc' with
+# the common leading octet factored out of the alternation
+PATTERN_MAC = re.compile(r'[\dA-Fa-f]{2}(?:(?:[.:-][\dA-Fa-f]{2}){5}|'
+                         r'[\dA-Fa-f]{2}\.[\dA-Fa-f]{4}\.[\dA-Fa-f]{4})')
+PATTERN_PORT_HEADER = re.compile('Port', re.I)
+PATTERN_SEPARATOR = re.compile(r'--+')
+MAC_SEPARATORS = str.maketrans('', '', '.:-')
+
+
+def mac_to_int(mac):
+    """Convert a MAC address in any common notation to a 48-bit int
+
+    Args:
+        mac (str): 'cc:cc:cc:cc:cc:cc', 'cc-cc-cc-cc-cc-cc' or
+                   'cccc.cccc.cccc'
+
+    Returns:
+        int: MAC address value
+    """
+    return int(mac.translate(MAC_SEPARATORS), 16)
+
+
+def int_to_mac(value):
+    """Convert a 48-bit int to a lower case 'cc:cc:cc:cc:cc:cc' string"""
+    mac = '{:012x}'.format(value)
+    return ':'.join((mac[0:2], mac[2:4], mac[4:6], mac[6:8], mac[8:10],
+                     mac[10:12]))
+
+
+class MacAddressTable(object):
+    """Parsed switch MAC address table
+
+    Attributes:
+        port_to_macs (AttrDict): Port mapped to a list of MAC strings
+        mac_to_port (dict): 48-bit MAC int mapped to port
+    """
+
+    def __init__(self):
+        self.port_to_macs = AttrDict()
+        self.mac_to_port = {}
+
+    def add(self, port, mac, mac_value):
+        if port not in self.port_to_macs:
+            self.port_to_macs[port] = [mac]
+        else:
+            self.port_to_macs[port].append(mac)
+        self.mac_to_port[mac_value] = port
+
+    def get_port(self, mac):
+        """Get the port a MAC address was learned on
+
+        Args:
+            mac (str or int): MAC address in any notation or 48-bit int
+
+        Returns:
+            str: Port or None if the MAC is not in the table
+        """
+        if not isinstance(mac, int):
+            mac = mac_to_int(mac)
+        return self.mac_to_port.get(mac)
+
+    def __len__(self):
+        return len(self.mac_to_port)
+
+
+def parse_mac_address_table(mac_address_table, fmt='std', port_prefix=' ',
+                            sanitize=None):
+    """Parse a switch MAC address table
+
+    The table must have a header row with "Port" as a column header
+    followed by a delimiter row composed of dashes ('-') which delimit
+    columns. The port column span is taken from the delimiter row and
+    only re-evaluated if another delimiter row is found.
+
+    Args:
+        mac_address_table (str or iterable): Table text or an iterable of
+                                             lines (e.g. streamed command
+                                             output)
+        fmt (str, optional): 'std' returns MACs as lower case
+                             'cc:cc:cc:cc:cc:cc' with 'port_prefix'
+                             removed from ports, anything else keeps the
+                             native switch format
+        port_prefix (str, optional): Prefix removed from 'std' ports
+        sanitize (callable, optional): Applied to rows containing a MAC
+                                       before the port is extracted
+
+    Returns:
+        MacAddressTable: Parsed table
+    """
+    log = logger.getlogger()
+    if isinstance(mac_address_table, str):
+        mac_address_table = mac_address_table.splitlines()
+    else:
+        mac_address_table = (line.rstrip('\r\n') for line in
+                             mac_address_table)
+    std = fmt == 'std'
+    table = MacAddressTable()
+    pos = None
+    port_span = None
+
+    for line in mac_address_table:
+        match = PATTERN_MAC.search(line)
+        if match is None:
+            if '--' in line:
+                log.debug('Found header seperator row: {}'.format(line))
+                for sep in PATTERN_SEPARATOR.finditer(line):
+                    # find column aligned with 'Port'
+                    if pos is not None and sep.start() <= pos < sep.end():
+                        port_span = (sep.start() - 1, sep.end())
+            else:
+                header = PATTERN_PORT_HEADER.search(line)
+                if header:
+                    pos = header.start()
+            continue
+        if port_span is None:
+            continue
+
+        if sanitize is not None:
+            line = sanitize(line)
+        mac = match.group()
+        mac_value = mac_to_int(mac)
+        # Extract port section of row
+        port = line[port_span[0]:port_span[1]].strip(' ')
+        if std:
+            mac = int_to_mac(mac_value)
+            port = port.replace(port_prefix, '')
+        table.add(port, mac, mac_value)
+    return table
@@ -0,0 +1,441 @@
+#!/usr/bin/env python3
+"""Plan the deployer network changes for all management and client networks
+from one read of the link and address state, and apply them as one netlink
+batch which is rolled back if any change fails.
+"""
+
+# Copyright 2019 IBM Corp.
+#
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import errno
+import os
+import select
+import socket
+import struct
+import time
+from netaddr import IPNetwork
+from pyroute2 import IPBatch, IPRoute
+from pyroute2.netlink.rtnl.ifinfmsg import ifinfmsg
+
+import lib.logger as logger
+from lib.exception import UserCriticalException
+from lib.utilities import netns_socket
+
+# Seconds to wait for the acknowledgements of a batch and for links to come up
+ACK_TIMEOUT = 5
+UP_TIMEOUT = 10
+IFF_UP = 0x1
+NETLINK_ROUTE = 0
+NLMSG_ERROR = 2
+RTM_NEWLINK = 16
+RTMGRP_LINK = 0x1
+NLMSG_HDR = struct.Struct('=IHHII')
+NLMSG_ERR = struct.Struct('=i')
+SOCK_BUF_SIZE = 1 << 20
+
+
+def get_bridge_label(_type, vlan=None):
+    """Name of the bridge of a deployer network
+    Args:
+        _type (str): Network type (mgmt, pxe, ipmi)
+        vlan (int, optional): Network vlan
+    """
+    if vlan and vlan != 4095:
+        return f'br-{_type}-{vlan}'
+    return f'br-{_type}'
+
+
+def get_bridge_port(dev_label, vlan=None):
+    """Name of the interface attached to the bridge of a deployer network.
+    This is the vlan interface of dev_label for a tagged network.
+    """
+    if vlan and vlan != 4095:
+        return f'{dev_label}.{vlan}'
+    return dev_label
+
+
+def _netlink_socket(netns=None, groups=0):
+    """Open a route netlink socket in the network namespace netns"""
+    sock = netns_socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_ROUTE,
+                        netns)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCK_BUF_SIZE)
+    sock.bind((0, groups))
+    return sock
+
+
+def _get_messages(data):
+    """Split netlink data into (type, sequence number, message bytes)"""
+    offset = 0
+    while offset + NLMSG_HDR.size <= len(data):
+        length, msg_type, _, seq, _ = NLMSG_HDR.unpack_from(data, offset)
+        if length < NLMSG_HDR.size:
+            break
+        yield msg_type, seq, data[offset:offset + length]
+        offset += length
+
+
+class Change(object):
+    """One netlink request and the requests which revert it
+    Args:
+        desc (str): Description for logs and errors
+        request (tuple): IPRoute method name, command and keyword arguments
+        undo (list of tuple): Requests which revert request
+    """
+
+    def __init__(self, desc, request, undo=()):
+        self.desc = desc
+        self.request = request
+        self.undo = list(undo)
+
+    def __repr__(self):
+        return f'Change({self.desc!r})'
+
+
+class NetworkState(object):
+    """Links and IPv4 addresses read from one link dump and one address dump.
+    links is keyed by link name, with index, kind, up (admin state),
+    operstate, master (link name or None), link (parent index) and vlan_id.
+    addrs holds a list of (address, prefixlen) for each link name.
+    Args:
+        ipr (IPRoute): Netlink socket
+    """
+
+    def __init__(self, ipr):
+        links = ipr.get_links()
+        names = {link['index']: link.get_attr('IFLA_IFNAME') for link in links}
+        self.links = {}
+        for link in links:
+            self.links[link.get_attr('IFLA_IFNAME')] = {
+                'index': link['index'],
+                'kind': link.get_nested('IFLA_LINKINFO', 'IFLA_INFO_KIND'),
+                'up': bool(link['flags'] & IFF_UP),
+                'operstate': link.get_attr('IFLA_OPERSTATE'),
+                'master': names.get(link.get_attr('IFLA_MASTER')),
+                'link': link.get_attr('IFLA_LINK'),
+                'vlan_id': link.get_nested('IFLA_LINKINFO', 'IFLA_INFO_DATA',
+                                           'IFLA_VLAN_ID')}
+        self.addrs = {name: [] for name in self.links}
+        for addr in ipr.get_addr(family=socket.AF_INET):
+            name = names.get(addr['index'])
+            if name in self.addrs:
+                self.addrs[name].append((addr.get_attr('IFA_ADDRESS'),
+                                         addr['prefixlen']))
+        self.next_index = max(names, default=0) + 1
+
+    def new_index(self):
+        """Allocate an unused link index for a planned link"""
+        index = self.next_index
+        self.next_index += 1
+        return index
+
+    def get_ports(self, bridge):
+        return sorted(name for name, link in self.links.items()
+                      if link['master'] == bridge)
+
+
+class NetworkPlan(object):
+    """Changes needed to set up or tear down deployer networks. The state is
+    read once; planning a network updates the planned state, so networks
+    sharing a bridge or interface are planned correctly.
+    Args:
+        netns (str, optional): Network namespace to plan and apply in
+    """
+
+    def __init__(self, netns=None):
+        self.log = logger.getlogger()
+        self.netns = netns
+        with IPRoute(netns=netns) as ipr:
+            self.state = NetworkState(ipr)
+        self.changes = []
+        self.wait_up = []
+
+    def is_attached_elsewhere(self, ifc, bridge):
+        """Checks whether ifc is attached to a bridge other than bridge
+        Args:
+            ifc (str) interface name
+            bridge (str) name of bridge the interface is intended for
+        Returns:
+            True if the interface is already being used (is unavailable)
+        """
+        link = self.state.links.get(ifc)
+        return bool(link and link['master'] and link['master'] != bridge)
+
+    def add_network(self, dev_label, interface_ipaddr, netprefix,
+                    bridge_ipaddr=None, vlan=None, _type='mgmt'):
+        """Plan the creation of a network between the container and the
+        physical interface dev_label. Without bridge_ipaddr, interface_ipaddr
+        is added to dev_label. Otherwise addresses of the bridge subnet are
+        removed from dev_label and a bridge is created with bridge_ipaddr,
+        attached to dev_label or, for a tagged network, its vlan interface.
+        """
+        links = self.state.links
+        addrs = self.state.addrs
+        if dev_label not in links:
+            self.log.error(f'External interface {dev_label} not found')
+            raise UserCriticalException(
+                f'External interface {dev_label} not found.')
+        if not bridge_ipaddr:
+            if (interface_ipaddr, int(netprefix)) not in addrs[dev_label]:
+                self._add_addr(dev_label, interface_ipaddr, netprefix)
+            else:
+                self.log.debug(f'Address {interface_ipaddr} already exists on '
+                               f'link {dev_label}')
+            return
+
+        # Remove addresses of the bridge subnet from the external interface
+        network = IPNetwork(f'{bridge_ipaddr}/{netprefix}').network
+        for addr, prefix in list(addrs[dev_label]):
+            if IPNetwork(f'{addr}/{prefix}').network == network:
+                self._del_addr(dev_label, addr, prefix)
+
+        br_label = get_bridge_label(_type, vlan)
+        link = get_bridge_port(dev_label, vlan)
+        if link not in links:
+            self._add_link(link, kind='vlan', link=links[dev_label]['index'],
+                           vlan_id=vlan)
+        self._set_up(link)
+        if br_label not in links:
+            # No forward delay, as in the bridge config files
+            self._add_link(br_label, kind='bridge', br_forward_delay=0)
+        self._set_up(br_label)
+        if bridge_ipaddr not in [addr for addr, _ in addrs[br_label]]:
+            self._add_addr(br_label, bridge_ipaddr, netprefix)
+        self._set_master(link, br_label)
+        self.wait_up.extend(ifc for ifc in (link, br_label)
+                            if ifc not in self.wait_up)
+
+    def remove_network(self, dev_label, interface_ipaddr, netprefix,
+                       bridge_ipaddr=None, vlan=None, _type='mgmt'):
+        """Plan the removal of a network set up by add_network. The vlan
+        interface is kept if it is attached to another bridge.
+        """
+        links = self.state.links
+        addrs = self.state.addrs
+        if not bridge_ipaddr:
+            if dev_label not in links:
+                self.log.info(f'External interface {dev_label} not found')
+            elif (interface_ipaddr, int(netprefix)) in addrs[dev_label]:
+                self._del_addr(dev_label, interface_ipaddr, netprefix)
+            else:
+                self.log.debug(f'Address {interface_ipaddr} does not exist on '
+                               f'link {dev_label}')
+            return
+
+        br_label = get_bridge_label(_type, vlan)
+        link = get_bridge_port(dev_label, vlan)
+        del_link = (link in links and links[link]['kind'] == 'vlan' and
+                    not self.is_attached_elsewhere(link, br_label))
+        if br_label in links:
+            for port in self.state.get_ports(br_label):
+                self._set_master(port, None)
+        if del_link:
+            self._del_link(link)
+        if br_label in links:
+            for addr, prefix in list(addrs[br_label]):
+                self._del_addr(br_label, addr, prefix)
+            self._del_link(br_label)
+
+    def apply(self, timeout=UP_TIMEOUT):
+        """Send all planned changes as one netlink batch and wait for the
+        planned interfaces to come up. If any change fails or an interface
+        does not come up, the applied changes are reverted.
+        Args:
+            timeout (int, optional): Seconds to wait for interfaces to be up
+        Raises:
+            UserCriticalException: The changes were not applied
+        """
+        if not self.changes:
+            self.log.debug('No deployer network changes needed')
+            return
+        for change in self.changes:
+            self.log.debug(f'Planned: {change.desc}')
+        events = _netlink_socket(self.netns, RTMGRP_LINK)
+        try:
+            errors = self._send([change.request for change in self.changes])
+            applied = [change for change, err in zip(self.changes, errors)
+                       if not err]
+            failed = [(change, err) for change, err in
+                      zip(self.changes, errors) if err]
+            if failed:
+                change, err = failed[0]
+                msg = f'Failed to {change.desc}: {os.strerror(-err)}'
+                self.log.error(msg)
+                self._rollback(applied)
+                raise UserCriticalException(msg)
+            down = self._wait_for_up(events, timeout)
+        finally:
+            events.close()
+        if down:
+            msg = f'Failed to bring up interface {", ".join(down)}'
+            self.log.error(msg)
+            self._rollback(applied)
+            raise UserCriticalException(msg)
+        self.log.info(f'Applied {len(applied)} deployer network changes')
+
+    def _add_change(self, desc, request, undo):
+        self.changes.append(Change(desc, request, undo))
+
+    def _add_link(self, name, **kwarg):
+        index = self.state.new_index()
+        self._add_change(f'create {kwarg["kind"]} interface {name}',
+                         ('link', 'add', dict(index=index, ifname=name,
+                                              **kwarg)),
+                         [('link', 'del', {'index': index})])
+        self.state.links[name] = {
+            'index': index, 'kind': kwarg['kind'], 'up': False,
+            'operstate': 'DOWN', 'master': None, 'link': kwarg.get('link'),
+            'vlan_id': kwarg.get('vlan_id')}
+        self.state.addrs[name] = []
+
+    def _del_link(self, name):
+        link = self.state.links.pop(name)
+        self.state.addrs.pop(name)
+        kwarg = {'index': link['index'], 'ifname': name, 'kind': link['kind']}
+        if link['kind'] == 'vlan':
+            kwarg.update(link=link['link'], vlan_id=link['vlan_id'])
+        undo = [('link', 'add', kwarg)]
+        if link['up']:
+            undo.append(('link', 'set', {'index': link['index'],
+                                         'state': 'up'}))
+        self._add_change(f'delete interface {name}',
+                         ('link', 'del', {'index': link['index']}), undo)
+
+    def _set_up(self, name):
+        link = self.state.links[name]
+        if link['up']:
+            return
+        self._add_change(f'bring up interface {name}',
+                         ('link', 'set', {'index': link['index'],
+                                          'state': 'up'}),
+                         [('link', 'set', {'index': link['index'],
+                                           'state': 'down'})])
+        link['up'] = True
+
+    def _set_master(self, name, master):
+        """Attach interface name to bridge master, or release it from its
+        bridge if master is None
+        """
+        link = self.state.links[name]
+        if link['master'] == master:
+            return
+        prev = link['master']
+        prev_index = self.state.links[prev]['index'] if prev else 0
+        index = self.state.links[master]['index'] if master else 0
+        desc = (f'attach {name} to bridge {master}' if master else
+                f'release {name} from bridge {prev}')
+        self._add_change(desc,
+                         ('link', 'set', {'index': link['index'],
+                                          'master': index}),
+                         [('link', 'set', {'index': link['index'],
+                                           'master': prev_index})])
+        link['master'] = master
+
+    def _add_addr(self, name, addr, prefix):
+        kwarg = {'index': self.state.links[name]['index'], 'address': addr,
+                 'prefixlen': int(prefix)}
+        self._add_change(f'add address {addr}/{prefix} to {name}',
+                         ('addr', 'add', kwarg), [('addr', 'del', kwarg)])
+        self.state.addrs[name].append((addr, int(prefix)))
+
+    def _del_addr(self, name, addr, prefix):
+        kwarg = {'index': self.state.links[name]['index'], 'address': addr,
+                 'prefixlen': int(prefix)}
+        self._add_change(f'remove address {addr}/{prefix} from {name}',
+                         ('addr', 'del', kwarg), [('addr', 'add', kwarg)])
+        self.state.addrs[name].remove((addr, int(prefix)))
+
+    def _send(self, requests):
+        """Send requests as one netlink batch. The kernel processes every
+        request in the batch, acknowledging each one.
+        Returns:
+            list of int: Error (negative errno) or 0 for each request
+        """
+        ipb = IPBatch()
+        batch = bytearray()
+        try:
+            for seq, (method, command, kwarg) in enumerate(requests, 1):
+                ipb.reset()
+                getattr(ipb, method)(command, **kwarg)
+                msg = bytearray(ipb.batch)
+                # Number the messages by request, to match acknowledgements
+                offset = 0
+                while offset < len(msg):
+                    length = NLMSG_HDR.unpack_from(msg, offset)[0]
+                    struct.pack_into('=II', msg, offset + 8, seq, 0)
+                    offset += length
+                batch += msg
+        finally:
+            ipb.close()
+
+        errors = [None] * len(requests)
+        sock = _netlink_socket(self.netns)
+        try:
+            sock.sendto(bytes(batch), (0, 0))
+            deadline = time.time() + ACK_TIMEOUT
+            while None in errors:
+                remaining = deadline - time.time()
+                if (remaining <= 0 or
+                        not select.select([sock], [], [], remaining)[0]):
+                    break
+                for msg_type, seq, data in _get_messages(sock.recv(65536)):
+                    if msg_type == NLMSG_ERROR and 0 < seq <= len(requests):
+                        err = NLMSG_ERR.unpack_from(data, NLMSG_HDR.size)[0]
+                        errors[seq - 1] = errors[seq - 1] or err
+        finally:
+            sock.close()
+        # Unacknowledged requests are reported as timed out
+        return [-errno.ETIMEDOUT if err is None else err for err in errors]
+
+    def _rollback(self, applied):
+        """Revert applied changes, newest first"""
+        requests = [undo for change in reversed(applied)
+                    for undo in change.undo]
+        if not requests:
+            return
+        self.log.info(f'Reverting {len(applied)} deployer network changes')
+        for request, err in zip(requests, self._send(requests)):
+            if err:
+                self.log.error(f'Failed to revert {request}: '
+                               f'{os.strerror(-err)}')
+
+    def _wait_for_up(self, events, timeout):
+        """Wait for the planned interfaces to be operationally up, using the
+        link events received on events after the current state.
+        Returns:
+            list of str: Interfaces which are not up
+        """
+        pending = set(self.wait_up)
+        with IPRoute(netns=self.netns) as ipr:
+            for link in ipr.get_links():
+                if link.get_attr('IFLA_OPERSTATE') == 'UP':
+                    pending.discard(link.get_attr('IFLA_IFNAME'))
+        if pending:
+            self.log.info(f'Waiting for interface(s) {", ".join(pending)} '
+                          'to come up')
+        deadline = time.time() + timeout
+        while pending:
+            remaining = deadline - time.time()
+            if (remaining <= 0 or
+                    not select.select([events], [], [], remaining)[0]):
+                break
+            for msg_type, _, data in _get_messages(events.recv(65536)):
+                if msg_type != RTM_NEWLINK:
+                    continue
+                msg = ifinfmsg(data)
+                msg.decode()
+                if msg.get_attr('IFLA_OPERSTATE') == 'UP':
+                    pending.discard(msg.get_attr('IFLA_IFNAME'))
+        return sorted(pending)
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""Incremental correlation of discovered node addresses and switch ports"""
+
+# Copyright 2019 IBM Corp.
+#
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from collections import namedtuple
+from orderedattrdict import AttrDict
+
+import lib.logger as logger
+
+# One row of the published node table
+NodePort = namedtuple('NodePort', ['in_inventory', 'switch', 'port', 'mac',
+                                   'ipaddr', 'port_type'])
+
+# Node template port slot defined in the config file
+PortSlot = namedtuple('PortSlot', ['template', 'switch', 'port', 'port_type'])
+
+
+class NodeCorrelator(object):
+    """Hash joined discovery tables
+
+    DHCP leases, switch MAC address table snapshots, BMC FRU data and
+    inventory entries are fed in as they become available. Each feed
+    only updates its own index, so all lookups and the node table are
+    hash joins instead of nested scans.
+
+    Indices:
+        mac_ip: MAC -> leased IP address
+        ip_mac: leased IP address -> MAC
+        mac_port: MAC -> (switch, port)
+        port_macs: (switch, port) -> list of MACs
+        slots: (switch, port) -> PortSlot (config node template ports)
+        templates: Node template labels in config order
+        inventory: (switch, port) -> (MAC, IP address) from inventory
+        fru: MAC -> FRU data
+
+    Ports are always keyed as strings.
+    """
+
+    def __init__(self):
+        self.log = logger.getlogger()
+        self.mac_ip = {}
+        self.ip_mac = {}
+        self.mac_port = {}
+        self.port_macs = {}
+        self.slots = AttrDict()
+        self.templates = []
+        self.inventory = {}
+        self.fru = {}
+
+    def update_leases(self, mac_ip):
+        """Replace the DHCP lease table. Leases missing from mac_ip
+        (expired or released) are dropped.
+
+        Args:
+            mac_ip (dict): IP addresses keyed by MAC, all current leases
+                           (e.g. 'read_leases' or 'LeaseWatcher.get_mac_ip')
+        """
+        self.mac_ip = dict(mac_ip)
+        self.ip_mac = {ipaddr: mac for mac, ipaddr in self.mac_ip.items()}
+
+    def remove_lease(self, mac):
+        """Remove a released or expired DHCP lease"""
+        ipaddr = self.mac_ip.pop(mac, None)
+        if ipaddr is not None and self.ip_mac.get(ipaddr) == mac:
+            del self.ip_mac[ipaddr]
+
+    def update_mac_table(self, switch, port_to_macs):
+        """Replace the MAC address table snapshot of a switch
+
+        Args:
+            switch (str): Switch label
+            port_to_macs (dict): Lists of 'std' format MACs keyed by port
+                                 (e.g. 'show_mac_address_table(format='std')')
+        """
+        for key in [key for key in self.port_macs if key[0] == switch]:
+            for mac in self.port_macs.pop(key):
+                if self.mac_port.get(mac) == key:
+                    del self.mac_port[mac]
+        for port, macs in port_to_macs.items():
+            key = (switch, str(port))
+            self.port_macs[key] = list(macs)
+            for mac in macs:
+                # A MAC learned on a node template port takes precedence
+                # over the same MAC seen on an uplink or unused port
+                if key in self.slots or self.mac_port.get(mac) not in \
+                        self.slots:
+                    self.mac_port[mac] = key
+
+    def update_fru(self, mac, fru):
+        """Add BMC FRU data (e.g. serial and part numbers)
+
+        Args:
+            mac (str): BMC MAC address
+            fru (dict): FRU data
+        """
+        self.fru[mac] = fru
+
+    def update_inventory(self, ports_mac_ip):
+        """Replace the inventory port index
+
+        Args:
+            ports_mac_ip (dict): (MAC, IP address) keyed by (switch, port)
+                                 (see 'Inventory.get_ports_mac_ip')
+        """
+        self.inventory = {(switch, str(port)): value
+                          for (switch, port), value in ports_mac_ip.items()}
+
+    def add_slot(self, template, switch, port, port_type):
+        """Add a node template port slot"""
+        if template not in self.templates:
+            self.templates.append(template)
+        key = (switch, str(port))
+        self.slots[key] = PortSlot(template, switch, port, port_type)
+
+    def add_config_slots(self, cfg, port_type):
+        """Add the node template port slots of a config file
+
+        Args:
+            cfg (Config): Config object
+            port_type (str): 'ipmi' or 'pxe'
+        """
+        for template in cfg.model.templates:
+            if template not in self.templates:
+                self.templates.append(template)
+        for tmpl_port in cfg.model.template_ports:
+            if tmpl_port.if_type == port_type:
+                self.add_slot(tmpl_port.template, tmpl_port.switch,
+                              tmpl_port.port, port_type)
+
+    def get_ip(self, mac):
+        """Get the leased IP address of a MAC or None"""
+        return self.mac_ip.get(mac)
+
+    def get_mac(self, ipaddr):
+        """Get the MAC holding a leased IP address or None"""
+        return self.ip_mac.get(ipaddr)
+
+    def get_port(self, mac):
+        """Get the (switch, port) a MAC was learned on or None"""
+        return self.mac_port.get(mac)
+
+    def get_port_macs(self, switch, port):
+        """Get MACs learned on a switch port"""
+        return self.port_macs.get((switch, str(port)), [])
+
+    def get_slot(self, switch, port):
+        """Get the node template port slot of a switch port or None"""
+        return self.slots.get((switch, str(port)))
+
+    def get_fru(self, mac):
+        """Get FRU data of a BMC or None"""
+        return self.fru.get(mac)
+
+    def get_leased_port_macs(self, switches=None):
+        """Get switch ports with a leased MAC
+
+        Args:
+            switches (iterable, optional): Switch labels to include even
+                                           if no port has a leased MAC
+
+        Returns:
+            AttrDict: Switch{Port}{[MAC]} holding the last leased MAC of
+                      each port (the format used by 'Inventory.add_macs_*')
+        """
+        port_macs = AttrDict()
+        for switch in switches or []:
+            port_macs[switch] = AttrDict()
+        for (switch, port), macs in self.port_macs.items():
+            leased = [mac for mac in macs if mac in self.mac_ip]
+            if leased:
+                port_macs.setdefault(switch, AttrDict())[port] = leased[-1:]
+        return port_macs
+
+    def get_node_table(self, port_type=None):
+        """Get the current node table
+
+        Args:
+            port_type (str, optional): Only include 'ipmi' or 'pxe' slots
+
+        Returns:
+            tuple: (dict of NodePort lists keyed by node template label,
+                   number of slots defined in inventory, number of slots)
+        """
+        node_table = {template: [] for template in self.templates}
+        ports_found = 0
+        ports_total = 0
+        for key, slot in self.slots.items():
+            if port_type is not None and slot.port_type != port_type:
+                continue
+            rows = node_table.setdefault(slot.template, [])
+            ports_total += 1
+            mac, ipaddr = self.inventory.get(key, (None, None))
+            if mac is not None and ipaddr is not None:
+                ports_found += 1
+                rows.append(NodePort(True, slot.switch, slot.port, mac,
+                                     ipaddr, slot.port_type))
+                continue
+            leased = [mac for mac in self.port_macs.get(key, [])
+                      if mac in self.mac_ip]
+            if not leased:
+                rows.append(NodePort(False, slot.switch, slot.port, '-', '-',
+                                     slot.port_type))
+            for mac in leased[-1:]:
+                rows.append(NodePort(False, slot.switch, slot.port, mac,
+                                     self.mac_ip[mac], slot.port_type))
+        return node_table, ports_found, ports_total
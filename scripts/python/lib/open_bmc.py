@@ -17,10 +17,33 @@
 
 import requests
 import json
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
 
 import lib.logger as logger
 
+OBMC_PATH = '/xyz/openbmc_project'
+# Object paths of the snapshot facts. Older firmware keeps the boot
+# settings on the 'boot' object only.
+CHASSIS_STATE_PATH = f'{OBMC_PATH}/state/chassis0'
+HOST_STATE_PATH = f'{OBMC_PATH}/state/host0'
+BMC_STATE_PATH = f'{OBMC_PATH}/state/bmc0'
+BOOT_PATHS = (f'{OBMC_PATH}/control/host0/boot/one_time',
+              f'{OBMC_PATH}/control/host0/boot')
+SYSTEM_PATH = f'{OBMC_PATH}/inventory/system'
+SOFTWARE_PATH = f'{OBMC_PATH}/software/'
+# Subtrees enumerated for a snapshot. Enumerating the whole object tree
+# would also return every sensor and logging entry, and no smaller subtree
+# holds them all.
+SNAPSHOT_PATHS = (f'{OBMC_PATH}/state', f'{OBMC_PATH}/control/host0',
+                  f'{OBMC_PATH}/software', SYSTEM_PATH)
+
+BmcSnapshot = namedtuple('BmcSnapshot', ['power_state', 'host_state',
+                                         'bmc_state', 'boot_source',
+                                         'boot_mode', 'serial_number',
+                                         'part_number', 'fw_activating'])
+
 
 def login(host, username, pw, timeout=10):
     """
@@ -343,14 +366,39 @@ def checkFWactivation(host, session):
         log.error(f'BMC connection error. {exc}')
         return True
     fwInfo = json.loads(resp.text)['data']
-    for key in fwInfo:
-        if 'Activation' in fwInfo[key]:
-            if 'Activating' in (fwInfo[key]['Activation'],
-                                fwInfo[key]['RequestedActivation']):
+    return _is_fw_activating(fwInfo)
+
+
+def _is_fw_activating(objects):
+    """Check software objects for an image that is being activated
+
+    Args:
+        objects (dict): Object properties by path
+
+    Returns:
+        bool: True if an image is being activated
+    """
+    for props in objects.values():
+        if 'Activation' in props:
+            if 'activating' in (_get_enum_value(props['Activation']),
+                                _get_enum_value(
+                                    props.get('RequestedActivation'))):
                 return True
     return False
 
 
+def _get_enum_value(value):
+    """Get the last component of a D-Bus enum value, in lower case
+
+    Returns:
+        str: e.g. 'on' for 'xyz.openbmc_project.State.Chassis.PowerState.On'
+             or None if value is not set
+    """
+    if not value:
+        return None
+    return value.split('.')[-1].lower()
+
+
 def get_system_info(host, session, timeout=5):
     log = logger.getlogger()
 
@@ -413,6 +461,101 @@ def get_system_sn_pn(host, session, timeout=5):
     return res
 
 
+def extract_snapshot(objects):
+    """Extract the BMC state snapshot from enumerated objects
+
+    Args:
+        objects (dict): Object properties by path, as returned in the data
+                        of an 'enumerate' request
+
+    Returns:
+        BmcSnapshot: Enum values in lower case, as returned by the single
+                     fact getters. Facts missing from objects are None.
+    """
+    def get(path, prop):
+        return objects.get(path, {}).get(prop)
+
+    boot = next((objects[path] for path in BOOT_PATHS
+                 if 'BootSource' in objects.get(path, {})), {})
+    software = {path: props for path, props in objects.items()
+                if path.startswith(SOFTWARE_PATH)}
+    return BmcSnapshot(
+        power_state=_get_enum_value(get(CHASSIS_STATE_PATH,
+                                        'CurrentPowerState')),
+        host_state=_get_enum_value(get(HOST_STATE_PATH, 'CurrentHostState')),
+        bmc_state=_get_enum_value(get(BMC_STATE_PATH, 'CurrentBMCState')),
+        boot_source=_get_enum_value(boot.get('BootSource')),
+        boot_mode=_get_enum_value(boot.get('BootMode')),
+        serial_number=get(SYSTEM_PATH, 'SerialNumber'),
+        part_number=get(SYSTEM_PATH, 'Model'),
+        fw_activating=_is_fw_activating(software))
+
+
+def _enumerate(host, session, path, timeout):
+    """Get the objects of a subtree with one 'enumerate' request
+
+    Returns:
+        dict: Object properties by path or None if the request failed
+    """
+    log = logger.getlogger()
+
+    url = f"https://{host}{path}/enumerate"
+    httpHeader = {'Content-Type': 'application/json'}
+    try:
+        res = session.get(url, headers=httpHeader, verify=False,
+                          timeout=timeout)
+    except (requests.exceptions.Timeout) as exc:
+        log.debug(f'BMC request timeout error. Host: {host}')
+        log.debug(exc)
+        return None
+    except (requests.exceptions.ConnectionError) as exc:
+        log.debug(f'BMC request connection error. Host: {host}')
+        log.debug(exc)
+        return None
+    try:
+        res = json.loads(res.text)
+        if res['status'] != 'ok':
+            log.debug(f'BMC enumerate request failed. Host: {host} {path} '
+                      f'{res["data"]["description"]}')
+            return None
+        return dict(res['data'])
+    except (json.JSONDecodeError, KeyError, TypeError, ValueError,
+            AttributeError) as exc:
+        log.error(f'Error in JSON response from BMC {host}')
+        log.debug(exc)
+        return None
+
+
+def get_snapshot(host, session, timeout=10):
+    """Get the power, boot, inventory and firmware state of a host with
+    one 'enumerate' request per subtree (SNAPSHOT_PATHS) instead of one
+    request per fact. The subtrees are requested concurrently, so a
+    snapshot takes about one request time and at most about timeout.
+
+    Args:
+        host(str): host ip or name
+        session(session object instance)
+        timeout (int): Request timeout in seconds
+
+    Returns:
+        BmcSnapshot: BMC state or None if a request failed
+    """
+    log = logger.getlogger()
+
+    with ThreadPoolExecutor(max_workers=len(SNAPSHOT_PATHS)) as executor:
+        subtrees = list(executor.map(
+            lambda path: _enumerate(host, session, path, timeout),
+            SNAPSHOT_PATHS))
+    if None in subtrees:
+        return None
+    objects = {}
+    for subtree in subtrees:
+        objects.update(subtree)
+    snapshot = extract_snapshot(objects)
+    log.debug(f'BMC snapshot: {snapshot}')
+    return snapshot
+
+
 def bmcPowerState(host, session, timeout):
     log = logger.getlogger()
 
@@ -36,8 +36,8 @@ class SSH(object):
     def __init__(self):
         self.log = logger.getlogger()
 
-    def exec_cmd(self, ip_addr, username, password, cmd,
-                 ssh_log=False, look_for_keys=True, key_filename=None):
+    def _connect(self, ip_addr, username, password, ssh_log=False,
+                 look_for_keys=True, key_filename=None, port=None):
         self.ssh_log = SSH_LOG
         if ssh_log and logger.is_log_level_file_debug():
             paramiko.util.log_to_file(self.ssh_log)
@@ -48,7 +48,7 @@ class SSH(object):
         try:
             ssh.connect(
                 ip_addr,
-                port=self.SWITCH_PORT,
+                port=self.SWITCH_PORT if port is None else port,
                 username=username,
                 password=password,
                 look_for_keys=look_for_keys,
@@ -62,6 +62,13 @@ class SSH(object):
             self.log.error('%s: %s' % (ip_addr, str(exc)))
             raise SSH_Exception('SSH connection Failure - {}'.format(exc))
             # sys.exit(1)
+        return ssh
+
+    def exec_cmd(self, ip_addr, username, password, cmd,
+                 ssh_log=False, look_for_keys=True, key_filename=None,
+                 port=None):
+        ssh = self._connect(ip_addr, username, password, ssh_log,
+                            look_for_keys, key_filename, port)
         try:
             _, stdout, stderr = ssh.exec_command(cmd)
         except paramiko.SSHException as exc:
@@ -73,6 +80,29 @@ class SSH(object):
         ssh.close()
         return status, stdout_, stderr_
 
+    def exec_cmd_lines(self, ip_addr, username, password, cmd,
+                       ssh_log=False, look_for_keys=True, key_filename=None,
+                       port=None):
+        """Run a command and yield stdout lines as they are received
+
+        The connection is closed when the generator is exhausted or
+        closed.
+
+        Returns:
+            iter of str: Decoded stdout lines
+        """
+        ssh = self._connect(ip_addr, username, password, ssh_log,
+                            look_for_keys, key_filename, port)
+        try:
+            _, stdout, _ = ssh.exec_command(cmd)
+            for line in stdout:
+                yield line
+        except paramiko.SSHException as exc:
+            self.log.error('%s: %s' % (ip_addr, str(exc)))
+            raise SSH_Exception('SSH command Failure - {}'.format(exc))
+        finally:
+            ssh.close()
+
 
 class SSH_CONNECTION(paramiko.SSHClient):
     """Returns a connected paramiko SSHClient
@@ -19,7 +19,6 @@ import stat
 import subprocess
 import re
 import netaddr
-from orderedattrdict import AttrDict
 from enum import Enum
 from filelock import Timeout, FileLock
 from socket import gethostbyname
@@ -27,7 +26,9 @@ from time import sleep
 from random import random
 
 import lib.logger as logger
+import lib.trace as trace
 from lib.ssh import SSH
+from lib.mac_table import parse_mac_address_table
 from lib.switch_exception import SwitchException
 from lib.genesis import get_switch_lock_path
 
@@ -36,6 +37,8 @@ SWITCH_LOCK_PATH = get_switch_lock_path()
 
 
 class SwitchCommon(object):
+    # Switch CLI SSH port (see 'lib.switch_simulator' for simulated switches)
+    SSH_PORT = SSH.SWITCH_PORT
     ENABLE_REMOTE_CONFIG = 'configure terminal ; {} '
     IFC_ETH_CFG = 'interface ethernet {} '
     IFC_PORT_CH_CFG = 'interface port-channel {} '
@@ -92,13 +95,15 @@ class SwitchCommon(object):
         HYBRID = ''
         TRUNK_NATIVE = ''
 
-    def send_cmd(self, cmd):
-        if self.mode == 'passive':
-            f = open(self.outfile, 'a+')
-            f.write(cmd + '\n')
-            f.close()
-            return
+    def _acquire_lock(self):
+        """Acquire the per switch command lock
+
+        Returns:
+            FileLock: Acquired lock
 
+        Raises:
+            SwitchException: Lock could not be acquired
+        """
         host_ip = gethostbyname(self.host)
         lockfile = os.path.join(SWITCH_LOCK_PATH, host_ip + '.lock')
         if not os.path.isfile(lockfile):
@@ -116,28 +121,68 @@ class SwitchCommon(object):
                 sleep(0.01)  # give switch a chance to close out comms
             except Timeout:
                 pass
+        if not lock.is_locked:
+            self.log.error('Unable to acquire lock for switch {}'.format(self.host))
+            raise SwitchException('Unable to acquire lock for switch {}'.
+                                  format(self.host))
+        return lock
+
+    def _release_lock(self, lock):
+        lock.release()
+        # sleep 60 ms to give other processes a chance.
+        sleep(0.06 + random() / 100)  # lock acquire polls at 50 ms
         if lock.is_locked:
+            self.log.error('Lock is locked. Should be unlocked')
+
+    @trace.traced(trace.SWITCH, host_attr='host')
+    def send_cmd(self, cmd):
+        if self.mode == 'passive':
+            f = open(self.outfile, 'a+')
+            f.write(cmd + '\n')
+            f.close()
+            return
+
+        lock = self._acquire_lock()
+        if self.ENABLE_REMOTE_CONFIG:
+            cmd = self.ENABLE_REMOTE_CONFIG.format(cmd)
+            self.log.debug(cmd)
+        ssh = SSH()
+        __, data, _ = ssh.exec_cmd(
+            self.host,
+            self.userid,
+            self.password,
+            cmd,
+            ssh_log=True,
+            look_for_keys=False,
+            port=self.SSH_PORT)
+        self._release_lock(lock)
+        return data.decode("utf-8")
+
+    def send_cmd_lines(self, cmd):
+        """Send a command and yield output lines as they are received.
+        The switch lock is held until the generator is exhausted or
+        closed.
+
+        Returns:
+            iter of str: Output lines
+        """
+        lock = self._acquire_lock()
+        try:
             if self.ENABLE_REMOTE_CONFIG:
                 cmd = self.ENABLE_REMOTE_CONFIG.format(cmd)
                 self.log.debug(cmd)
             ssh = SSH()
-            __, data, _ = ssh.exec_cmd(
-                self.host,
-                self.userid,
-                self.password,
-                cmd,
-                ssh_log=True,
-                look_for_keys=False)
-            lock.release()
-            # sleep 60 ms to give other processes a chance.
-            sleep(0.06 + random() / 100)  # lock acquire polls at 50 ms
-            if lock.is_locked:
-                self.log.error('Lock is locked. Should be unlocked')
-            return data.decode("utf-8")
-        else:
-            self.log.error('Unable to acquire lock for switch {}'.format(self.host))
-            raise SwitchException('Unable to acquire lock for switch {}'.
-                                  format(self.host))
+            for line in ssh.exec_cmd_lines(
+                    self.host,
+                    self.userid,
+                    self.password,
+                    cmd,
+                    ssh_log=True,
+                    look_for_keys=False,
+                    port=self.SSH_PORT):
+                yield line
+        finally:
+            self._release_lock(lock)
 
     def get_enums(self):
         return self.PortMode, self.AllowOp
@@ -368,12 +413,15 @@ class SwitchCommon(object):
 
         Args:
             format (boolean) : set to 'dict' or 'std' to return a dictionary
+                               or 'table' to return a MacAddressTable
         Returns:
             raw string if format=False
             dictionary of ports and mac address values in native switch form
             if format = 'dict'.
             ordered dictionary of ports and mac address values in a standard
             format if fmt = 'std'.
+            MacAddressTable with 'std' format ports and macs and a mac to
+            port index if format = 'table'.
         """
         if self.mode == 'passive':
             mac_info = {}
@@ -388,10 +436,13 @@ class SwitchCommon(object):
             mac_info = self.get_port_to_mac(mac_info)
             return mac_info
 
-        mac_info = self.send_cmd(self.SHOW_MAC_ADDRESS_TABLE)
         if not format or format == 'raw':
-            return mac_info
-        return self.get_port_to_mac(mac_info, format, self.PORT_PREFIX)
+            return self.send_cmd(self.SHOW_MAC_ADDRESS_TABLE)
+        lines = self.send_cmd_lines(self.SHOW_MAC_ADDRESS_TABLE)
+        if format == 'table':
+            return parse_mac_address_table(lines, 'std', self.PORT_PREFIX,
+                                           self.sanitize_line)
+        return self.get_port_to_mac(lines, format, self.PORT_PREFIX)
 
     def clear_mac_address_table(self):
         """Clear switch mac address table by writing the CLEAR_MAC_ADDRESS_TABLE
@@ -420,64 +471,20 @@ class SwitchCommon(object):
         """Convert MAC address table to dictionary.
 
         Args:
-            mac_address_table (string): MAC address table. Lines delimited
-            with line feed.  Assumes a header row with "Port" as a column
-            header followed by a delimiter row composed of dashes ('-')
-            which delimit columns.  Handles MAC addresses formatted
-            as 'cc:cc:cc:cc:cc:cc' or 'cccc.cccc.cccc'
+            mac_address_table (string or iterable): MAC address table. Lines
+            delimited with line feed or an iterable of lines. Assumes a
+            header row with "Port" as a column header followed by a
+            delimiter row composed of dashes ('-') which delimit columns.
+            Handles MAC addresses formatted as 'cc:cc:cc:cc:cc:cc' or
+            'cccc.cccc.cccc'
 
         Returns:
             dictionary: Keys are string port numbers and values are a list
-            of MAC addresses both in native switch format.
+            of MAC addresses in native switch format or in lower case
+            'cc:cc:cc:cc:cc:cc' format if fmt='std'.
         """
-        import lib.logger as logger
-        log = logger.getlogger()
-        pos = None
-        mac_dict = AttrDict()
-
-        _mac_iee802 = r'([\dA-F]{2}[\.:-]){5}([\dA-F]{2})'
-        _mac_cisco = r'([\dA-F]{4}\.){2}[\dA-F]{4}'
-        _mac_all = "%s|%s" % (_mac_iee802, _mac_cisco)
-        _mac_regex = re.compile(_mac_all, re.I)
-
-        mac_address_table = mac_address_table.splitlines()
-        p2 = re.compile('Port', re.IGNORECASE)
-        for line in mac_address_table:
-            # find row with 'Port' label
-            match = p2.search(line)
-            if match:
-                pos = match.start()
-            # find header seperator row
-            if re.search(r'--+', line):
-                log.debug('Found header seperator row: {}'.format(line))
-                iter = re.finditer(r'--+', line)
-                for i, match in enumerate(iter):
-                    # find column aligned with 'Port'
-                    if (pos is not None and pos >= match.span()[0] and
-                            pos < match.span()[1]):
-                        port_span = (match.span()[0], match.span()[1])
-            # find rows with MACs
-            match = _mac_regex.search(line)
-
-            if match:
-                line = self.sanitize_line(line)
-                mac = match.group()
-                log.debug('Found mac address: {}'.format(mac))
-                _mac = mac
-                if fmt == 'std':
-                    _mac = mac[0:2]
-                    mac = re.sub(r'\.|\:', '', mac)
-                    for i in (2, 4, 6, 8, 10):
-                        _mac = _mac + ':' + mac[i:i + 2]
-                # Extract port section of row
-                port = line[port_span[0] - 1:port_span[1]].strip(' ')
-                if fmt == 'std':
-                    port = port.replace(port_prefix, '')
-                if port not in mac_dict.keys():
-                    mac_dict[port] = [_mac]
-                else:
-                    mac_dict[port].append(_mac)
-        return mac_dict
+        return parse_mac_address_table(mac_address_table, fmt, port_prefix,
+                                       self.sanitize_line).port_to_macs
 
     @staticmethod
     def sanitize_line(line):
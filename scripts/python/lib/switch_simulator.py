@@ -0,0 +1,1002 @@
+#!/usr/bin/env python3
+"""Simulated Mellanox, Lenovo and Cisco switch CLIs served over SSH"""
+
+# Copyright 2019 IBM Corp.
+#
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import random
+import re
+import shlex
+import socket
+import threading
+import time
+from collections import namedtuple, OrderedDict
+from ipaddress import IPv4Address, IPv4Interface
+
+import paramiko
+from orderedattrdict import AttrDict
+
+import lib.logger as logger
+from lib.mac_table import int_to_mac
+
+VLAN_MAX = 4094
+# Locally administered base address of generated MAC addresses
+MAC_BASE = 0x020000000000
+ACCEPT_TIMEOUT = 0.2
+
+# One row of a switch MAC address table
+MacEntry = namedtuple('MacEntry', ['vlan', 'mac', 'port'])
+
+
+def parse_vlans(vlans):
+    """Parse a switch VLAN list
+
+    Args:
+        vlans (str): VLANs and VLAN ranges separated by commas or spaces
+                     (e.g. '1,5-7' or '1 5-7')
+
+    Returns:
+        set of int: VLANs
+    """
+    result = set()
+    for item in re.split(r'[,\s]+', vlans.strip()):
+        if item:
+            first, _, last = item.partition('-')
+            result.update(range(int(first), int(last or first) + 1))
+    return result
+
+
+def format_vlans(vlans):
+    """Format VLANs as a list of VLANs and VLAN ranges
+
+    Args:
+        vlans (iterable of int): VLANs
+
+    Returns:
+        list of str: Items (e.g. ['1', '5-7'])
+    """
+    items = []
+    first = last = None
+    for vlan in sorted(vlans):
+        if last is not None and vlan == last + 1:
+            last = vlan
+            continue
+        if first is not None:
+            items.append(str(first) if first == last else f'{first}-{last}')
+        first = last = vlan
+    if first is not None:
+        items.append(str(first) if first == last else f'{first}-{last}')
+    return items
+
+
+def generate_mac_table(ports, macs_per_port=1, switch_index=0, vlan=1):
+    """Generate a MAC address table with MACs learned on every port
+
+    MACs are unique across switches with different indices as long as
+    there are fewer than 256 MACs per port.
+
+    Args:
+        ports (iterable of str): Port names
+        macs_per_port (int, optional): MACs learned on each port
+        switch_index (int, optional): Switch index (0 - 65535)
+        vlan (int, optional): VLAN of the entries
+
+    Returns:
+        list of MacEntry: Table rows in port order
+    """
+    table = []
+    for port_index, port in enumerate(ports, 1):
+        for mac_index in range(macs_per_port):
+            mac = (MAC_BASE | (switch_index & 0xffff) << 24 |
+                   (port_index & 0xffff) << 8 | mac_index & 0xff)
+            table.append(MacEntry(vlan, mac, port))
+    return table
+
+
+class _CliError(Exception):
+    pass
+
+
+class _Interface(object):
+    """Ethernet port, port channel or MLAG port channel state"""
+
+    def __init__(self):
+        self.mode = 'access'
+        self.pvid = 1
+        self.allowed = set()
+        self.mtu = 1500
+        self.enabled = True
+        self.channel_group = None
+        self.mlag_group = None
+
+
+class SwitchCli(object):
+    """Switch CLI interpreter holding VLAN, port, LAG and interface state
+
+    Each SSH command is split into CLI commands which are run in order.
+    'interface' commands set the context of the following commands. A
+    command which is not recognized stops the run and its error message
+    is returned.
+
+    Args:
+        ports (int): Number of ethernet ports
+        mac_table (list of MacEntry, optional): MAC address table. A table
+                                                with one MAC per port is
+                                                generated by default.
+    """
+    PORT_PREFIX = 'Eth'
+    UNRECOGNIZED = '% Invalid command: {}\n'
+    # Port modes which carry tagged VLANs
+    TRUNK_MODES = ('trunk',)
+    # Trunk ports allow all VLANs by default
+    TRUNK_ALL_VLANS = False
+    CONFIG_COMMANDS = (
+        (r'vlan (\d+)', '_cfg_vlan'),
+        (r'no vlan (\d+)', '_cfg_no_vlan'),
+        (r'interface ethernet (\S+)(?: (.+))?', '_cfg_ifc_ethernet'),
+        (r'interface port (\S+)', '_cfg_ifc_ethernet'),
+        (r'interface port-channel (\d+)(?: (.+))?', '_cfg_ifc_lag'),
+        (r'no interface port-channel (\d+)', '_cfg_no_ifc_lag'),
+        (r'interface mlag-port-channel (\d+)(?: (.+))?', '_cfg_ifc_mlag'),
+        (r'no interface mlag-port-channel (\d+)', '_cfg_no_ifc_mlag'),
+        (r'interface vlan ?(\d+)(?: (.+))?', '_cfg_ifc_vlan'),
+        (r'no interface vlan ?(\d+)', '_cfg_no_ifc_vlan'),
+        (r'interface ip (\d+)', '_cfg_ifc_ip'),
+        (r'no interface ip (\d+)', '_cfg_no_ifc_ip'),
+        (r'switchport mode (\S+)', '_cfg_switchport_mode'),
+        (r'switchport access vlan (\d+)', '_cfg_pvid'),
+        (r'switchport trunk native vlan (\d+)', '_cfg_pvid'),
+        (r'switchport (?:trunk allowed vlan|hybrid allowed-vlan) '
+         r'(add|remove|except|all|none) ?(\S*)', '_cfg_allowed_vlans'),
+        (r'channel-group (\d+) mode \S+', '_cfg_channel_group'),
+        (r'no channel-group', '_cfg_no_channel_group'),
+        (r'mlag-channel-group (\d+) mode \S+', '_cfg_mlag_group'),
+        (r'no mlag-channel-group', '_cfg_no_mlag_group'),
+        (r'mtu (\d+)(?: force)?', '_cfg_mtu'),
+        (r'no mtu(?: force)?', '_cfg_mtu'),
+        (r'(no )?shutdown', '_cfg_shutdown'),
+        (r'enable', '_cfg_enable'),
+        (r'ip address (\S+)(?: ?(\S+))?', '_cfg_ip_address'),
+        (r'no ip address.*', '_cfg_no_ip_address'),
+        (r'ip netmask (\S+)', '_cfg_ip_netmask'),
+        (r'ipl 1 peer-address (\S+)', '_cfg_ipl_peer'),
+        (r'no ipl 1 peer-address', '_cfg_ipl_peer'),
+        (r'(no )?ipl 1', '_cfg_ipl'),
+        (r'(no )?protocol mlag', '_cfg_protocol_mlag'),
+        (r'(no )?mlag shutdown', '_cfg_mlag_shutdown'),
+        (r'mlag-vip (.+)', '_cfg_mlag_vip'),
+        (r'no mlag-vip', '_cfg_mlag_vip'),
+        (r'clear mac[ -]address-table.*', '_cfg_clear_mac_table'),
+        # Accepted without modelled state
+        (r'configure terminal|en|no prompting|management|ip routing|'
+         r'(no )?(feature|lacp|dcb|spanning-tree)( .*)?', None))
+    SHOW_COMMANDS = ()
+
+    def __init__(self, ports, mac_table=None):
+        self.lock = threading.Lock()
+        self.vlans = {1}
+        self.ports = OrderedDict((self.get_port_name(index), _Interface())
+                                 for index in range(1, ports + 1))
+        self.lags = OrderedDict()
+        self.mlags = OrderedDict()
+        self.vlan_ifcs = OrderedDict()
+        self.ip_ifcs = OrderedDict()
+        self.mlag = AttrDict(protocol=False, enabled=False, vip=None,
+                             ipl=None)
+        self.mac_table = (mac_table if mac_table is not None else
+                          generate_mac_table(self.ports))
+        self.context = None
+        self._config_cmds = [
+            (re.compile(pattern), getattr(self, name) if name else None)
+            for pattern, name in self.CONFIG_COMMANDS]
+        self._show_cmds = [(re.compile(pattern), getattr(self, name))
+                           for pattern, name in self.SHOW_COMMANDS]
+
+    @classmethod
+    def get_port_name(cls, index):
+        """Get the CLI name of an ethernet port by its 1 based index"""
+        return str(index)
+
+    def split(self, command):
+        """Split an SSH command into CLI commands"""
+        return [cmd.strip() for cmd in command.split(';') if cmd.strip()]
+
+    def execute(self, command):
+        """Run an SSH command
+
+        Args:
+            command (str): SSH command as sent by the switch driver
+
+        Returns:
+            tuple: (exit status, output)
+        """
+        output = []
+        with self.lock:
+            self.context = None
+            for cmd in self.split(command):
+                try:
+                    output.append(self.run(cmd))
+                except _CliError as exc:
+                    output.append(str(exc))
+                    return 1, ''.join(output)
+        return 0, ''.join(output)
+
+    def count(self, command):
+        """Get the number of CLI commands in an SSH command"""
+        return len(self.split(command))
+
+    def run(self, cmd):
+        """Run one CLI command and return its output"""
+        cmd, _, include = cmd.partition(' | include ')
+        cmd = re.sub(r'\s+', ' ', cmd.strip())
+        if cmd.startswith('show '):
+            for pattern, handler in self._show_cmds:
+                match = pattern.fullmatch(cmd)
+                if match:
+                    output = handler(*match.groups())
+                    if include:
+                        output = ''.join(
+                            line for line in output.splitlines(True)
+                            if re.search(include.strip(), line))
+                    return output
+        else:
+            for pattern, handler in self._config_cmds:
+                match = pattern.fullmatch(cmd)
+                if match:
+                    if handler is not None:
+                        handler(*match.groups())
+                    return ''
+        raise _CliError(self.UNRECOGNIZED.format(cmd))
+
+    def _run_in_context(self, rest):
+        if rest:
+            self.run(rest)
+
+    def _get_ifc(self):
+        kind, key = self.context or (None, None)
+        if kind == 'port':
+            return self.ports[key]
+        if kind == 'lag':
+            return self.lags[key]
+        if kind == 'mlag':
+            return self.mlags[key]
+        raise _CliError(self.UNRECOGNIZED.format('(not in interface mode)'))
+
+    def _get_port(self, name):
+        port = self.get_port_key(name)
+        if port not in self.ports:
+            raise _CliError(f'% Interface {name} does not exist\n')
+        return port
+
+    def get_port_key(self, name):
+        """Get the port key of a CLI port name"""
+        return name
+
+    def _cfg_vlan(self, vlan):
+        if self.context and self.context[0] == 'ip':
+            self.ip_ifcs[self.context[1]].vlan = int(vlan)
+            return
+        if not 1 <= int(vlan) <= VLAN_MAX:
+            raise _CliError(f'% Invalid VLAN {vlan}\n')
+        self.vlans.add(int(vlan))
+        self.context = ('vlan', int(vlan))
+
+    def _cfg_no_vlan(self, vlan):
+        if int(vlan) != 1:
+            self.vlans.discard(int(vlan))
+
+    def _cfg_ifc_ethernet(self, name, rest=None):
+        self.context = ('port', self._get_port(name))
+        self._run_in_context(rest)
+
+    def _cfg_ifc_lag(self, num, rest=None):
+        self.lags.setdefault(int(num), _Interface())
+        self.context = ('lag', int(num))
+        self._run_in_context(rest)
+
+    def _cfg_no_ifc_lag(self, num):
+        self.lags.pop(int(num), None)
+        for port in self.ports.values():
+            if port.channel_group == int(num):
+                port.channel_group = None
+        if self.mlag.ipl == int(num):
+            self.mlag.ipl = None
+
+    def _cfg_ifc_mlag(self, num, rest=None):
+        self.mlags.setdefault(int(num), _Interface())
+        self.context = ('mlag', int(num))
+        self._run_in_context(rest)
+
+    def _cfg_no_ifc_mlag(self, num):
+        self.mlags.pop(int(num), None)
+        for port in self.ports.values():
+            if port.mlag_group == int(num):
+                port.mlag_group = None
+
+    def _cfg_ifc_vlan(self, vlan, rest=None):
+        self.vlan_ifcs.setdefault(
+            int(vlan), AttrDict(ipaddr=None, prefix=None, peer=None))
+        self.context = ('vlan_ifc', int(vlan))
+        self._run_in_context(rest)
+
+    def _cfg_no_ifc_vlan(self, vlan):
+        self.vlan_ifcs.pop(int(vlan), None)
+
+    def _cfg_ifc_ip(self, num):
+        self.ip_ifcs.setdefault(int(num), AttrDict(
+            ipaddr=None, netmask='255.255.255.0', vlan=1, enabled=False))
+        self.context = ('ip', int(num))
+
+    def _cfg_no_ifc_ip(self, num):
+        self.ip_ifcs.pop(int(num), None)
+
+    def _cfg_switchport_mode(self, mode):
+        ifc = self._get_ifc()
+        if (mode in self.TRUNK_MODES and ifc.mode not in self.TRUNK_MODES and
+                self.TRUNK_ALL_VLANS):
+            ifc.allowed = set(range(1, VLAN_MAX + 1))
+        ifc.mode = mode
+
+    def _cfg_pvid(self, vlan):
+        self._get_ifc().pvid = int(vlan)
+
+    def _cfg_allowed_vlans(self, operation, vlans):
+        ifc = self._get_ifc()
+        vlans = parse_vlans(vlans)
+        if operation == 'add':
+            ifc.allowed |= vlans
+        elif operation == 'remove':
+            ifc.allowed -= vlans
+        elif operation == 'none':
+            ifc.allowed = set()
+        elif operation == 'all':
+            ifc.allowed = set(range(1, VLAN_MAX + 1))
+        else:
+            ifc.allowed = set(range(1, VLAN_MAX + 1)) - vlans
+
+    def _cfg_channel_group(self, num):
+        if self.context is None or self.context[0] != 'port':
+            raise _CliError(self.UNRECOGNIZED.format('channel-group'))
+        self.lags.setdefault(int(num), _Interface())
+        self.ports[self.context[1]].channel_group = int(num)
+
+    def _cfg_no_channel_group(self):
+        self._get_ifc().channel_group = None
+
+    def _cfg_mlag_group(self, num):
+        if int(num) not in self.mlags:
+            raise _CliError(f'% MLAG port channel {num} does not exist\n')
+        self._get_ifc().mlag_group = int(num)
+
+    def _cfg_no_mlag_group(self):
+        self._get_ifc().mlag_group = None
+
+    def _cfg_mtu(self, mtu=None):
+        self._get_ifc().mtu = int(mtu) if mtu else 1500
+
+    def _cfg_shutdown(self, no):
+        if self.context and self.context[0] in ('port', 'lag', 'mlag'):
+            self._get_ifc().enabled = bool(no)
+
+    def _cfg_enable(self):
+        if self.context and self.context[0] == 'ip':
+            self.ip_ifcs[self.context[1]].enabled = True
+
+    def _cfg_ip_address(self, ipaddr, mask=None):
+        kind, key = self.context or (None, None)
+        if kind == 'ip':
+            self.ip_ifcs[key].ipaddr = ipaddr
+            if mask:
+                self.ip_ifcs[key].netmask = mask
+            return
+        if kind != 'vlan_ifc':
+            raise _CliError(self.UNRECOGNIZED.format('ip address'))
+        if mask is None and '/' in ipaddr:
+            ipaddr, _, mask = ipaddr.partition('/')
+        ifc = IPv4Interface(f'{ipaddr}/{(mask or "32").lstrip("/")}')
+        self.vlan_ifcs[key].ipaddr = ipaddr
+        self.vlan_ifcs[key].prefix = ifc.network.prefixlen
+
+    def _cfg_no_ip_address(self):
+        kind, key = self.context or (None, None)
+        if kind == 'vlan_ifc':
+            self.vlan_ifcs[key].ipaddr = None
+            self.vlan_ifcs[key].prefix = None
+
+    def _cfg_ip_netmask(self, netmask):
+        if self.context and self.context[0] == 'ip':
+            self.ip_ifcs[self.context[1]].netmask = netmask
+
+    def _cfg_ipl_peer(self, peer=None):
+        if self.context and self.context[0] == 'vlan_ifc':
+            self.vlan_ifcs[self.context[1]].peer = peer
+
+    def _cfg_ipl(self, no):
+        if self.context and self.context[0] == 'lag':
+            self.mlag.ipl = None if no else self.context[1]
+
+    def _cfg_protocol_mlag(self, no):
+        self.mlag.protocol = not no
+
+    def _cfg_mlag_shutdown(self, no):
+        self.mlag.enabled = bool(no)
+
+    def _cfg_mlag_vip(self, vip=None):
+        self.mlag.vip = vip
+
+    def _cfg_clear_mac_table(self):
+        # Generated entries belong to active nodes and are learned again
+        # right away, so the table is left as is
+        pass
+
+    def _get_vlan_ifc_rows(self):
+        return [(vlan, ifc) for vlan, ifc in self.vlan_ifcs.items()
+                if ifc.ipaddr is not None]
+
+    def _get_lag_members(self, num, mlag=False):
+        return [port for port, ifc in self.ports.items()
+                if (ifc.mlag_group if mlag else ifc.channel_group) == num]
+
+    def _get_trunk_vlans(self, ifc):
+        return ifc.allowed if ifc.mode in self.TRUNK_MODES else {ifc.pvid}
+
+
+class MellanoxCli(SwitchCli):
+    """Mellanox Onyx CLI as driven by 'lib.mellanox'"""
+    PORT_PREFIX = 'Eth1/'
+    UNRECOGNIZED = '% Unrecognized command "{}".\n'
+    TRUNK_MODES = ('hybrid', 'trunk')
+    SHOW_COMMANDS = (
+        (r'show vlan', '_show_vlan'),
+        (r'show interfaces switchport', '_show_switchport'),
+        (r'show interfaces port-channel summary', '_show_port_channel'),
+        (r'show interfaces mlag-port-channel summary', '_show_mlag_ifcs'),
+        (r'show mlag', '_show_mlag'),
+        (r'show interface vlan ?(\d*)', '_show_interface_vlan'),
+        (r'show mac-address-table', '_show_mac_address_table'))
+
+    def split(self, command):
+        args = shlex.split(command)
+        while args and args[0] in ('cli', 'enable') or \
+                args and args[0].startswith('-'):
+            args.pop(0)
+        return [arg.strip() for arg in args if arg.strip()]
+
+    def get_port_key(self, name):
+        return name.rpartition('/')[2]
+
+    def _show_vlan(self):
+        lines = ['', 'VLAN    Name                 Ports',
+                 '----    ----                 -----']
+        for vlan in sorted(self.vlans):
+            name = 'default' if vlan == 1 else ''
+            lines.append(f'{vlan:<8}{name:<21}')
+        return '\n'.join(lines) + '\n'
+
+    def _show_switchport(self):
+        lines = ['', 'Interface     Mode        Access vlan    Allowed vlans',
+                 '---------     ----        -----------    -------------']
+        for port, ifc in self.ports.items():
+            if ifc.channel_group is not None or ifc.mlag_group is not None:
+                continue
+            if ifc.mode == 'access':
+                pvid, avlans = str(ifc.pvid), {ifc.pvid}
+            elif ifc.mode == 'hybrid':
+                pvid, avlans = str(ifc.pvid), ifc.allowed | {ifc.pvid}
+            else:
+                pvid, avlans = 'N/A', ifc.allowed
+            avlans = ', '.join(str(vlan) for vlan in sorted(avlans))
+            lines.append(f'Eth1/{port:<9}{ifc.mode:<12}{pvid:<15}'
+                         f'{avlans or "N/A"}')
+        return '\n'.join(lines) + '\n'
+
+    def _show_lag_summary(self, lags, prefix, mlag=False):
+        lines = ['Flags: D - Down, U - Up, P - Up in port-channel (members)',
+                 '', '-' * 70,
+                 'Group        Type     Member Ports', 'Port-Channel',
+                 '-' * 70]
+        for num in lags:
+            members = ''.join(f'Eth1/{port}(P)    ' for port in
+                              self._get_lag_members(num, mlag))
+            lines.append(f'{num:<4}{prefix}{num}(U)     LACP     {members}')
+        return '\n'.join(lines) + '\n'
+
+    def _show_port_channel(self):
+        return self._show_lag_summary(self.lags, 'Po')
+
+    def _show_mlag_ifcs(self):
+        return self._show_lag_summary(self.mlags, 'Mpo', mlag=True)
+
+    def _show_mlag(self):
+        if not self.mlag.protocol:
+            return self.UNRECOGNIZED.format('show mlag')
+        lines = [f'Admin status: {"Enabled" if self.mlag.enabled else "Disabled"}',
+                 'MLAG IPLs Summary:', '-' * 70,
+                 'ID   Group         Vlan       Operational  Local'
+                 '           Peer',
+                 '     Port-Channel  Interface  State        IP address'
+                 '      IP address', '-' * 70]
+        if self.mlag.ipl is not None:
+            for vlan, ifc in self.vlan_ifcs.items():
+                if ifc.peer is not None:
+                    lines.append(f'1    Po{self.mlag.ipl:<12}{vlan:<11}Up'
+                                 f'           {ifc.ipaddr or "":<16}{ifc.peer}')
+                    break
+        return '\n'.join(lines) + '\n'
+
+    def _show_interface_vlan(self, vlan):
+        lines = []
+        for _vlan, ifc in self._get_vlan_ifc_rows():
+            if vlan and int(vlan) != _vlan:
+                continue
+            lines += [f'Vlan {_vlan}', '  Admin state: Enabled',
+                      f'  Internet Address: {ifc.ipaddr}/{ifc.prefix}', '']
+        return '\n'.join(lines) + '\n'
+
+    def _show_mac_address_table(self):
+        lines = ['', 'Vlan    Mac Address         Type         Port',
+                 '----    -----------         ----         ------------']
+        for entry in self.mac_table:
+            lines.append(f'{entry.vlan:<8}{int_to_mac(entry.mac).upper():<20}'
+                         f'Dynamic      Eth1/{entry.port}')
+        return '\n'.join(lines) + '\n'
+
+
+class LenovoCli(SwitchCli):
+    """Lenovo ENOS (G8052) CLI as driven by 'lib.lenovo'"""
+    PORT_PREFIX = ''
+    UNRECOGNIZED = 'Error: Unrecognized command "{}".\n'
+    # 'show interface trunk' columns and widths
+    TRUNK_COLUMNS = (('Alias', 7), ('Port', 4), ('Tag', 3), ('RMON', 4),
+                     ('Lrn', 3), ('Fld', 3), ('PVID', 6),
+                     ('DESCRIPTION', 12), ('VLAN(s)', 41))
+    SHOW_COMMANDS = (
+        (r'show vlan', '_show_vlan'),
+        (r'show interface trunk', '_show_interface_trunk'),
+        (r'show interface ip ?(\d*)', '_show_interface_ip'),
+        (r'show port-channel summary', '_show_port_channel'),
+        (r'show mac-address-table', '_show_mac_address_table'))
+
+    def _show_vlan(self):
+        lines = ['', 'VLAN                Name                Status  Ports',
+                 '----  --------------------------------  ------  ' + '-' * 24]
+        for vlan in sorted(self.vlans):
+            name = 'Default VLAN' if vlan == 1 else f'VLAN {vlan}'
+            lines.append(f'{vlan:<6}{name:<34}ena')
+        return '\n'.join(lines) + '\n'
+
+    def _wrap_vlans(self, vlans, width):
+        rows = [[]]
+        for item in format_vlans(vlans):
+            if rows[-1] and len(' '.join(rows[-1] + [item])) > width:
+                rows.append([])
+            rows[-1].append(item)
+        # Continuation rows are only recognized with two or more items
+        if len(rows) > 1 and len(rows[-1]) == 1:
+            rows[-1].insert(0, rows[-2].pop())
+        return [' '.join(row) for row in rows]
+
+    def _show_interface_trunk(self):
+        widths = [width for _, width in self.TRUNK_COLUMNS]
+        vlan_col = sum(widths[:-1]) + len(widths) - 1
+        lines = ['', ' '.join(f'{name:<{width}}'
+                              for name, width in self.TRUNK_COLUMNS),
+                 ' '.join('-' * width for width in widths)]
+        for port, ifc in self.ports.items():
+            tag = 'y' if ifc.mode in self.TRUNK_MODES else 'n'
+            vlans = self._wrap_vlans(self._get_trunk_vlans(ifc),
+                                     widths[-1]) or ['']
+            row = (port, port, tag, 'd', 'e', 'e', ifc.pvid, '', vlans[0])
+            lines.append(' '.join(f'{value:<{width}}' for value, width in
+                                  zip(row, widths)).rstrip())
+            for vlan_row in vlans[1:]:
+                lines.append(' ' * vlan_col + vlan_row)
+        return '\n'.join(lines) + '\n'
+
+    def _show_interface_ip(self, num):
+        lines = ['Interface information:']
+        for _num, ifc in self.ip_ifcs.items():
+            if (num and int(num) != _num) or ifc.ipaddr is None:
+                continue
+            bcast = IPv4Interface(f'{ifc.ipaddr}/{ifc.netmask}').network
+            bcast = bcast.broadcast_address
+            state = 'up' if ifc.enabled else 'down'
+            lines.append(f'{_num}:      IP4 {ifc.ipaddr:<16} {ifc.netmask:<16} '
+                         f'{bcast},  vlan {ifc.vlan}, {state}')
+        return '\n'.join(lines) + '\n'
+
+    def _show_port_channel(self):
+        lines = []
+        for num in self.lags:
+            members = ' '.join(f'{port}(P)' for port in
+                               self._get_lag_members(num))
+            lines.append(f'PortChannel {num}: Enabled, members: {members}')
+        return '\n'.join(lines) + '\n'
+
+    def _show_mac_address_table(self):
+        lines = ['Mac address Aging Time: 300', '',
+                 '     MAC address       VLAN     Port    Trnk  State  '
+                 'Permanent',
+                 '  -----------------  --------  -------  ----  -----  '
+                 '---------']
+        for entry in self.mac_table:
+            lines.append(f'  {int_to_mac(entry.mac)}  {entry.vlan:>8}   '
+                         f'{entry.port:<7}        FWD')
+        return '\n'.join(lines) + '\n'
+
+
+class CiscoCli(SwitchCli):
+    """Cisco NX-OS CLI as driven by 'lib.cisco'"""
+    UNRECOGNIZED = "% Invalid command at '^' marker. ({})\n"
+    TRUNK_ALL_VLANS = True
+    SHOW_COMMANDS = (
+        (r'show vlan', '_show_vlan'),
+        (r'show interface brief', '_show_interface_brief'),
+        (r'show interface trunk', '_show_interface_trunk'),
+        (r'show port-channel summary', '_show_port_channel'),
+        (r'show ip interface brief', '_show_ip_interface_brief'),
+        (r'show interface vlan ?(\d+)', '_show_interface_vlan'),
+        (r'show mac address-table', '_show_mac_address_table'))
+
+    @classmethod
+    def get_port_name(cls, index):
+        return f'1/{index}'
+
+    def get_port_key(self, name):
+        return name if '/' in name else f'1/{name}'
+
+    def _show_vlan(self):
+        lines = ['', 'VLAN Name                             Status    Ports',
+                 '---- -------------------------------- --------- ' + '-' * 31]
+        for vlan in sorted(self.vlans):
+            name = 'default' if vlan == 1 else f'VLAN{vlan:04}'
+            lines.append(f'{vlan:<5}{name:<33}active')
+        return '\n'.join(lines) + '\n'
+
+    def _show_interface_brief(self):
+        lines = ['', '-' * 79,
+                 'Ethernet      VLAN   Type Mode   Status  Reason   Speed',
+                 'Interface', '-' * 79]
+        for port, ifc in self.ports.items():
+            mode = 'trunk' if ifc.mode in self.TRUNK_MODES else 'access'
+            status = 'up' if ifc.enabled else 'down'
+            lines.append(f'Eth{port:<11}{ifc.pvid:<7}eth  {mode:<7}{status:<8}'
+                         f'none     10G(D) '
+                         f'{ifc.channel_group or "--"}')
+        return '\n'.join(lines) + '\n'
+
+    def _show_interface_trunk(self):
+        lines = ['', '-' * 79, 'Port          Native  Status        Port',
+                 '              Vlan                  Channel', '-' * 79]
+        trunks = [(port, ifc) for port, ifc in self.ports.items()
+                  if ifc.mode in self.TRUNK_MODES]
+        for port, ifc in trunks:
+            lines.append(f'Eth{port:<11}{ifc.pvid:<8}trunking      '
+                         f'{ifc.channel_group or "--"}')
+        lines += ['', '-' * 79, 'Port          Vlans Allowed on Trunk',
+                  '-' * 79]
+        for port, ifc in trunks:
+            lines.append(f'Eth{port:<11}'
+                         f'{",".join(format_vlans(ifc.allowed)) or "none"}')
+        return '\n'.join(lines) + '\n'
+
+    def _show_port_channel(self):
+        lines = ['Group Port-       Type     Protocol  Member Ports',
+                 '      Channel', '-' * 79]
+        for num in self.lags:
+            members = ''.join(f'Eth{port}(P)    ' for port in
+                              self._get_lag_members(num))
+            lines.append(f'{num:<6}Po{num}(SU){" " * 6}Eth      LACP      '
+                         f'{members}')
+        return '\n'.join(lines) + '\n'
+
+    def _show_ip_interface_brief(self):
+        lines = ['IP Interface Status for VRF "default"(1)',
+                 'Interface            IP Address      Interface Status']
+        for vlan, ifc in self._get_vlan_ifc_rows():
+            lines.append(f'Vlan{vlan:<17}{ifc.ipaddr:<16}'
+                         'protocol-up/link-up/admin-up')
+        return '\n'.join(lines) + '\n'
+
+    def _show_interface_vlan(self, vlan):
+        ifc = self.vlan_ifcs.get(int(vlan))
+        if ifc is None or ifc.ipaddr is None:
+            raise _CliError(f'Invalid interface format at Vlan{vlan}\n')
+        return (f'Vlan{vlan} is up, line protocol is up\n'
+                '  Hardware is EtherSVI, address is  0000.0000.0000\n'
+                f'  Internet Address is {ifc.ipaddr}/{ifc.prefix}\n')
+
+    def _show_mac_address_table(self):
+        lines = ['Legend:',
+                 '        * - primary entry, G - Gateway MAC, '
+                 '(R) - Routed MAC, O - Overlay MAC',
+                 '   VLAN     MAC Address      Type      age     Secure '
+                 'NTFY Ports',
+                 '---------+-----------------+--------+---------+------+'
+                 '----+------------------']
+        for entry in self.mac_table:
+            mac = f'{entry.mac:012x}'
+            mac = f'{mac[0:4]}.{mac[4:8]}.{mac[8:12]}'
+            lines.append(f'* {entry.vlan:>4}     {mac}   dynamic  0         '
+                         f'F      F    Eth{entry.port}')
+        return '\n'.join(lines) + '\n'
+
+
+CLI_CLASSES = {'mellanox': MellanoxCli, 'lenovo': LenovoCli,
+               'cisco': CiscoCli}
+
+
+class _SshServer(paramiko.ServerInterface):
+
+    def __init__(self, simulator):
+        self.simulator = simulator
+
+    def get_allowed_auths(self, username):
+        return 'password'
+
+    def check_auth_password(self, username, password):
+        if (username == self.simulator.userid and
+                password == self.simulator.password):
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+    def check_channel_request(self, kind, chanid):
+        if kind == 'session':
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_exec_request(self, channel, command):
+        thread = threading.Thread(target=self.simulator.handle_exec,
+                                  args=(channel, command), daemon=True)
+        thread.start()
+        return True
+
+
+class SwitchSimulator(object):
+    """SSH server emulating the CLI of one switch
+
+    Every SSH exec request is run through the switch class CLI
+    interpreter. Latency and failures can be injected to mimic slow or
+    flaky switches.
+
+    Args:
+        switch_class (str): 'mellanox', 'lenovo' or 'cisco'
+        host (str, optional): Listen address
+        port (int, optional): Listen port (0 picks a free port)
+        ports (int, optional): Number of ethernet ports
+        macs_per_port (int, optional): MACs learned on each port
+        switch_index (int, optional): Makes generated MACs unique per
+                                      switch
+        userid (str, optional): SSH user
+        password (str, optional): SSH password
+        latency (float, optional): Seconds added to each SSH command
+        cmd_latency (float, optional): Seconds added to each CLI command
+        fail_rate (float, optional): Probability of rejecting an SSH
+                                     command without changing state
+        fail_pattern (str, optional): Regex. SSH commands with a matching
+                                      CLI command are always rejected.
+        seed (int, optional): Failure injection random seed
+        host_key (paramiko.PKey, optional): Server host key. A new key is
+                                            generated by default.
+
+    Attributes:
+        cli (SwitchCli): Switch state
+        stats (AttrDict): Number of SSH 'sessions', CLI 'commands' and
+                          injected 'failures'
+    """
+
+    def __init__(self, switch_class, host='127.0.0.1', port=0, ports=48,
+                 macs_per_port=1, switch_index=0, userid='admin',
+                 password='admin', latency=0.0, cmd_latency=0.0,
+                 fail_rate=0.0, fail_pattern=None, seed=None, host_key=None):
+        self.log = logger.getlogger()
+        self.switch_class = switch_class.lower()
+        cli_class = CLI_CLASSES[self.switch_class]
+        names = [cli_class.get_port_name(index)
+                 for index in range(1, ports + 1)]
+        self.cli = cli_class(ports, generate_mac_table(
+            names, macs_per_port, switch_index))
+        self.host = host
+        self.port = port
+        self.userid = userid
+        self.password = password
+        self.latency = latency
+        self.cmd_latency = cmd_latency
+        self.fail_rate = fail_rate
+        self.fail_pattern = (re.compile(fail_pattern) if fail_pattern
+                             else None)
+        self.random = random.Random(seed)
+        self.host_key = host_key or paramiko.ECDSAKey.generate()
+        self.stats = AttrDict(sessions=0, commands=0, failures=0)
+        self._stats_lock = threading.Lock()
+        self._sock = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._transports = []
+
+    def start(self):
+        """Start listening"""
+        if self._sock is not None:
+            return
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind((self.host, self.port))
+        self._sock.listen(64)
+        self._sock.settimeout(ACCEPT_TIMEOUT)
+        self.port = self._sock.getsockname()[1]
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._accept, daemon=True)
+        self._thread.start()
+        self.log.debug(f'Simulated {self.switch_class} switch listening on '
+                       f'{self.host}:{self.port}')
+
+    def stop(self):
+        """Stop listening and close open connections"""
+        if self._sock is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._sock.close()
+        self._sock = None
+        for transport in self._transports:
+            transport.close()
+        self._transports = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def _accept(self):
+        while not self._stop.is_set():
+            try:
+                conn, _ = self._sock.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            conn.settimeout(None)
+            threading.Thread(target=self._serve, args=(conn,),
+                             daemon=True).start()
+
+    def _serve(self, conn):
+        transport = paramiko.Transport(conn)
+        transport.add_server_key(self.host_key)
+        self._transports = [t for t in self._transports if t.is_active()]
+        self._transports.append(transport)
+        try:
+            transport.start_server(server=_SshServer(self))
+        except (paramiko.SSHException, EOFError, OSError) as exc:
+            self.log.debug(f'Simulated switch SSH negotiation failed: {exc}')
+            transport.close()
+
+    def run(self, command):
+        """Run an SSH command, applying latency and failure injection
+
+        Args:
+            command (str): SSH command
+
+        Returns:
+            tuple: (exit status, output)
+        """
+        count = self.cli.count(command)
+        if self.latency or self.cmd_latency:
+            time.sleep(self.latency + self.cmd_latency * count)
+        with self._stats_lock:
+            self.stats.sessions += 1
+            self.stats.commands += count
+            failed = ((self.fail_rate and
+                       self.random.random() < self.fail_rate) or
+                      (self.fail_pattern and any(
+                          self.fail_pattern.search(cmd)
+                          for cmd in self.cli.split(command))))
+            if failed:
+                self.stats.failures += 1
+        if failed:
+            return 1, '% Command rejected (simulated failure)\n'
+        return self.cli.execute(command)
+
+    def handle_exec(self, channel, command):
+        """Reply to an SSH exec request
+
+        The request may not have been acknowledged yet, so the channel is
+        only half closed (EOF) and the client closes it.
+        """
+        try:
+            status, output = self.run(command.decode('utf-8'))
+            channel.sendall(output.encode('utf-8'))
+            channel.send_exit_status(status)
+            channel.shutdown_write()
+        except (OSError, EOFError, paramiko.SSHException) as exc:
+            self.log.debug(f'Simulated switch channel error: {exc}')
+            channel.close()
+
+
+class SimulatedFabric(object):
+    """A set of simulated switches of the same class
+
+    Each switch listens on its own loopback address (so per switch
+    locks in 'SwitchCommon' are not shared) and all switches use the
+    same SSH port. Set 'SwitchCommon.SSH_PORT' to 'port' for the switch
+    drivers to connect to the simulated switches.
+
+    Args:
+        count (int): Number of switches
+        switch_class (str): 'mellanox', 'lenovo' or 'cisco'
+        base_address (str, optional): Loopback address of the first
+                                      switch. Following switches use the
+                                      next addresses.
+        kwargs: Passed to each SwitchSimulator
+
+    Attributes:
+        switches (list of SwitchSimulator): Simulated switches
+        port (int): SSH port of all switches
+    """
+
+    def __init__(self, count, switch_class, base_address='127.0.1.1',
+                 **kwargs):
+        host_key = kwargs.pop('host_key', None) or \
+            paramiko.ECDSAKey.generate()
+        seed = kwargs.pop('seed', None)
+        base = IPv4Address(base_address)
+        self.switches = [
+            SwitchSimulator(switch_class, host=str(base + index),
+                            switch_index=index, host_key=host_key,
+                            seed=None if seed is None else seed + index,
+                            **kwargs)
+            for index in range(count)]
+        self.port = 0
+
+    def start(self):
+        """Start all switches on a common port"""
+        for switch in self.switches:
+            switch.port = self.port
+            switch.start()
+            self.port = switch.port
+
+    def stop(self):
+        for switch in self.switches:
+            switch.stop()
+
+    def __enter__(self):
+        try:
+            self.start()
+        except OSError:
+            self.stop()
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def get_addresses(self):
+        """Get the listen address of each switch"""
+        return [switch.host for switch in self.switches]
+
+    def get_stats(self):
+        """Get SSH session, CLI command and failure totals"""
+        stats = AttrDict(sessions=0, commands=0, failures=0)
+        for switch in self.switches:
+            for key in stats:
+                stats[key] += switch.stats[key]
+        return stats
+
+    def reset_stats(self):
+        for switch in self.switches:
+            for key in switch.stats:
+                switch.stats[key] = 0
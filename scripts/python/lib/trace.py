@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""Timing spans and counters for POWER-Up commands
+
+Tracing is off unless enabled with 'enable()' (pup '--trace') or the
+GEN_TRACE_FILE environment variable, which also carries the trace file
+to child POWER-Up processes. Disabled spans and counters return after a
+single check.
+
+Each span is written to the trace file as one JSON line when it ends::
+
+    {"type": "span", "kind": "bmc", "name": "chassis_power",
+     "host": "192.168.30.21", "start": 1565712000.1, "secs": 0.52,
+     "pid": 4120, "thread": "MainThread", "id": 12, "parent": 3}
+
+'finish()' appends the counters and returns a summary of the slowest
+phases, BMC hosts and switches.
+"""
+
+# Copyright 2019 IBM Corp.
+#
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import atexit
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+
+import lib.logger as logger
+
+GEN_TRACE_FILE = 'GEN_TRACE_FILE'
+TOP = 10
+
+# Span kinds
+COMMAND = 'command'
+PHASE = 'phase'
+BMC = 'bmc'
+SWITCH = 'switch'
+SUBPROCESS = 'subprocess'
+ANSIBLE = 'ansible'
+
+_tracer = None
+
+
+class _NullSpan(object):
+    """Span returned while tracing is disabled"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span(object):
+
+    def __init__(self, tracer, kind, name, attrs):
+        self.tracer = tracer
+        self.kind = kind
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.id, self.parent = self.tracer.push()
+        self.start = time.time()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        secs = time.perf_counter() - self._start
+        self.tracer.pop()
+        if exc_type is not None:
+            self.attrs['error'] = exc_type.__name__
+        self.tracer.record(self, secs)
+        return False
+
+    def set(self, **attrs):
+        """Add attributes (e.g. a return code) before the span ends"""
+        self.attrs.update(attrs)
+
+
+class Tracer(object):
+    """Write spans to a JSON lines file and aggregate them for 'summary'
+
+    Args:
+        path (str): Trace file. Spans are appended so that child processes
+                    can share the file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.ids = itertools.count(1)
+        self.counters = Counter()
+        # (kind, key) -> [spans, total secs, max secs]
+        self.totals = defaultdict(lambda: [0, 0.0, 0.0])
+        self.file = open(path, 'a', buffering=1)
+
+    def push(self):
+        stack = getattr(self.local, 'stack', None)
+        if stack is None:
+            stack = self.local.stack = []
+        span_id = next(self.ids)
+        parent = stack[-1] if stack else None
+        stack.append(span_id)
+        return span_id, parent
+
+    def pop(self):
+        self.local.stack.pop()
+
+    def record(self, span, secs):
+        entry = {'type': 'span', 'kind': span.kind, 'name': span.name}
+        entry.update(span.attrs)
+        entry.update({'start': round(span.start, 6), 'secs': round(secs, 6),
+                      'pid': os.getpid(),
+                      'thread': threading.current_thread().name,
+                      'id': span.id, 'parent': span.parent})
+        line = json.dumps(entry, default=str) + '\n'
+        keys = [(span.kind, span.name)]
+        if 'host' in span.attrs:
+            keys.append((span.kind + ' host', span.attrs['host']))
+        with self.lock:
+            self.file.write(line)
+            for key in keys:
+                total = self.totals[key]
+                total[0] += 1
+                total[1] += secs
+                total[2] = max(total[2], secs)
+
+    def count(self, name, value):
+        with self.lock:
+            self.counters[name] += value
+
+    def close(self):
+        with self.lock:
+            for name, value in sorted(self.counters.items()):
+                self.file.write(json.dumps({'type': 'counter', 'name': name,
+                                            'value': value,
+                                            'pid': os.getpid()}) + '\n')
+            self.file.close()
+
+    def summary(self, top=TOP):
+        """Get tables of the slowest phases, BMC hosts, switches,
+        subprocesses and Ansible runs plus the counters
+
+        Returns:
+            str: Summary tables
+        """
+        from tabulate import tabulate
+
+        sections = ((COMMAND, 'Command'), (PHASE, 'Phase'),
+                    (BMC + ' host', 'BMC host'), (BMC, 'BMC operation'),
+                    (SWITCH + ' host', 'Switch'),
+                    (SUBPROCESS, 'Subprocess'), (ANSIBLE, 'Ansible run'))
+        with self.lock:
+            totals = dict(self.totals)
+            counters = dict(self.counters)
+        tables = []
+        for kind, title in sections:
+            rows = sorted(((key, *total) for (_kind, key), total
+                           in totals.items() if _kind == kind),
+                          key=lambda row: row[2], reverse=True)
+            if not rows:
+                continue
+            rows = [(key, calls, f'{secs:.2f}', f'{_max:.2f}')
+                    for key, calls, secs, _max in rows[:top]]
+            tables.append(tabulate(rows, headers=(title, 'Calls', 'Secs',
+                                                  'Max secs')))
+        if counters:
+            tables.append(tabulate(sorted(counters.items()),
+                                   headers=('Counter', 'Value')))
+        return '\n\n'.join(tables)
+
+
+def get_trace_path():
+    """Get a new trace file path in the POWER-Up logs directory"""
+    return os.path.join(logger.LOG_PATH,
+                        time.strftime('trace_%Y%m%d_%H%M%S.jsonl'))
+
+
+def enable(path=None):
+    """Enable tracing for this process and its POWER-Up child processes
+
+    Args:
+        path (str, optional): Trace file. Defaults to a new file in the
+                              POWER-Up logs directory.
+
+    Returns:
+        str: Trace file path
+    """
+    global _tracer
+    if _tracer is not None:
+        return _tracer.path
+    if path is None:
+        path = get_trace_path()
+    _tracer = Tracer(path)
+    os.environ[GEN_TRACE_FILE] = path
+    atexit.register(finish)
+    return path
+
+
+def get_path():
+    """Get the trace file path or None if tracing is disabled"""
+    return None if _tracer is None else _tracer.path
+
+
+def finish():
+    """Stop tracing and write the counters
+
+    Returns:
+        str: Summary tables or None if tracing was not enabled
+    """
+    global _tracer
+    if _tracer is None:
+        return None
+    tracer = _tracer
+    _tracer = None
+    os.environ.pop(GEN_TRACE_FILE, None)
+    tracer.close()
+    return tracer.summary()
+
+
+def span(kind, name, **attrs):
+    """Time a block of code
+
+    Args:
+        kind (str): Span kind (e.g. PHASE, BMC, SWITCH)
+        name (str): Span name
+        attrs: JSON serializable span attributes. 'host' is also
+               summarized per host.
+
+    Returns:
+        Context manager whose 'set' method adds attributes
+    """
+    if _tracer is None:
+        return _NULL_SPAN
+    return _Span(_tracer, kind, name, attrs)
+
+
+def count(name, value=1):
+    """Increment a counter"""
+    if _tracer is not None:
+        _tracer.count(name, value)
+
+
+def traced(kind, name=None, host_attr=None):
+    """Decorator timing each call of a function or method
+
+    Args:
+        kind (str): Span kind
+        name (str, optional): Span name. Defaults to the function name.
+        host_attr (str, optional): Attribute of the method's instance
+                                   holding the host (read when the call
+                                   ends, so '__init__' can set it)
+    """
+    def decorator(func):
+        _name = name or func.__name__.lstrip('_')
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return func(*args, **kwargs)
+            with span(kind, _name) as _span:
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    if host_attr is not None:
+                        _span.set(host=getattr(args[0], host_attr, None))
+        return wrapper
+    return decorator
+
+
+if os.getenv(GEN_TRACE_FILE):
+    enable(os.getenv(GEN_TRACE_FILE))
@@ -19,20 +19,31 @@ import os
 import re
 import sys
 import datetime
+import signal
+import socket
 import subprocess
+import tarfile
+import threading
 import fileinput
 import readline
-from shutil import copy2, copyfile
-from subprocess import Popen, PIPE
-from netaddr import IPNetwork, IPAddress, IPSet
+from concurrent.futures import ThreadPoolExecutor
+from shutil import copy2, copyfile, rmtree
+from subprocess import Popen, PIPE, STDOUT, TimeoutExpired
+from netaddr import IPNetwork, IPAddress
 from tabulate import tabulate
 from textwrap import dedent
 import hashlib
+import json
+import tempfile
 from distro import linux_distribution
 
 from lib.config import Config
 import lib.logger as logger
+import lib.trace as trace
 from lib.exception import UserException
+from lib.iso_image import IsoImage
+from lib.ip_plan import ip_to_int, int_to_ip, prefix_to_mask, \
+    mask_to_prefix, parse_network, network_range
 
 PATTERN_DHCP = r"^\|_*\s+(.+):(.+)"
 PATTERN_MAC = r'([\da-fA-F]{2}:){5}[\da-fA-F]{2}'
@@ -44,6 +55,17 @@ PATTERN_EMBEDDED_IP = (r'(?:(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.){3}'
 CalledProcessError = subprocess.CalledProcessError
 
 LOG = logger.getlogger()
+# Return code of subprocesses killed at their timeout (as from 'timeout')
+SUB_PROC_TIMEOUT_RC = 124
+# Maximum concurrent subprocesses of 'sub_proc_exec_all'
+MAX_SUB_PROC_WORKERS = 16
+NETNS_PATH = '/var/run/netns'
+# Size of the chunks generated by 'tar_stream'
+TAR_CHUNK_SIZE = 1 << 20
+# Maximum concurrent ISO extractions of 'extract_iso_images'
+MAX_ISO_WORKERS = 4
+# Records the ISO an 'extract_iso_image' directory was extracted from
+ISO_CACHE_FILE = '.pup-iso.json'
 DHCP_SERVER_CMD = "sudo nmap --script broadcast-dhcp-discover -e {0}"
 
 
@@ -188,21 +210,21 @@ def get_network_addr(ipaddr, prefix):
     """ Return the base address of the subnet in which the ipaddr / prefix
         reside.
     """
-    return str(IPNetwork(f'{ipaddr}/{prefix}').network)
+    return int_to_ip(network_range(f'{ipaddr}/{prefix}')[0])
 
 
 def get_netmask(prefix):
-    return str(IPNetwork(f'0.0.0.0/{prefix}').netmask)
+    return int_to_ip(prefix_to_mask(prefix))
 
 
 def get_prefix(netmask):
-    return IPAddress(netmask).netmask_bits()
+    return mask_to_prefix(ip_to_int(netmask))
 
 
 def get_network_size(cidr):
     """ return the decimal size of the cidr address
     """
-    return IPNetwork(cidr).size
+    return 1 << (32 - parse_network(cidr)[1])
 
 
 def add_offset_to_address(addr, offset):
@@ -213,9 +235,7 @@ def add_offset_to_address(addr, offset):
     Returns:
         addr_.ip (str) address in ipv4 representation
     """
-    addr_ = IPNetwork(addr)
-    addr_.value += offset
-    return str(addr_.ip)
+    return int_to_ip(parse_network(addr)[0] + offset)
 
 
 def is_overlapping_addr(subnet1, subnet2):
@@ -225,31 +245,41 @@ def is_overlapping_addr(subnet1, subnet2):
     Returns:
         True if the two subnets overlap, False if they do not.
     """
-    if IPSet([subnet1]).intersection(IPSet([subnet2])):
-        return True
-    else:
-        return False
+    first1, last1 = network_range(subnet1)
+    first2, last2 = network_range(subnet2)
+    return first1 <= last2 and first2 <= last1
 
 
-def bash_cmd(cmd):
+def bash_cmd(cmd, timeout=None):
     """Run command in Bash subprocess
 
     Args:
         cmd (str): Command to run
+        timeout (float, optional): Seconds to wait for the command
 
     Returns:
         output (str): stdout from command
+
+    Raises:
+        CalledProcessError: If the command fails
+        TimeoutExpired: If the command is killed at its timeout
     """
     log = logger.getlogger()
     _cmd = ['bash', '-c', cmd]
     log.debug('Run subprocess: %s' % ' '.join(_cmd))
-    output = subprocess.check_output(_cmd, universal_newlines=True,
-                                     stderr=subprocess.STDOUT)
-    try:
-        output = output.decode('utf-8')
-    except AttributeError:
-        pass
+    with trace.span(trace.SUBPROCESS, _proc_name(cmd)) as span:
+        proc = Popen(_cmd, stdout=PIPE, stderr=STDOUT, universal_newlines=True,
+                     start_new_session=timeout is not None)
+        try:
+            output, _ = proc.communicate(timeout=timeout)
+        except TimeoutExpired:
+            _kill_proc(proc)
+            output, _ = proc.communicate()
+            raise TimeoutExpired(_cmd, timeout, output=output)
+        span.set(rc=proc.returncode)
     log.debug(output)
+    if proc.returncode:
+        raise CalledProcessError(proc.returncode, _cmd, output=output)
 
     return output
 
@@ -396,6 +426,16 @@ def copy_file(source, dest, metadata=True):
         copyfile(source, dest)
 
 
+def _proc_name(cmd):
+    """Get the program name of a command string for trace spans. The
+    arguments are left out as they may hold credentials.
+    """
+    words = cmd.split()
+    if words[:1] == ['sudo']:
+        words = words[1:]
+    return os.path.basename(words[0]) if words else ''
+
+
 def sub_proc_launch(cmd, stdout=PIPE, stderr=PIPE):
     """Launch a subprocess and return the Popen process object.
     This is non blocking. This is useful for long running processes.
@@ -406,18 +446,38 @@ def sub_proc_launch(cmd, stdout=PIPE, stderr=PIPE):
     return proc
 
 
-def sub_proc_exec(cmd, stdout=PIPE, stderr=PIPE, shell=False, env=None):
+def sub_proc_exec(cmd, stdout=PIPE, stderr=PIPE, shell=False, env=None,
+                  timeout=None, input=None):
     """Launch a subprocess wait for the process to finish.
     Returns stdout from the process
     This is blocking
+
+    A process still running after timeout seconds is killed and
+    SUB_PROC_TIMEOUT_RC is returned. input (str), if given, is written to
+    the stdin of the process.
     """
     log = logger.getlogger()
     log.debug(f"sub_proc_exec cmd='{cmd}' stdout='{stdout}' stderr='{stderr}' "
-              f"shell='{shell}' env='{env}'")
-    if not shell:
-        cmd = cmd.split()
-    proc = Popen(cmd, stdout=stdout, stderr=stderr, shell=shell, env=env)
-    stdout, stderr = proc.communicate()
+              f"shell='{shell}' env='{env}' timeout='{timeout}'")
+    with trace.span(trace.SUBPROCESS, _proc_name(cmd)) as span:
+        if not shell:
+            cmd = cmd.split()
+        proc = Popen(cmd, stdin=None if input is None else PIPE,
+                     stdout=stdout, stderr=stderr, shell=shell, env=env,
+                     start_new_session=timeout is not None)
+        try:
+            stdout, stderr = proc.communicate(
+                input=None if input is None else input.encode('utf-8'),
+                timeout=timeout)
+            rc = proc.returncode
+        except TimeoutExpired:
+            _kill_proc(proc)
+            stdout, stderr = proc.communicate()
+            rc = SUB_PROC_TIMEOUT_RC
+            log.error(f"sub_proc_exec cmd='{cmd}' killed after {timeout} s")
+        span.set(rc=rc)
+    if rc:
+        trace.count('subprocess.nonzero_rc')
     try:
         stdout = stdout.decode('utf-8')
     except AttributeError:
@@ -427,26 +487,220 @@ def sub_proc_exec(cmd, stdout=PIPE, stderr=PIPE, shell=False, env=None):
     except AttributeError:
         pass
     log.debug(f"sub_proc_exec stdout='{stdout}' stderr='{stderr}' "
-              f"rc='{proc.returncode}'")
-    return stdout, stderr, proc.returncode
+              f"rc='{rc}'")
+    return stdout, stderr, rc
+
+
+def sub_proc_exec_all(cmds, max_workers=MAX_SUB_PROC_WORKERS, **kwargs):
+    """Run independent commands concurrently with 'sub_proc_exec'
+
+    Args:
+        cmds (list of str): Commands
+        max_workers (int, optional): Maximum concurrent subprocesses
+        kwargs: 'sub_proc_exec' arguments (e.g. timeout) for all commands
+
+    Returns:
+        list of tuple: stdout, stderr and rc of each command, in order
+    """
+    cmds = list(cmds)
+    if len(cmds) < 2:
+        return [sub_proc_exec(cmd, **kwargs) for cmd in cmds]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(cmds))) as pool:
+        return list(pool.map(lambda cmd: sub_proc_exec(cmd, **kwargs), cmds))
+
+
+def sub_proc_stream(cmd, callback=None, log_file=None, shell=False, env=None,
+                    timeout=None):
+    """Run a subprocess and hand its output over line by line as it is
+    produced instead of buffering it. stderr is merged into stdout.
+
+    Args:
+        cmd (str): Command to run
+        callback (callable, optional): Called with each decoded line
+        log_file (str, optional): File the output is appended to
+        shell (bool, optional): Run the command with the shell
+        env (dict, optional): Process environment
+        timeout (float, optional): Seconds after which the process is
+                                   killed and SUB_PROC_TIMEOUT_RC returned
+
+    Returns:
+        int: Return code
+    """
+    log = logger.getlogger()
+    log.debug(f"sub_proc_stream cmd='{cmd}' log_file='{log_file}' "
+              f"shell='{shell}' env='{env}' timeout='{timeout}'")
+    with trace.span(trace.SUBPROCESS, _proc_name(cmd)) as span:
+        if not shell:
+            cmd = cmd.split()
+        proc = Popen(cmd, stdout=PIPE, stderr=STDOUT, shell=shell, env=env,
+                     start_new_session=timeout is not None,
+                     universal_newlines=True, errors='replace')
+        timer = None
+        killed = threading.Event()
+        if timeout is not None:
+            timer = threading.Timer(timeout, _kill_proc, (proc, killed))
+            timer.start()
+        log_f = open(log_file, 'a') if log_file else None
+        try:
+            for line in proc.stdout:
+                if log_f is not None:
+                    log_f.write(line)
+                if callback is not None:
+                    callback(line)
+            proc.wait()
+        finally:
+            if timer is not None:
+                timer.cancel()
+            if log_f is not None:
+                log_f.close()
+            if proc.poll() is None:
+                _kill_proc(proc)
+                proc.wait()
+        rc = proc.returncode
+        if killed.is_set():
+            rc = SUB_PROC_TIMEOUT_RC
+            log.error(f"sub_proc_stream cmd='{cmd}' killed after {timeout} s")
+        span.set(rc=rc)
+    if rc:
+        trace.count('subprocess.nonzero_rc')
+    log.debug(f"sub_proc_stream rc='{rc}'")
+    return rc
 
 
-def sub_proc_display(cmd, stdout=None, stderr=None, shell=False, env=None):
+def _kill_proc(proc, killed=None):
+    """Kill a process started in its own session and its children"""
+    if killed is not None:
+        killed.set()
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        proc.kill()
+
+
+def sub_proc_display(cmd, stdout=None, stderr=None, shell=False, env=None,
+                     timeout=None):
     """Popen subprocess created without PIPES to allow subprocess printing
     to the parent screen. This is a blocking function.
+
+    A process still running after timeout seconds is killed and
+    SUB_PROC_TIMEOUT_RC is returned.
     """
     log = logger.getlogger()
     log.debug(f"sub_proc_display cmd='{cmd}' stdout='{stdout}' "
-              f"stderr='{stderr}' shell='{shell}' env='{env}'")
-    if not shell:
-        cmd = cmd.split()
-    proc = Popen(cmd, stdout=stdout, stderr=stderr, shell=shell, env=env)
-    proc.wait()
-    rc = proc.returncode
+              f"stderr='{stderr}' shell='{shell}' env='{env}' "
+              f"timeout='{timeout}'")
+    with trace.span(trace.SUBPROCESS, _proc_name(cmd)) as span:
+        if not shell:
+            cmd = cmd.split()
+        proc = Popen(cmd, stdout=stdout, stderr=stderr, shell=shell, env=env,
+                     start_new_session=timeout is not None)
+        try:
+            rc = proc.wait(timeout=timeout)
+        except TimeoutExpired:
+            _kill_proc(proc)
+            proc.wait()
+            rc = SUB_PROC_TIMEOUT_RC
+            log.error(f"sub_proc_display cmd='{cmd}' killed after {timeout} s")
+        span.set(rc=rc)
+    if rc:
+        trace.count('subprocess.nonzero_rc')
     log.debug(f"sub_proc_display rc='{rc}'")
     return rc
 
 
+def get_pids(name):
+    """Get the ids of processes by name from /proc without running
+    'pgrep'. Names longer than 15 characters are truncated by the
+    kernel, so only the first 15 are compared.
+
+    Args:
+        name (str): Process name (e.g. 'dnsmasq')
+
+    Returns:
+        list of str: Process ids
+    """
+    pids = []
+    for pid in os.listdir('/proc'):
+        if not pid.isdigit():
+            continue
+        try:
+            with open(f'/proc/{pid}/comm') as f:
+                comm = f.read().rstrip('\n')
+        except OSError:
+            continue  # process exited
+        if comm == name[:15]:
+            pids.append(pid)
+    return sorted(pids, key=int)
+
+
+def kill_pid(pid, sig=signal.SIGTERM):
+    """Signal a process without running 'kill'
+
+    Args:
+        pid (str or int): Process id
+        sig (int, optional): Signal
+
+    Returns:
+        bool: True if the process was signalled
+    """
+    try:
+        os.kill(int(pid), sig)
+    except OSError as exc:
+        logger.getlogger().debug(f'Unable to signal process {pid}: {exc}')
+        return False
+    return True
+
+
+def get_netns_name(pid):
+    """Get the named network namespace of a process without running
+    'ip netns identify'
+
+    Args:
+        pid (str or int): Process id
+
+    Returns:
+        str: Namespace name or '' if the process is not in a named
+             namespace
+    """
+    try:
+        proc_ns = os.stat(f'/proc/{pid}/ns/net')
+        names = os.listdir(NETNS_PATH)
+    except OSError:
+        return ''
+    for name in names:
+        try:
+            netns = os.stat(os.path.join(NETNS_PATH, name))
+        except OSError:
+            continue
+        if (netns.st_dev, netns.st_ino) == (proc_ns.st_dev, proc_ns.st_ino):
+            return name
+    return ''
+
+
+def netns_socket(family, sock_type, proto=0, netns=None):
+    """Open a socket in a named network namespace. The socket stays in
+    the namespace it was created in after the process switches back.
+
+    Args:
+        family (int): Address family, e.g. socket.AF_PACKET
+        sock_type (int): Socket type, e.g. socket.SOCK_RAW
+        proto (int, optional): Protocol number
+        netns (str, optional): Network namespace name, default the
+                               current namespace
+
+    Returns:
+        socket.socket: The socket
+    """
+    if not netns:
+        return socket.socket(family, sock_type, proto)
+    from pyroute2.netns import popns, pushns
+    pushns(netns)
+    try:
+        return socket.socket(family, sock_type, proto)
+    finally:
+        popns()
+
+
 def sub_proc_wait(proc):
     """Launch a subprocess and display a simple time counter while waiting.
     This is a blocking wait. NOTE: sleeping (time.sleep()) in the wait loop
@@ -1436,63 +1690,143 @@ def firewall_add_services(services):
     Returns:
         int: Binary error code
     """
+    from lib.firewall import update_firewall
 
     if type(services) is str:
         services = [services]
 
-    fw_err = 0
-    if 'rhel' in linux_distribution(full_distribution_name=False):
-        firewall_service = 'firewalld.service'
-        firewall_enable_cmd = 'firewall-cmd --permanent --add-service='
-        firewall_reload_cmd = 'firewall-cmd --reload'
-    elif 'ubuntu' in linux_distribution(full_distribution_name=False):
-        firewall_service = 'ufw.service'
-        firewall_enable_cmd = 'ufw allow '
-        firewall_reload_cmd = 'true'
+    if 'ubuntu' in linux_distribution(full_distribution_name=False):
         return 0  # TODO: Need to add firewall configuration for Ubuntu
-    cmd = f'systemctl status {firewall_service}'
-    resp, err, rc = sub_proc_exec(cmd)
-    if 'Active: active (running)' in resp.splitlines()[2]:
-        LOG.debug('Firewall is running')
-    else:
-        cmd = f'systemctl enable {firewall_service}'
-        resp, err, rc = sub_proc_exec(cmd)
-        if rc != 0:
-            fw_err += 1
-            LOG.error('Failed to enable firewall service')
+    return update_firewall(services=services)
 
-        cmd = f'systemctl start {firewall_service}'
-        resp, err, rc = sub_proc_exec(cmd)
-        if rc != 0:
-            fw_err += 10
-            LOG.error('Failed to start firewall')
 
-    for service in services:
-        cmd = f'{firewall_enable_cmd}{service}'
-        resp, err, rc = sub_proc_exec(cmd)
-        if rc != 0:
-            fw_err += 100
-            LOG.error(f'Failed to enable {service} service on firewall')
+def tar_stream(source_paths, chunk_size=TAR_CHUNK_SIZE):
+    """Generate a tar archive of files and directories in chunks. Each source
+    is archived under its base name. A thread writes the archive into a pipe,
+    so memory use is bounded by the pipe buffer and one chunk and nothing is
+    written to disk.
+
+    Args:
+        source_paths (list of str): Files or directories
+        chunk_size (int, optional): Maximum bytes per chunk
+
+    Yields:
+        bytes: Archive data
+    """
+    read_fd, write_fd = os.pipe()
+    errors = []
+
+    def write_archive():
+        try:
+            with os.fdopen(write_fd, 'wb') as pipe:
+                with tarfile.open(fileobj=pipe, mode='w|') as tar_file:
+                    for path in source_paths:
+                        tar_file.add(path, arcname=os.path.basename(
+                            os.path.normpath(path)))
+        except BrokenPipeError:
+            # The reader stopped early
+            pass
+        except Exception as exc:
+            errors.append(exc)
+
+    writer = threading.Thread(target=write_archive, daemon=True)
+    writer.start()
+    with os.fdopen(read_fd, 'rb') as pipe:
+        while True:
+            chunk = pipe.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    writer.join()
+    if errors:
+        raise errors[0]
+
+
+def _find_iso_boot_files(iso, name):
+    """Locate the netboot kernel and initrd in the ISO directory tree. Known
+    distribution layouts are checked first, then the tree is searched.
+
+    Args:
+        iso (IsoImage): ISO image
+        name (str): ISO file name without '.iso'
+
+    Returns:
+        tuple: ('str: Path to kernel', 'str: Path to initrd') relative to
+               the image root. Either is None if not found.
+    """
+    filename_parsed = {item.lower() for item in name.split('-')}
+    candidates = []
+    if {'ubuntu', 'amd64'}.issubset(filename_parsed):
+        candidates = [('install/netboot/ubuntu-installer/amd64', 'linux',
+                       'initrd.gz'),
+                      ('casper', 'vmlinux', 'initrd')]
+    elif {'ubuntu', 'ppc64el'}.issubset(filename_parsed):
+        candidates = [('install/netboot/ubuntu-installer/ppc64el', 'vmlinux',
+                       'initrd.gz')]
+    elif ({'rhel', 'x86_64'}.issubset(filename_parsed) or
+            {'centos', 'x86_64'}.issubset(filename_parsed)):
+        candidates = [('images/pxeboot', 'vmlinuz', 'initrd.img')]
+    elif ({'rhel', 'ppc64le'}.issubset(filename_parsed) or
+            {'centos', 'ppc64le'}.issubset(filename_parsed)):
+        candidates = [('ppc/ppc64', 'vmlinuz', 'initrd.img')]
+
+    kernel = None
+    initrd = None
+    for sub_path, kernel_name, initrd_name in candidates:
+        if kernel is None and iso.isfile(f'{sub_path}/{kernel_name}'):
+            kernel = f'{sub_path}/{kernel_name}'
+        if initrd is None and iso.isfile(f'{sub_path}/{initrd_name}'):
+            initrd = f'{sub_path}/{initrd_name}'
+
+    # If kernel or initrd isn't in the above matrix search for them
+    if kernel is None or initrd is None:
+        kernel_names = ('linux', 'vmlinux', 'vmlinuz')
+        initrd_names = ('initrd.gz', 'initrd.img', 'initrd')
+
+        for dirpath, dirnames, filenames in iso.walk():
+            rel_dir = dirpath.strip('/')
+            if kernel is None:
+                found = [item for item in kernel_names if item in filenames]
+                if found:
+                    kernel = os.path.join(rel_dir, found[0])
+            if initrd is None:
+                found = [item for item in initrd_names if item in filenames]
+                if found:
+                    initrd = os.path.join(rel_dir, found[0])
+            if kernel is not None and initrd is not None:
+                break
 
-    resp, err, rc = sub_proc_exec(firewall_reload_cmd)
-    if 'success' not in resp:
-        fw_err += 1000
-        LOG.error('Error attempting to restart firewall')
+    return kernel, initrd
 
-    return fw_err
 
+def _read_iso_cache(iso_dir):
+    try:
+        with open(os.path.join(iso_dir, ISO_CACHE_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
 
-def extract_iso_image(iso_path, dest_dir):
+
+def extract_iso_image(iso_path, dest_dir, subtrees=None):
     """Extract ISO image into directory
 
-    If a (non-empty) directory matching the iso file already exists in
-    the destination directory extraction is not attempted.
+    The kernel and initrd are located by reading the ISO directory tree, and
+    the extraction is recorded with the ISO digest (see
+    'IsoImage.get_digest'). An existing extraction of the same ISO is
+    reused without extracting it again. An extraction made before digests
+    were recorded is reused if it holds the kernel and initrd. A new
+    extraction is made in a temporary directory and then moved in place,
+    so an interrupted extraction is never mistaken for a complete one.
 
     Args:
         iso_path (str): Path to ISO file
         dest_dir (str): Path to an existing directory that the ISO will
                         be extracted into. A subdirectory matching the
                         image filename will be created.
+        subtrees (list of str, optional): Directories of the image to
+                        extract, in addition to those holding the kernel and
+                        initrd. The whole image is extracted by default, as
+                        needed to serve it as an installation repository.
 
     Returns:
         tuple: ('str: Relative path to kernel',
@@ -1501,9 +1835,10 @@ def extract_iso_image(iso_path, dest_dir):
     Raises:
         UserException: iso_path is not a valid file path
                        iso_path does not end in '.iso'
-                       can't find kernel or initrd in extracted image
+                       iso_path is not an ISO9660 image
+                       can't find kernel or initrd in ISO image
     """
-
+    log = logger.getlogger()
     if not os.path.isfile(iso_path):
         raise UserException(f"Invalid iso_path: '{iso_path}")
     elif not iso_path.lower().endswith('.iso'):
@@ -1512,66 +1847,74 @@ def extract_iso_image(iso_path, dest_dir):
     name = os.path.basename(iso_path)[:-4]
     iso_dir = os.path.join(dest_dir, name)
 
-    if not os.path.isdir(iso_dir):
-        os.makedirs(iso_dir)
-
-    if len(os.listdir(iso_dir)) == 0:
-        bash_cmd(f'xorriso -osirrox on -indev {iso_path} -extract / {iso_dir}')
-        bash_cmd(f'chmod 755 {iso_dir}')
-
-    filename_parsed = {item.lower() for item in name.split('-')}
-    kernel = None
-    initrd = None
-    if {'ubuntu', 'amd64'}.issubset(filename_parsed):
-        sub_path = 'install/netboot/ubuntu-installer/amd64'
-        kernel = os.path.join(name, sub_path, 'linux')
-        initrd = os.path.join(name, sub_path, 'initrd.gz')
-        if not os.path.isfile(kernel):
-            sub_path = 'casper'
-            kernel = os.path.join(name, sub_path, 'vmlinux')
-            initrd = os.path.join(name, sub_path, 'initrd')
-    elif {'ubuntu', 'ppc64el'}.issubset(filename_parsed):
-        sub_path = 'install/netboot/ubuntu-installer/ppc64el'
-        kernel = os.path.join(name, sub_path, 'vmlinux')
-        initrd = os.path.join(name, sub_path, 'initrd.gz')
-    elif ({'rhel', 'x86_64'}.issubset(filename_parsed) or
-            {'centos', 'x86_64'}.issubset(filename_parsed)):
-        sub_path = 'images/pxeboot'
-        kernel = os.path.join(name, sub_path, 'vmlinuz')
-        initrd = os.path.join(name, sub_path, 'initrd.img')
-    elif ({'rhel', 'ppc64le'}.issubset(filename_parsed) or
-            {'centos', 'ppc64le'}.issubset(filename_parsed)):
-        sub_path = 'ppc/ppc64'
-        kernel = os.path.join(name, sub_path, 'vmlinuz')
-        initrd = os.path.join(name, sub_path, 'initrd.img')
-
-    if not os.path.isfile(os.path.join(dest_dir, kernel)):
-        kernel = None
-    if not os.path.isfile(os.path.join(dest_dir, initrd)):
-        initrd = None
-
-    # If kernel or initrd isn't in the above matrix search for them
-    if kernel is None or initrd is None:
-        kernel_names = {'linux', 'vmlinux', 'vmlinuz'}
-        initrd_names = {'initrd.gz', 'initrd.img', 'initrd'}
-
-        for dirpath, dirnames, filenames in os.walk(iso_dir):
-            if kernel is None and not kernel_names.isdisjoint(set(filenames)):
-                rel_dir = os.path.relpath(dirpath, dest_dir)
-                kernel = (os.path.join(
-                    rel_dir, kernel_names.intersection(set(filenames)).pop()))
-            if initrd is None and not initrd_names.isdisjoint(set(filenames)):
-                rel_dir = os.path.relpath(dirpath, dest_dir)
-                initrd = (os.path.join(
-                    rel_dir, initrd_names.intersection(set(filenames)).pop()))
-            if kernel is not None and initrd is not None:
-                break
-
+    with IsoImage(iso_path) as iso:
+        digest = iso.get_digest()
+        kernel, initrd = _find_iso_boot_files(iso, name)
     if kernel is None or initrd is None:
         raise UserException("Unable to find kernel and/or initrd in ISO image:"
                             f" kernel: '{kernel}' initrd: '{initrd}'")
+    if subtrees is not None:
+        subtrees = sorted({path.strip('/') for path in subtrees} |
+                          {os.path.dirname(kernel), os.path.dirname(initrd)})
+    result = os.path.join(name, kernel), os.path.join(name, initrd)
+
+    cache = _read_iso_cache(iso_dir)
+    if cache is not None and cache.get('digest') == digest and (
+            cache['subtrees'] is None or subtrees is not None and
+            set(subtrees).issubset(cache['subtrees'])):
+        log.debug(f'ISO image {iso_path} is already extracted')
+        return result
+    if cache is None and os.path.isdir(iso_dir) and \
+            os.path.isfile(os.path.join(dest_dir, result[0])) and \
+            os.path.isfile(os.path.join(dest_dir, result[1])):
+        log.debug(f'Using the existing extraction of {iso_path}')
+        subtrees = None
+    else:
+        log.info(f'Extracting ISO image {iso_path}')
+        tmp_dir = tempfile.mkdtemp(prefix=f'.{name}.', dir=dest_dir)
+        try:
+            if subtrees is None:
+                extract = f'-extract / {tmp_dir}'
+            else:
+                extract = ' '.join(f"-extract '/{path}' '{tmp_dir}/{path}'"
+                                   for path in subtrees)
+            bash_cmd(f"xorriso -osirrox on -indev '{iso_path}' {extract}")
+            os.chmod(tmp_dir, 0o755)
+            if os.path.lexists(iso_dir):
+                rmtree(iso_dir)
+            os.rename(tmp_dir, iso_dir)
+        except Exception:
+            rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+    with open(os.path.join(iso_dir, ISO_CACHE_FILE), 'w') as f:
+        json.dump({'digest': digest, 'subtrees': subtrees}, f)
+    return result
+
+
+def extract_iso_images(iso_paths, dest_dir, max_workers=MAX_ISO_WORKERS,
+                       **kwargs):
+    """Extract ISO images concurrently with 'extract_iso_image'
 
-    return kernel, initrd
+    Args:
+        iso_paths (list of str): Paths to ISO files
+        dest_dir (str): Path to the directory the ISOs are extracted into
+        max_workers (int, optional): Maximum concurrent extractions
+        kwargs: 'extract_iso_image' arguments for all images
+
+    Returns:
+        list of tuple: Relative paths to kernel and initrd of each image,
+                       in order
+    """
+    iso_paths = list(iso_paths)
+    if len(iso_paths) < 2:
+        return [extract_iso_image(path, dest_dir, **kwargs)
+                for path in iso_paths]
+    with ThreadPoolExecutor(max_workers=min(max_workers,
+                                            len(iso_paths))) as pool:
+        return list(pool.map(
+            lambda path: extract_iso_image(path, dest_dir, **kwargs),
+            iso_paths))
 
 
 def timestamp():
@@ -1747,10 +2090,9 @@ def get_rpm_info(filelist, _dir):
 
     if isinstance(filelist, list):
         _dict = {}
-        for _file in filelist:
-            path = os.path.join(_dir, _file)
-            cmd = f'rpm -qip {path}'
-            resp, err, rc = sub_proc_exec(cmd)
+        paths = [os.path.join(_dir, _file) for _file in filelist]
+        results = sub_proc_exec_all(f'rpm -qip {path}' for path in paths)
+        for path, (resp, err, rc) in zip(paths, results):
             if rc != 0:
                 LOG.error(f'Error querying package {path}')
             name, ep, ver, rel = get_parts(resp)
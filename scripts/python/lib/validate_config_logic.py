@@ -17,6 +17,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import hashlib
 from netaddr import IPNetwork
 import re
 import os
@@ -25,6 +26,11 @@ from lib.exception import UserException, UserCriticalException
 from lib.genesis import get_os_images_path, get_os_profile_pointers, \
     get_os_image_urls, get_os_image_urls_yaml_path
 
+# Logic version. Changes to this module yield a new version so cached
+# validation results are not reused under changed rules.
+with open(__file__, 'rb') as _file:
+    LOGIC_VERSION = hashlib.sha1(_file.read()).hexdigest()[:12]
+
 
 class ValidateConfigLogic(object):
     """Config logic validation
@@ -41,6 +47,7 @@ class ValidateConfigLogic(object):
         # Instantiate Config with supplied config object
         self.cfg = Config(cfg=self.config)
         self.exc = ''
+        self.warnings = ''
 
     def _validate_version(self):
         """Validate version
@@ -95,25 +102,25 @@ class ValidateConfigLogic(object):
         """
 
         def get_dupes(_list):
-            found = []
+            found = set()
             dupes = []
             for item in _list:
                 if item in found:
                     dupes.append(item)
                 else:
-                    found.append(item)
+                    found.add(item)
             return dupes
 
         def validate_switch_defined(switch):
             global exc
-            if switch not in sw_lbls:
+            if switch not in sw_lbls_set:
                 msg = ('\nSwitch "{}" in node template "{}" is not defined.'
                        '\nValid defined switches are: {}\n').format(
                     switch, ntmpl_lbl, sw_lbls)
                 self.exc += msg
 
         def validate_interface_defined(phy_ifc_lbl):
-            if phy_ifc_lbl not in ifc_lbls:
+            if phy_ifc_lbl not in ifc_lbls_set:
                 msg = ('\nPhysical interface "{}" in node template "{}" '
                        '\nreferences an undefined interface.')
                 self.exc += msg.format(phy_ifc_lbl, ntmpl_lbl)
@@ -123,15 +130,17 @@ class ValidateConfigLogic(object):
             if switch in ports_list:
                 ports_list[switch] += ports
             else:
-                ports_list[switch] = ports
+                ports_list[switch] = list(ports)
 
         ifcs = self.cfg.get_interfaces()
         ifc_lbls = []
         for ifc in ifcs:
             ifc_lbls.append(ifc['label'])
+        ifc_lbls_set = set(ifc_lbls)
 
         sw_lbls = self.cfg.get_sw_mgmt_label()
         sw_lbls += self.cfg.get_sw_data_label()
+        sw_lbls_set = set(sw_lbls)
 
         ports_list = {}
         for ntmpl_ind in self.cfg.yield_ntmpl_ind():
@@ -231,8 +240,7 @@ class ValidateConfigLogic(object):
         Lease time can be given as an int (seconds), int + m (minutes),
         int + h (hours) or "infinite".
 
-        Exception:
-            Invalid lease time value
+        Invalid values are reported as a warning.
         """
 
         dhcp_lease_time = self.cfg.get_globals_dhcp_lease_time()
@@ -242,8 +250,8 @@ class ValidateConfigLogic(object):
             exc = ("Config 'Globals: dhcp_lease_time: {}' has invalid value!"
                    "\n".format(dhcp_lease_time))
             exc += ('Value can be in seconds, minutes (e.g. "15m"),\n'
-                    'hours (e.g. "1h") or "infinite" (lease does not expire).')
-            raise UserException(exc)
+                    'hours (e.g. "1h") or "infinite" (lease does not expire).\n')
+            self.warnings += exc
 
     def _validate_labels(self):
         """Verify that all labels are valid."""
@@ -286,9 +294,10 @@ class ValidateConfigLogic(object):
                 valid_hosts = list(set(valid_hosts +
                                        self.cfg.get_ntmpl_roles(ntmpl_ind)))
 
+        valid_hosts_set = set(valid_hosts)
         bs = self.cfg.get_software_bootstrap()
         for item in bs:
-            if item.hosts not in valid_hosts:
+            if item.hosts not in valid_hosts_set:
                 msg = ('\nUndefined software bootstrap host.\nhost: {}\n'.
                        format(item.hosts))
                 self.exc += msg
@@ -330,7 +339,14 @@ class ValidateConfigLogic(object):
             self.exc += msg
 
     def validate_config_logic(self):
-        """Config logic validation"""
+        """Config logic validation
+
+        All checks are run before reporting.
+
+        Exception:
+            UserCriticalException listing all errors, UserException if
+            only warnings are found
+        """
 
         self._validate_version()
         self._validate_physical_interfaces()
@@ -341,4 +357,6 @@ class ValidateConfigLogic(object):
         self._validate_os_profiles()
 
         if self.exc:
-            raise UserCriticalException(self.exc)
+            raise UserCriticalException(self.exc + self.warnings)
+        if self.warnings:
+            raise UserException(self.warnings)
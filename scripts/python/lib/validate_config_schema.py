@@ -17,13 +17,24 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import hashlib
+import json
+import os
 import jsonschema
-from jsonschema import validate
 import jsl
 
 import lib.logger as logger
+import lib.genesis as gen
 from lib.exception import UserException, UserCriticalException
 
+# Schema version. Changes to this module yield a new version so stale
+# disk cached schemas are never used.
+with open(__file__, 'rb') as _file:
+    SCHEMA_VERSION = hashlib.sha1(_file.read()).hexdigest()[:12]
+SCHEMA_CACHE_FILE = 'config-schema-{}.json'
+
+_VALIDATOR = None
+
 
 def _string_int_field(**kwargs):
     return jsl.fields.AnyOfField(
@@ -224,6 +235,64 @@ class SchemaDefinition(jsl.Document):
         jsl.fields.DocumentField(SoftwareBootstrap))
 
 
+def get_schema():
+    """Get the config JSON schema
+
+    The schema generated from 'SchemaDefinition' is cached on disk by
+    SCHEMA_VERSION.
+
+    Returns:
+        dict: JSON schema
+    """
+    log = logger.getlogger()
+    path = os.path.join(gen.get_cache_path(),
+                        SCHEMA_CACHE_FILE.format(SCHEMA_VERSION))
+    try:
+        with open(path, 'r') as schema_file:
+            return json.load(schema_file)
+    except (IOError, ValueError):
+        pass
+    schema = SchemaDefinition.get_schema(ordered=True)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + '.tmp', 'w') as schema_file:
+            json.dump(schema, schema_file)
+        os.rename(path + '.tmp', path)
+    except (IOError, OSError) as exc:
+        log.debug('Unable to cache config schema - {}'.format(exc))
+    return schema
+
+
+def get_validator():
+    """Get the config schema validator, compiled once per process
+
+    Returns:
+        jsonschema validator
+    """
+    global _VALIDATOR
+    if _VALIDATOR is None:
+        schema = get_schema()
+        cls = jsonschema.validators.validator_for(schema)
+        _VALIDATOR = cls(schema, format_checker=jsonschema.FormatChecker())
+    return _VALIDATOR
+
+
+def _format_error(error):
+    if error.cause is not None:
+        return 'Schema validation failed - {} - {}'.format(
+            error.cause, error.message)
+    path = None
+    for index, element in enumerate(error.path):
+        if isinstance(element, int):
+            path += '[{}]'.format(element)
+        else:
+            if index == 0:
+                path = '{}'.format(element)
+            else:
+                path += '.{}'.format(element)
+    return 'Schema validation failed - {} - {}'.format(path, error.message)
+
+
 class ValidateConfigSchema(object):
     """Config schema validation
 
@@ -235,34 +304,35 @@ class ValidateConfigSchema(object):
         self.log = logger.getlogger()
         self.config = config
 
+    def get_errors(self):
+        """Get all schema validation errors
+
+        Returns:
+            tuple: (list of critical error messages, list of warning
+                   messages). Unknown properties are warnings.
+        """
+        errors = []
+        warnings = []
+        for error in sorted(get_validator().iter_errors(self.config),
+                            key=lambda error: [str(elem)
+                                               for elem in error.path]):
+            msg = _format_error(error)
+            if 'Additional properties are not allowed' in error.message:
+                warnings.append(msg)
+            else:
+                errors.append(msg)
+        return errors, warnings
+
     def validate_config_schema(self):
         """Config schema validation
 
         Exception:
-            If schema validation fails
+            UserCriticalException listing all errors if schema validation
+            fails, UserException if only unknown properties are found
         """
 
-        schema = SchemaDefinition.get_schema(ordered=True)
-        try:
-            validate(
-                self.config, schema, format_checker=jsonschema.FormatChecker())
-        except jsonschema.exceptions.ValidationError as error:
-            if error.cause is None:
-                path = None
-                for index, element in enumerate(error.path):
-                    if isinstance(element, int):
-                        path += '[{}]'.format(element)
-                    else:
-                        if index == 0:
-                            path = '{}'.format(element)
-                        else:
-                            path += '.{}'.format(element)
-                exc = 'Schema validation failed - {} - {}'.format(
-                    path, str(error))
-            else:
-                exc = 'Schema validation failed - {} - {}'.format(
-                    error.cause, str(error))
-            if 'Additional properties are not allowed' in str(error):
-                raise UserException(exc)
-            else:
-                raise UserCriticalException(exc)
+        errors, warnings = self.get_errors()
+        if errors:
+            raise UserCriticalException('\n'.join(errors + warnings))
+        if warnings:
+            raise UserException('\n'.join(warnings))
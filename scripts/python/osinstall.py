@@ -39,7 +39,7 @@ from lib.genesis import get_package_path, get_sample_configs_path, \
 import lib.utilities as u
 from nginx_setup import nginx_setup
 from ip_route_get_to import ip_route_get_to
-from lib.bmc import Bmc
+from lib.bmc import Bmc, call_all
 from set_bootdev_clients import set_bootdev_clients
 from set_power_clients import set_power_clients
 from lib.genesis import get_power_wait
@@ -57,6 +57,9 @@ OSINSTALL_HTTP_DIR = 'osinstall'
 CLIENT_STATUS_DIR = '/var/pup_install_status/'
 
 POWER_WAIT = get_power_wait()
+# Deadline in seconds for reading the BMC serial and part numbers, for all
+# OpenBMC nodes together or for each IPMI node
+SN_PN_TIMEOUT = 15
 
 
 def osinstall(profile_path):
@@ -1559,14 +1562,19 @@ class Pup_form(npyscreen.ActionFormV2):
         bmc_inst = {}
         # list for responding BMCs
         sn_pn_list = {}
+        # BMCs with a request still running past the deadline
+        pending = []
         if bmc_type in ('2200', 'openbmc'):
             for ip in node_list:
                 this_bmc = Bmc(ip, uid, pw, 'openbmc')
                 if this_bmc.is_connected():
                     bmc_inst[ip] = this_bmc
-            for ip in bmc_inst:
-                sn_pn = bmc_inst[ip].get_system_sn_pn() + ('openbmc',)
-                sn_pn_list[ip] = sn_pn
+            snapshots, pending = call_all(
+                bmc_inst, lambda bmc: bmc.get_snapshot(), SN_PN_TIMEOUT)
+            for ip, snapshot in snapshots.items():
+                if snapshot and snapshot.serial_number:
+                    sn_pn_list[ip] = (snapshot.serial_number,
+                                      snapshot.part_number, 'openbmc')
 
         elif bmc_type in ('623', 'ipmi'):
             for ip in node_list:
@@ -1574,28 +1582,17 @@ class Pup_form(npyscreen.ActionFormV2):
                 if this_bmc.is_connected():
                     bmc_inst[ip] = this_bmc
 
-            # Create dict to hold inventory gathering sub process instances
-            sub_proc_instance = {}
-            # Start a sub process instance to gather inventory for each node.
-            for node in bmc_inst:
-                sub_proc_instance[node] = bmc_inst[node].\
-                    get_system_inventory_in_background()
-            # poll for inventory gathering completion
-            st_time = time()
-            timeout = 15  # seconds
-
-            while time() < st_time + timeout and len(sn_pn_list) < len(bmc_inst):
-                for node in sub_proc_instance:
-                    if sub_proc_instance[node].poll() is not None:
-                        if (sub_proc_instance[node].poll() == 0 and
-                                node not in sn_pn_list):
-                            inv, stderr = sub_proc_instance[node].communicate()
-                            inv = inv.decode('utf-8')
-                            sn_pn_list[node] = bmc_inst[node].\
-                                extract_system_sn_pn(inv) + ('ipmi',)
+            # The FRU inventory is read on the sessions opened above, one
+            # BMC at a time. pyghmi sessions share one client per process
+            # and are not safe to use from concurrent threads.
+            for ip, this_bmc in bmc_inst.items():
+                sn_pn = this_bmc.get_system_sn_pn(timeout=SN_PN_TIMEOUT)
+                if sn_pn and sn_pn[0]:
+                    sn_pn_list[ip] = sn_pn + ('ipmi',)
 
         for node in bmc_inst:
-            bmc_inst[node].logout()
+            if node not in pending:
+                bmc_inst[node].logout()
 
         return sn_pn_list
 
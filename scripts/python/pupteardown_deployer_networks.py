@@ -19,23 +19,25 @@ import argparse
 import sys
 import os
 import re
-import platform
-from pyroute2 import IPRoute
 from docker import errors
 
 from lib.config import Config
-from lib.genesis import GEN_PATH
+from lib.genesis import GEN_PATH, get_opsys
 from lib.container import Container
+from lib.firewall import update_firewall
 import lib.logger as logger
-from lib.utilities import sub_proc_exec, remove_line, get_netmask
+from lib.network_plan import NetworkPlan, get_bridge_label, get_bridge_port
+from lib.utilities import remove_line, get_netmask
 
-IPR = IPRoute()
-OPSYS = platform.dist()[0]
+OPSYS = get_opsys()
 IFCFG_PATH = '/etc/sysconfig/network-scripts/'
 
 
 def teardown_deployer_network(config_path=None):
     """Teardown the network elements on the deployer.
+    The link and address changes for all networks are planned from one read
+    of the current state and applied together. If any change fails, the
+    applied changes are reverted and no config files are removed.
     This function is idempotent.
     """
     cfg = Config(config_path)
@@ -44,7 +46,7 @@ def teardown_deployer_network(config_path=None):
     LOG.debug('----------------------------------------')
     LOG.info('Teardown Docker networks')
     _remove_docker_networks(cfg)
-    LOG.info('Teardown deployer management networks')
+    networks = []
     dev_label = cfg.get_depl_netw_mgmt_device()
     interface_ipaddr = cfg.get_depl_netw_mgmt_intf_ip()
     container_ipaddr = cfg.get_depl_netw_mgmt_cont_ip()
@@ -53,14 +55,13 @@ def teardown_deployer_network(config_path=None):
     netprefix = cfg.get_depl_netw_mgmt_prefix()
 
     for i, dev in enumerate(dev_label):
-        _delete_network(dev_label[i],
-                        interface_ipaddr[i],
-                        netprefix[i],
-                        container_ipaddr=container_ipaddr[i],
-                        bridge_ipaddr=bridge_ipaddr[i],
-                        vlan=vlan[i])
+        networks.append({'dev_label': dev_label[i],
+                         'interface_ipaddr': interface_ipaddr[i],
+                         'netprefix': netprefix[i],
+                         'container_ipaddr': container_ipaddr[i],
+                         'bridge_ipaddr': bridge_ipaddr[i],
+                         'vlan': vlan[i]})
 
-    LOG.info('Teardown deployer client networks')
     type_ = cfg.get_depl_netw_client_type()
     dev_label = cfg.get_depl_netw_client_device()
     interface_ipaddr = cfg.get_depl_netw_client_intf_ip()
@@ -70,16 +71,29 @@ def teardown_deployer_network(config_path=None):
     netprefix = cfg.get_depl_netw_client_prefix()
 
     for i, dev in enumerate(dev_label):
-        _delete_network(dev_label[i],
-                        interface_ipaddr[i],
-                        netprefix[i],
-                        container_ipaddr=container_ipaddr[i],
-                        bridge_ipaddr=bridge_ipaddr[i],
-                        vlan=vlan[i],
-                        type_=type_[i])
-
-
-def _delete_network(
+        networks.append({'dev_label': dev_label[i],
+                         'interface_ipaddr': interface_ipaddr[i],
+                         'netprefix': netprefix[i],
+                         'container_ipaddr': container_ipaddr[i],
+                         'bridge_ipaddr': bridge_ipaddr[i],
+                         'vlan': vlan[i],
+                         'type_': type_[i]})
+
+    LOG.info('Teardown deployer management and client networks')
+    plan = NetworkPlan()
+    for network in networks:
+        _plan_network_removal(plan, **network)
+    plan.apply()
+    for network in networks:
+        _delete_network_cfg(**network)
+    # Remove the rules of all the bridges in one firewall update
+    update_firewall(remove_bridges=[
+        get_bridge_label(network.get('type_', 'mgmt'), network['vlan'])
+        for network in networks if network['bridge_ipaddr']])
+
+
+def _plan_network_removal(
+        plan,
         dev_label,
         interface_ipaddr,
         netprefix,
@@ -87,23 +101,33 @@ def _delete_network(
         bridge_ipaddr=None,
         vlan=None,
         type_='mgmt'):
+    """ Plans the removal of the address or bridge of a network.
+    A vlan link in use on another bridge is not deleted.
+    """
+    if bridge_ipaddr:
+        br_label = get_bridge_label(type_, vlan)
+        link = get_bridge_port(dev_label, vlan)
+        # if the vlan link already exists on another bridge then display warning
+        if plan.is_attached_elsewhere(link, br_label):
+            LOG.warning('Link {} in use on another bridge. Not deleted'.
+                        format(link))
+            print('Warning: Link {} in use on another bridge. Not deleted'.
+                  format(link))
+    plan.remove_network(dev_label, interface_ipaddr, netprefix,
+                        bridge_ipaddr=bridge_ipaddr, vlan=vlan, _type=type_)
 
-    ifc_addresses = _get_ifc_addresses()
 
+def _delete_network_cfg(
+        dev_label,
+        interface_ipaddr,
+        netprefix,
+        container_ipaddr=None,
+        bridge_ipaddr=None,
+        vlan=None,
+        type_='mgmt'):
+    """ Deletes the PowerUp created config files of a network.
+    """
     if not bridge_ipaddr:
-        if not IPR.link_lookup(ifname=dev_label):
-            LOG.info('External interface {} not found'.format(dev_label))
-            return
-        # if address is on device, then remove it.
-        if interface_ipaddr + '/' + str(netprefix) in ifc_addresses[dev_label]:
-            LOG.info('Removing address {} from link {}'
-                     .format(interface_ipaddr, dev_label))
-            index = IPR.link_lookup(ifname=dev_label)
-            IPR.addr('del', index=index, address=interface_ipaddr, mask=netprefix)
-        else:
-            LOG.debug('Address {} does not exist on link {}'.
-                      format(interface_ipaddr, dev_label))
-
         # Check to see if the device and address is configured in any interface
         # definition file. If it is and it was PowerUp created, then delete the
         # definition file.
@@ -115,59 +139,9 @@ def _delete_network(
         if addr_cfgd:
             _delete_ifc_cfg(dev_label, interface_ipaddr, get_netmask(netprefix))
     else:
-        # bridge specified
-        # Prepare to delete the bridge
-        br_label = 'br-' + type_
-        if vlan and vlan != 4095:
-            br_label = br_label + '-' + str(vlan)
-        link = dev_label
-        # if a vlan other than 4095 is specified, delete the vlan link
-        if vlan and vlan != 4095:
-            link = dev_label + '.{}'.format(vlan)
-        # if the vlan link already exists on another bridge then display warning
-        if _is_ifc_attached_elsewhere(link, br_label):
-            LOG.warning('Link {} in use on another bridge. Not deleted'.
-                        format(link))
-            print('Warning: Link {} in use on another bridge. Not deleted'.
-                  format(link))
-        else:
-            # Delete the tagged interface
-            if IPR.link_lookup(ifname=link):
-                LOG.debug('Deleting vlan interface: {}'.format(link))
-                IPR.link("del", ifname=link)
-        _delete_bridge(br_label)
-
+        br_label = get_bridge_label(type_, vlan)
         _delete_br_cfg_file(br_label, dev_label)
 
-        _update_firewall(br_label)
-
-
-def _is_firewall_running():
-    res, err, rc = sub_proc_exec('systemctl status firewalld')
-    if not rc:
-        if 'Active: active' in res or 'active (running)' in res:
-            return True
-
-
-def _update_firewall(br_label):
-    """gets the FORWARD iptable and remove all entries which contain 'br_label'
-    """
-    if _is_firewall_running():
-        rmv = []
-        fwd_tbl, err, rc = sub_proc_exec('iptables -nvL FORWARD --line-numbers')
-        for line in fwd_tbl.splitlines():
-            if br_label in line:
-                rmv.append(int(line[0:2]))
-        # reverse the entry number list so that they can be removed sequentially
-        # without affecting the number earlier entries.
-        rmv.reverse()
-        for item in rmv:
-            cmd = f'iptables -D FORWARD {item}'
-            res, err, rc = sub_proc_exec(cmd)
-            if rc:
-                LOG.warning(f'An error occured while removing {br_label} from the '
-                            f'iptables FORWARD table')
-
 
 def _delete_ifc_cfg(ifc, ipaddr='', netmask=''):
     """ Deletes a PowerUp created interface specific configuration. For Ubuntu
@@ -256,20 +230,6 @@ def _is_ifc_configured(ifc_cfg_file, dev_label, interface_ipaddr):
     return ifc_cfgd, addr_cfgd
 
 
-def _get_ifc_addresses():
-    """ Create a dictionary of links.  For each link, create list of cidr
-    addresses
-    """
-    ifc_addresses = {}
-    for link in IPR.get_links():
-        link_name = link.get_attr('IFLA_IFNAME')
-        ifc_addresses[link_name] = []
-        for addr in IPR.get_addr(index=link['index']):
-            ifc_addresses[link_name].append(
-                addr.get_attr('IFA_ADDRESS') + '/' + str(addr['prefixlen']))
-    return ifc_addresses
-
-
 def _get_ifcs_path_list():
     """ Returns the absolute path for all interface definition files
     """
@@ -290,55 +250,6 @@ def _get_ifcs_path_list():
     return path_list
 
 
-def _delete_bridge(bridge):
-    """ Deletes a bridge if the bridge exists.
-    Args:
-        bridge (str) bridge name
-    """
-    if IPR.link_lookup(ifname=bridge):
-        LOG.info('Deleting bridge {}'.format(bridge))
-        IPR.link("del", ifname=bridge)
-
-
-def _is_addr_on_link(ip, link):
-    """ Checks to see if address ip is already added to link
-    Args:
-        ip (str) ipv4 address
-        link (str) link name
-    Returns: True/False
-    """
-    addr_list = IPR.get_addr(label=link)
-    for addr in addr_list:
-        if ip == addr.get_attr('IFA_ADDRESS'):
-            LOG.debug(
-                'Address {} found on link {}'.format(ip, link))
-            return True
-    LOG.debug('Address {} not found on link {}'.format(ip, link))
-    return False
-
-
-def _is_ifc_attached_elsewhere(ifc, bridge):
-    """ Checks to see if ifc is in use on a bridge other than that specified
-    Args:
-        ifc (str) interface name
-        bridge (str) name of bridge the interface is intended for
-    Returns:
-        True if the interface is already being used (is unavailable)
-    """
-    br_list, err, rc = sub_proc_exec('brctl show')
-    br_list = br_list.splitlines()
-    output = []
-    for line in br_list[1:]:
-        if line.startswith('\t'):
-            output[len(output) - 1] = output[len(output) - 1] + line
-        else:
-            output.append(line)
-        if ifc in output[len(output) - 1] \
-                and bridge not in output[len(output) - 1]:
-            return True
-    return False
-
-
 def _remove_docker_networks(cfg):
     try:
         container = Container(cfg.config_path)
@@ -27,8 +27,8 @@ from shutil import copy, copytree, rmtree, Error
 from sys import executable
 
 import lib.logger as logger
-from lib.utilities import sub_proc_display, sub_proc_exec, get_url, \
-    get_dir, get_yesno, get_selection, get_file_path, get_src_path, bold, \
+from lib.utilities import sub_proc_display, sub_proc_exec, sub_proc_stream, \
+    get_url, get_dir, get_yesno, get_selection, get_file_path, get_src_path, bold, \
     parse_conda_filenames, parse_rpm_filenames, parse_pypi_filenames, get_rpm_info
 from lib.exception import UserException
 
@@ -475,9 +475,12 @@ class PowerupRepo(object):
             cmd = f'createrepo -v {self.yumrepo_dir}'
         else:
             cmd = f'createrepo -v --update {self.yumrepo_dir}'
-        resp, err, rc = sub_proc_exec(cmd)
+        # Verbose output of large repositories is streamed to a log file
+        log_file = os.path.join(logger.LOG_PATH,
+                                f'createrepo_{self.repo_id}.log')
+        rc = sub_proc_stream(cmd, log_file=log_file)
         if rc != 0:
-            self.log.error(f'Repo creation error: rc: {rc} stderr: {err}')
+            self.log.error(f'Repo creation error: rc: {rc} output: {log_file}')
         else:
             self.log.info(f'Repo {action[0]} metadata for {self.repo_id} finished'
                           ' successfully')
@@ -22,26 +22,31 @@ import click
 import os.path
 from os import listdir, getlogin, getuid
 import filecmp
-import json
 import pwd
 import grp
 from shutil import copyfile
 from pathlib import Path
-import re
 import netaddr
 import socket
-from subprocess import CalledProcessError
+from subprocess import CalledProcessError, TimeoutExpired
 import sys
 from getpass import getpass
 from socket import getfqdn
 
 from inventory import generate_dynamic_inventory
+from lib.ansible_inventory import load_inventory
 from lib.exception import UserException
 import lib.logger as logger
 from lib.genesis import get_python_path, CFG_FILE, \
     get_dynamic_inventory_path, get_playbooks_path, get_ansible_path
-from lib.utilities import bash_cmd, sub_proc_exec, heading1, get_selection, \
-    bold, get_yesno, remove_line, append_line, rlinput, replace_regex
+from lib.utilities import bash_cmd, sub_proc_exec, sub_proc_exec_all, \
+    heading1, get_selection, bold, get_yesno, remove_line, append_line, \
+    rlinput, replace_regex
+
+# Seconds allowed for host reachability and host key queries
+FPING_TIMEOUT = 60
+SSH_KEYGEN_TIMEOUT = 10
+SSH_KEYSCAN_TIMEOUT = 30
 
 
 def _get_dynamic_inventory():
@@ -246,7 +251,8 @@ def _set_software_hosts_owner_mode(software_hosts_file_path):
 def _validate_inventory_count(software_hosts_file_path, min_hosts,
                               group='all'):
     """Validate minimum number of hosts are defined in inventory
-    Calls Ansible to process inventory which validates file syntax.
+    Parses the inventory (without calling Ansible) which validates file
+    syntax.
 
     Args:
         software_hosts_file_path (str): Path to software inventory file
@@ -257,30 +263,15 @@ def _validate_inventory_count(software_hosts_file_path, min_hosts,
         list: List of hosts defined in software inventory file
 
     Raises:
-        UserException: Ansible reports host count of less than min_hosts
+        UserException: Inventory host count of less than min_hosts
     """
     log = logger.getlogger()
-    host_count = None
-    host_list = []
-    raw_host_list = bash_cmd(f'ansible {group} -i {software_hosts_file_path} '
-                             '--list-hosts')
-
-    # Iterate over ansible '--list-hosts' output
-    count_verified = False
-    host_count_pattern = re.compile(r'.*\((\d+)\)\:$')
-    for host in raw_host_list.splitlines():
-        if not count_verified:
-            # Verify host count is > 0
-            match = host_count_pattern.match(host)
-            if match:
-                host_count = int(match.group(1))
-                log.debug("Ansible host count: {}".format(host_count))
-                if host_count < min_hosts:
-                    raise UserException("Ansible reporting host count of less "
-                                        "than one ({})!".format(host_count))
-                count_verified = True
-        else:
-            host_list.append(host.strip())
+    host_list = load_inventory(software_hosts_file_path).get_hosts(group)
+    host_count = len(host_list)
+    log.debug("Ansible host count: {}".format(host_count))
+    if host_count < min_hosts:
+        raise UserException("Ansible reporting host count of less "
+                            "than one ({})!".format(host_count))
 
     log.debug("Software inventory host count validation passed")
     log.debug("Ansible host list: {}".format(host_list))
@@ -316,8 +307,9 @@ def _validate_host_list_network(host_list):
 
     # Ping IP
     try:
-        bash_cmd('fping -u {}'.format(' '.join(host_list)))
-    except CalledProcessError as exc:
+        bash_cmd('fping -u {}'.format(' '.join(host_list)),
+                 timeout=FPING_TIMEOUT)
+    except (CalledProcessError, TimeoutExpired) as exc:
         msg = "Ping failed on hosts:\n{}".format(exc.output)
         log.debug(msg)
         raise UserException(msg)
@@ -363,15 +355,22 @@ def _check_known_hosts(host_list):
             log.debug("Creating root '/root/.ssh/known_hosts' file")
             Path('/root/.ssh/known_hosts').touch(mode=0o600)
 
-    for host in host_list:
-        for known_hosts in known_hosts_files:
-            cmd = (f'ssh-keygen -F {host} -f {known_hosts}')
-            resp, err, rc = sub_proc_exec(cmd)
-            if rc != 0:
-                cmd = (f'ssh-keyscan -H {host}')
-                resp, err, rc = sub_proc_exec(cmd)
-                print(f'Adding \'{host}\' host keys to \'{known_hosts}\'')
-                append_line(known_hosts, resp, check_exists=False)
+    # Look up all hosts, then scan each missing host once, concurrently
+    entries = [(host, known_hosts) for host in host_list
+               for known_hosts in known_hosts_files]
+    results = sub_proc_exec_all(
+        [f'ssh-keygen -F {host} -f {known_hosts}'
+         for host, known_hosts in entries], timeout=SSH_KEYGEN_TIMEOUT)
+    missing = [entry for entry, (resp, err, rc) in zip(entries, results)
+               if rc != 0]
+    scan_hosts = list(dict.fromkeys(host for host, _ in missing))
+    scans = sub_proc_exec_all([f'ssh-keyscan -H {host}' for host in scan_hosts],
+                              timeout=SSH_KEYSCAN_TIMEOUT)
+    host_keys = {host: resp for host, (resp, err, rc)
+                 in zip(scan_hosts, scans)}
+    for host, known_hosts in missing:
+        print(f'Adding \'{host}\' host keys to \'{known_hosts}\'')
+        append_line(known_hosts, host_keys[host], check_exists=False)
 
 
 def _validate_ansible_ping(software_hosts_file_path, hosts_list):
@@ -852,7 +851,10 @@ def copy_ssh_key_pair_to_hosts(private_key_path, software_hosts_file_path,
 
 
 def get_ansible_hostvars(software_hosts_file_path):
-    """Get Ansible generated 'hostvars' dictionary
+    """Get Ansible 'hostvars' dictionary
+
+    The inventory is parsed natively and cached until the file changes,
+    so repeated calls do not spawn 'ansible-inventory'.
 
     Args:
         software_hosts_file_path (str): Path to software inventory file
@@ -860,10 +862,16 @@ def get_ansible_hostvars(software_hosts_file_path):
     Returns:
         dict: Ansible 'hostvars' dictionary
     """
-    cmd = (f'ansible-inventory --inventory {software_hosts_file_path} --list')
-    resp, err, rc = sub_proc_exec(cmd, shell=True)
-    hostvars = json.loads(resp)['_meta']['hostvars']
-    return hostvars
+    return load_inventory(software_hosts_file_path).get_hostvars()
+
+
+def _is_true(value):
+    """Interpret an inventory variable as Ansible's 'bool' filter does.
+    Values set in INI ':vars' sections are strings.
+    """
+    if isinstance(value, str):
+        return value.strip().lower() in ('yes', 'on', '1', 'true', 'y', 't')
+    return bool(value)
 
 
 def get_host_list_no_reboot(software_hosts_file_path):
@@ -879,7 +887,7 @@ def get_host_list_no_reboot(software_hosts_file_path):
     hostvars = get_ansible_hostvars(software_hosts_file_path)
 
     for host, vars_dict in hostvars.items():
-        if 'pup_reboot' in vars_dict and not vars_dict['pup_reboot']:
+        if 'pup_reboot' in vars_dict and not _is_true(vars_dict['pup_reboot']):
             host_list.append(host)
 
     return host_list
@@ -33,15 +33,20 @@ from lib.ssh import SSH_Exception
 from lib.switch_exception import SwitchException
 from lib.switch import SwitchFactory
 from lib.exception import UserException, UserCriticalException
-from get_dhcp_lease_info import GetDhcpLeases
+from lib.lease_watcher import LeaseWatcher, read_leases
+from lib.node_correlator import NodeCorrelator
 from lib.genesis import get_dhcp_pool_start, GEN_PATH
-from lib.utilities import sub_proc_exec, sub_proc_launch
+from lib.utilities import sub_proc_exec, sub_proc_launch, get_pids, \
+    get_netns_name, kill_pid
 import lib.bmc as _bmc
+from lib.bmc_discovery import CredentialDiscovery
 from set_power_clients import set_power_clients
 from set_bootdev_clients import set_bootdev_clients
 
 # offset relative to bridge address
 NAME_SPACE_OFFSET_ADDR = 1
+# Seconds allowed for an fping scan of the IPMI or PXE network
+FPING_TIMEOUT = 300
 
 
 def main(config_path):
@@ -232,6 +237,11 @@ class ValidateClusterHardware(object):
         self.node_table_ipmi = AttrDict()
         self.node_table_pxe = AttrDict()
         self.node_list = []
+        self.lease_watchers = {}
+        self.correlator_ipmi = NodeCorrelator()
+        self.correlator_ipmi.add_config_slots(self.cfg, 'ipmi')
+        self.correlator_pxe = NodeCorrelator()
+        self.correlator_pxe.add_config_slots(self.cfg, 'pxe')
 
     def _add_offset_to_address(self, addr, offset):
         """calculates an address with an offset added.
@@ -257,8 +267,10 @@ class ValidateClusterHardware(object):
 
     def _get_credentials(self, node_addr_list, cred_list):
         """ Attempts to discover bmc credentials and generate a list of all
-        discovered nodes.  For each node try all available credentials.  If no
-        credentials allow access, the node is not marked as succesful.
+        discovered nodes.  Nodes are probed concurrently, each trying the
+        available credentials in affinity order (see
+        lib.bmc_discovery.CredentialDiscovery).  If no credentials allow
+        access, the node is not marked as succesful.
 
         Args:
             node_addr_list (list): list of ipv4 addresses for the discovered
@@ -271,59 +283,52 @@ class ValidateClusterHardware(object):
         """
         tot = [cred_list[x][3] for x in range(len(cred_list))]
         tot = sum(tot)
-        left = tot
-        max_attempts = 20
-        delay = 5
-        attempt = 0
-        timeout = 4
         print()
         self.log.info("Discover BMC credentials and verify communications")
         print()
-        nodes = {}
-        bmc_ai = {}
-        for node in node_addr_list:
-            nodes[node] = False
-        while not all([x for x in nodes.values()]) and attempt <= max_attempts:
-            print(f'\rAttempt count: {max_attempts - attempt}  ', end='')
+
+        # Credential affinity hints from the switch port each BMC was
+        # found on. cred_list holds one entry per node template.
+        port_templates = self._get_ipmi_port_templates()
+        templates = {}
+        macs = {}
+        for switch, table in self.node_table_ipmi.items():
+            for port, mac, ipaddr in table:
+                macs[ipaddr] = mac
+                if (switch, str(port)) in port_templates:
+                    templates[ipaddr] = port_templates[(switch, str(port))]
+
+        found = []
+
+        def _progress(node, creds):
+            found.append(node)
+            print(f'\r{len(found)} of {tot} nodes communicating via IPMI',
+                  end='')
             sys.stdout.flush()
-            attempt += 1
-            timeout += 1
-            node_list = [x for x in nodes if not nodes[x]]
-            for node in node_list:
-                # each time through re-sort cred_list based on nodes left with
-                # those credentials to maximize the probability
-                # of using the correct credentials with minimum attempts
-                cred_list.sort(key=lambda x: x[3], reverse=True)
-                for j, creds in enumerate(cred_list):
-                    self.log.debug(f'BMC {node} - Trying userid: {creds[0]} | '
-                                   f'password: {creds[1]} | bmc type: {creds[2]}')
-                    bmc = _bmc.Bmc(node, *creds[:-1], timeout=timeout)
-                    if bmc.is_connected():
-                        r = bmc.chassis_power('status')
-                        self.log.debug(f'Chassis power status: {r}')
-                        if r:
-                            nodes[node] = True
-                            time.sleep(1)
-                            self.log.debug(f'Node {node} is powered {r}')
-                            bmc_ai[node] = tuple(cred_list[j][:-1])
-                            cred_list[j][3] -= 1
-                            left -= 1
-                            print(f'\r{tot - left} of {tot} nodes communicating via IPMI',
-                                  end='')
-                            sys.stdout.flush()
-                            bmc.logout()
-                        else:
-                            self.log.debug(f'No power status response from node {node}')
-            time.sleep(delay)
+
+        discovery = CredentialDiscovery(cred_list)
+        bmc_ai = discovery.discover(node_addr_list, templates, macs,
+                                    callback=_progress)
+        left = tot - len(bmc_ai)
         if left != 0:
             self.log.error('IPMI communication successful with only '
                            f'{tot - left} of {tot} nodes')
             raise UserException('Unable to validate the following IPMI IP '
                                 'Addresses :'
-                                f'{[x for x in nodes if not nodes[x]]}')
+                                f'{[x for x in node_addr_list if x not in bmc_ai]}')
         print('\n')
         return bmc_ai
 
+    def _get_ipmi_port_templates(self):
+        """ Get the node template index cabled to each ipmi switch port
+        Returns:
+            dict: node template index keyed by (switch label, port str)
+        """
+        return {(tmpl_port.switch, str(tmpl_port.port)):
+                tmpl_port.template_index
+                for tmpl_port in self.cfg.model.template_ports
+                if tmpl_port.if_type == 'ipmi'}
+
     def _get_ipmi_ports(self, switch_lbl):
         """ Get all of the ipmi ports for a given switch
         Args:
@@ -331,15 +336,8 @@ class ValidateClusterHardware(object):
         Returns:
             ports (list of str): port name or number
         """
-        ports = []
-        for node_tmpl_idx in self.cfg.yield_ntmpl_ind():
-            for sw_idx in self.cfg.yield_ntmpl_phyintf_ipmi_ind(node_tmpl_idx):
-                if switch_lbl == self.cfg.get_ntmpl_phyintf_ipmi_switch(
-                        node_tmpl_idx, sw_idx):
-                    ports += self.cfg.get_ntmpl_phyintf_ipmi_ports(
-                        node_tmpl_idx, sw_idx)
-        ports = [str(port) for port in ports]
-        return ports
+        return [str(port) for port in
+                self.cfg.get_client_switch_ports(switch_lbl, 'ipmi')]
 
     def _get_pxe_ports(self, switch_lbl):
         """ Get all of the pxe ports for a given switch
@@ -348,15 +346,24 @@ class ValidateClusterHardware(object):
         Returns:
             ports (list of str): port name or number
         """
-        ports = []
-        for node_tmpl_idx in self.cfg.yield_ntmpl_ind():
-            for sw_idx in self.cfg.yield_ntmpl_phyintf_pxe_ind(node_tmpl_idx):
-                if switch_lbl == self.cfg.get_ntmpl_phyintf_pxe_switch(
-                        node_tmpl_idx, sw_idx):
-                    ports += self.cfg.get_ntmpl_phyintf_pxe_ports(
-                        node_tmpl_idx, sw_idx)
-        ports = [str(port) for port in ports]
-        return ports
+        return [str(port) for port in
+                self.cfg.get_client_switch_ports(switch_lbl, 'pxe')]
+
+    def _update_mac_tables(self, correlator):
+        """ Read the MAC address table of each management switch once
+        into a node correlator.
+        Args:
+            correlator (NodeCorrelator): Correlator to update
+        Returns:
+            labels (list of str): management switch labels
+        """
+        labels = []
+        for sw_ai in self.cfg.yield_sw_mgmt_access_info():
+            sw = SwitchFactory.factory(*sw_ai[1:])
+            correlator.update_mac_table(
+                sw_ai[0], sw.show_mac_address_table(format='std'))
+            labels.append(sw_ai[0])
+        return labels
 
     def _get_port_table_ipmi(self, node_list):
         """ Build table of discovered nodes.  The responding IP addresses are
@@ -367,98 +374,61 @@ class ValidateClusterHardware(object):
         Returns:
             table (AttrDict): switch, switch port, IPV4 address, MAC address
         """
-        dhcp_leases = GetDhcpLeases(self.dhcp_ipmi_leases_file)
-        dhcp_mac_ip = dhcp_leases.get_mac_ip()
-
-        dhcp_mac_table = AttrDict()
-        for ip in node_list:
-            for item in dhcp_mac_ip.items():
-                if ip in item:
-                    dhcp_mac_table[item[0]] = item[1]
+        correlator = self.correlator_ipmi
+        correlator.update_leases(read_leases(self.dhcp_ipmi_leases_file))
+        responding = set(node_list)
         self.log.debug('ipmi mac-ip table')
-        self.log.debug(dhcp_mac_table)
-
-        for sw_ai in self.cfg.yield_sw_mgmt_access_info():
-            sw = SwitchFactory.factory(*sw_ai[1:])
-            label = sw_ai[0]
-            ipmi_ports = self._get_ipmi_ports(label)
-            mgmt_sw_cfg_mac_lists = \
-                sw.show_mac_address_table(format='std')
-            # Get switch ipmi port mac address table
-            # Logic below maintains same port order as config.yml
-            sw_ipmi_mac_table = AttrDict()
-            for port in ipmi_ports:
-                if port in mgmt_sw_cfg_mac_lists:
-                    sw_ipmi_mac_table[port] = mgmt_sw_cfg_mac_lists[port]
-            self.log.debug('Switch ipmi port mac table')
-            self.log.debug(sw_ipmi_mac_table)
-
-            if label not in self.node_table_ipmi.keys():
-                self.node_table_ipmi[label] = []
-
-            for port in sw_ipmi_mac_table:
-                for mac in dhcp_mac_table:
-                    if mac in sw_ipmi_mac_table[port]:
-                        if not self._is_port_in_table(
-                                self.node_table_ipmi[label], port):
-                            self.node_table_ipmi[label].append(
-                                [port, mac, dhcp_mac_table[mac]])
+        self.log.debug({mac: ip for mac, ip in correlator.mac_ip.items()
+                        if ip in responding})
+
+        for label in self._update_mac_tables(correlator):
+            table = self.node_table_ipmi.setdefault(label, [])
+            ports_in_table = {row[0] for row in table}
+            # Slots are in the same port order as config.yml
+            for slot in correlator.slots.values():
+                port = str(slot.port)
+                if slot.switch != label or port in ports_in_table:
+                    continue
+                for mac in correlator.get_port_macs(label, port):
+                    if correlator.get_ip(mac) in responding:
+                        table.append([port, mac, correlator.get_ip(mac)])
+                        ports_in_table.add(port)
+                        break
 
     def _build_port_table_pxe(self, mac_list):
         """ Build table of discovered nodes.  The responding mac addresses
         discovered by tcpdump are correlated to switch ports from cluster
         switches. If nodes have taken an ip address (via dnsmasq) the ip
-        address is included in the table.
+        address is included in the table. Existing rows are updated when
+        the port or ip address of a mac address becomes known.
         Args:
-            node_list (list of str): IPV4 addresses
+            mac_list (list of str): MAC addresses
         Returns:
             table (AttrDict): switch, switch port, IPV4 address, MAC address
         """
-        dhcp_leases = GetDhcpLeases(self.dhcp_pxe_leases_file)
-        dhcp_mac_ip = dhcp_leases.get_mac_ip()
-
-        dhcp_mac_table = AttrDict()
-        for mac in mac_list:
-            for item in dhcp_mac_ip.items():
-                if mac in item:
-                    dhcp_mac_table[item[0]] = item[1]
+        correlator = self.correlator_pxe
+        correlator.update_leases(read_leases(self.dhcp_pxe_leases_file))
         self.log.debug('pxe dhcp mac table')
-        self.log.debug(dhcp_mac_table)
-
-        for sw_ai in self.cfg.yield_sw_mgmt_access_info():
-            sw = SwitchFactory.factory(*sw_ai[1:])
-            sw_label = sw_ai[0]
-            pxe_ports = self._get_pxe_ports(sw_label)
-            mgmt_sw_mac_lists = \
-                sw.show_mac_address_table(format='std')
-
-            # Get switch pxe port mac address table
-            # Logic below maintains same port order as config.yml
-            sw_pxe_mac_table = AttrDict()
-            for port in pxe_ports:
-                if port in mgmt_sw_mac_lists:
-                    sw_pxe_mac_table[port] = mgmt_sw_mac_lists[port]
-            self.log.debug('Switch pxe port mac table')
-            self.log.debug(sw_pxe_mac_table)
+        self.log.debug({mac: correlator.get_ip(mac) for mac in mac_list})
 
+        for label in self._update_mac_tables(correlator):
             # self.node_table_pxe is structured around switches
-            if sw_label not in self.node_table_pxe.keys():
-                self.node_table_pxe[sw_label] = []
-
+            table = self.node_table_pxe.setdefault(label, [])
+            rows = {row[1]: row for row in table}
             for mac in mac_list:
-                _port = '-'
-                for port in sw_pxe_mac_table:
-                    if mac in sw_pxe_mac_table[port]:
-                        _port = port
-                        break
-                if mac in dhcp_mac_table:
-                    ip = dhcp_mac_table[mac]
-                else:
-                    ip = '-'
-                if not self._is_val_in_table(
-                        self.node_table_pxe[sw_label], mac):
-                    self.node_table_pxe[sw_label].append(
-                        [_port, mac, ip])
+                port = '-'
+                key = correlator.get_port(mac)
+                if key is not None and key[0] == label and \
+                        correlator.get_slot(*key) is not None:
+                    port = key[1]
+                ip = correlator.get_ip(mac) or '-'
+                if mac not in rows:
+                    rows[mac] = [port, mac, ip]
+                    table.append(rows[mac])
+                elif port != '-' or ip != '-':
+                    row = rows[mac]
+                    row[0] = port if port != '-' else row[0]
+                    row[2] = ip if ip != '-' else row[2]
 
     def _reset_existing_bmcs(self, node_addr_list, cred_list):
         """ Attempts to reset any BMCs which have existing IP addresses since
@@ -523,7 +493,7 @@ class ValidateClusterHardware(object):
 
         # scan ipmi network for nodes with pre-existing ip addresses
         cmd = 'fping -r0 -a -g {} {}'.format(addr_st, addr_end)
-        node_list, stderr, rc = sub_proc_exec(cmd)
+        node_list, stderr, rc = sub_proc_exec(cmd, timeout=FPING_TIMEOUT)
         if rc not in (0, 1):
             self.log.warning(f'Error scanning IPMI network. rc: {rc}')
         self.log.debug('Pre-existing node list: \n{}'.format(node_list))
@@ -535,18 +505,19 @@ class ValidateClusterHardware(object):
             print('Pause 60s for BMCs to begin reset')
             time.sleep(60)
 
-        dns_list, stderr, rc = sub_proc_exec('pgrep dnsmasq')
-        if rc not in [0, 1]:
-            self.log.warning(f'Error looking for dnsmasq. rc: {rc}')
-        dns_list = dns_list.splitlines()
+        # Lease events are received from the namespace dnsmasq. If it is
+        # already running (without the event hook) the watcher falls back
+        # to checking the lease file for changes.
+        self.ipmi_watcher = self._start_lease_watcher(
+            self.ipmi_ns, self.dhcp_ipmi_leases_file)
 
-        for pid in dns_list:
-            ns_name, stderr, rc = sub_proc_exec('ip netns identify {}'.format(pid))
+        for pid in get_pids('dnsmasq'):
+            ns_name = get_netns_name(pid)
             if self.ipmi_ns._get_name_sp_name() in ns_name:
                 self.log.debug('DHCP already running in {}'.format(ns_name))
                 break
         else:
-            cmd = (f'dnsmasq --dhcp-leasefile={self.dhcp_ipmi_leases_file} '
+            cmd = (f'dnsmasq {self.ipmi_watcher.get_dnsmasq_args()} '
                    f'--interface={self.ipmi_ns._get_name_sp_ifc_name()} '
                    f'--dhcp-range={addr_st},{dhcp_end},{netmask},600')
             stdout, stderr, rc = self.ipmi_ns._exec_cmd(cmd)
@@ -554,27 +525,29 @@ class ValidateClusterHardware(object):
                 self.log.warning(f'Error setting up dnsmasq. rc: {rc}')
             print(stderr)
 
-        # Scan up to 25 times. Delay 5 seconds between scans
+        # Wait up to 125 s for BMCs to request DHCP addresses. Leased
+        # addresses are pinged as new leases appear.
         # Allow infinite number of retries
-        self.log.info('Scanning BMC network on 5 s intervals')
+        self.log.info('Waiting for BMC DHCP requests')
         cnt = 0
-        cnt_down = 25
+        scan_time = 125
         while cnt < ipmi_cnt:
             print()
-            for i in range(cnt_down):
-                print('\r{} of {} nodes requesting DHCP address. Scan count: {} '
-                      .format(cnt, ipmi_cnt, cnt_down - i), end="")
-                sys.stdout.flush()
-                time.sleep(5)
-                cmd = 'fping -r0 -a -g {} {}'.format(addr_st, dhcp_end)
-                stdout, stderr, rc = sub_proc_exec(cmd)
-                node_list = stdout.splitlines()
+            end_time = time.time() + scan_time
+            while True:
+                node_list = self._ping_addrs(
+                    self.ipmi_watcher.get_mac_ip().values())
                 cnt = len(node_list)
+                print('\r{} of {} nodes requesting DHCP address. Timeout: {} s '
+                      .format(cnt, ipmi_cnt, max(int(end_time - time.time()), 0)),
+                      end="")
+                sys.stdout.flush()
                 if cnt >= ipmi_cnt:
                     rc = True
-                    print('\r{} of {} nodes requesting DHCP address. Scan count: {} '
-                          .format(cnt, ipmi_cnt, cnt_down - i), end="")
                     break
+                if time.time() >= end_time:
+                    break
+                self.ipmi_watcher.wait(end_time - time.time())
 
             self._get_port_table_ipmi(node_list)
             self.log.debug('Table of found IPMI ports: {}'.format(self.node_table_ipmi))
@@ -644,26 +617,52 @@ class ValidateClusterHardware(object):
                              port_cnt])
         return cred_list
 
+    def _start_lease_watcher(self, ns, leases_file):
+        """ Start watching the DHCP leases of a namespace dnsmasq. The
+        watcher is stopped when the namespace is torn down.
+        Args:
+            ns (NetNameSpace): Namespace running dnsmasq
+            leases_file (str): dnsmasq lease file path
+        Returns:
+            watcher (LeaseWatcher): Started lease watcher
+        """
+        watcher = LeaseWatcher(leases_file)
+        watcher.start()
+        self.lease_watchers[ns._get_name_sp_name()] = watcher
+        return watcher
+
+    def _ping_addrs(self, addrs):
+        """ Ping a list of addresses once
+        Args:
+            addrs (iterable of str): IPV4 addresses
+        Returns:
+            list of str: Responding addresses
+        """
+        addrs = list(addrs)
+        if not addrs:
+            return []
+        stdout, stderr, rc = sub_proc_exec('fping -r0 -a ' + ' '.join(addrs),
+                                           timeout=FPING_TIMEOUT)
+        if rc not in (0, 1):
+            self.log.warning(f'Error pinging addresses. rc: {rc}')
+        return stdout.splitlines()
+
     def _teardown_ns(self, ns):
-        # kill dnsmasq
-        dns_list, stderr, rc = sub_proc_exec('pgrep dnsmasq')
-        dns_list = dns_list.splitlines()
+        watcher = self.lease_watchers.pop(ns._get_name_sp_name(), None)
+        if watcher is not None:
+            watcher.stop()
 
-        for pid in dns_list:
-            ns_name, stderr, rc = sub_proc_exec('ip netns identify ' + pid)
-            if ns._get_name_sp_name() in ns_name:
+        # kill dnsmasq
+        for pid in get_pids('dnsmasq'):
+            if ns._get_name_sp_name() in get_netns_name(pid):
                 self.log.debug('Killing dnsmasq {}'.format(pid))
-                stdout, stderr, rc = sub_proc_exec('kill -15 ' + pid)
+                kill_pid(pid)
 
         # kill tcpdump
-        tcpdump_list, stderr, rc = sub_proc_exec('pgrep tcpdump')
-        tcpdump_list = tcpdump_list.splitlines()
-
-        for pid in tcpdump_list:
-            ns_name, stderr, rc = sub_proc_exec('ip netns identify ' + pid)
-            if ns._get_name_sp_name() in ns_name:
+        for pid in get_pids('tcpdump'):
+            if ns._get_name_sp_name() in get_netns_name(pid):
                 self.log.debug('Killing tcpdump {}'.format(pid))
-                stdout, stderr, rc = sub_proc_exec('kill -15 ' + pid)
+                kill_pid(pid)
 
         # reconnect the veth pair to the container
         ns._reconnect_container()
@@ -751,20 +750,18 @@ class ValidateClusterHardware(object):
         addr_st = self._add_offset_to_address(pxe_network, dhcp_st)
         addr_end = self._add_offset_to_address(pxe_network, dhcp_st + pxe_cnt + 2)
 
-        dns_list, stderr, rc = sub_proc_exec('pgrep dnsmasq')
-        dns_list = dns_list.splitlines()
-
         if os.path.exists(self.dhcp_pxe_leases_file):
             os.remove(self.dhcp_pxe_leases_file)
 
         # delete any remnant dnsmasq processes
-        for pid in dns_list:
-            ns_name, stderr, rc = sub_proc_exec('ip netns identify {}'.format(pid))
-            if pxe_ns._get_name_sp_name() in ns_name:
+        for pid in get_pids('dnsmasq'):
+            if pxe_ns._get_name_sp_name() in get_netns_name(pid):
                 self.log.debug('Killing dnsmasq. pid {}'.format(pid))
-                stdout, stderr, rc = sub_proc_exec('kill -15 ' + pid)
+                kill_pid(pid)
 
-        cmd = (f'dnsmasq --dhcp-leasefile={self.dhcp_pxe_leases_file} '
+        pxe_watcher = self._start_lease_watcher(pxe_ns,
+                                                self.dhcp_pxe_leases_file)
+        cmd = (f'dnsmasq {pxe_watcher.get_dnsmasq_args()} '
                f'--interface={pxe_ns._get_name_sp_ifc_name()} '
                f'--dhcp-range={addr_st},{addr_end},{netmask},3600')
         stdout, stderr, rc = pxe_ns._exec_cmd(cmd)
@@ -774,15 +771,11 @@ class ValidateClusterHardware(object):
         if os.path.exists(self.tcp_dump_file):
             os.remove(self.tcp_dump_file)
 
-        tcpdump_list, stderr, rc = sub_proc_exec('pgrep tcpdump')
-        tcpdump_list = tcpdump_list.splitlines()
-
         # delete any remnant tcpdump processes
-        for pid in tcpdump_list:
-            ns_name, stderr, rc = sub_proc_exec('ip netns identify ' + pid)
-            if pxe_ns._get_name_sp_name() in ns_name:
+        for pid in get_pids('tcpdump'):
+            if pxe_ns._get_name_sp_name() in get_netns_name(pid):
                 self.log.debug('Killing tcpdump. pid {}'.format(pid))
-                stdout, stderr, rc = sub_proc_exec('kill -15 ' + pid)
+                kill_pid(pid)
 
         cmd = (f'sudo tcpdump -X -U -i {pxe_ns._get_name_sp_ifc_name()} '
                f'-w {self.tcp_dump_file} --immediate-mode  port 67')
@@ -790,9 +783,10 @@ class ValidateClusterHardware(object):
         if not isinstance(proc, object):
             self.log.error(f'Failure to launch process of tcpdump monitor {proc}')
 
-        # Scan up to 25 times. Delay 10 seconds between scans
+        # Scan up to 25 times. Scans run when a DHCP lease is handed out
+        # or after 10 seconds without one.
         # Allow infinite number of retries
-        self.log.info('Scanning pxe network on 10 s intervals.')
+        self.log.info('Scanning pxe network on DHCP lease events.')
         cnt = 0
         cnt_prev = 0
         cnt_down = 25
@@ -805,7 +799,7 @@ class ValidateClusterHardware(object):
                 print('\r{} of {} nodes requesting PXE boot. Scan cnt: {} '
                       .format(cnt, pxe_cnt, cnt_down - i), end="")
                 sys.stdout.flush()
-                time.sleep(10)
+                pxe_watcher.wait(10)
                 # read the tcpdump file if size is not 0
                 if os.path.exists(self.tcp_dump_file) and os.path.getsize(self.tcp_dump_file):
                     dump, stderr, rc = sub_proc_exec(cmd)
@@ -817,8 +811,12 @@ class ValidateClusterHardware(object):
                 cnt = len(mac_list)
                 if cnt > cnt_prev:
                     cnt_prev = cnt
-                    # Pause briefly for in flight DHCP to complete and lease file to update
-                    time.sleep(5)
+                    # Wait briefly for in flight DHCP to complete
+                    end_time = time.time() + 5
+                    while (time.time() < end_time and
+                           any(mac not in pxe_watcher.get_mac_ip()
+                               for mac in mac_list)):
+                        pxe_watcher.wait(end_time - time.time())
                     self._build_port_table_pxe(mac_list)
                 if cnt >= pxe_cnt:
                     foundall = True
@@ -913,13 +911,6 @@ class ValidateClusterHardware(object):
                 return True
         return False
 
-    def _is_val_in_table(self, table, val):
-        for item in table:
-            if val == item[0] or val == item[1]:
-                self.log.debug('Found in table: {} item: {}'.format(val, item))
-                return True
-        return False
-
     def _get_network(self, type_):
         """Returns details of a Power-Up network.
         Args:
@@ -28,7 +28,6 @@ from shutil import copy2
 import calendar
 import time
 import yaml
-import json
 from getpass import getpass
 import pwd
 import grp
@@ -38,7 +37,8 @@ import lib.logger as logger
 from repos import PowerupRepo, PowerupRepoFromDir, PowerupYumRepoFromRepo, \
     PowerupAnaRepoFromRepo, PowerupRepoFromRpm, setup_source_file, \
     PowerupPypiRepoFromRepo, get_name_dir
-from software_hosts import get_ansible_inventory, validate_software_inventory
+from software_hosts import get_ansible_inventory, \
+    validate_software_inventory, get_ansible_hostvars
 from lib.utilities import sub_proc_display, sub_proc_exec, heading1, Color, \
     get_selection, get_yesno, rlinput, bold, ansible_pprint, replace_regex
 from lib.genesis import GEN_SOFTWARE_PATH, get_ansible_playbook_path
@@ -1425,10 +1425,7 @@ class software(object):
 
 def _interactive_anaconda_license_accept(ansible_inventory, ana_path):
     log = logger.getlogger()
-    cmd = (f'ansible-inventory --inventory {ansible_inventory} --list')
-    resp, err, rc = sub_proc_exec(cmd, shell=True)
-    inv = json.loads(resp)
-    hostname, hostvars = inv['_meta']['hostvars'].popitem()
+    hostname, hostvars = get_ansible_hostvars(ansible_inventory).popitem()
     ip = re.search(r'(Anaconda\d)-\d+.\d+.\d+', ana_path, re.IGNORECASE).group(1)
     ip = f'/opt/{ip}/'.lower()
     base_cmd = f'ssh -t {hostvars["ansible_user"]}@{hostname} '
@@ -1462,9 +1459,7 @@ def _interactive_anaconda_license_accept(ansible_inventory, ana_path):
 def _interactive_paie_license_accept(ansible_inventory):
     log = logger.getlogger()
 
-    cmd = (f'ansible-inventory --inventory {ansible_inventory} --list')
-    resp, err, rc = sub_proc_exec(cmd, shell=True)
-    inv = json.loads(resp)
+    inv_hostvars = get_ansible_hostvars(ansible_inventory)
 
     accept_cmd = ('sudo /opt/DL/powerai-enterprise/license/bin/'
                   'accept-powerai-enterprise-license.sh ')
@@ -1475,7 +1470,7 @@ def _interactive_paie_license_accept(ansible_inventory):
                'all nodes in the cluster.'))
     rlinput(f'Press Enter to run interactively on each hosts')
 
-    for hostname, hostvars in inv['_meta']['hostvars'].items():
+    for hostname, hostvars in inv_hostvars.items():
         base_cmd = f'ssh -t {hostvars["ansible_user"]}@{hostname} '
         if "ansible_ssh_common_args" in hostvars:
             base_cmd += f'{hostvars["ansible_ssh_common_args"]} '
@@ -1510,10 +1505,7 @@ def _interactive_paie_license_accept(ansible_inventory):
 
 
 def _set_spectrum_conductor_install_env(ansible_inventory, package):
-    cmd = (f'ansible-inventory --inventory {ansible_inventory} --list')
-    resp, err, rc = sub_proc_exec(cmd, shell=True)
-    inv = json.loads(resp)
-    hostname, hostvars = inv['_meta']['hostvars'].popitem()
+    hostname, hostvars = get_ansible_hostvars(ansible_inventory).popitem()
 
     if package == 'spark':
         envs_path = (f'{GEN_SOFTWARE_PATH}/paie111_ansible/'
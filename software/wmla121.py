@@ -30,7 +30,6 @@ import time
 import yaml
 from yamlvault import YAMLVault
 from orderedattrdict.yamlutils import AttrDictYAMLLoader
-import json
 from getpass import getpass
 import pwd
 import grp
@@ -41,10 +40,13 @@ from repos import PowerupRepo, PowerupRepoFromDir, PowerupYumRepoFromRepo, \
     PowerupAnaRepoFromRepo, PowerupRepoFromRpm, setup_source_file, \
     PowerupPypiRepoFromRepo, get_name_dir
 from software_hosts import get_ansible_inventory, \
-    validate_software_inventory, get_host_list_no_reboot
+    validate_software_inventory, get_host_list_no_reboot, \
+    get_ansible_hostvars
 from lib.utilities import sub_proc_display, sub_proc_exec, heading1, Color, \
     get_selection, get_yesno, rlinput, bold, ansible_pprint, replace_regex, \
     lscpu, parse_rpm_filenames, md5sum
+from lib.ansible_procedure import InstallProcedure, get_ansible_env
+from lib.fact_cache import FactCache
 from lib.genesis import GEN_SOFTWARE_PATH, get_ansible_playbook_path, \
     get_playbooks_path, get_nginx_root_dir, get_venv_path, get_python_path, get_scripts_path, PYTHON_EXE
 from nginx_setup import nginx_setup
@@ -77,7 +79,7 @@ class software(object):
     """
     def __init__(self, eval_ver=False, non_int=False, arch='ppc64le',
                  proc_family=None, engr_mode=False, base_dir=None,
-                 public=None):
+                 public=None, single_run=False):
         self.log = logger.getlogger()
         self.log_lvl = logger.get_log_level_print()
         self.my_name = sys.modules[__name__].__name__
@@ -101,6 +103,7 @@ class software(object):
             else f'{self.my_name}_{self.arch}'
 
         self.eng_mode = engr_mode
+        self.single_run = single_run
         yaml.FullLoader.add_constructor(YAMLVault.yaml_tag,
                                         YAMLVault.from_yaml)
         self.ana_platform_basename = '64' if self.arch == "x86_64" else self.arch
@@ -1795,8 +1798,21 @@ class software(object):
                 run = False
             print('All done')
 
-    def _gather_facts(self):
+    def _gather_facts(self, refresh=False):
+        """Gather client facts into the fact cache
+
+        Args:
+            refresh (bool, optional): Gather even if unexpired facts are
+                                      cached (e.g. after client reboots)
+        """
         log = logger.getlogger()
+        fact_cache = FactCache()
+        hosts = list(get_ansible_hostvars(self.sw_vars['ansible_inventory']))
+        if refresh:
+            fact_cache.clear()
+        elif all(fact_cache.is_fresh(host) for host in hosts + ['localhost']):
+            log.info("Using cached client facts")
+            return
         run = True
         gather_facts_playbook = 'gather_facts.yml'
         cmd = (f"{get_ansible_playbook_path()} -i "
@@ -2168,7 +2184,8 @@ class software(object):
 
         specific_arch = "_" + self.arch if self.arch == 'x86_64' else ""
 
-        self._gather_facts()
+        self._gather_facts(
+            refresh=self.sw_vars['self_install_run_final_tasks'])
 
         if self.sw_vars['self_install_run_final_tasks']:
             print(bold(f'\nPrevious install paused to allow for manual client '
@@ -2194,6 +2211,8 @@ class software(object):
 
     def run_ansible_task(self, yamlfile):
         log = logger.getlogger()
+        if self.single_run:
+            return self._run_ansible_procedure(yamlfile)
         try:
             install_tasks = yaml.full_load(open(yamlfile))
         except Exception as e:
@@ -2215,6 +2234,7 @@ class software(object):
                                "automatically rebooted: "))
                     for host in no_reboot_hosts:
                         print(f"    {host}")
+                    FactCache().clear()
                     print(bold("\nPlease manually reboot these hosts and then "
                                "re-run 'pup software wmla121 --install'"))
                     break
@@ -2240,6 +2260,60 @@ class software(object):
 #                pass
         print('Done')
 
+    def _run_ansible_procedure(self, yamlfile):
+        """Run an install procedure as one compiled playbook. Interactive
+        steps (license acceptance, reboot checks) are run as gates
+        between playbook segments.
+        """
+        name = os.path.splitext(os.path.basename(yamlfile))[0]
+        procedure = InstallProcedure(
+            yamlfile, f'{GEN_SOFTWARE_PATH}{self.my_name}_ansible',
+            f'{GEN_SOFTWARE_PATH}{self.my_name}_ansible/{name}_compiled.yml',
+            f'{GEN_SOFTWARE_PATH}.{name}_state', self.eng_mode)
+
+        def _reboot_gate():
+            # Passed once the install paused for manual reboots
+            if self.sw_vars['self_install_run_final_tasks']:
+                return True
+            if procedure.check_reboots(
+                    self.sw_vars['ansible_inventory'],
+                    f'pup software {self.my_name} --install'):
+                return True
+            self.sw_vars['self_install_run_final_tasks'] = True
+            return False
+
+        gates = {
+            "PowerAI tuning recommendations": _reboot_gate,
+            "Install CUDA": lambda: _check_clients_needs_restarting(
+                self.sw_vars['ansible_inventory'])}
+        if not self.sw_vars["public"]:
+            gates["Install Anaconda installer"] = (
+                lambda: _interactive_anaconda_license_accept(
+                    self.sw_vars['ansible_inventory'],
+                    self.sw_vars['content_files']['anaconda'],
+                    self.sw_vars['ansible_remote_dir']))
+            gates["Check WMLA License acceptance and install to root"] = (
+                lambda: _interactive_wmla_license_accept(
+                    self.sw_vars['ansible_inventory'], self.eval_ver,
+                    self.sw_vars['remote_spectrum_computing_install_dir']))
+
+        cmd = (f'{get_ansible_playbook_path()} -i '
+               f'{self.sw_vars["ansible_inventory"]} '
+               f'--extra-vars "@{GEN_SOFTWARE_PATH}{self.sw_vars_file_name}" ')
+        before_run = None
+        if self.sw_vars['ansible_become_pass'] is not None:
+            cmd += f'--vault-password-file {self.vault_pass_file} '
+            before_run = (lambda: self._unlock_vault(validate=False))
+        elif procedure.uses_become():
+            print('\nClient password required for privilege escalation')
+            cmd += '--ask-become-pass '
+
+        env = get_ansible_env(ENVIRONMENT_VARS)
+        rc = procedure.run(cmd, gates, env, self.log_lvl == 'debug',
+                           before_run, self.non_int)
+        print('Done')
+        return rc
+
     def get_software_path(self, tasks_path):
         tasks_path = f'{self.my_name}_ansible/' + tasks_path
         return f'{GEN_SOFTWARE_PATH}{tasks_path}'
@@ -2267,11 +2341,12 @@ class software(object):
                    f'--extra-vars "task_file={GEN_SOFTWARE_PATH}{tasks_path}" '
                    f'--extra-vars "@{GEN_SOFTWARE_PATH}{self.sw_vars_file_name}" '
                    f'{extra_args}')
+        reboot = ('notify: Reboot' in
+                  open(f'{GEN_SOFTWARE_PATH}{tasks_path}').read())
         run = True
         while run:
             log.info(f'Running Ansible tasks found in \'{tasks_path}\' ...')
-            if ('notify: Reboot' in
-                    open(f'{GEN_SOFTWARE_PATH}{tasks_path}').read()):
+            if reboot:
                 print(bold('\nThis step requires changed systems to reboot! '
                            '(16 minute timeout)'))
             if '--ask-become-pass' in cmd:
@@ -2288,6 +2363,9 @@ class software(object):
 
             log.debug(f"cmd: {cmd}\nresp: {resp}\nerr: {err}\nrc: {rc}")
             print("")  # line break
+            if reboot:
+                # Rebooted clients may have new kernel and device facts
+                FactCache().clear()
 
             # If .vault file is missing a retry should work
             if rc != 0 and '.vault was not found' in err:
@@ -2325,10 +2403,7 @@ class software(object):
 def _interactive_anaconda_license_accept(ansible_inventory, ana_path,
                                          remote_dir='~'):
     log = logger.getlogger()
-    cmd = (f'ansible-inventory --inventory {ansible_inventory} --list')
-    resp, err, rc = sub_proc_exec(cmd, shell=True)
-    inv = json.loads(resp)
-    hostname, hostvars = inv['_meta']['hostvars'].popitem()
+    hostname, hostvars = get_ansible_hostvars(ansible_inventory).popitem()
     ip = re.search(r'(Anaconda\d)-\d+.\d+.\d+', ana_path, re.IGNORECASE).group(1)
     ip = f'/opt/{ip}/'.lower()
     base_cmd = f'ssh -t {hostvars["ansible_user"]}@{hostname} '
@@ -2361,10 +2436,7 @@ def _interactive_anaconda_license_accept(ansible_inventory, ana_path,
 
 def _interactive_wmla_license_accept(ansible_inventory, eval_ver, remote_dir):
     log = logger.getlogger()
-    cmd = (f'ansible-inventory --inventory {ansible_inventory} --list')
-    resp, err, rc = sub_proc_exec(cmd, shell=True)
-    inv = json.loads(resp)
-    hostname, hostvars = inv['_meta']['hostvars'].popitem()
+    hostname, hostvars = get_ansible_hostvars(ansible_inventory).popitem()
     base_cmd = f'ssh -t {hostvars["ansible_user"]}@{hostname} '
     if "ansible_ssh_private_key_file" in hostvars:
         base_cmd += f'-i {hostvars["ansible_ssh_private_key_file"]} '
@@ -2396,10 +2468,7 @@ def _interactive_wmla_license_accept(ansible_inventory, eval_ver, remote_dir):
 
 def _set_spectrum_conductor_install_env(ansible_inventory, package, ana_ver=None):
     mod_name = sys.modules[__name__].__name__
-    cmd = (f'ansible-inventory --inventory {ansible_inventory} --list')
-    resp, err, rc = sub_proc_exec(cmd, shell=True)
-    inv = json.loads(resp)
-    hostname, hostvars = inv['_meta']['hostvars'].popitem()
+    hostname, hostvars = get_ansible_hostvars(ansible_inventory).popitem()
 
     if package == 'spark':
         envs_path = (f'{GEN_SOFTWARE_PATH}/{mod_name}_ansible/'
@@ -2460,13 +2529,11 @@ def _set_spectrum_conductor_install_env(ansible_inventory, package, ana_ver=None
 
 def _check_clients_needs_restarting(ansible_inventory):
     log = logger.getlogger()
-    cmd = (f'ansible-inventory --inventory {ansible_inventory} --list')
-    resp, err, rc = sub_proc_exec(cmd, shell=True)
-    inv = json.loads(resp)
+    inv_hostvars = get_ansible_hostvars(ansible_inventory)
 
     needs_restarting_list = list()
 
-    for hostname, hostvars in inv['_meta']['hostvars'].items():
+    for hostname, hostvars in inv_hostvars.items():
         base_cmd = f'ssh -t {hostvars["ansible_user"]}@{hostname} '
         if "ansible_ssh_private_key_file" in hostvars:
             base_cmd += f'-i {hostvars["ansible_ssh_private_key_file"]} '
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# Copyright 2019 IBM Corp.
+#
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import tempfile
+import unittest
+
+import tests.unit  # noqa: F401 (sets up import path)
+from lib.ansible_inventory import load_inventory
+from lib.exception import UserException
+from software_hosts import get_host_list_no_reboot
+
+INI_INVENTORY = """\
+# Ansible Inventory File
+[master]
+host1.domain.com  # master host
+
+[compute]
+host[03:04].domain.com pup_reboot=False
+host5.domain.com:2222 ansible_user=other
+
+[cluster:children]
+master
+compute
+
+[compute:vars]
+role=compute
+port=1234
+
+[all:vars]
+pup_reboot=True
+ansible_user=egoadmin
+ansible_ssh_common_args='-o StrictHostKeyChecking=no'
+"""
+
+YAML_INVENTORY = """\
+all:
+  vars:
+    ansible_user: egoadmin
+  children:
+    master:
+      hosts:
+        host1.domain.com:
+    compute:
+      hosts:
+        host2.domain.com:
+          pup_reboot: false
+"""
+
+
+class TestAnsibleInventory(unittest.TestCase):
+
+    def _write(self, content):
+        fd, path = tempfile.mkstemp()
+        with os.fdopen(fd, 'w') as inventory_file:
+            inventory_file.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_ini_inventory(self):
+        inv = load_inventory(self._write(INI_INVENTORY))
+        self.assertEqual(inv.get_hosts('master'), ['host1.domain.com'])
+        self.assertEqual(inv.get_hosts('cluster'),
+                         ['host1.domain.com', 'host03.domain.com',
+                          'host04.domain.com', 'host5.domain.com'])
+        self.assertEqual(inv.get_hosts('missing'), [])
+        self.assertEqual(inv.get_groups('host03.domain.com'),
+                         ['all', 'cluster', 'compute'])
+
+        hostvars = inv.get_hostvars()
+        # Host line values are Python literals, ':vars' values strings
+        self.assertEqual(hostvars['host1.domain.com']['pup_reboot'], 'True')
+        self.assertIs(hostvars['host03.domain.com']['pup_reboot'], False)
+        self.assertEqual(hostvars['host03.domain.com']['role'], 'compute')
+        self.assertEqual(hostvars['host03.domain.com']['port'], '1234')
+        self.assertEqual(hostvars['host5.domain.com']['ansible_port'], 2222)
+        self.assertEqual(hostvars['host5.domain.com']['ansible_user'],
+                         'other')
+        self.assertEqual(
+            hostvars['host1.domain.com']['ansible_ssh_common_args'],
+            "'-o StrictHostKeyChecking=no'")
+
+    def test_yaml_inventory(self):
+        inv = load_inventory(self._write(YAML_INVENTORY))
+        self.assertEqual(inv.get_hosts(),
+                         ['host1.domain.com', 'host2.domain.com'])
+        hostvars = inv.get_hostvars()
+        self.assertEqual(hostvars['host1.domain.com'],
+                         {'ansible_user': 'egoadmin'})
+        self.assertIs(hostvars['host2.domain.com']['pup_reboot'], False)
+
+    def test_cache_invalidated_on_change(self):
+        path = self._write(INI_INVENTORY)
+        inv = load_inventory(path)
+        self.assertIs(load_inventory(path), inv)
+        # Returned hostvars are copies, safe to modify
+        inv.get_hostvars().popitem()
+        self.assertEqual(len(inv.get_hostvars()), 4)
+
+        with open(path, 'a') as inventory_file:
+            inventory_file.write('\n[extra]\nhost9.domain.com\n')
+        self.assertIn('host9.domain.com', load_inventory(path).get_hosts())
+
+    def test_host_list_no_reboot(self):
+        path = self._write(INI_INVENTORY)
+        self.assertEqual(get_host_list_no_reboot(path),
+                         ['host03.domain.com', 'host04.domain.com'])
+        # ':vars' values are strings
+        with open(path, 'a') as inventory_file:
+            inventory_file.write('\n[master:vars]\npup_reboot=False\n')
+        self.assertEqual(get_host_list_no_reboot(path),
+                         ['host1.domain.com', 'host03.domain.com',
+                          'host04.domain.com'])
+
+    def test_invalid_inventory(self):
+        with self.assertRaises(UserException):
+            load_inventory(self._write('[master]\nhost1 novalue\n'))
+
+
+if __name__ == '__main__':
+    unittest.main()
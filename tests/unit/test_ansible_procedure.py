@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# Copyright 2019 IBM Corp.
+#
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import yaml
+from mock import patch as patch
+
+import tests.unit  # noqa: F401 (sets up import path)
+from lib.ansible_procedure import InstallProcedure, get_ansible_env
+
+PROCEDURE = [
+    {'description': 'Install prerequisites', 'tasks': 'prereqs.yml'},
+    {'description': 'Engineering mode update',
+     'tasks': 'engr_mode_update.yml'},
+    {'description': 'Install CUDA', 'tasks': 'cuda.yml',
+     'hosts': 'gpu_nodes'},
+    {'description': 'Tune', 'tasks': 'tune.yml'},
+]
+TASKS = {
+    'prereqs.yml': '- name: Install\n  yum: name=gcc\n',
+    'engr_mode_update.yml': '- name: Update\n  become: yes\n',
+    'cuda.yml': '- name: Install CUDA\n  yum: name=cuda\n  notify: Reboot\n',
+    'tune.yml': '- name: Tune\n  command: tuned-adm\n',
+    'reboot.yml': '- name: Reboot\n  reboot:\n',
+}
+
+
+class TestInstallProcedure(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        for name, content in TASKS.items():
+            with open(os.path.join(self.tmp, name), 'w') as f:
+                f.write(content)
+        self.procedure_file = os.path.join(self.tmp, 'procedure.yml')
+        with open(self.procedure_file, 'w') as f:
+            yaml.safe_dump(PROCEDURE, f)
+        self.playbook = os.path.join(self.tmp, 'compiled.yml')
+        self.state_file = os.path.join(self.tmp, '.state')
+        self.exec_p = patch('lib.ansible_procedure.sub_proc_exec',
+                            return_value=('', '', 0))
+        self.sub_proc_exec = self.exec_p.start()
+        self.addCleanup(self.exec_p.stop)
+        self.cache_p = patch('lib.ansible_procedure.FactCache')
+        self.fact_cache = self.cache_p.start()
+        self.addCleanup(self.cache_p.stop)
+
+    def _get_procedure(self, eng_mode=False):
+        return InstallProcedure(self.procedure_file, self.tmp, self.playbook,
+                                self.state_file, eng_mode)
+
+    def _get_tags(self):
+        return [call[0][0].split('--tags ')[1].strip('"')
+                for call in self.sub_proc_exec.call_args_list]
+
+    def test_compile(self):
+        procedure = self._get_procedure()
+        self.assertEqual([step['tag'] for step in procedure.steps],
+                         ['step_00', 'step_02', 'step_03'])
+        with open(procedure.compile()) as f:
+            playbook = yaml.safe_load(f)
+        self.assertEqual(len(playbook), 4)
+        self.assertEqual(playbook[0]['tags'], ['always'])
+        play = playbook[2]
+        self.assertEqual(play['name'], 'Install CUDA')
+        self.assertEqual(play['hosts'], 'gpu_nodes:localhost')
+        self.assertEqual(play['tags'], ['step_02'])
+        self.assertEqual(play['tasks'][0], {
+            'import_tasks': os.path.join(self.tmp, 'cuda.yml')})
+        self.assertEqual(play['tasks'][2]['lineinfile'], {
+            'path': self.state_file, 'line': 'step_02', 'create': True})
+        self.assertEqual(play['handlers'], [{
+            'import_tasks': os.path.join(self.tmp, 'reboot.yml')}])
+        self.assertEqual(playbook[1]['hosts'], 'all')
+
+    def test_task_file_checks(self):
+        procedure = self._get_procedure()
+        self.assertFalse(procedure.uses_become())
+        self.assertTrue(self._get_procedure(eng_mode=True).uses_become())
+        self.assertTrue(procedure.requires_reboot(procedure.steps))
+        self.assertFalse(procedure.requires_reboot(procedure.steps[:1]))
+
+    def test_get_segments(self):
+        procedure = self._get_procedure()
+        self.assertEqual(len(procedure.get_segments()), 1)
+        segments = procedure.get_segments({'Install CUDA': None,
+                                           'Install prerequisites': None})
+        self.assertEqual([[step['tag'] for step in segment]
+                          for segment in segments],
+                         [['step_00'], ['step_02', 'step_03']])
+
+    def test_run(self):
+        gates = []
+        procedure = self._get_procedure()
+        self.assertTrue(procedure.run(
+            'ansible-playbook -i hosts',
+            {'Install CUDA': lambda: gates.append('cuda')}))
+        self.assertEqual(self._get_tags(), ['step_00', 'step_02,step_03'])
+        self.assertEqual(gates, ['cuda'])
+        self.assertTrue(self.sub_proc_exec.call_args_list[0][0][0].startswith(
+            f'ansible-playbook -i hosts {self.playbook} --tags'))
+        # Reboot steps invalidate cached facts
+        self.assertEqual(self.fact_cache.return_value.clear.call_count, 1)
+        self.assertFalse(os.path.isfile(self.state_file))
+
+    def test_gate_stop_and_resume(self):
+        procedure = self._get_procedure()
+        self.assertFalse(procedure.run('ansible-playbook',
+                                       {'Install CUDA': lambda: False}))
+        self.assertEqual(self._get_tags(), ['step_00'])
+        self.assertEqual(procedure.get_completed(), {'step_00'})
+        self.assertTrue(procedure.run('ansible-playbook',
+                                      {'Install CUDA': lambda: True},
+                                      non_int=True))
+        self.assertEqual(self._get_tags(), ['step_00', 'step_02,step_03'])
+
+    def test_resume_within_segment(self):
+        procedure = self._get_procedure()
+        procedure.set_completed(procedure.steps[0])
+        procedure.set_completed(procedure.steps[1])
+        gates = []
+        self.assertTrue(procedure.run(
+            'ansible-playbook', {'Install CUDA': lambda: gates.append(1)},
+            non_int=True))
+        # The gate only runs before its own step
+        self.assertEqual(self._get_tags(), ['step_03'])
+        self.assertEqual(gates, [])
+
+    @patch('lib.ansible_procedure.get_selection', return_value=('2', None))
+    def test_failed_step(self, get_selection):
+        # The first step is recorded by the playbook before the failure
+        def _run(cmd, shell, env):
+            procedure.set_completed(procedure.steps[0])
+            return '', 'failed', 2
+        self.sub_proc_exec.side_effect = _run
+        procedure = self._get_procedure()
+        self.assertTrue(procedure.run('ansible-playbook'))
+        # Continue marks the failed step completed and runs the rest
+        self.assertEqual(self._get_tags(), ['step_00,step_02,step_03',
+                                            'step_03'])
+        self.assertEqual(get_selection.call_count, 2)
+
+    @patch('software_hosts.get_host_list_no_reboot')
+    def test_check_reboots(self, get_host_list_no_reboot):
+        procedure = self._get_procedure()
+        get_host_list_no_reboot.return_value = []
+        self.assertTrue(procedure.check_reboots('hosts', 'pup software x'))
+        self.fact_cache.return_value.clear.assert_not_called()
+        get_host_list_no_reboot.return_value = ['node1']
+        self.assertFalse(procedure.check_reboots('hosts', 'pup software x'))
+        self.fact_cache.return_value.clear.assert_called_once_with()
+        get_host_list_no_reboot.assert_called_with('hosts')
+
+
+class TestAnsibleEnv(unittest.TestCase):
+
+    def test_get_ansible_env(self):
+        env = get_ansible_env({'ANSIBLE_PIPELINING': 'False'})
+        self.assertEqual(env['ANSIBLE_PIPELINING'], 'False')
+        self.assertIn('ControlPersist', env['ANSIBLE_SSH_ARGS'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# Copyright 2019 IBM Corp.
+#
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import time
+import unittest
+
+import tests.unit  # noqa: F401 (sets up import path)
+from lib.arp import (ARP_REQUEST, ArpProbe, make_arp_request,
+                     parse_arp_frame)
+from lib.interfaces import Interfaces
+
+NAMESPACE = 'pup-test-arp'
+MAC = b'\x02\x00\x00\x00\x00\x01'
+
+
+def _create_netns():
+    if os.geteuid() != 0:
+        return False
+    from pyroute2 import netns
+    try:
+        netns.create(NAMESPACE)
+    except OSError:
+        return False
+    return True
+
+
+class TestArpFrame(unittest.TestCase):
+
+    def test_request(self):
+        frame = make_arp_request(MAC, '192.168.1.254')
+        self.assertEqual(len(frame), 42)
+        self.assertEqual(frame[:6], b'\xff' * 6)
+        self.assertEqual(parse_arp_frame(frame),
+                         (ARP_REQUEST, MAC, '0.0.0.0', '192.168.1.254'))
+        self.assertEqual(frame[-4:], bytes([192, 168, 1, 254]))
+        self.assertIsNone(parse_arp_frame(frame[:30]))
+        self.assertIsNone(parse_arp_frame(frame[:12] + b'\x08\x00' +
+                                          frame[14:]))
+
+
+class FakeSocket(object):
+    """Non-blocking socket with queued frames"""
+
+    def __init__(self, frames):
+        self.frames = list(frames)
+
+    def recv(self, size):
+        if not self.frames:
+            raise BlockingIOError
+        return self.frames.pop(0)
+
+
+class TestArpReceive(unittest.TestCase):
+
+    def setUp(self):
+        self.probe = ArpProbe.__new__(ArpProbe)
+        self.probe.mac = MAC
+
+    def _receive(self, *frames):
+        self.probe.sock = FakeSocket(frames)
+        pending = {'10.9.0.10', '10.9.0.11', '10.9.0.12'}
+        used = set()
+        self.probe._receive(pending, used)
+        self.assertEqual(pending | used, {'10.9.0.10', '10.9.0.11',
+                                          '10.9.0.12'})
+        return used
+
+    def test_receive(self):
+        other = b'\x02\x00\x00\x00\x00\x02'
+        self.assertEqual(self._receive(
+            # Own probe, another host's probe and an address claim
+            make_arp_request(MAC, '10.9.0.10'),
+            make_arp_request(other, '10.9.0.11'),
+            make_arp_request(other, '10.9.1.1', src_addr='10.9.0.12')),
+            {'10.9.0.11', '10.9.0.12'})
+        # A request from a configured address does not claim its target
+        self.assertEqual(self._receive(
+            make_arp_request(other, '10.9.0.10', src_addr='10.9.1.1')),
+            set())
+
+
+class TestArpProbe(unittest.TestCase):
+    """'a0' probes; its veth peer 'a1' answers for the addresses it holds"""
+
+    def setUp(self):
+        if not _create_netns():
+            self.skipTest('Network namespaces require root')
+        self.ifcs = Interfaces(netns=NAMESPACE)
+        self.addCleanup(self._cleanup)
+        self.ifcs.link('add', ifname='a0', kind='veth', peer='a1')
+        for name in ('a0', 'a1'):
+            self.ifcs.link('set', index=self.ifcs.link_lookup(ifname=name)[0],
+                           state='up')
+        self.ifcs.ifcs = self.ifcs.get_interfaces_dict()
+
+    def _cleanup(self):
+        from pyroute2 import netns
+        self.ifcs.close()
+        netns.remove(NAMESPACE)
+
+    def _add_peer_addrs(self, *addrs):
+        index = self.ifcs.link_lookup(ifname='a1')[0]
+        for addr in addrs:
+            self.ifcs.addr('add', index=index, address=addr, mask=24)
+
+    def test_probe(self):
+        self._add_peer_addrs('10.9.0.10', '10.9.0.12')
+        candidates = [f'10.9.0.{i}' for i in range(10, 14)]
+        with ArpProbe('a0', timeout=0.3, netns=NAMESPACE) as probe:
+            start = time.time()
+            used = probe.probe(candidates)
+            # All candidates are probed together
+            self.assertLess(time.time() - start, 1.5)
+            self.assertEqual(used, {'10.9.0.10', '10.9.0.12'})
+            self.assertEqual(probe.find_unused(candidates), '10.9.0.11')
+            self.assertEqual(probe.find_unused(candidates[2:], window=1),
+                             '10.9.0.13')
+            self.assertIsNone(probe.find_unused(['10.9.0.10', '10.9.0.12'],
+                                                window=1))
+
+    def test_find_unused_addr_and_add_to_ifc(self):
+        self._add_peer_addrs('10.9.0.252', '10.9.0.251', '10.9.1.4')
+        ifcs = self.ifcs
+        self.assertTrue(ifcs.find_unused_addr_and_add_to_ifc('a0',
+                                                             '10.9.0.0/24'))
+        self.assertEqual(ifcs.get_interface_addresses('a0'), ['10.9.0.250'])
+        # An existing address in the subnet is kept
+        self.assertTrue(ifcs.find_unused_addr_and_add_to_ifc(
+            'a0', '10.9.0.0/24', loc='bot'))
+        self.assertEqual(ifcs.get_interface_addresses('a0'), ['10.9.0.250'])
+        self.assertTrue(ifcs.find_unused_addr_and_add_to_ifc(
+            'a0', '10.9.1.0/24', loc='bot'))
+        self.assertEqual(ifcs.get_interface_addresses('a0'),
+                         ['10.9.0.250', '10.9.1.5'])
+
+
+if __name__ == '__main__':
+    unittest.main()
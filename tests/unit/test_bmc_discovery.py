@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# Copyright 2019 IBM Corp.
+#
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import unittest
+
+import tests.unit  # noqa: F401 (sets up import path)
+from lib.bmc_discovery import CredentialDiscovery, get_oui
+from lib.bmc_simulator import BmcFleet
+
+OUI = '70:e2:84'
+
+
+class FakeDiscovery(CredentialDiscovery):
+    """Discovery against a table of working credential indices"""
+
+    def __init__(self, cred_list, working, errors=None, **kwargs):
+        super(FakeDiscovery, self).__init__(cred_list, **kwargs)
+        self.working = working
+        self.errors = errors or {}
+        self.probes = []
+        self.probe_lock = threading.Lock()
+
+    def probe(self, node, creds, timeout):
+        with self.probe_lock:
+            self.probes.append((node, self.cred_list.index(creds), timeout))
+            if self.errors.get(node):
+                self.errors[node] -= 1
+                raise OSError(f'{node} unreachable')
+        return self.cred_list.index(creds) == self.working[node]
+
+
+class TestCredentialOrder(unittest.TestCase):
+
+    def setUp(self):
+        self.cred_list = [['ADMIN', 'admin', 'ipmi', 2],
+                          ['root', '0penBmc', 'openbmc', 5],
+                          ['USERID', 'PASSW0RD', 'ipmi', 5]]
+        self.discovery = CredentialDiscovery(self.cred_list)
+
+    def test_get_order(self):
+        # Most nodes still expected, ties by index
+        self.assertEqual(self.discovery.get_order(), [1, 2, 0])
+        self.assertEqual(self.discovery.get_order(template=0), [0, 1, 2])
+
+    def test_record(self):
+        self.discovery._record(2, OUI)
+        self.assertEqual(self.discovery.successes, [0, 0, 1])
+        self.assertEqual(self.discovery.remaining, [2, 5, 4])
+        self.assertEqual(self.discovery.get_order(), [2, 1, 0])
+        self.discovery._record(0, OUI)
+        self.discovery._record(0, OUI)
+        self.discovery._record(1, None)
+        self.discovery._record(1, None)
+        self.discovery._record(1, None)
+        # Same OUI successes before overall successes
+        self.assertEqual(self.discovery.get_order(oui=OUI), [0, 2, 1])
+        self.assertEqual(self.discovery.get_order(), [1, 0, 2])
+        # Template affinity before OUI affinity
+        self.assertEqual(self.discovery.get_order(template=2, oui=OUI),
+                         [2, 0, 1])
+
+    def test_get_oui(self):
+        self.assertEqual(get_oui('70-E2-84-14-0A-A1'), OUI)
+        self.assertIsNone(get_oui(None))
+
+
+class TestDiscover(unittest.TestCase):
+
+    def setUp(self):
+        self.cred_list = [['ADMIN', 'admin', 'ipmi', 2],
+                          ['USERID', 'PASSW0RD', 'ipmi', 2]]
+
+    def test_discover(self):
+        nodes = [f'10.0.0.{i}' for i in range(1, 5)]
+        working = dict(zip(nodes, [0, 0, 1, 1]))
+        discovery = FakeDiscovery(self.cred_list, working, max_workers=2)
+        found = []
+        bmc_ai = discovery.discover(
+            nodes, templates={nodes[3]: 1},
+            macs={node: OUI + ':00:00:0' + node[-1] for node in nodes},
+            callback=lambda node, creds: found.append(node))
+        self.assertEqual(bmc_ai, {node: tuple(
+            self.cred_list[index][:3]) for node, index in working.items()})
+        self.assertEqual(sorted(found), nodes)
+        # The template node is probed with its own credentials first
+        self.assertEqual([probe[1] for probe in discovery.probes
+                          if probe[0] == nodes[3]], [1])
+
+    def test_probe_errors(self):
+        nodes = ['10.0.0.1', '10.0.0.2']
+        discovery = FakeDiscovery(self.cred_list,
+                                  {nodes[0]: 0, nodes[1]: 1},
+                                  errors={nodes[0]: 1})
+        bmc_ai = discovery.discover(nodes, delay=0, timeout=5)
+        self.assertEqual(list(sorted(bmc_ai)), nodes)
+        # Retried in the next round with a longer timeout, first with the
+        # credentials that worked for the other node
+        self.assertEqual([probe for probe in discovery.probes
+                          if probe[0] == nodes[0]],
+                         [(nodes[0], 0, 5), (nodes[0], 1, 6),
+                          (nodes[0], 0, 6)])
+
+    def test_unreachable(self):
+        discovery = FakeDiscovery(self.cred_list, {'10.0.0.1': None},
+                                  errors={'10.0.0.1': 10})
+        self.assertEqual(discovery.discover(['10.0.0.1'], max_rounds=3,
+                                            delay=0), {})
+        self.assertEqual(len(discovery.probes), 3)
+
+    def test_simulated_bmcs(self):
+        with BmcFleet(4, 'ipmi') as fleet:
+            cred_list = [['ADMIN', 'wrong', 'ipmi', 2],
+                         [fleet.userid, fleet.password, 'ipmi', 2]]
+            discovery = CredentialDiscovery(cred_list, max_workers=4)
+            bmc_ai = discovery.discover(fleet.get_addresses(), max_rounds=1)
+            self.assertEqual(bmc_ai, {
+                address: (fleet.userid, fleet.password, 'ipmi')
+                for address in fleet.get_addresses()})
+            self.assertEqual(discovery.successes, [0, 4])
+
+
+if __name__ == '__main__':
+    unittest.main()
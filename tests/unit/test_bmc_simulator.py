@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# Copyright 2019 IBM Corp.
+#
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import time
+import unittest
+
+import tests.unit  # noqa: F401 (sets up import path)
+from lib.bmc import Bmc
+from lib.bmc_simulator import BmcFleet, SimulatedNode
+from lib.ipmi import split_host
+
+
+class TestBmcSimulator(unittest.TestCase):
+
+    def test_split_host(self):
+        self.assertEqual(split_host('192.168.30.21'), ('192.168.30.21', 623))
+        self.assertEqual(split_host('127.0.0.1:6230'), ('127.0.0.1', 6230))
+        self.assertEqual(split_host('fe80::1'), ('fe80::1', 623))
+
+    def test_node(self):
+        node = SimulatedNode(0, power_delay=0.2, auth_fail_rate=0.5, seed=1)
+        results = [node.check_login('ADMIN', 'admin') for _ in range(20)]
+        self.assertIn(True, results)
+        self.assertIn(False, results)
+        self.assertFalse(node.check_login('ADMIN', 'wrong'))
+        self.assertEqual(node.stats.auth_failures, results.count(False) + 1)
+        node.set_power('on')
+        self.assertEqual(node.power, 'off')
+        time.sleep(0.3)
+        self.assertEqual(node.power, 'on')
+
+    def _round_trip(self, bmc_type):
+        with BmcFleet(3, bmc_type, nodes_per_process=2,
+                      reset_time=0.5) as fleet:
+            addresses = fleet.get_addresses()
+            self.assertEqual(len(set(addresses)), 3)
+            bmc = Bmc(addresses[1], 'ADMIN', 'admin', bmc_type)
+            self.assertTrue(bmc.is_connected())
+            self.assertEqual(bmc.chassis_power('status'), 'off')
+            bmc.chassis_power('on')
+            self.assertEqual(bmc.chassis_power('status'), 'on')
+            self.assertEqual(bmc.host_boot_source('network'), 'network')
+            self.assertEqual(bmc.host_boot_source(), 'network')
+            self.assertTrue(bmc.bmc_reset('cold'))
+            self.assertIsNone(bmc.chassis_power('status'))
+            time.sleep(0.6)
+            bmc = Bmc(addresses[1], 'ADMIN', 'admin', bmc_type)
+            self.assertEqual(bmc.chassis_power('status'), 'on')
+            self.assertTrue(bmc.logout())
+            self.assertFalse(Bmc(addresses[2], 'ADMIN', 'wrong',
+                                 bmc_type).is_connected())
+            nodes = fleet.get_nodes()
+            stats = fleet.get_stats()
+        self.assertEqual([node.power for node in nodes], ['off', 'on', 'off'])
+        self.assertEqual(nodes[1].bootdev, 'default')
+        self.assertEqual(stats.resets, 1)
+        self.assertGreaterEqual(stats.dropped, 1)
+
+    def test_ipmi_round_trip(self):
+        self._round_trip('ipmi')
+
+    def test_openbmc_round_trip(self):
+        self._round_trip('openbmc')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# Copyright 2019 IBM Corp.
+#
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+import yaml
+from orderedattrdict.yamlutils import AttrDictYAMLLoader
+
+import tests.unit  # noqa: F401 (sets up import path)
+from lib.config_model import ConfigModel, NetworkMask
+from lib.exception import UserException
+
+CONFIG = """
+deployer:
+    networks:
+        mgmt:
+            - device: enp1s0f0
+              interface_ipaddr: 192.168.5.2
+              netmask: 255.255.255.0
+        client:
+            - type: ipmi
+              device: enp1s0f0
+              container_ipaddr: 192.168.30.2
+              bridge_ipaddr: 192.168.30.3
+              prefix: 22
+              vlan: 30
+interfaces:
+    - label: pxe_ifc
+      description: pxe interface
+      iface: eth15
+    - label: data_ifc
+      description: data interface
+      iface: eth10
+networks:
+    - label: data_net
+      interfaces:
+          - data_ifc
+node_templates:
+    - label: compute
+      networks:
+          - data_net
+      physical_interfaces:
+          ipmi:
+              - switch: mgmt1
+                ports: [1, 2]
+          pxe:
+              - switch: mgmt1
+                interface: pxe_ifc
+                ports: [3, 4]
+    - label: storage
+      physical_interfaces:
+          ipmi:
+              - switch: mgmt1
+                ports: [5]
+          pxe:
+              - switch: mgmt1
+                interface: pxe_ifc
+                ports: [6]
+"""
+
+
+class TestConfigModel(unittest.TestCase):
+
+    def setUp(self):
+        self.model = ConfigModel(yaml.load(CONFIG, Loader=AttrDictYAMLLoader))
+
+    def test_port_views(self):
+        self.assertEqual(self.model.templates, ('compute', 'storage'))
+        self.assertEqual(self.model.get_switch_ports('mgmt1', 'ipmi'),
+                         (1, 2, 5))
+        self.assertEqual(self.model.get_switch_ports('mgmt2', 'ipmi'), ())
+        self.assertEqual(self.model.get_port_template('mgmt1', '6', 'pxe'), 1)
+        self.assertIsNone(self.model.get_port_template('mgmt1', 6, 'ipmi'))
+        with self.assertRaises(TypeError):
+            self.model.port_templates[('ipmi', 'mgmt1', '9')] = 0
+
+    def test_interfaces(self):
+        self.assertEqual(self.model.template_if_labels,
+                         (('pxe_ifc', 'data_ifc'), ('pxe_ifc',)))
+        self.assertEqual(self.model.interfaces['data_ifc'].iface, 'eth10')
+
+    def test_masks(self):
+        self.assertEqual(self.model.mgmt_masks,
+                         (NetworkMask('255.255.255.0', 24),))
+        self.assertEqual(self.model.client_masks,
+                         (NetworkMask('255.255.252.0', 22),))
+
+    def test_invalid_mask(self):
+        cfg = yaml.load(CONFIG, Loader=AttrDictYAMLLoader)
+        cfg.deployer.networks.mgmt[0].netmask = '255.255.256.0'
+        model = ConfigModel(cfg)
+        # Unrelated views are not affected
+        self.assertEqual(model.templates, ('compute', 'storage'))
+        self.assertEqual(model.client_masks,
+                         (NetworkMask('255.255.252.0', 22),))
+        with self.assertRaisesRegex(UserException,
+                                    r"'deployer\.networks\.mgmt\[0\]\."
+                                    r"netmask'"):
+            model.mgmt_masks
+        cfg.deployer.networks.client[0].prefix = 33
+        with self.assertRaisesRegex(UserException, 'client.0..prefix'):
+            ConfigModel(cfg).client_masks
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# Copyright 2019 IBM Corp.
+#
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from mock import patch as patch
+from orderedattrdict import AttrDict
+
+import tests.unit  # noqa: F401 (sets up import path)
+from tests.unit import TOP_DIR
+from lib.db import DatabaseConfig
+from lib.exception import UserCriticalException, UserException
+from lib.validate_config_schema import ValidateConfigSchema
+
+CONFIG_FILE = os.path.join(TOP_DIR, 'sample-configs',
+                           'basic.config.red-hat.yml')
+
+
+class TestValidateConfigSchema(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        # The generated schema is cached on disk
+        self.cache_p = patch('lib.genesis.get_cache_path',
+                             return_value=os.path.join(self.tmp, ''))
+        self.cache_p.start()
+        self.addCleanup(self.cache_p.stop)
+
+    def test_get_errors(self):
+        config = AttrDict({'version': 'v2.0', 'globals': 'x', 'bogus': 1})
+        errors, warnings = ValidateConfigSchema(config).get_errors()
+        self.assertEqual(len(errors), 3)
+        self.assertIn("'interfaces' is a required property", errors[0])
+        self.assertIn("'node_templates' is a required property", errors[1])
+        self.assertIn("'x' is not of type 'object'", errors[2])
+        self.assertEqual(len(warnings), 1)
+        self.assertIn("'bogus' was unexpected", warnings[0])
+
+    def test_validate_config_schema(self):
+        config = AttrDict({'version': 'v2.0', 'globals': 'x'})
+        with self.assertRaises(UserCriticalException) as cm:
+            ValidateConfigSchema(config).validate_config_schema()
+        self.assertEqual(len(str(cm.exception).splitlines()), 3)
+        config = AttrDict({'version': 'v2.0', 'bogus': 1, 'interfaces': [],
+                           'node_templates': []})
+        with self.assertRaises(UserException) as cm:
+            ValidateConfigSchema(config).validate_config_schema()
+        self.assertNotIsInstance(cm.exception, UserCriticalException)
+
+
+class TestValidationCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.cfg_file = os.path.join(self.tmp, 'config.yml')
+        shutil.copy(CONFIG_FILE, self.cfg_file)
+        self.cache_p = patch('lib.genesis.get_cache_path',
+                             return_value=os.path.join(self.tmp, 'cache', ''))
+        self.cache_p.start()
+        # Logic validation of the sample config needs OS images; its
+        # results are replaced to count the validation runs
+        self.logic_p = patch('lib.db.ValidateConfigLogic')
+        self.logic = self.logic_p.start()
+
+    def tearDown(self):
+        self.logic_p.stop()
+        self.cache_p.stop()
+        shutil.rmtree(self.tmp)
+
+    def _validate(self):
+        DatabaseConfig(self.cfg_file).validate_config()
+        return self.logic.return_value.validate_config_logic.call_count
+
+    def test_cache_hit(self):
+        self.assertEqual(self._validate(), 1)
+        self.assertEqual(self._validate(), 1)
+
+    def test_cached_warnings(self):
+        self.logic.return_value.validate_config_logic.side_effect = \
+            UserException('warning')
+        for _ in range(2):
+            with self.assertRaisesRegex(UserException, 'warning'):
+                self._validate()
+        self.assertEqual(
+            self.logic.return_value.validate_config_logic.call_count, 1)
+
+    def test_errors_not_cached(self):
+        self.logic.return_value.validate_config_logic.side_effect = \
+            UserCriticalException('error')
+        for _ in range(2):
+            with self.assertRaises(UserCriticalException):
+                self._validate()
+        self.assertEqual(
+            self.logic.return_value.validate_config_logic.call_count, 2)
+
+    def test_config_change(self):
+        self.assertEqual(self._validate(), 1)
+        with open(self.cfg_file, 'a') as cfg_file:
+            cfg_file.write('\n# changed\n')
+        self.assertEqual(self._validate(), 2)
+
+    def test_rule_change(self):
+        self.assertEqual(self._validate(), 1)
+        with patch('lib.db.LOGIC_VERSION', 'changed'):
+            self.assertEqual(self._validate(), 2)
+        with patch('lib.db.SCHEMA_VERSION', 'changed'):
+            self.assertEqual(self._validate(), 3)
+        self.assertEqual(self._validate(), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
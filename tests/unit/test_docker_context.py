@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# Copyright 2019 IBM Corp.
+#
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+import os
+import tarfile
+import tempfile
+import unittest
+
+import tests.unit  # noqa: F401 (sets up import path)
+from tests.unit import TOP_DIR
+from lib.docker_context import (get_context_digest, get_context_files,
+                                get_copy_sources, is_ignored, write_context)
+
+DOCKERFILE = """FROM ubuntu:18.04
+# COPY ./commented /opt/
+RUN apt-get update && \\
+    apt-get install -y git
+COPY ./LICENSE /opt/power-up/
+copy --chown=root:root ./scripts/* \\
+    /opt/power-up/scripts/
+ADD ["os-images/config*", "/opt/power-up/os-images/config/"]
+COPY ./logs/* /opt/power-up/logs/
+COPY --from=builder /build/out /opt/
+ADD https://example.com/file.tgz /opt/
+"""
+FILES = {
+    'LICENSE': 'license',
+    'scripts/setup.sh': 'setup',
+    'scripts/python/gen.py': 'gen',
+    'scripts/python/__pycache__/gen.cpython-36.pyc': 'compiled',
+    'scripts/.hidden': 'hidden',
+    'os-images/config/RHEL.ks': 'ks',
+    'os-images/config-extra': 'extra',
+    'os-images/rhel.iso': 'iso',
+    'logs/gen': 'log',
+    'docs/index.rst': 'docs',
+    'tests/unit/test_x.py': 'test',
+}
+
+
+class TestDockerContext(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.context = self.tmp.name
+        self.dockerfile = os.path.join(self.context, 'Dockerfile')
+        self._write('Dockerfile', DOCKERFILE)
+        self._write('.dockerignore', '/pup-venv\n**/__pycache__\n')
+        for path, data in FILES.items():
+            self._write(path, data)
+
+    def _write(self, path, data):
+        path = os.path.join(self.context, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(data)
+
+    def _digest(self):
+        return get_context_digest(
+            self.context, get_context_files(self.context, self.dockerfile))
+
+    def test_copy_sources(self):
+        self.assertEqual(get_copy_sources(self.dockerfile),
+                         ['./LICENSE', './scripts/*', 'os-images/config*',
+                          './logs/*'])
+
+    def test_context_files(self):
+        self.assertEqual(get_context_files(self.context, self.dockerfile), [
+            'Dockerfile', 'LICENSE', 'logs/gen', 'os-images/config-extra',
+            'os-images/config/RHEL.ks', 'scripts/.hidden',
+            'scripts/python/gen.py', 'scripts/setup.sh'])
+        self.assertTrue(is_ignored('a/__pycache__/b.pyc', ['**/__pycache__']))
+        self.assertTrue(is_ignored('__pycache__/b.pyc', ['**/__pycache__']))
+        self.assertTrue(is_ignored('pup-venv/bin/python', ['/pup-venv']))
+        self.assertFalse(is_ignored('docs/a.rst', ['docs', '!docs/a.rst']))
+
+    def test_digest(self):
+        digest = self._digest()
+        self.assertEqual(len(digest), 40)
+        os.utime(os.path.join(self.context, 'LICENSE'), (0, 0))
+        self._write('docs/index.rst', 'changed docs')
+        self._write('logs/gen', 'more log lines')
+        self._write('scripts/python/__pycache__/gen.cpython-36.pyc', 'new')
+        self.assertEqual(self._digest(), digest)
+
+        self._write('scripts/python/gen.py', 'changed gen')
+        changed = self._digest()
+        self.assertNotEqual(changed, digest)
+        os.chmod(os.path.join(self.context, 'scripts/setup.sh'), 0o755)
+        self.assertNotEqual(self._digest(), changed)
+        self._write('scripts/python/new.py', 'new')
+        self.assertNotEqual(self._digest(), changed)
+
+    def test_write_context(self):
+        files = get_context_files(self.context, self.dockerfile)
+        context = io.BytesIO()
+        write_context(self.context, files, context)
+        context.seek(0)
+        with tarfile.open(fileobj=context) as tar_file:
+            self.assertEqual(tar_file.getnames(), files)
+            self.assertEqual(tar_file.extractfile('scripts/python/gen.py')
+                             .read(), b'gen')
+
+    def test_package_dockerfile(self):
+        files = get_context_files(TOP_DIR, os.path.join(TOP_DIR,
+                                                        'Dockerfile'))
+        self.assertIn('scripts/python/gen.py', files)
+        self.assertIn('requirements.txt', files)
+        self.assertFalse([path for path in files if
+                          path.startswith('tests/') or '__pycache__' in path])
+
+
+if __name__ == '__main__':
+    unittest.main()
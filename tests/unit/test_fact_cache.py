@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# Copyright 2019 IBM Corp.
+#
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from mock import patch as patch
+
+import tests.unit  # noqa: F401 (sets up import path)
+import lib.genesis as gen
+from lib.fact_cache import FactCache
+
+FACTS = {
+    'ansible_hostname': 'node1',
+    'ansible_interfaces': ['lo', 'enP1p3s0f0', 'ib0', 'bond-1'],
+    'ansible_lo': {'device': 'lo'},
+    'ansible_enP1p3s0f0': {'device': 'enP1p3s0f0',
+                           'macaddress': '70:E2:84:14:0A:A1'},
+    'ansible_ib0': {'device': 'ib0'},
+    'ansible_bond_1': {'device': 'bond-1',
+                       'macaddress': '70:e2:84:14:0a:a2'},
+    'discovered_interpreter_python': '/usr/bin/python',
+}
+
+
+class TestFactCache(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+        self.cache = FactCache(self.path, timeout=60)
+        self._write('node1', FACTS)
+
+    def _write(self, host, facts, age=0):
+        path = os.path.join(self.path, host)
+        with open(path, 'w') as f:
+            json.dump(facts, f)
+        mtime = time.time() - age
+        os.utime(path, (mtime, mtime))
+
+    def test_ansible_cfg(self):
+        # Defaults are read from the POWER-Up ansible.cfg
+        cache = FactCache()
+        self.assertEqual(cache.path, os.path.join(
+            gen.get_playbooks_path(), '.facts', ''))
+        self.assertEqual(cache.timeout, 86400)
+        with open(os.path.join(self.path, 'ansible.cfg'), 'w') as f:
+            f.write('[defaults]\nfact_caching_connection = /tmp/facts\n'
+                    'fact_caching_timeout = 0\n')
+        with patch('lib.genesis.get_playbooks_path', return_value=self.path):
+            cache = FactCache()
+        self.assertEqual(cache.path, '/tmp/facts/')
+        self.assertEqual(cache.timeout, 0)
+
+    def test_is_fresh(self):
+        self.assertTrue(self.cache.is_fresh('node1'))
+        self.assertFalse(self.cache.is_fresh('node2'))
+        self._write('node2', FACTS, age=120)
+        self.assertFalse(self.cache.is_fresh('node2'))
+        self.assertTrue(FactCache(self.path, timeout=0).is_fresh('node2'))
+
+    def test_get_facts(self):
+        facts = self.cache.get_facts('node1')
+        self.assertEqual(facts['hostname'], 'node1')
+        self.assertEqual(facts['discovered_interpreter_python'],
+                         '/usr/bin/python')
+        self.assertIsNone(self.cache.get_facts('node2'))
+        self._write('node2', FACTS, age=120)
+        self.assertIsNone(self.cache.get_facts('node2'))
+        with open(os.path.join(self.path, 'node3'), 'w') as f:
+            f.write('{"ansible_hostname": ')
+        self.assertIsNone(self.cache.get_facts('node3'))
+
+    def test_get_mac_to_device(self):
+        self.assertEqual(self.cache.get_mac_to_device('node1'), {
+            '70:e2:84:14:0a:a1': 'enP1p3s0f0',
+            '70:e2:84:14:0a:a2': 'bond-1'})
+        self.assertEqual(self.cache.get_mac_to_device('node2'), {})
+
+    def test_clear(self):
+        self._write('node2', FACTS)
+        self.cache.clear('node2')
+        self.assertEqual(os.listdir(self.path), ['node1'])
+        self.cache.clear()
+        self.assertEqual(os.listdir(self.path), [])
+        FactCache(os.path.join(self.path, 'missing')).clear()
+
+
+if __name__ == '__main__':
+    unittest.main()
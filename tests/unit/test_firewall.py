@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# Copyright 2019 IBM Corp.
+#
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import shutil
+import subprocess
+import sys
+import unittest
+
+import tests.unit  # noqa: F401 (sets up import path)
+from lib.firewall import get_bridge_rule_changes, get_forward_rules
+
+SAVE_OUTPUT = """# Generated by iptables-save
+*nat
+-A POSTROUTING -o br-pxe -j MASQUERADE
+COMMIT
+*filter
+:INPUT ACCEPT [0:0]
+:FORWARD ACCEPT [0:0]
+-A FORWARD -i br-pxe -j ACCEPT
+-A FORWARD -o br-pxe-20 -m conntrack --ctstate RELATED -j ACCEPT
+-A FORWARD -j REJECT --reject-with icmp-host-prohibited
+COMMIT
+"""
+
+# Run in an unprivileged user and network namespace ('unshare -rn')
+NAMESPACE_SCRIPT = """
+from lib.firewall import update_bridge_rules
+from lib.utilities import sub_proc_exec
+print(update_bridge_rules(['br-pxe', 'br-mgmt', 'br-pxe']))
+print(update_bridge_rules(['br-pxe', 'br-mgmt']))
+print(update_bridge_rules(remove_bridges=['br-pxe']))
+print(sub_proc_exec('iptables-save -t filter')[0])
+"""
+
+
+class TestFirewall(unittest.TestCase):
+
+    def test_get_forward_rules(self):
+        self.assertEqual(get_forward_rules(SAVE_OUTPUT), [
+            '-i br-pxe -j ACCEPT',
+            '-o br-pxe-20 -m conntrack --ctstate RELATED -j ACCEPT',
+            '-j REJECT --reject-with icmp-host-prohibited'])
+
+    def test_get_bridge_rule_changes(self):
+        rules = get_forward_rules(SAVE_OUTPUT)
+        self.assertEqual(get_bridge_rule_changes(rules, ['br-pxe']), [])
+        self.assertEqual(
+            get_bridge_rule_changes(rules, ['br-pxe', 'br-ipmi', 'br-ipmi']),
+            ['-I FORWARD -i br-ipmi -j ACCEPT'])
+        self.assertEqual(
+            get_bridge_rule_changes(rules, remove_bridges=['br-pxe-20']),
+            ['-D FORWARD -o br-pxe-20 -m conntrack --ctstate RELATED '
+             '-j ACCEPT'])
+        self.assertEqual(
+            get_bridge_rule_changes(rules, remove_bridges=['br-pxe']),
+            ['-D FORWARD -i br-pxe -j ACCEPT'])
+        self.assertEqual(get_bridge_rule_changes(rules), [])
+
+    def test_update_bridge_rules(self):
+        if not (shutil.which('unshare') and shutil.which('iptables-restore')):
+            self.skipTest('unshare and iptables-restore are required')
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+        proc = subprocess.run(['unshare', '-rn', sys.executable, '-c',
+                               NAMESPACE_SCRIPT], env=env,
+                              stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                              universal_newlines=True)
+        if proc.returncode:
+            self.skipTest(f'Unprivileged namespaces unavailable: '
+                          f'{proc.stderr}')
+        output = proc.stdout.splitlines()
+        self.assertEqual(output[:3], ['0', '0', '0'])
+        self.assertEqual(get_forward_rules('\n'.join(output[3:])),
+                         ['-i br-mgmt -j ACCEPT'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# Copyright 2019 IBM Corp.
+#
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import subprocess
+import sys
+import unittest
+
+import tests.unit
+
+# Cumulative 'import gen' time budget in microseconds
+IMPORT_BUDGET_US = 250000
+
+# Third party modules only subcommand handlers may import
+DEFERRED_MODULES = ('docker', 'pyroute2', 'pyghmi', 'paramiko', 'npyscreen',
+                    'jsonschema', 'jsl', 'requests', 'netaddr', 'jinja2',
+                    'pexpect', 'tabulate')
+
+
+def get_import_times(module):
+    """Import a module in a new interpreter with '-X importtime'
+
+    Returns:
+        dict: Cumulative import time in microseconds keyed by module
+    """
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=os.path.join(tests.unit.TOP_DIR, tests.unit.SCRIPT_DIR),
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        universal_newlines=True)
+    if proc.returncode != 0:
+        raise AssertionError(f'import {module} failed:\n{proc.stderr}')
+    times = {}
+    for line in proc.stderr.splitlines():
+        fields = line.split('|')
+        if len(fields) == 3 and fields[1].strip().isdigit():
+            times[fields[2].strip()] = int(fields[1])
+    return times
+
+
+class TestImportTime(unittest.TestCase):
+
+    def test_pup_startup_imports(self):
+        times = get_import_times('gen')
+        loaded = [name for name in times
+                  if name.split('.')[0] in DEFERRED_MODULES]
+        self.assertEqual(loaded, [])
+        self.assertLess(times['gen'], IMPORT_BUDGET_US)
+
+
+if __name__ == '__main__':
+    unittest.main()
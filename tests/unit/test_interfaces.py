@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# Copyright 2019 IBM Corp.
+#
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import unittest
+
+import tests.unit  # noqa: F401 (sets up import path)
+from lib.interfaces import Interfaces
+
+NAMESPACE = 'pup-test-ifcs'
+
+
+def _create_netns():
+    if os.geteuid() != 0:
+        return False
+    from pyroute2 import netns
+    try:
+        netns.create(NAMESPACE)
+    except OSError:
+        return False
+    return True
+
+
+class TestInterfaces(unittest.TestCase):
+
+    def setUp(self):
+        if not _create_netns():
+            self.skipTest('Network namespaces require root')
+        self.ifcs = Interfaces(netns=NAMESPACE)
+        self.addCleanup(self._cleanup)
+
+    def _cleanup(self):
+        from pyroute2 import netns
+        self.ifcs.close()
+        netns.remove(NAMESPACE)
+
+    def test_interfaces_dict(self):
+        ifcs = self.ifcs
+        ifcs.link('add', ifname='v0', kind='veth', peer='v1')
+        ifcs.link('add', ifname='br0', kind='bridge')
+        v0 = ifcs.link_lookup(ifname='v0')[0]
+        ifcs.addr('add', index=v0, address='10.0.0.1', mask=24)
+        ifcs.addr('add', index=v0, address='10.0.1.1', mask=24)
+        ifcs.link('set', index=v0, state='up')
+        ifcs.ifcs = ifcs.get_interfaces_dict()
+
+        self.assertEqual(set(ifcs.ifcs), {'lo', 'v0', 'v1', 'br0'})
+        self.assertEqual(ifcs.get_interface_addresses('v0'),
+                         ['10.0.0.1', '10.0.1.1'])
+        self.assertEqual(ifcs.ifcs['v0']['slave'], 'v1')
+        self.assertEqual(ifcs.ifcs['v0']['type'], 'veth')
+        self.assertEqual(ifcs.ifcs['br0']['type'], 'bridge')
+        self.assertEqual(ifcs.ifcs['lo']['type'], 'phys')
+        self.assertIsNone(ifcs.ifcs['br0']['slave'])
+        self.assertEqual(sorted(ifcs.get_interfaces_names(_type='veth')),
+                         ['v0', 'v1'])
+        self.assertIn('10.0.0.0/24', ifcs.get_interfaces_routes()['v0'])
+
+        # Apply single interface changes
+        ifcs.addr('add', index=ifcs.link_lookup(ifname='v1')[0],
+                  address='10.0.2.1', mask=24)
+        ifcs.link('del', index=ifcs.link_lookup(ifname='br0')[0])
+        ifcs.update_interface('v1')
+        ifcs.update_interface('br0')
+        self.assertEqual(ifcs.ifcs['v1']['addrs'], ['10.0.2.1'])
+        self.assertNotIn('br0', ifcs.ifcs)
+        self.assertEqual(ifcs.ifcs, ifcs.get_interfaces_dict())
+
+
+if __name__ == '__main__':
+    unittest.main()
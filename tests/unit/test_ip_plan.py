@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# Copyright 2019 IBM Corp.
+#
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+import tests.unit  # noqa: F401 (sets up import path)
+from lib.ip_plan import AddressPlanner, ip_to_int, int_to_ip, \
+    network_range, parse_network
+from lib.exception import UserException
+
+
+class TestAddressPlanner(unittest.TestCase):
+
+    def test_conversions(self):
+        self.assertEqual(int_to_ip(ip_to_int('192.168.5.10')),
+                         '192.168.5.10')
+        self.assertEqual(parse_network('10.0.0.5/255.255.0.0'),
+                         (ip_to_int('10.0.0.5'), 16))
+        self.assertEqual(network_range('10.0.1.7/24'),
+                         (ip_to_int('10.0.1.0'), ip_to_int('10.0.1.255')))
+        with self.assertRaises(ValueError):
+            ip_to_int('10.0.0.256')
+
+    def test_plan_skips_reserved_and_keeps_leases(self):
+        planner = AddressPlanner('192.168.3.1/24', start_offset=20)
+        planner.reserve('192.168.3.21')
+        planner.reserve('192.168.3.23', '192.168.3.24')
+        planner.add_lease('AA:BB:CC:00:00:02', '192.168.3.100')
+        # Collides with a reserved address, must be reassigned
+        planner.add_lease('aa:bb:cc:00:00:03', '192.168.3.21')
+        requests = [(index, f'aa:bb:cc:00:00:0{index}', None)
+                    for index in range(5)]
+        self.assertEqual(planner.plan(requests),
+                         {0: '192.168.3.20', 1: '192.168.3.22',
+                          2: '192.168.3.100', 3: '192.168.3.25',
+                          4: '192.168.3.26'})
+        self.assertEqual(planner.get_next_ip(), '192.168.3.101')
+
+    def test_rack_blocks(self):
+        planner = AddressPlanner('10.0.0.0/24', start_offset=10,
+                                 block_size=20)
+        plan = planner.plan([('a', None, 'rack2'), ('b', None, 'rack1'),
+                             ('c', None, 'rack2')])
+        self.assertEqual(plan, {'a': '10.0.0.10', 'b': '10.0.0.30',
+                                'c': '10.0.0.11'})
+
+    def test_plan_exhausted(self):
+        planner = AddressPlanner('10.0.0.0/29', start_offset=2)
+        planner.reserve('10.0.0.3')
+        # .2, .4, .5 and .6 are usable, .7 is the broadcast address
+        with self.assertRaises(UserException):
+            planner.plan([(index, None, None) for index in range(5)])
+
+    def test_large_plan_deterministic(self):
+        requests = [(index, f'02:00:00:00:{index // 256:02x}:'
+                     f'{index % 256:02x}', f'rack{index // 40}')
+                    for index in range(10000)]
+        plans = []
+        for _ in range(2):
+            planner = AddressPlanner('10.128.0.0/16', start_offset=20,
+                                     block_size=64)
+            planner.reserve('10.128.0.20', '10.128.0.29')
+            plans.append(planner.plan(requests))
+        self.assertEqual(plans[0], plans[1])
+        self.assertEqual(len(set(plans[0].values())), 10000)
+
+
+if __name__ == '__main__':
+    unittest.main()
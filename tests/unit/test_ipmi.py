@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# Copyright 2019 IBM Corp.
+#
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import unittest
+
+from mock import patch as patch
+from pyghmi.ipmi.fru import FRU
+
+import tests.unit  # noqa: F401 (sets up import path)
+from lib.bmc import Bmc
+from lib.bmc_simulator import BmcFleet, make_fru
+from lib.ipmi import (extract_system_info, extract_system_sn_pn, fru_info2dict,
+                      get_system_info, ipmi_fru2dict)
+
+FRU_DIR = os.path.join(os.path.dirname(__file__), 'fixtures', 'fru')
+# Fixture: system FRU, serial number, part number, FRU count
+FRU_SYSTEMS = {
+    'ibm_8001-22c.txt': ('SYS_FRU (ID 1)', '21ABCDA', '8001-22C', 5),
+    'lenovo_7x06.txt': (None, 'J300ABCD', '7X06CTO1WW', 2),
+    'openbmc_8335-gtw.txt': (None, '13D6F7A', '8335-GTW', 26),
+    'supermicro_9006-22p.txt': (None, '782A5DA', '9006-22P', 1),
+}
+
+
+def read_fru(name):
+    with open(os.path.join(FRU_DIR, name)) as f:
+        return f.read()
+
+
+class TestIpmiFru(unittest.TestCase):
+
+    def test_fru2dict(self):
+        fru_dict = ipmi_fru2dict(read_fru('ibm_8001-22c.txt'))
+        self.assertEqual(list(fru_dict), [
+            'Builtin FRU Device (ID 0)', 'SYS_FRU (ID 1)', 'BMC_FRU (ID 2)',
+            'PSU1_FRU (ID 3)', 'PSU2_FRU (ID 4)'])
+        self.assertEqual(fru_dict['Builtin FRU Device (ID 0)'], {
+            'Device not present (Requested sensor, data, or record not '
+            'found)': ''})
+        self.assertEqual(fru_dict['BMC_FRU (ID 2)'], {
+            'Board Mfg Date': 'Tue Aug 22 14:37:00 2017',
+            'Board Mfg': 'IBM',
+            'Board Product': 'BMC',
+            'Board Serial': 'Y130UF6BK1AA',
+            'Board Part Number': '01DH055'})
+        system = fru_dict['SYS_FRU (ID 1)']
+        # Repeated names keep the last value
+        self.assertEqual(system['Board Extra'], 'FRU: 01DH052')
+        self.assertEqual(system['Product Asset Tag'], '')
+
+    def test_fru2dict_values(self):
+        fru = ipmi_fru2dict(read_fru('supermicro_9006-22p.txt'))
+        fru = fru['Builtin FRU Device (ID 0)']
+        self.assertEqual(fru['Product Asset Tag'], '"lab rack 3, U21"')
+        self.assertEqual(fru['Product Extra'], 'MAC: 0c:c4:7a:d4:c2:1f')
+        self.assertEqual(fru['Board Mfg Date'], 'Mon Jan  1 00:00:00 1996')
+
+    def test_fru2dict_nesting(self):
+        fru_str = ('Top : A\n'
+                   '  Nested : B\n'
+                   '    x : 1\n'
+                   '  y : 2\n'
+                   'Other\n'
+                   '\tz: 3')
+        self.assertEqual(ipmi_fru2dict(fru_str), {
+            'A': {'B': {'x': '1'}, 'y': '2'}, 'Other': {'z': '3'}})
+        self.assertEqual(ipmi_fru2dict(''), {})
+
+    def test_extract_system_info(self):
+        for name, (system, sn, pn, count) in FRU_SYSTEMS.items():
+            fru_str = read_fru(name)
+            self.assertEqual(len(ipmi_fru2dict(fru_str)), count, name)
+            info = extract_system_info(fru_str)
+            if system:
+                self.assertEqual(list(info), [system], name)
+            else:
+                self.assertEqual(len(info), count, name)
+            self.assertEqual(extract_system_sn_pn(fru_str), (sn, pn), name)
+
+
+class TestIpmiFruSession(unittest.TestCase):
+
+    def test_fru_info2dict(self):
+        info = FRU(rawdata=make_fru('SIM0000007', '8335-GTB')).info
+        info['board_extra'] = [None, 'EC: P10050', bytearray(b'\x01\xff')]
+        self.assertEqual(fru_info2dict(info), {
+            'Chassis Type': 'Rack Mount Chassis',
+            'Chassis Part Number': '8335-GTB',
+            'Chassis Serial': 'SIM0000007',
+            'Board Mfg Date': '2019-01-01T00:00',
+            'Board Mfg': 'SIM',
+            'Board Product': 'Planar',
+            'Board Serial': 'YSIM0000007',
+            'Board Part Number': '01AB234',
+            'Board Extra': '01ff',
+            'Product Manufacturer': 'SIM',
+            'Product Name': 'Simulated node',
+            'Product Part Number': '8335-GTB',
+            'Product Version': '1.0',
+            'Product Serial': 'SIM0000007'})
+
+    def test_read_fru(self):
+        with BmcFleet(2, 'ipmi') as fleet:
+            bmc = Bmc(fleet.get_addresses()[1], 'ADMIN', 'admin', 'ipmi')
+            self.assertTrue(bmc.is_connected())
+            self.assertEqual(bmc.chassis_power('status'), 'off')
+            fleet.reset_stats()
+            self.assertEqual(bmc.get_system_sn_pn(),
+                             ('SIM0000001', '8335-GTB'))
+            # Area info and one read, without a new login
+            stats = fleet.get_stats()
+            self.assertEqual((stats.logins, stats.requests), (0, 2))
+            info = bmc.get_system_info()
+            self.assertEqual(list(info), ['Builtin FRU Device (ID 0)'])
+            self.assertEqual(
+                info['Builtin FRU Device (ID 0)']['Product Serial'],
+                'SIM0000001')
+            bmc.logout()
+
+    @patch('lib.ipmi.read_fru', return_value=None)
+    def test_system_info_sdr_names(self, read_fru):
+        class Command(object):
+            def get_inventory_descriptions(self):
+                return ['System', 'NODE 0', 'SYS_FRU', 'MB_FRU']
+
+            def get_inventory_of_component(self, name):
+                if name == 'SYS_FRU':
+                    return {'Chassis serial number': '21ABCDA',
+                            'Chassis part number': '8001-22C'}
+                return {}
+
+        # System FRU names without inventory are skipped
+        self.assertEqual(get_system_info('bmc1', Command()), {
+            'SYS_FRU': {'Chassis Serial': '21ABCDA',
+                        'Chassis Part Number': '8001-22C'}})
+        # No further FRUs are read after the timeout
+        self.assertIsNone(get_system_info('bmc1', Command(), timeout=-1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+# Copyright 2019 IBM Corp.
+#
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+
+import tests.unit  # noqa: F401 (sets up import path)
+from lib.exception import UserException
+from lib.iso_image import SECTOR_SIZE, IsoImage
+import lib.utilities as utilities
+
+RHEL_TREE = {
+    'images/pxeboot/vmlinuz': b'kernel',
+    'images/pxeboot/initrd.img': b'initrd',
+    'Packages/bash-4.2.46-31.el7.ppc64le.rpm': b'rpm',
+    'repodata/repomd.xml': b'<repomd/>',
+    '.discinfo': b'1549907370.402591\n',
+}
+
+
+def _both16(value):
+    return struct.pack('<H', value) + struct.pack('>H', value)
+
+
+def _both32(value):
+    return struct.pack('<I', value) + struct.pack('>I', value)
+
+
+def _record(name, extent, size, is_dir, sua=b''):
+    pad = b'\0' if len(name) % 2 == 0 else b''
+    if (33 + len(name) + len(pad) + len(sua)) % 2:
+        sua += b'\0'
+    length = 33 + len(name) + len(pad) + len(sua)
+    return (bytes([length, 0]) + _both32(extent) + _both32(size) +
+            bytes(7) + bytes([0x02 if is_dir else 0, 0, 0]) + _both16(1) +
+            bytes([len(name)]) + name + pad + sua)
+
+
+def _nm(name, flags=0):
+    return b'NM' + bytes([5 + len(name), 1, flags]) + name
+
+
+def make_iso(path, tree, rock_ridge=True, joliet=False, volume_id='PUP'):
+    """Write an ISO9660 image of tree (file path: contents). Each directory
+    fits one sector. File names longer than 20 characters are given as two
+    Rock Ridge NM entries, and names starting with 'ce-' in a continuation
+    area.
+    """
+    dirs = {'': set()}
+    for file_path in tree:
+        parts = file_path.split('/')
+        for i in range(len(parts)):
+            parent = '/'.join(parts[:i])
+            dirs.setdefault(parent, set()).add(parts[i])
+            if i < len(parts) - 1:
+                dirs.setdefault('/'.join(parts[:i + 1]), set())
+    trees = ['primary'] + (['joliet'] if joliet else [])
+    sector = 16 + len(trees) + 1
+    extents = {}
+    for kind in trees:
+        for dir_path in sorted(dirs):
+            extents[kind, dir_path] = sector
+            sector += 1
+    ce_sector = sector
+    sector += 1
+    for file_path in sorted(tree):
+        extents['file', file_path] = sector
+        sector += max(1, -(-len(tree[file_path]) // SECTOR_SIZE))
+    image = bytearray(sector * SECTOR_SIZE)
+    ce_area = b''
+
+    def iso_name(name, is_dir, kind):
+        if kind == 'joliet':
+            return (name if is_dir else name + ';1').encode('utf-16-be')
+        name = name.upper().replace('-', '_')
+        return (name if is_dir else (name if '.' in name else name + '.') +
+                ';1').encode('ascii')
+
+    for kind in trees:
+        for dir_path, names in dirs.items():
+            parent = dir_path.rpartition('/')[0] if dir_path else ''
+            dot_sua = b'SP' + bytes([7, 1]) + b'\xbe\xef\x00' \
+                if rock_ridge and kind == 'primary' and not dir_path else b''
+            data = (_record(b'\0', extents[kind, dir_path], SECTOR_SIZE,
+                            True, dot_sua) +
+                    _record(b'\1', extents[kind, parent], SECTOR_SIZE, True))
+            for name in sorted(names):
+                child = f'{dir_path}/{name}'.lstrip('/')
+                is_dir = child in dirs
+                if is_dir:
+                    extent, size = extents[kind, child], SECTOR_SIZE
+                else:
+                    extent, size = extents['file', child], len(tree[child])
+                sua = b''
+                if rock_ridge and kind == 'primary':
+                    raw = name.encode('utf-8')
+                    if name.startswith('ce-'):
+                        offset = len(ce_area)
+                        ce_area += _nm(raw)
+                        sua = (b'CE' + bytes([28, 1]) + _both32(ce_sector) +
+                               _both32(offset) + _both32(len(_nm(raw))))
+                    elif len(raw) > 20:
+                        sua = _nm(raw[:10], 1) + _nm(raw[10:])
+                    else:
+                        sua = _nm(raw)
+                data += _record(iso_name(name, is_dir, kind), extent, size,
+                                is_dir, sua)
+            assert len(data) <= SECTOR_SIZE
+            offset = extents[kind, dir_path] * SECTOR_SIZE
+            image[offset:offset + len(data)] = data
+    image[ce_sector * SECTOR_SIZE:
+          ce_sector * SECTOR_SIZE + len(ce_area)] = ce_area
+    for file_path, contents in tree.items():
+        offset = extents['file', file_path] * SECTOR_SIZE
+        image[offset:offset + len(contents)] = contents
+    for index, kind in enumerate(trees + ['terminator']):
+        descriptor = bytearray(SECTOR_SIZE)
+        descriptor[0] = {'primary': 1, 'joliet': 2, 'terminator': 255}[kind]
+        descriptor[1:7] = b'CD001\x01'
+        if kind != 'terminator':
+            descriptor[40:72] = volume_id.ljust(32).encode('ascii')
+            descriptor[80:88] = _both32(sector)
+            root = _record(b'\0', extents[kind, ''], SECTOR_SIZE, True)
+            descriptor[156:156 + len(root)] = root
+        if kind == 'joliet':
+            descriptor[88:91] = b'%/E'
+        offset = (16 + index) * SECTOR_SIZE
+        image[offset:offset + SECTOR_SIZE] = descriptor
+    with open(path, 'wb') as f:
+        f.write(image)
+
+
+class TestIsoImage(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.iso_path = os.path.join(self.tmp, 'image.iso')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_rock_ridge(self):
+        tree = dict(RHEL_TREE)
+        tree['EFI/BOOT/ce-grubx64.efi'] = b'grub'
+        make_iso(self.iso_path, tree, joliet=True)
+        with IsoImage(self.iso_path) as iso:
+            self.assertEqual(iso.listdir(), ['.discinfo', 'EFI', 'Packages',
+                                             'images', 'repodata'])
+            self.assertEqual(iso.listdir('/Packages'),
+                             ['bash-4.2.46-31.el7.ppc64le.rpm'])
+            self.assertEqual(iso.listdir('EFI/BOOT'), ['ce-grubx64.efi'])
+            self.assertTrue(iso.isfile('/images/pxeboot/vmlinuz'))
+            self.assertTrue(iso.isdir('images/pxeboot/'))
+            self.assertFalse(iso.isfile('images/pxeboot'))
+            self.assertFalse(iso.isfile('images/pxeboot/missing'))
+            self.assertFalse(iso.isdir('.discinfo/x'))
+            self.assertEqual(list(iso.walk('/images')), [
+                ('/images', ['pxeboot'], []),
+                ('/images/pxeboot', [], ['initrd.img', 'vmlinuz'])])
+            self.assertEqual([dirpath for dirpath, _, _ in iso.walk()], [
+                '/', '/EFI', '/EFI/BOOT', '/Packages', '/images',
+                '/images/pxeboot', '/repodata'])
+            with self.assertRaises(UserException):
+                iso.listdir('/.discinfo')
+
+    def test_joliet_and_iso9660_names(self):
+        make_iso(self.iso_path, RHEL_TREE, rock_ridge=False, joliet=True)
+        with IsoImage(self.iso_path) as iso:
+            self.assertTrue(iso.joliet)
+            self.assertEqual(iso.listdir('images/pxeboot'),
+                             ['initrd.img', 'vmlinuz'])
+        make_iso(self.iso_path, RHEL_TREE, rock_ridge=False)
+        with IsoImage(self.iso_path) as iso:
+            self.assertFalse(iso.joliet)
+            self.assertEqual(iso.listdir('IMAGES/PXEBOOT'),
+                             ['INITRD.IMG', 'VMLINUZ'])
+
+    def test_digest(self):
+        make_iso(self.iso_path, RHEL_TREE)
+        with IsoImage(self.iso_path) as iso:
+            digest = iso.get_digest()
+        make_iso(self.iso_path, RHEL_TREE)
+        with IsoImage(self.iso_path) as iso:
+            self.assertEqual(iso.get_digest(), digest)
+        make_iso(self.iso_path, RHEL_TREE, volume_id='RHEL-7.6')
+        with IsoImage(self.iso_path) as iso:
+            self.assertNotEqual(iso.get_digest(), digest)
+
+    def test_not_iso(self):
+        with open(self.iso_path, 'wb') as f:
+            f.write(bytes(20 * SECTOR_SIZE))
+        with self.assertRaises(UserException):
+            IsoImage(self.iso_path)
+
+
+class TestExtractIsoImage(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.dest_dir = os.path.join(self.tmp, 'html')
+        os.mkdir(self.dest_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def _make_iso(self, name, tree=RHEL_TREE, **kwargs):
+        iso_path = os.path.join(self.tmp, name + '.iso')
+        make_iso(iso_path, tree, **kwargs)
+        return iso_path
+
+    def test_find_boot_files(self):
+        iso_path = self._make_iso('ubuntu-18.04-server-amd64', {
+            'casper/vmlinux': b'kernel', 'casper/initrd': b'initrd'})
+        with IsoImage(iso_path) as iso:
+            self.assertEqual(utilities._find_iso_boot_files(
+                iso, 'ubuntu-18.04-server-amd64'),
+                ('casper/vmlinux', 'casper/initrd'))
+        iso_path = self._make_iso('custom', {
+            'boot/kernels/x/vmlinux': b'kernel',
+            'boot/initrd.img': b'initrd'})
+        with IsoImage(iso_path) as iso:
+            self.assertEqual(utilities._find_iso_boot_files(iso, 'custom'),
+                             ('boot/kernels/x/vmlinux', 'boot/initrd.img'))
+        with self.assertRaises(UserException):
+            utilities.extract_iso_image(
+                self._make_iso('empty', {'README': b''}), self.dest_dir)
+
+    def test_cached_extraction(self):
+        name = 'RHEL-7.6-20181010.0-Server-ppc64le-dvd1'
+        iso_path = self._make_iso(name)
+        boot_files = (f'{name}/images/pxeboot/vmlinuz',
+                      f'{name}/images/pxeboot/initrd.img')
+        # A complete extraction made before digests were recorded
+        for path in boot_files:
+            os.makedirs(os.path.dirname(os.path.join(self.dest_dir, path)),
+                        exist_ok=True)
+            open(os.path.join(self.dest_dir, path), 'w').close()
+        self.assertEqual(utilities.extract_iso_image(iso_path, self.dest_dir),
+                         boot_files)
+        cache_path = os.path.join(self.dest_dir, name,
+                                  utilities.ISO_CACHE_FILE)
+        with open(cache_path) as f:
+            cache = json.load(f)
+        with IsoImage(iso_path) as iso:
+            self.assertEqual(cache, {'digest': iso.get_digest(),
+                                     'subtrees': None})
+        os.remove(os.path.join(self.dest_dir, boot_files[0]))
+        self.assertEqual(utilities.extract_iso_images(
+            [iso_path, iso_path], self.dest_dir,
+            subtrees=['repodata']), [boot_files] * 2)
+
+    @unittest.skipUnless(shutil.which('xorriso'), 'requires xorriso')
+    def test_extract(self):
+        name = 'RHEL-7.6-20181010.0-Server-ppc64le-dvd1'
+        iso_path = self._make_iso(name)
+        kernel, initrd = utilities.extract_iso_image(
+            iso_path, self.dest_dir, subtrees=['repodata'])
+        iso_dir = os.path.join(self.dest_dir, name)
+        self.assertEqual(sorted(os.listdir(iso_dir)), [
+            utilities.ISO_CACHE_FILE, 'images', 'repodata'])
+        with open(os.path.join(self.dest_dir, kernel), 'rb') as f:
+            self.assertEqual(f.read(), b'kernel')
+        utilities.extract_iso_image(iso_path, self.dest_dir)
+        self.assertIn('Packages', os.listdir(iso_dir))
+        self.assertEqual([entry for entry in os.listdir(self.dest_dir)],
+                         [name])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# Copyright 2019 IBM Corp.
+#
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+import tests.unit  # noqa: F401 (sets up import path)
+from lib.lease_watcher import LeaseWatcher, read_leases
+
+LEASES = """\
+1560000000 aa:bb:cc:00:00:01 192.168.10.21 * 01:aa:bb:cc:00:00:01
+1560000000 aa:bb:cc:00:00:02 192.168.10.22 node2 *
+
+"""
+
+
+class TestLeaseWatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.leases_file = os.path.join(self.tmpdir, 'dnsmasq.leases')
+        with open(self.leases_file, 'w') as leases:
+            leases.write(LEASES)
+
+    def test_read_leases(self):
+        mac_ip = read_leases(self.leases_file)
+        self.assertEqual(dict(mac_ip),
+                         {'aa:bb:cc:00:00:01': '192.168.10.21',
+                          'aa:bb:cc:00:00:02': '192.168.10.22'})
+        # Returned tables are copies of the cached parse
+        mac_ip.popitem()
+        self.assertEqual(len(read_leases(self.leases_file)), 2)
+
+    def test_file_changes(self):
+        watcher = LeaseWatcher(self.leases_file)
+        self.assertEqual(len(watcher.wait(0)), 2)
+        self.assertEqual(watcher.wait(0), [])
+        with open(self.leases_file, 'a') as leases:
+            leases.write('1560000000 aa:bb:cc:00:00:03 192.168.10.23 * *\n')
+        self.assertEqual(watcher.wait(0), ['aa:bb:cc:00:00:03'])
+        # Expired and released leases are dropped
+        with open(self.leases_file, 'w') as leases:
+            leases.write('1560000000 aa:bb:cc:00:00:03 192.168.10.23 * *\n'
+                         '1560000000 aa:bb:cc:00:00:02 192.168.10.32 * *\n')
+        self.assertEqual(watcher.wait(0), ['aa:bb:cc:00:00:02'])
+        self.assertEqual(dict(watcher.get_mac_ip()),
+                         {'aa:bb:cc:00:00:03': '192.168.10.23',
+                          'aa:bb:cc:00:00:02': '192.168.10.32'})
+        self.assertFalse(watcher.wait_for(3, 0))
+
+    def test_hook_events(self):
+        with LeaseWatcher(self.leases_file) as watcher:
+            self.assertTrue(os.access(watcher.hook_path, os.X_OK))
+            subprocess.check_call([watcher.hook_path, 'add',
+                                   'aa:bb:cc:00:00:04', '192.168.10.24'])
+            self.assertEqual(watcher.wait(5), ['aa:bb:cc:00:00:04'])
+            subprocess.check_call([watcher.hook_path, 'del',
+                                   'aa:bb:cc:00:00:04', '192.168.10.24'])
+            self.assertEqual(watcher.wait(0.2), [])
+            self.assertNotIn('aa:bb:cc:00:00:04', watcher.get_mac_ip())
+            self.assertTrue(watcher.wait_for(2, 0))
+        self.assertFalse(os.path.exists(watcher.socket_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# Copyright 2019 IBM Corp.
+#
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+import tests.unit  # noqa: F401 (sets up import path)
+from lib.mac_table import parse_mac_address_table, mac_to_int, int_to_mac
+
+CISCO_TABLE = """\
+Legend:
+        * - primary entry, G - Gateway MAC, (R) - Routed MAC, O - Overlay MAC
+   VLAN     MAC Address      Type      age     Secure NTFY Ports
+---------+-----------------+--------+---------+------+----+------------------
+*    1     0000.0c07.ac01   dynamic  0         F      F    Eth1/18
+*   20     7C:FE:90:A1:B2:C3   dynamic  0         F      F    Eth1/19
+*   20     7c:fe:90:a1:b2:c4   dynamic  0         F      F    Eth1/19
+"""
+
+
+class TestMacTable(unittest.TestCase):
+
+    def test_mac_conversion(self):
+        value = mac_to_int('7C:FE:90:A1:B2:C3')
+        self.assertEqual(value, mac_to_int('7cfe.90a1.b2c3'))
+        self.assertEqual(int_to_mac(value), '7c:fe:90:a1:b2:c3')
+
+    def test_std_format(self):
+        table = parse_mac_address_table(CISCO_TABLE, 'std', 'Eth')
+        self.assertEqual(dict(table.port_to_macs),
+                         {'1/18': ['00:00:0c:07:ac:01'],
+                          '1/19': ['7c:fe:90:a1:b2:c3',
+                                   '7c:fe:90:a1:b2:c4']})
+        self.assertEqual(table.get_port('00-00-0C-07-AC-01'), '1/18')
+        self.assertIsNone(table.get_port('00:00:00:00:00:01'))
+        self.assertEqual(len(table), 3)
+
+    def test_native_format_streamed(self):
+        lines = iter(line + '\r\n' for line in CISCO_TABLE.splitlines())
+        table = parse_mac_address_table(lines, 'dict')
+        self.assertEqual(table.port_to_macs['Eth1/18'], ['0000.0c07.ac01'])
+        self.assertEqual(table.port_to_macs['Eth1/19'][0],
+                         '7C:FE:90:A1:B2:C3')
+
+
+if __name__ == '__main__':
+    unittest.main()
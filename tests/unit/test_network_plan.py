@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# Copyright 2019 IBM Corp.
+#
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import unittest
+
+import tests.unit  # noqa: F401 (sets up import path)
+from lib.exception import UserCriticalException
+from lib.network_plan import (Change, NetworkPlan, get_bridge_label,
+                              get_bridge_port)
+
+NAMESPACE = 'pup-test-plan'
+MGMT = {'dev_label': 'eth0', 'interface_ipaddr': '10.10.0.5', 'netprefix': 24}
+PXE = {'dev_label': 'eth1', 'interface_ipaddr': None, 'netprefix': 24,
+       'bridge_ipaddr': '10.20.0.1', 'vlan': 4095, '_type': 'pxe'}
+
+
+def _create_netns():
+    if os.geteuid() != 0:
+        return False
+    from pyroute2 import netns
+    try:
+        netns.create(NAMESPACE)
+    except OSError:
+        return False
+    return True
+
+
+def _get_state(plan):
+    return ({name: link['master'] for name, link in plan.state.links.items()},
+            plan.state.addrs)
+
+
+class TestBridgeNames(unittest.TestCase):
+
+    def test_names(self):
+        self.assertEqual(get_bridge_label('pxe', 4095), 'br-pxe')
+        self.assertEqual(get_bridge_label('ipmi', 20), 'br-ipmi-20')
+        self.assertEqual(get_bridge_label('mgmt'), 'br-mgmt')
+        self.assertEqual(get_bridge_port('eth1', 20), 'eth1.20')
+        self.assertEqual(get_bridge_port('eth1', None), 'eth1')
+
+
+class TestNetworkPlan(unittest.TestCase):
+    """Deployer networks on veth interfaces 'eth0' and 'eth1', whose peers
+    are up so that the interfaces and bridges come up
+    """
+
+    def setUp(self):
+        if not _create_netns():
+            self.skipTest('Network namespaces require root')
+        from pyroute2 import IPRoute, netns
+        self.addCleanup(netns.remove, NAMESPACE)
+        with IPRoute(netns=NAMESPACE) as ipr:
+            for index in range(2):
+                ipr.link('add', ifname=f'eth{index}', kind='veth',
+                         peer=f'peer{index}')
+                peer = ipr.link_lookup(ifname=f'peer{index}')[0]
+                ipr.link('set', index=peer, state='up')
+            ipr.addr('add', index=ipr.link_lookup(ifname='eth1')[0],
+                     address='10.20.0.9', prefixlen=24)
+
+    def _plan(self, networks, remove=False):
+        plan = NetworkPlan(netns=NAMESPACE)
+        for network in networks:
+            if remove:
+                plan.remove_network(**network)
+            else:
+                plan.add_network(**network)
+        return plan
+
+    def test_apply_and_remove(self):
+        plan = self._plan([MGMT, PXE])
+        self.assertEqual(plan.wait_up, ['eth1', 'br-pxe'])
+        plan.apply(timeout=5)
+
+        links, addrs = _get_state(NetworkPlan(netns=NAMESPACE))
+        self.assertEqual(links['eth1'], 'br-pxe')
+        self.assertEqual(addrs['eth0'], [('10.10.0.5', 24)])
+        self.assertEqual(addrs['eth1'], [])
+        self.assertEqual(addrs['br-pxe'], [('10.20.0.1', 24)])
+        self.assertEqual(self._plan([MGMT, PXE]).changes, [])
+
+        self._plan([MGMT, PXE], remove=True).apply()
+        links, addrs = _get_state(NetworkPlan(netns=NAMESPACE))
+        self.assertNotIn('br-pxe', links)
+        self.assertIsNone(links['eth1'])
+        self.assertEqual(addrs['eth0'], [])
+        self.assertEqual(self._plan([MGMT, PXE], remove=True).changes, [])
+
+    def test_rollback(self):
+        before = _get_state(NetworkPlan(netns=NAMESPACE))
+        plan = self._plan([MGMT, PXE])
+        plan.changes.append(Change('add address to a missing link',
+                                   ('addr', 'add', {'index': 9999,
+                                                    'address': '10.30.0.1',
+                                                    'prefixlen': 24})))
+        with self.assertRaisesRegex(UserCriticalException, 'missing link'):
+            plan.apply()
+        self.assertEqual(_get_state(NetworkPlan(netns=NAMESPACE)), before)
+
+        # Teardown is reverted the same way
+        self._plan([MGMT, PXE]).apply()
+        applied = _get_state(NetworkPlan(netns=NAMESPACE))
+        plan = self._plan([MGMT, PXE], remove=True)
+        plan.changes.append(Change('delete a missing link',
+                                   ('link', 'del', {'index': 9999})))
+        with self.assertRaises(UserCriticalException):
+            plan.apply()
+        self.assertEqual(_get_state(NetworkPlan(netns=NAMESPACE)), applied)
+
+    def test_missing_interface(self):
+        with self.assertRaisesRegex(UserCriticalException, 'eth9'):
+            self._plan([dict(PXE, dev_label='eth9')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# Copyright 2019 IBM Corp.
+#
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+import tests.unit  # noqa: F401 (sets up import path)
+from lib.node_correlator import NodeCorrelator, NodePort
+
+
+class TestNodeCorrelator(unittest.TestCase):
+
+    def setUp(self):
+        self.correlator = NodeCorrelator()
+        for port in (1, 2, 3):
+            self.correlator.add_slot('compute', 'mgmt1', port, 'ipmi')
+        self.correlator.update_mac_table('mgmt1', {
+            '1': ['aa:00:00:00:00:01'],
+            '2': ['aa:00:00:00:00:09', 'aa:00:00:00:00:02'],
+            '48': ['aa:00:00:00:00:01', 'aa:00:00:00:00:02']})
+
+    def test_leases(self):
+        self.correlator.update_leases({'aa:00:00:00:00:01': '10.0.0.1'})
+        self.correlator.update_leases({'aa:00:00:00:00:01': '10.0.0.5'})
+        self.assertEqual(self.correlator.get_ip('aa:00:00:00:00:01'),
+                         '10.0.0.5')
+        self.assertIsNone(self.correlator.get_mac('10.0.0.1'))
+        self.correlator.remove_lease('aa:00:00:00:00:01')
+        self.assertIsNone(self.correlator.get_mac('10.0.0.5'))
+
+    def test_expired_leases(self):
+        self.correlator.update_leases({'aa:00:00:00:00:01': '10.0.0.1',
+                                       'aa:00:00:00:00:02': '10.0.0.2'})
+        self.correlator.update_leases({'aa:00:00:00:00:02': '10.0.0.2'})
+        self.assertIsNone(self.correlator.get_ip('aa:00:00:00:00:01'))
+        self.assertIsNone(self.correlator.get_mac('10.0.0.1'))
+        self.assertEqual(self.correlator.get_leased_port_macs(), {
+            'mgmt1': {'2': ['aa:00:00:00:00:02'],
+                      '48': ['aa:00:00:00:00:02']}})
+
+    def test_slot_ports_take_precedence(self):
+        self.assertEqual(self.correlator.get_port('aa:00:00:00:00:02'),
+                         ('mgmt1', '2'))
+        self.correlator.update_mac_table('mgmt1', {'3': ['aa:00:00:00:00:02']})
+        self.assertEqual(self.correlator.get_port('aa:00:00:00:00:02'),
+                         ('mgmt1', '3'))
+        self.assertIsNone(self.correlator.get_port('aa:00:00:00:00:01'))
+
+    def test_node_table(self):
+        self.correlator.update_leases({'aa:00:00:00:00:02': '10.0.0.2',
+                                       'aa:00:00:00:00:01': '10.0.0.1'})
+        self.correlator.update_inventory(
+            {('mgmt1', 1): ('aa:00:00:00:00:01', '10.0.0.1')})
+        self.assertEqual(
+            self.correlator.get_leased_port_macs(['mgmt2']),
+            {'mgmt2': {}, 'mgmt1': {'1': ['aa:00:00:00:00:01'],
+                                    '2': ['aa:00:00:00:00:02'],
+                                    '48': ['aa:00:00:00:00:02']}})
+        node_table, found, total = self.correlator.get_node_table('ipmi')
+        self.assertEqual((found, total), (1, 3))
+        self.assertEqual(node_table['compute'], [
+            NodePort(True, 'mgmt1', 1, 'aa:00:00:00:00:01', '10.0.0.1',
+                     'ipmi'),
+            NodePort(False, 'mgmt1', 2, 'aa:00:00:00:00:02', '10.0.0.2',
+                     'ipmi'),
+            NodePort(False, 'mgmt1', 3, '-', '-', 'ipmi')])
+        self.assertEqual(self.correlator.get_node_table('pxe')[1:], (0, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# Copyright 2019 IBM Corp.
+#
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import threading
+import time
+import unittest
+
+import tests.unit  # noqa: F401 (sets up import path)
+from lib.bmc import Bmc, call_all
+from lib.bmc_simulator import BmcFleet
+from lib.open_bmc import (SNAPSHOT_PATHS, BmcSnapshot, extract_snapshot,
+                          get_snapshot)
+
+OBMC = 'xyz.openbmc_project'
+OBMC_PATH = '/xyz/openbmc_project'
+
+
+class TestOpenBmc(unittest.TestCase):
+
+    def test_extract_snapshot(self):
+        objects = {
+            f'{OBMC_PATH}/state/chassis0': {
+                'CurrentPowerState': f'{OBMC}.State.Chassis.PowerState.On'},
+            f'{OBMC_PATH}/state/bmc0': {
+                'CurrentBMCState': f'{OBMC}.State.BMC.BMCState.Ready'},
+            f'{OBMC_PATH}/control/host0/boot': {
+                'BootSource': f'{OBMC}.Control.Boot.Source.Sources.Network',
+                'BootMode': f'{OBMC}.Control.Boot.Mode.Modes.Safe'},
+            f'{OBMC_PATH}/control/host0/boot/one_time': {'Enabled': 0},
+            f'{OBMC_PATH}/inventory/system': {'SerialNumber': '1234ABC',
+                                              'Model': '8335-GTB'},
+            f'{OBMC_PATH}/inventory/system/chassis': {'SerialNumber': 'X'},
+            f'{OBMC_PATH}/software/1a2b': {
+                'Activation': f'{OBMC}.Software.Activation.Activations.'
+                              'Activating',
+                'RequestedActivation': f'{OBMC}.Software.Activation.'
+                                       'RequestedActivations.Active'}}
+        self.assertEqual(extract_snapshot(objects),
+                         BmcSnapshot('on', None, 'ready', 'network', 'safe',
+                                     '1234ABC', '8335-GTB', True))
+        del objects[f'{OBMC_PATH}/software/1a2b']
+        self.assertEqual(extract_snapshot(objects).fw_activating, False)
+        self.assertEqual(extract_snapshot({}), BmcSnapshot(
+            None, None, None, None, None, None, None, False))
+
+    def test_snapshot_requests(self):
+        class Session(object):
+            urls = []
+
+            def get(self, url, **kwargs):
+                time.sleep(0.2)
+                self.urls.append(url)
+
+                class Response(object):
+                    text = json.dumps({'status': 'ok', 'data': {}})
+                return Response()
+
+        session = Session()
+        start = time.time()
+        self.assertEqual(get_snapshot('bmc1', session), BmcSnapshot(
+            None, None, None, None, None, None, None, False))
+        # The subtrees are requested concurrently
+        self.assertLess(time.time() - start, 0.6)
+        # Only the snapshot subtrees, not sensors or logging
+        self.assertEqual(sorted(session.urls), [
+            'https://bmc1/xyz/openbmc_project/control/host0/enumerate',
+            'https://bmc1/xyz/openbmc_project/inventory/system/enumerate',
+            'https://bmc1/xyz/openbmc_project/software/enumerate',
+            'https://bmc1/xyz/openbmc_project/state/enumerate'])
+        self.assertEqual(len(SNAPSHOT_PATHS), len(session.urls))
+
+    def test_snapshot(self):
+        with BmcFleet(2, 'openbmc') as fleet:
+            address = fleet.get_addresses()[1]
+            bmc = Bmc(address, 'ADMIN', 'admin', 'openbmc')
+            self.assertTrue(bmc.is_connected())
+            bmc.chassis_power('on')
+            bmc.host_boot_source('network')
+            fleet.reset_stats()
+            snapshot = bmc.get_snapshot()
+            # One request per subtree
+            self.assertEqual(fleet.get_stats().requests, 4)
+            self.assertEqual(snapshot, BmcSnapshot(
+                'on', 'running', 'ready', 'network', 'regular',
+                'SIM0000001', '8335-GTB', False))
+            self.assertEqual(snapshot.power_state,
+                             bmc.chassis_power('status'))
+            self.assertEqual(snapshot.boot_source, bmc.host_boot_source())
+            self.assertEqual(snapshot.boot_mode, bmc.host_boot_mode())
+            self.assertEqual(snapshot[5:7], bmc.get_system_sn_pn())
+            bmc.logout()
+            self.assertIsNone(bmc.get_snapshot())
+
+
+class TestCallAll(unittest.TestCase):
+
+    def test_call_all(self):
+        with BmcFleet(3, 'openbmc') as fleet:
+            bmcs = {address: Bmc(address, 'ADMIN', 'admin', 'openbmc')
+                    for address in fleet.get_addresses()}
+            snapshots, pending = call_all(
+                bmcs, lambda bmc: bmc.get_snapshot(), 15)
+            self.assertEqual(pending, [])
+            self.assertEqual(
+                {address: snapshot.serial_number
+                 for address, snapshot in snapshots.items()},
+                {address: f'SIM000000{index}'
+                 for index, address in enumerate(fleet.get_addresses())})
+            for bmc in bmcs.values():
+                bmc.logout()
+
+    def test_call_all_deadline(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def read(delay):
+            if delay is None:
+                raise OSError('no response')
+            release.wait(delay)
+            return delay
+
+        start = time.time()
+        self.assertEqual(call_all({'a': 0, 'b': 2, 'c': None}, read, 0.5),
+                         ({'a': 0}, ['b']))
+        self.assertLess(time.time() - start, 1.5)
+        self.assertEqual(call_all({}, read, 1), ({}, []))
+
+
+if __name__ == '__main__':
+    unittest.main()
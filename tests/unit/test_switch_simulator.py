@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# Copyright 2019 IBM Corp.
+#
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+import tests.unit  # noqa: F401 (sets up import path)
+from lib.switch_simulator import (MellanoxCli, SimulatedFabric,
+                                  SwitchSimulator, format_vlans, parse_vlans)
+
+
+class TestSwitchSimulator(unittest.TestCase):
+
+    def test_vlan_lists(self):
+        self.assertEqual(parse_vlans('1,5-7'), {1, 5, 6, 7})
+        self.assertEqual(parse_vlans('1 5-7'), {1, 5, 6, 7})
+        self.assertEqual(format_vlans({1, 5, 6, 7, 9}), ['1', '5-7', '9'])
+
+    def test_mellanox_lag(self):
+        cli = MellanoxCli(4)
+        status, _ = cli.execute(
+            'cli enable "configure terminal" "vlan 10" '
+            '"interface port-channel 3" "switchport mode hybrid" '
+            '"switchport hybrid allowed-vlan add 10"')
+        self.assertEqual(status, 0)
+        for port in (3, 4):
+            cli.execute(f'cli enable "configure terminal" '
+                        f'"interface ethernet 1/{port}" '
+                        f'"channel-group 3 mode active"')
+        self.assertEqual(cli.lags[3].allowed, {10})
+        _, summary = cli.execute('cli enable "configure terminal" '
+                                 '"show interfaces port-channel summary"')
+        self.assertIn('Eth1/3(P)', summary)
+        self.assertIn('Eth1/4(P)', summary)
+        _, switchport = cli.execute('cli enable "show interfaces switchport"')
+        self.assertIn('Eth1/2 ', switchport)
+        self.assertNotIn('Eth1/3 ', switchport)
+        _, mlag = cli.execute('cli enable "show mlag"')
+        self.assertIn('Unrecognized command', mlag)
+
+    def test_failure_injection(self):
+        switch = SwitchSimulator('cisco', fail_pattern=r'^vlan 5$')
+        status, output = switch.run('configure terminal ; vlan 5')
+        self.assertEqual(status, 1)
+        self.assertIn('simulated failure', output)
+        self.assertNotIn(5, switch.cli.vlans)
+        self.assertEqual(switch.run('configure terminal ; vlan 6')[0], 0)
+        self.assertEqual(switch.stats.failures, 1)
+        self.assertEqual(switch.stats.commands, 4)
+
+    def test_driver_round_trip(self):
+        from lib.switch import SwitchFactory
+        from lib.switch_common import SwitchCommon
+        ssh_port = SwitchCommon.SSH_PORT
+        with SimulatedFabric(1, 'lenovo', ports=8, macs_per_port=2,
+                             userid='admin', password='passw0rd') as fabric:
+            SwitchCommon.SSH_PORT = fabric.port
+            try:
+                switch = SwitchFactory.factory(
+                    'lenovo', fabric.switches[0].host, 'admin', 'passw0rd')
+                port_mode, allow_op = switch.get_enums()
+                switch.create_vlan(20)
+                switch.set_switchport_mode(5, port_mode.TRUNK, 20)
+                switch.allowed_vlans_port(5, allow_op.ADD, [20, 21])
+                ports = switch.show_ports(format='std')
+                macs = switch.show_mac_address_table(format='std')
+            finally:
+                SwitchCommon.SSH_PORT = ssh_port
+        self.assertEqual(ports['5'], {'mode': 'trunk', 'nvlan': '20',
+                                      'avlans': '20, 21'})
+        self.assertEqual(ports['6']['mode'], 'access')
+        self.assertEqual(len(macs), 8)
+        self.assertEqual(macs['5'], ['02:00:00:00:05:00',
+                                     '02:00:00:00:05:01'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# Copyright 2019 IBM Corp.
+#
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import tempfile
+import unittest
+
+import tests.unit  # noqa: F401 (sets up import path)
+import lib.trace as trace
+from lib.utilities import sub_proc_exec
+
+
+class Switch(object):
+
+    def __init__(self, host):
+        self.host = host
+
+    @trace.traced(trace.SWITCH, host_attr='host')
+    def send_cmd(self, cmd):
+        if cmd == 'bad':
+            raise ValueError(cmd)
+        return cmd
+
+
+class TestTrace(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'trace.jsonl')
+
+    def tearDown(self):
+        trace.finish()
+        self.tmp.cleanup()
+
+    def test_disabled(self):
+        self.assertIsNone(trace.get_path())
+        with trace.span(trace.PHASE, 'create_inventory') as span:
+            span.set(rc=0)
+        trace.count('bmc.login_failures')
+        self.assertEqual(Switch('sw1').send_cmd('show vlan'), 'show vlan')
+        self.assertIsNone(trace.finish())
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_spans(self):
+        self.assertEqual(trace.enable(self.path), self.path)
+        self.assertEqual(os.environ[trace.GEN_TRACE_FILE], self.path)
+        with trace.span(trace.PHASE, 'config_data_switches'):
+            Switch('sw1').send_cmd('show vlan')
+            Switch('sw2').send_cmd('show vlan')
+            with self.assertRaises(ValueError):
+                Switch('sw1').send_cmd('bad')
+            sub_proc_exec('/bin/true')
+        trace.count('bmc.login_failures', 2)
+        summary = trace.finish()
+        self.assertNotIn(trace.GEN_TRACE_FILE, os.environ)
+
+        with open(self.path) as f:
+            entries = [json.loads(line) for line in f]
+        spans = [entry for entry in entries if entry['type'] == 'span']
+        self.assertEqual([span['name'] for span in spans],
+                         ['send_cmd', 'send_cmd', 'send_cmd', 'true',
+                          'config_data_switches'])
+        phase = spans[-1]
+        self.assertIsNone(phase['parent'])
+        self.assertTrue(all(span['parent'] == phase['id']
+                            for span in spans[:-1]))
+        self.assertEqual(spans[2]['host'], 'sw1')
+        self.assertEqual(spans[2]['error'], 'ValueError')
+        self.assertIn('rc', spans[3])
+        self.assertIn({'type': 'counter', 'name': 'bmc.login_failures',
+                       'value': 2, 'pid': os.getpid()}, entries)
+        self.assertIn('config_data_switches', summary)
+        self.assertRegex(summary, r'sw1\s+2\s')
+        self.assertRegex(summary, r'bmc.login_failures\s+2')
+
+
+if __name__ == '__main__':
+    unittest.main()
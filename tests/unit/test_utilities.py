@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# Copyright 2019 IBM Corp.
+#
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+import os
+import subprocess
+import tarfile
+import tempfile
+import time
+import unittest
+
+import tests.unit  # noqa: F401 (sets up import path)
+from lib import utilities
+from lib.utilities import (SUB_PROC_TIMEOUT_RC, bash_cmd, get_netns_name,
+                           get_pids, kill_pid, sub_proc_display,
+                           sub_proc_exec, sub_proc_exec_all, sub_proc_stream,
+                           tar_stream)
+
+
+class TestSubProc(unittest.TestCase):
+
+    def test_timeout(self):
+        start = time.time()
+        stdout, _, rc = sub_proc_exec('sh -c "echo started; sleep 10"',
+                                      shell=True, timeout=0.5)
+        self.assertEqual(rc, SUB_PROC_TIMEOUT_RC)
+        self.assertEqual(stdout, 'started\n')
+        self.assertEqual(sub_proc_display('sleep 10', timeout=0.5),
+                         SUB_PROC_TIMEOUT_RC)
+        self.assertEqual(sub_proc_stream('sleep 10', timeout=0.5),
+                         SUB_PROC_TIMEOUT_RC)
+        with self.assertRaises(subprocess.TimeoutExpired):
+            bash_cmd('sleep 10; echo done', timeout=0.5)
+        with self.assertRaises(subprocess.CalledProcessError) as exc:
+            bash_cmd('echo failed; exit 2')
+        self.assertEqual(exc.exception.output, 'failed\n')
+        self.assertLess(time.time() - start, 5)
+        self.assertEqual(sub_proc_exec('true', timeout=5)[2], 0)
+
+    def test_exec_all(self):
+        start = time.time()
+        results = sub_proc_exec_all(
+            [f'sh -c "sleep 0.{4 - i}; echo {i}; exit {i}"'
+             for i in range(4)], shell=True)
+        self.assertLess(time.time() - start, 1)
+        self.assertEqual(results, [(f'{i}\n', '', i) for i in range(4)])
+        self.assertEqual(sub_proc_exec_all([]), [])
+
+    def test_stream(self):
+        lines = []
+        with tempfile.TemporaryDirectory() as tmp:
+            log_file = os.path.join(tmp, 'out.log')
+            rc = sub_proc_stream('printf "a\\nb\\n" ; echo c >&2 ; exit 3',
+                                 callback=lines.append, log_file=log_file,
+                                 shell=True)
+            with open(log_file) as f:
+                logged = f.read()
+        self.assertEqual(rc, 3)
+        self.assertEqual(lines, ['a\n', 'b\n', 'c\n'])
+        self.assertEqual(logged, 'a\nb\nc\n')
+
+
+class TestProcesses(unittest.TestCase):
+
+    def test_get_pids(self):
+        proc = subprocess.Popen(['sleep', '10'])
+        try:
+            for _ in range(50):
+                if str(proc.pid) in get_pids('sleep'):
+                    break
+                time.sleep(0.02)
+            self.assertIn(str(proc.pid), get_pids('sleep'))
+            self.assertTrue(kill_pid(proc.pid))
+            proc.wait()
+        finally:
+            proc.kill()
+        self.assertNotIn(str(proc.pid), get_pids('sleep'))
+        self.assertFalse(kill_pid(proc.pid))
+
+    def test_get_netns_name(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            netns_path = utilities.NETNS_PATH
+            utilities.NETNS_PATH = tmp
+            try:
+                self.assertEqual(get_netns_name(os.getpid()), '')
+                # A bind mount of a namespace has the namespace's inode
+                os.symlink(f'/proc/{os.getpid()}/ns/net',
+                           os.path.join(tmp, 'ipmi-ns-1'))
+                self.assertEqual(get_netns_name(os.getpid()), 'ipmi-ns-1')
+                self.assertEqual(get_netns_name('999999999'), '')
+            finally:
+                utilities.NETNS_PATH = netns_path
+
+
+class TestTarStream(unittest.TestCase):
+
+    def test_tar_stream(self):
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp:
+            os.makedirs(os.path.join(tmp, 'scripts', 'lib'))
+            files = {'scripts/lib/a.py': b'a' * 3000,
+                     'scripts/b.sh': b'b',
+                     'config.yml': os.urandom(100000)}
+            for name, data in files.items():
+                with open(os.path.join(tmp, name), 'wb') as f:
+                    f.write(data)
+            chunks = list(tar_stream([os.path.join(tmp, 'scripts/'),
+                                      os.path.join(tmp, 'config.yml')],
+                                     chunk_size=4096))
+            self.assertTrue(all(len(chunk) <= 4096 for chunk in chunks))
+            # No temporary archive is written
+            self.assertEqual(sorted(os.listdir(tmp)), ['config.yml', 'scripts'])
+            with tarfile.open(fileobj=io.BytesIO(b''.join(chunks))) as tar:
+                names = tar.getnames()
+                for name, data in files.items():
+                    self.assertEqual(tar.extractfile(name).read(), data)
+            self.assertEqual(names[0], 'scripts')
+            self.assertIn('scripts/lib', names)
+
+            with self.assertRaises(FileNotFoundError):
+                list(tar_stream([os.path.join(tmp, 'config.yml'),
+                                 os.path.join(tmp, 'missing')]))
+            # The reader may stop early
+            stream = tar_stream([os.path.join(tmp, 'config.yml')], 512)
+            next(stream)
+            stream.close()
+        self.assertEqual(os.getcwd(), cwd)
+
+
+if __name__ == '__main__':
+    unittest.main()